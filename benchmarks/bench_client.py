@@ -0,0 +1,242 @@
+# benchmarks/bench_client.py
+"""
+Throughput and latency benchmark for LLMClient against the local mock server.
+
+Starts ``utils.mock.server`` in a subprocess (so its CPU time is not charged to
+the client), or with ``--transport inprocess`` serves it without sockets, then for each concurrency level sends a fixed number of requests
+and reports requests/s, p50/p95/p99 latency, client CPU per request and peak
+RSS. Latencies and errors are seeded, so results are comparable between
+commits:
+
+    python -m benchmarks.bench_client --output before.json
+    python -m benchmarks.bench_client --compare before.json --max-regression 0.1
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import resource
+import socket
+import subprocess
+import sys
+import time
+from typing import List, Dict, Any, Optional
+
+# The mock server ignores credentials, but the client still needs keys
+os.environ.setdefault("ANTHROPIC_API_KEY", "bench")
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+from core.api.client import LLMClient, APIError
+from core.api.transport import InProcessTransport
+from core.models.config import ModelType
+from utils.mock.server import MockProviderServer, MockConfig
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+def rss_mb() -> float:
+    """Current resident set size, falling back to the peak where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def start_mock(port: int, args: argparse.Namespace) -> subprocess.Popen:
+    process = subprocess.Popen([
+        sys.executable, "-m", "utils.mock.server",
+        "--port", str(port),
+        "--latency", args.latency,
+        "--tokens-per-second", str(args.tokens_per_second),
+        "--output-tokens", str(args.output_tokens),
+        "--payload-bytes", str(args.payload_bytes),
+        "--rate-429", str(args.rate_429),
+        "--rate-5xx", str(args.rate_5xx),
+    ])
+    deadline = time.monotonic() + 10
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            return process
+        except OSError:
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError("Mock server did not start")
+
+async def run_level(client: LLMClient, model_type: ModelType, concurrency: int,
+                    requests: int, stream: bool) -> Dict[str, Any]:
+    """Send ``requests`` calls from ``concurrency`` workers and summarize them."""
+    messages = [{"role": "user", "content": "benchmark prompt"}]
+    latencies: List[float] = []
+    errors = 0
+    remaining = requests
+    peak_rss = rss_mb()
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            try:
+                response = await client.generate(model_type, messages, stream=stream, max_tokens=256)
+                if stream:
+                    async for _ in client.stream_response(response):
+                        pass
+                latencies.append(time.perf_counter() - started)
+            except APIError:
+                errors += 1
+
+    async def sample_rss():
+        nonlocal peak_rss
+        while True:
+            await asyncio.sleep(0.05)
+            peak_rss = max(peak_rss, rss_mb())
+
+    sampler = asyncio.create_task(sample_rss())
+    cpu_started, wall_started = time.process_time(), time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - wall_started
+    cpu = time.process_time() - cpu_started
+    sampler.cancel()
+    peak_rss = max(peak_rss, rss_mb())
+
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": errors,
+        "rps": requests / wall,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "cpu_ms_per_request": cpu / requests * 1000,
+        "peak_rss_mb": peak_rss,
+    }
+
+def mock_config(args: argparse.Namespace) -> MockConfig:
+    return MockConfig(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        output_tokens=args.output_tokens,
+        payload_bytes=args.payload_bytes,
+        rate_429=args.rate_429,
+        rate_5xx=args.rate_5xx,
+    )
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    model_type = ModelType(args.model)
+    results = []
+    mock = None
+    if args.transport == "inprocess":
+        # No sockets or serialization: isolates the client's own overhead,
+        # though the mock's response building is charged to the same process
+        client = LLMClient(transport=InProcessTransport(MockProviderServer(mock_config(args)).handle))
+    else:
+        port = free_port()
+        mock = start_mock(port, args)
+        base = f"http://127.0.0.1:{port}"
+        client = LLMClient(anthropic_base_url=f"{base}/v1/messages", openai_base_url=f"{base}/v1/chat/completions")
+    try:
+        async with client:
+            await run_level(client, model_type, 1, args.warmup, args.stream)
+            for concurrency in args.concurrency:
+                results.append(await run_level(client, model_type, concurrency, args.requests, args.stream))
+    finally:
+        if mock is not None:
+            mock.terminate()
+            mock.wait()
+
+    return {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": {
+            key: getattr(args, key)
+            for key in ("transport", "model", "stream", "requests", "latency", "tokens_per_second",
+                        "output_tokens", "payload_bytes", "rate_429", "rate_5xx")
+        },
+        "results": results,
+    }
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], max_regression: float) -> List[str]:
+    """Print deltas against a baseline and return descriptions of regressions."""
+    regressions = []
+    if current["config"] != baseline["config"]:
+        print("warning: benchmark configurations differ; deltas may not be meaningful")
+    before = {r["concurrency"]: r for r in baseline["results"]}
+    print(f"\nvs {baseline.get('revision') or 'baseline'}:")
+    for row in current["results"]:
+        old = before.get(row["concurrency"])
+        if not old:
+            continue
+        deltas = {
+            key: (row[key] - old[key]) / old[key] if old[key] else 0.0
+            for key in ("rps", "p95_ms", "cpu_ms_per_request")
+        }
+        print(f"  c={row['concurrency']:<4} " + "  ".join(f"{k} {v:+.1%}" for k, v in deltas.items()))
+        if deltas["rps"] < -max_regression:
+            regressions.append(f"c={row['concurrency']} rps {deltas['rps']:+.1%}")
+        if deltas["cpu_ms_per_request"] > max_regression:
+            regressions.append(f"c={row['concurrency']} cpu/request {deltas['cpu_ms_per_request']:+.1%}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--model", default=ModelType.GPT4O.value, choices=[m.value for m in ModelType])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per concurrency level")
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--stream", action="store_true")
+    parser.add_argument("--transport", choices=["http", "inprocess"], default="http",
+                        help="'inprocess' skips sockets to measure client-side overhead alone")
+    parser.add_argument("--latency", default="fixed:0.005", help="Mock latency distribution")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0)
+    parser.add_argument("--output-tokens", type=int, default=64)
+    parser.add_argument("--payload-bytes", type=int, default=0)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--rate-5xx", type=float, default=0.0)
+    parser.add_argument("--output", help="Write results as JSON")
+    parser.add_argument("--compare", help="Baseline JSON from a previous run")
+    parser.add_argument("--max-regression", type=float, default=0.1,
+                        help="Fail when rps drops or CPU/request rises by more than this fraction")
+    args = parser.parse_args()
+
+    # Injected errors are counted, not logged
+    logging.getLogger("core.api").setLevel(logging.CRITICAL)
+    report = asyncio.run(run(args))
+    print(f"{'conc':>5} {'rps':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'cpu ms/req':>11} {'rss MB':>8} {'errors':>7}")
+    for row in report["results"]:
+        print(
+            f"{row['concurrency']:>5} {row['rps']:>9.1f} {row['p50_ms']:>8.2f} {row['p95_ms']:>8.2f} "
+            f"{row['p99_ms']:>8.2f} {row['cpu_ms_per_request']:>11.3f} {row['peak_rss_mb']:>8.1f} {row['errors']:>7}"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.max_regression)
+        if regressions:
+            print("FAIL: " + "; ".join(regressions))
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
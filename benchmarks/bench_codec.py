@@ -0,0 +1,56 @@
+# benchmarks/bench_codec.py
+"""
+Microbenchmark for request encoding and response/stream decoding.
+
+Compares the stdlib and orjson codecs, with and without a pre-serialized
+message prefix, on a long conversation:
+
+    python -m benchmarks.bench_codec --turns 200 --message-bytes 2000
+"""
+import argparse
+import json
+import timeit
+
+from core.api.codec import JSONCodec, OrjsonCodec, MessagePrefix, orjson
+
+def build_history(turns: int, message_bytes: int):
+    return [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": f"turn {i} " + "x" * message_bytes}
+        for i in range(turns)
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--message-bytes", type=int, default=2000)
+    parser.add_argument("--number", type=int, default=200)
+    args = parser.parse_args()
+
+    history = build_history(args.turns, args.message_bytes)
+    question = [{"role": "user", "content": "And the next step?"}]
+    response = json.dumps({
+        "choices": [{"message": {"role": "assistant", "content": "y" * 4000}}],
+        "usage": {"prompt_tokens": 1000, "completion_tokens": 1000},
+    }).encode()
+    event = b'data: {"choices":[{"delta":{"content":"token"}}]}\n'
+
+    codecs = [JSONCodec()] + ([OrjsonCodec()] if orjson is not None else [])
+    rows = [("aiohttp json= (baseline)", lambda: json.dumps({"model": "gpt-4o", "messages": history + question}).encode())]
+    for codec in codecs:
+        prefix = MessagePrefix(history)
+        rows.append((f"{codec.name} encode", lambda c=codec: c.encode_payload({"model": "gpt-4o", "messages": history + question})))
+        rows.append((f"{codec.name} encode+prefix", lambda c=codec, p=prefix: c.encode_payload({"model": "gpt-4o", "messages": p + question})))
+    rows.append(("response.json() (baseline)", lambda: json.loads(response.decode())))
+    for codec in codecs:
+        rows.append((f"{codec.name} decode", lambda c=codec: c.loads(response)))
+    rows.append(("SSE line stdlib (baseline)", lambda: json.loads(event.strip().removeprefix(b"data: "))))
+    for codec in codecs:
+        rows.append((f"{codec.name} SSE line", lambda c=codec: c.loads(event.strip()[6:])))
+
+    print(f"{'case':<30} {'us/op':>10}")
+    for name, fn in rows:
+        seconds = min(timeit.repeat(fn, number=args.number, repeat=5)) / args.number
+        print(f"{name:<30} {seconds * 1e6:>10.2f}")
+
+if __name__ == "__main__":
+    main()
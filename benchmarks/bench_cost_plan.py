@@ -0,0 +1,71 @@
+# benchmarks/bench_cost_plan.py
+"""
+Vectorized workload pricing vs a calculate_cost loop.
+
+Builds a synthetic workload of N requests and prices it on every model, once
+with CostPlanner.cost_matrix and once by calling ModelManager.calculate_cost
+per request and model, then times a full plan over the default policies:
+
+    python -m benchmarks.bench_cost_plan --requests 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from core.models.manager import ModelManager
+from core.models.planner import CostPlanner, Workload, MODELS
+
+TASKS = np.array(["chat", "code", "analysis", "creative", "summarize"])
+
+def build_workload(requests: int, seed: int) -> Workload:
+    rng = np.random.default_rng(seed)
+    return Workload(
+        input_tokens=rng.lognormal(7, 1.2, requests).astype(np.int64),
+        output_tokens=rng.lognormal(5, 1.0, requests).astype(np.int64),
+        cache_read_tokens=np.where(rng.random(requests) < 0.3, rng.integers(1024, 8192, requests), 0),
+        cache_write_tokens=np.zeros(requests, dtype=np.int64),
+        model=rng.integers(0, len(MODELS), requests).astype(np.int16),
+        batch=rng.random(requests) < 0.2,
+        task_type=TASKS[rng.integers(0, len(TASKS), requests)],
+        priority=np.full(requests, "balanced"),
+        budget=np.where(rng.random(requests) < 0.1, rng.choice([0.01, 0.03, 0.1], requests), np.nan),
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=1_000_000)
+    parser.add_argument("--scalar-sample", type=int, default=100_000, help="Requests priced by the scalar loop")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    workload = build_workload(args.requests, args.seed)
+    planner = CostPlanner()
+
+    started = time.perf_counter()
+    planner.cost_matrix(workload)
+    vectorized = time.perf_counter() - started
+
+    manager = ModelManager()
+    sample = min(args.scalar_sample, args.requests)
+    rows = zip(
+        workload.input_tokens[:sample].tolist(), workload.output_tokens[:sample].tolist(),
+        workload.cache_read_tokens[:sample].tolist(), workload.batch[:sample].tolist(),
+    )
+    started = time.perf_counter()
+    for input_tokens, output_tokens, cache_read, batch in rows:
+        for model in MODELS:
+            manager.calculate_cost(model, input_tokens, output_tokens, batch=batch, cache_read_tokens=cache_read)
+    scalar = (time.perf_counter() - started) * args.requests / sample
+
+    started = time.perf_counter()
+    plan = planner.plan(workload)
+    planning = time.perf_counter() - started
+
+    print(f"{args.requests} requests x {len(MODELS)} models")
+    print(f"  cost_matrix          {vectorized * 1000:>10.1f} ms")
+    print(f"  calculate_cost loop  {scalar * 1000:>10.1f} ms (extrapolated from {sample})   {scalar / vectorized:.0f}x slower")
+    print(f"  plan ({len(plan.policies)} policies)     {planning * 1000:>10.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# benchmarks/bench_import.py
+"""
+Import-time budget check for CLI commands.
+
+Runs each command in a fresh interpreter with ``-X importtime``, subtracts
+the cost of a bare interpreter, and compares what is left against a per-
+command budget. Commands that only print static data must also not import
+the heavy modules listed for them. Exits non-zero on any violation:
+
+    python -m benchmarks.bench_import
+    python -m benchmarks.bench_import --budget-scale 2 --top 10   # slower machine
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+# Budgets in milliseconds of import time above a bare interpreter. Help
+# output is rendered by typer through rich, which accounts for most of it.
+BUDGETS: Dict[str, float] = {
+    "--help": 300,
+    "list-models": 175,
+    "cost-estimate --model gpt-4o --input 1000 --output 500": 150,
+    "chat --help": 300,
+    "batch run --help": 300,
+    "serve --help": 300,
+}
+
+# Modules a command must not import at all
+STATIC = ("aiohttp", "pydantic_settings", "dotenv", "asyncio", "uvicorn", "fastapi")
+FORBIDDEN: Dict[str, Tuple[str, ...]] = {
+    "--help": STATIC,
+    "list-models": STATIC,
+    "cost-estimate --model gpt-4o --input 1000 --output 500": STATIC,
+    "chat --help": STATIC,
+    "batch run --help": STATIC,
+    "serve --help": STATIC,
+}
+
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+def import_profile(args: List[str]) -> Dict[str, Tuple[int, int, int]]:
+    """Map module -> (self us, cumulative us, nesting depth) for one run."""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        capture_output=True, text=True, env=env,
+    )
+    profile = {}
+    for line in result.stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            profile[name] = (int(self_us), int(cumulative_us), len(indent))
+    return profile
+
+def total_ms(profile: Dict[str, Tuple[int, int, int]]) -> float:
+    return sum(cumulative for _, cumulative, depth in profile.values() if depth == 1) / 1000
+
+def measure(args: List[str], runs: int) -> Tuple[float, Dict[str, Tuple[int, int, int]]]:
+    profiles = [import_profile(args) for _ in range(runs)]
+    return statistics.median(total_ms(p) for p in profiles), profiles[-1]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=5, help="Runs per command; the median is reported")
+    parser.add_argument("--budget-scale", type=float, default=1.0, help="Multiply all budgets")
+    parser.add_argument("--top", type=int, default=0, help="Show the N slowest modules per command")
+    args = parser.parse_args()
+
+    baseline, baseline_profile = measure(["-c", "pass"], args.runs)
+    print(f"bare interpreter: {baseline:.1f} ms\n")
+    print(f"{'command':<56} {'import ms':>10} {'budget':>8}")
+
+    failures = []
+    for command, budget in BUDGETS.items():
+        budget *= args.budget_scale
+        elapsed, profile = measure(["-m", "interfaces.cli.main", *command.split()], args.runs)
+        elapsed -= baseline
+        status = "ok" if elapsed <= budget else "OVER"
+        print(f"{command:<56} {elapsed:>10.1f} {budget:>8.0f}  {status}")
+        if elapsed > budget:
+            failures.append(f"{command}: {elapsed:.1f} ms > {budget:.0f} ms")
+
+        loaded = {name.split(".")[0] for name in profile}
+        for module in FORBIDDEN.get(command, ()):
+            if module in loaded:
+                failures.append(f"{command}: imports {module}")
+
+        if args.top:
+            slowest = sorted(
+                ((self_us, name) for name, (self_us, _, _) in profile.items() if name not in baseline_profile),
+                reverse=True,
+            )[:args.top]
+            for self_us, name in slowest:
+                print(f"    {self_us / 1000:7.2f} ms  {name}")
+
+    if failures:
+        print("\nFAIL:\n  " + "\n  ".join(failures))
+        sys.exit(1)
+    print("\nOK")
+
+if __name__ == "__main__":
+    main()
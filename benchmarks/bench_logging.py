@@ -0,0 +1,115 @@
+# benchmarks/bench_logging.py
+"""
+Event-loop stall caused by logging on the request path.
+
+Runs simulated requests that log at DEBUG and INFO while a monitor coroutine
+measures how late its 1 ms timer fires, first with a plain file handler on
+the loop thread and then with configure_logging's queue and writer thread:
+
+    python -m benchmarks.bench_logging --records 50000 --slow-write-us 50
+
+``--slow-write-us`` adds a delay per write to stand in for a slow disk or a
+blocked stderr pipe. The last table compares the cost of a disabled DEBUG
+call with an f-string message and with lazy %-style arguments.
+"""
+import argparse
+import asyncio
+import logging
+import tempfile
+import time
+import timeit
+from pathlib import Path
+
+from utils.bench.hdr import HdrHistogram
+from utils.log.setup import configure_logging, stop_logging
+
+FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+class SlowFileHandler(logging.FileHandler):
+    def __init__(self, path, delay: float):
+        super().__init__(path)
+        self.delay = delay
+
+    def emit(self, record):
+        super().emit(record)
+        if self.delay:
+            time.sleep(self.delay)
+
+async def workload(logger: logging.Logger, records: int, tasks: int, interval: float):
+    stalls = HdrHistogram()
+    done = asyncio.Event()
+
+    async def monitor():
+        loop = asyncio.get_running_loop()
+        while not done.is_set():
+            expected = loop.time() + interval
+            await asyncio.sleep(interval)
+            stalls.record(max(0.0, loop.time() - expected))
+
+    async def request(worker: int):
+        for i in range(records // tasks):
+            logger.debug("Sending request %s to %s", f"{worker}-{i}", "gpt-4o")
+            if i % 10 == 0:
+                logger.info("Completed %d requests on worker %d", i, worker)
+            await asyncio.sleep(0)
+
+    watcher = asyncio.create_task(monitor())
+    started = time.perf_counter()
+    await asyncio.gather(*(request(w) for w in range(tasks)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await watcher
+    return elapsed, stalls
+
+def run(mode: str, args, path: Path):
+    logger = logging.getLogger("bench")
+    handler = SlowFileHandler(path, args.slow_write_us / 1e6)
+    root = logging.getLogger()
+    if mode == "sync":
+        handler.setFormatter(logging.Formatter(FORMAT))
+        root.handlers[:] = [handler]
+        root.setLevel(logging.DEBUG)
+    else:
+        configure_logging("DEBUG", FORMAT, args.sample_every, handler=handler)
+    elapsed, stalls = asyncio.run(workload(logger, args.records, args.tasks, args.interval))
+    flush_started = time.perf_counter()
+    if mode == "sync":
+        handler.close()
+    else:
+        stop_logging()
+    flushed = time.perf_counter() - flush_started
+    root.handlers[:] = []
+    return elapsed, flushed, stalls
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--records", type=int, default=50000, help="DEBUG records logged")
+    parser.add_argument("--tasks", type=int, default=100)
+    parser.add_argument("--interval", type=float, default=0.001, help="Monitor timer, seconds")
+    parser.add_argument("--slow-write-us", type=float, default=0.0, help="Extra microseconds per write")
+    parser.add_argument("--sample-every", type=int, default=1, help="Queue mode: keep 1 in N DEBUG records")
+    args = parser.parse_args()
+
+    print(f"{'handler':<10} {'loop time':>10} {'drain':>8} {'stall p50':>10} {'stall p99':>10} {'stall max':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("sync", "queue"):
+            elapsed, flushed, stalls = run(mode, args, Path(tmp) / f"{mode}.log")
+            print(
+                f"{mode:<10} {elapsed:>9.2f}s {flushed:>7.2f}s {stalls.percentile(50) * 1e3:>8.2f}ms "
+                f"{stalls.percentile(99) * 1e3:>8.2f}ms {stalls.max * 1e3:>8.2f}ms"
+            )
+
+    logger = logging.getLogger("bench.disabled")
+    logger.setLevel(logging.INFO)
+    task, length, priority = "analysis", 5000, "balanced"
+    cases = [
+        ("f-string", lambda: logger.debug(f"Selecting model for task: {task}, length: {length}, priority: {priority}")),
+        ("lazy %s", lambda: logger.debug("Selecting model for task: %s, length: %s, priority: %s", task, length, priority)),
+    ]
+    print(f"\n{'disabled DEBUG call':<20} {'ns/call':>8}")
+    for name, fn in cases:
+        seconds = min(timeit.repeat(fn, number=100000, repeat=5)) / 100000
+        print(f"{name:<20} {seconds * 1e9:>8.0f}")
+
+if __name__ == "__main__":
+    main()
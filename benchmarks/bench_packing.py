@@ -0,0 +1,89 @@
+# benchmarks/bench_packing.py
+"""
+Throughput and cost of packed vs unpacked batch dispatch.
+
+Runs a classification-style batch (shared instructions, tiny prompts)
+through BatchRunner against the mock server, unpacked and with several pack
+sizes, and reports items/s, requests sent and cost:
+
+    python -m benchmarks.bench_packing --items 500 --pack-sizes 5,10,20 --drop-rate 0.02
+"""
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from core.api.client import LLMClient
+from core.api.transport import InProcessTransport
+from core.batch.packing import PromptPacker
+from core.batch.runner import BatchRunner
+from core.models.config import ModelType
+from utils.mock.server import MockProviderServer, MockConfig
+
+INSTRUCTIONS = (
+    "Classify the sentiment of the review as positive, negative or neutral. "
+    "Consider sarcasm, mixed opinions and domain-specific vocabulary. " * 20
+)
+
+def write_input(path: Path, items: int, model: ModelType):
+    with open(path, "w") as f:
+        for i in range(items):
+            f.write(json.dumps({
+                "id": f"r{i}",
+                "model": model.value,
+                "system": INSTRUCTIONS,
+                "prompt": f"Review {i}: the product arrived on time and works as described.",
+                "max_tokens": 8,
+            }) + "\n")
+
+async def run(args, input_path: Path, output_path: Path, pack: int):
+    server = MockProviderServer(MockConfig(
+        latency=f"fixed:{args.latency}",
+        output_tokens=2,
+        prefill_tokens_per_second=args.prefill_tokens_per_second,
+        pack_drop_rate=args.drop_rate,
+    ))
+    async with LLMClient(transport=InProcessTransport(server.handle), prompt_cache=args.prompt_cache) as client:
+        runner = BatchRunner(
+            client,
+            concurrency=args.concurrency,
+            retry_backoff=0.0,
+            packer=PromptPacker(max_items=pack) if pack else None,
+        )
+        started = time.perf_counter()
+        stats = await runner.run(input_path, output_path)
+        elapsed = time.perf_counter() - started
+    provider = "anthropic" if args.model == ModelType.CLAUDE else "openai"
+    return stats, elapsed, server.stats[f"{provider}_requests"]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--items", type=int, default=500)
+    parser.add_argument("--pack-sizes", default="5,10,20")
+    parser.add_argument("--model", type=ModelType, default=ModelType.CLAUDE)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.05, help="Fixed mock latency per request in seconds")
+    parser.add_argument("--prefill-tokens-per-second", type=float, default=50_000)
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="Share of packed inputs the mock leaves out")
+    parser.add_argument("--prompt-cache", action="store_true", help="Keep automatic prompt caching on")
+    args = parser.parse_args()
+
+    print(f"{'pack':>6} {'items/s':>9} {'requests':>9} {'resent':>7} {'cost $':>9} {'failed':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        input_path = Path(tmp) / "input.jsonl"
+        write_input(input_path, args.items, args.model)
+        baseline = None
+        for pack in [0] + [int(n) for n in args.pack_sizes.split(",")]:
+            output_path = Path(tmp) / f"output-{pack}.jsonl"
+            stats, elapsed, requests = asyncio.run(run(args, input_path, output_path, pack))
+            rate = stats.completed / elapsed
+            baseline = baseline or (rate, stats.cost)
+            print(
+                f"{pack or 'off':>6} {rate:>9.1f} {requests:>9} {stats.unpacked:>7} {stats.cost:>9.4f} {stats.failed:>7}"
+                f"   {rate / baseline[0]:.1f}x throughput, {stats.cost / baseline[1]:.2f}x cost"
+            )
+
+if __name__ == "__main__":
+    main()
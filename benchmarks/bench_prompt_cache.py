@@ -0,0 +1,73 @@
+# benchmarks/bench_prompt_cache.py
+"""
+Latency and cost saved by automatic prompt-cache breakpoints.
+
+Sends Claude requests sharing a long system prompt and document to the mock
+server, which emulates Anthropic's prompt cache and charges simulated prefill
+time for uncached prompt tokens, once with automatic caching off and once on:
+
+    python -m benchmarks.bench_prompt_cache --requests 50 --context-tokens 20000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from core.api.client import LLMClient
+from core.api.transport import InProcessTransport
+from core.models.config import ModelType
+from core.models.manager import ModelManager
+from utils.mock.server import MockProviderServer, MockConfig
+
+async def run(args, prompt_cache: bool):
+    server = MockProviderServer(MockConfig(
+        latency=f"fixed:{args.latency}",
+        output_tokens=args.output_tokens,
+        prefill_tokens_per_second=args.prefill_tokens_per_second,
+    ))
+    manager = ModelManager()
+    system = "You answer questions about the document below.\n\n" + "lorem ipsum " * (args.context_tokens // 3)
+    latencies, cost = [], 0.0
+    async with LLMClient(transport=InProcessTransport(server.handle), prompt_cache=prompt_cache) as client:
+        for i in range(args.requests):
+            started = time.perf_counter()
+            response = await client.generate(
+                ModelType.CLAUDE,
+                [{"role": "user", "content": f"Question {i}: what does paragraph {i} say?"}],
+                max_tokens=args.output_tokens,
+                system=system,
+            )
+            latencies.append(time.perf_counter() - started)
+            usage = response.usage
+            cost += manager.calculate_cost(
+                ModelType.CLAUDE, usage.input_tokens, usage.output_tokens,
+                cache_read_tokens=usage.cache_read_tokens, cache_write_tokens=usage.cache_write_tokens,
+            )
+        report = client.prompt_cache.report(manager) if client.prompt_cache else None
+    return latencies, cost, report
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--context-tokens", type=int, default=20000, help="Approximate size of the shared prompt")
+    parser.add_argument("--output-tokens", type=int, default=64)
+    parser.add_argument("--latency", type=float, default=0.02, help="Fixed mock latency in seconds")
+    parser.add_argument("--prefill-tokens-per-second", type=float, default=200_000)
+    args = parser.parse_args()
+
+    print(f"{'prompt cache':<14} {'mean ms':>9} {'p95 ms':>9} {'total $':>10}")
+    results = {}
+    for enabled in (False, True):
+        latencies, cost, report = asyncio.run(run(args, enabled))
+        results[enabled] = (statistics.mean(latencies), cost)
+        p95 = statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else latencies[0]
+        print(f"{'on' if enabled else 'off':<14} {statistics.mean(latencies) * 1000:>9.1f} {p95 * 1000:>9.1f} {cost:>10.4f}")
+
+    (off_latency, off_cost), (on_latency, on_cost) = results[False], results[True]
+    print(f"\nsaved: {(off_latency - on_latency) * 1000:.1f} ms per request, "
+          f"${off_cost - on_cost:.4f} ({(1 - on_cost / off_cost) * 100:.0f}% of cost)")
+    print(f"hits {report['hits']}/{report['requests']}, "
+          f"{report['cache_read_tokens']} tokens read, {report['cache_write_tokens']} written")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# benchmarks/bench_response_memory.py
+"""
+Memory footprint of held responses: decoded dicts vs LLMResponse.
+
+Builds mock-server-shaped response bodies and measures, with tracemalloc,
+the memory held by N of them in each form:
+
+    python -m benchmarks.bench_response_memory --count 100000 --output-tokens 50
+"""
+import argparse
+import gc
+import json
+import sys
+import tracemalloc
+from typing import Callable, List
+
+from core.api.response import LLMResponse
+from core.models.config import ModelType
+
+def build_bodies(count: int, output_tokens: int) -> List[bytes]:
+    return [
+        json.dumps({
+            "id": f"msg_{i}",
+            "type": "message",
+            "role": "assistant",
+            "model": ModelType.CLAUDE.value,
+            "content": [{"type": "text", "text": f"{i} " + "tok " * output_tokens}],
+            "stop_reason": "end_turn",
+            "stop_sequence": None,
+            "usage": {"input_tokens": 100 + i % 50, "output_tokens": output_tokens},
+        }).encode()
+        for i in range(count)
+    ]
+
+def held_bytes(build: Callable[[], list]) -> int:
+    gc.collect()
+    tracemalloc.start()
+    held = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del held
+    return size
+
+def read_fields(responses, mapping: bool = False):
+    for response in responses:
+        if mapping:
+            response["content"]
+        else:
+            response.text, response.usage
+    return responses
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--count", type=int, default=100_000)
+    parser.add_argument("--output-tokens", type=int, default=50)
+    args = parser.parse_args()
+
+    # The bodies are allocated before tracing starts; LLMResponse keeps them,
+    # so their size is added to its rows, while the dicts let them go
+    bodies = build_bodies(args.count, args.output_tokens)
+    body_total = sum(sys.getsizeof(body) for body in bodies)
+    wrap = lambda: [LLMResponse(ModelType.CLAUDE, body) for body in bodies]
+    cases = [
+        ("dict (json.loads)", lambda: [json.loads(body) for body in bodies], 0),
+        ("LLMResponse, unread", wrap, body_total),
+        ("LLMResponse, text+usage read", lambda: read_fields(wrap()), body_total),
+        ("LLMResponse, mapping access", lambda: read_fields(wrap(), mapping=True), body_total),
+    ]
+
+    print(f"{args.count} responses, {body_total / args.count:.0f} bytes of body each\n")
+    print(f"{'representation':<32} {'total MB':>10} {'bytes/response':>16}")
+    baseline = None
+    for name, build, retained in cases:
+        size = held_bytes(build) + retained
+        baseline = baseline or size
+        print(f"{name:<32} {size / 2**20:>10.1f} {size / args.count:>16.0f}  {size / baseline:.2f}x")
+
+if __name__ == "__main__":
+    main()
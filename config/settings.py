@@ -35,13 +35,30 @@ class Settings(BaseSettings):
     # Cache Configuration
     CACHE_ENABLED: bool = Field(default=True)
     CACHE_TTL: int = Field(default=3600)
-    
+    # "file" keeps one JSON file per entry; "sqlite" shares entries and
+    # in-flight leases between worker processes on the same host; "redis"
+    # shares entries between hosts through a Redis-compatible server at CACHE_URL
+    cache_backend: str = Field(default="file", alias="CACHE_BACKEND")
+    cache_url: str = Field(default="redis://127.0.0.1:6379/0", alias="CACHE_URL")
+
+    # Request tracing: "" (off), "jsonl" (TRACE_FILE) or "otlp" (an
+    # OTLP/HTTP collector at OTLP_ENDPOINT)
+    trace_exporter: str = Field(default="", alias="TRACE_EXPORTER")
+    trace_file: Path = Field(
+        default_factory=lambda: Path(__file__).parent.parent / ".cache" / "traces.jsonl",
+        alias="TRACE_FILE"
+    )
+    otlp_endpoint: str = Field(default="http://127.0.0.1:4318/v1/traces", alias="OTLP_ENDPOINT")
+    trace_sample_rate: float = Field(default=0.01, alias="TRACE_SAMPLE_RATE")
+
     # Logging
     log_level: str = Field(default="INFO", alias="LOG_LEVEL")
     log_format: str = Field(
         default="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
         alias="LOG_FORMAT"
     )
+    # Keep 1 in N DEBUG records per call site (utils.log.setup.configure_logging)
+    log_debug_sample_every: int = Field(default=1, alias="LOG_DEBUG_SAMPLE_EVERY")
     
     model_config = SettingsConfigDict(
         env_file=".env",
@@ -53,9 +70,8 @@ class Settings(BaseSettings):
     @classmethod
     def from_env(cls) -> "Settings":
         """Create settings from environment variables."""
-        settings = cls()
-        settings.cache_dir.mkdir(parents=True, exist_ok=True)
-        return settings
+        # Directories are created by the components that write to them
+        return cls()
 
     def get(self, key: str, default: Any = None) -> Any:
         """Get setting value by key."""
@@ -76,5 +92,9 @@ def get_settings() -> Settings:
     """Get cached settings instance."""
     return Settings.from_env()
 
-# Create a singleton instance
-settings = get_settings()
\ No newline at end of file
+def __getattr__(name: str) -> Any:
+    # `from config.settings import settings` builds the singleton on first use
+    # rather than whenever this module is imported
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
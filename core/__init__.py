@@ -1,14 +1,39 @@
-# core/__init__.py
-from .models.config import ModelType, ModelConfig
-from .models.manager import ModelManager
-from .api.client import LLMClient, APIError, RateLimitError, TokenLimitError
-
-__all__ = [
-    'ModelType',
-    'ModelConfig',
-    'ModelManager',
-    'LLMClient',
-    'APIError',
-    'RateLimitError',
-    'TokenLimitError'
-]
\ No newline at end of file
+# Exports are imported on first access so that `import core` (and the CLI
+# commands that only need model metadata) does not pull in aiohttp
+from importlib import import_module
+
+_EXPORTS = {
+    'ModelType': '.models.config',
+    'ModelConfig': '.models.config',
+    'ModelManager': '.models.manager',
+    'ModelRegistry': '.models.registry',
+    'get_registry': '.models.registry',
+    'LLMClient': '.api.client',
+    'APIError': '.api.client',
+    'RateLimitError': '.api.client',
+    'TokenLimitError': '.api.client',
+    'QueueFullError': '.api.client',
+    'DeadlineExceededError': '.api.client',
+    'FanOutError': '.api.client',
+    'RequestScheduler': '.api.scheduler',
+    'Priority': '.api.scheduler',
+    'OverflowPolicy': '.api.scheduler',
+    'FanOut': '.api.fanout',
+    'Branch': '.api.fanout',
+    'FanOutPolicy': '.api.fanout',
+    'SyncLLMClient': '.api.sync',
+    'get_sync_client': '.api.sync',
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,89 @@
+# core/api/buffers.py
+"""
+Accounting for the bytes LLMClient holds per request.
+
+A request buffers its encoded body (and the gzip copy, when compressed)
+while it is sent, then the response body while it is read. ``BufferMeter``
+hands each request a ``BufferLease`` that the transport adds to and releases
+from as it goes. The meter exports the bytes held by all in-flight requests
+as a gauge and each request's peak as a histogram, which is what sizes worker
+memory: peak per request times concurrency.
+"""
+from typing import Optional
+
+from utils.metrics.registry import MetricsRegistry, get_registry
+
+# 1 KiB to 256 MiB
+BYTE_BUCKETS = tuple(float(1024 * 4 ** i) for i in range(10))
+
+class BufferLease:
+    """Bytes held by one request."""
+
+    __slots__ = ("meter", "current", "peak", "closed")
+
+    def __init__(self, meter: "BufferMeter"):
+        self.meter = meter
+        self.current = 0
+        self.peak = 0
+        self.closed = False
+
+    def add(self, nbytes: int):
+        self.current += nbytes
+        self.peak = max(self.peak, self.current)
+        self.meter._add(nbytes)
+
+    def release(self, nbytes: int):
+        nbytes = min(nbytes, self.current)
+        self.current -= nbytes
+        self.meter._add(-nbytes)
+
+    def close(self):
+        """Release what is left and record the peak; later calls do nothing."""
+        if self.closed:
+            return
+        self.closed = True
+        self.release(self.current)
+        self.meter._record_peak(self.peak)
+
+class BufferMeter:
+    """Bytes buffered by in-flight requests."""
+
+    def __init__(self, metrics: Optional[MetricsRegistry] = None):
+        """
+        Args:
+            metrics: Registry for the buffer metrics; the process registry by default
+        """
+        registry = metrics or get_registry()
+        self._in_flight = registry.gauge(
+            "llm_buffered_bytes", "Request and response body bytes held by in-flight requests"
+        )
+        self._peak_bytes = registry.histogram(
+            "llm_request_peak_buffered_bytes", "Peak body bytes buffered per request", buckets=BYTE_BUCKETS
+        )
+        self.current = 0
+        self.high_water = 0
+        self.largest_request = 0
+
+    def lease(self) -> BufferLease:
+        return BufferLease(self)
+
+    def _add(self, nbytes: int):
+        self.current += nbytes
+        self.high_water = max(self.high_water, self.current)
+        # inc rather than set, so clients sharing a registry add up
+        self._in_flight.inc(nbytes)
+
+    def _record_peak(self, nbytes: int):
+        self.largest_request = max(self.largest_request, nbytes)
+        self._peak_bytes.observe(nbytes)
+
+    def snapshot(self):
+        """Bytes held now and at most at once, and per-request peaks (percentiles estimated from buckets)."""
+        return {
+            "current": self.current,
+            "high_water": self.high_water,
+            "requests": self._peak_bytes.count(),
+            "peak_p50": self._peak_bytes.quantile(0.5),
+            "peak_p99": self._peak_bytes.quantile(0.99),
+            "peak_max": self.largest_request,
+        }
@@ -1,60 +1,214 @@
 # core/api/client.py
-from typing import Optional, Dict, Any, List, AsyncGenerator
+from typing import Optional, Dict, Any, List, AsyncGenerator, AsyncIterator, Tuple, Union
 import aiohttp
 import json
 import logging
-from ..models.config import ModelType
-from ..security.keys import get_api_key
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from ..models.config import ModelType, get_provider
+from ..models.registry import get_registry
+from ..security.keys import KeyPool, PooledKey, get_key_pool
+from .buffers import BufferMeter
+from .codec import JSONCodec, get_codec
+from .deadline import resolve, within
+from .limiter import AdaptiveLimiter, LimiterGroup, OVERLOAD_STATUSES
+from .prompt_cache import PromptCachePlanner
+from .response import LLMResponse
+from .tracing import Tracer, RequestTrace
+from .transport import Transport, HTTPTransport, BodyTooLargeError
 
 class APIError(Exception):
-    """Base exception for API errors"""
-    pass
+    """Base exception for API errors; ``status`` is the provider's HTTP status, if any"""
+
+    def __init__(self, *args, status: Optional[int] = None):
+        super().__init__(*args)
+        self.status = status
 
 class RateLimitError(APIError):
     """Raised when hitting rate limits"""
     pass
 
+class NetworkError(APIError):
+    """Raised when the provider could not be reached or the connection failed"""
+    pass
+
 class TokenLimitError(APIError):
     """Raised when exceeding token limits"""
     pass
 
+class ResponseTooLargeError(APIError):
+    """Raised when a response body exceeds the client's max_response_bytes"""
+    pass
+
+class QueueFullError(APIError):
+    """Raised when a request is rejected or shed by a full scheduler queue"""
+    pass
+
+class DeadlineExceededError(APIError):
+    """Raised when a request's deadline passes before it completes"""
+    pass
+
+class FanOutError(APIError):
+    """Raised when no fan-out branch satisfies the result policy"""
+
+    def __init__(self, message: str, result=None):
+        super().__init__(message)
+        self.result = result
+
+# Claude requires max_tokens; callers written against OpenAI often omit it
+DEFAULT_CLAUDE_MAX_TOKENS = 1024
+
+# OpenAI request fields Claude also takes, under its own names; the other
+# OpenAI-only fields have no Claude equivalent
+CLAUDE_PARAM_MAP = {
+    "stop": "stop_sequences",
+    "top_k": "top_k",
+    "metadata": "metadata",
+}
+
+def provider_params(
+    model_type: ModelType, messages: List[Dict[str, Any]], params: Dict[str, Any]
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Fit messages and generate() parameters written for either provider to
+    the model's provider.
+
+    Claude takes system messages as ``system``, ``stop`` as
+    ``stop_sequences`` and requires ``max_tokens`` (DEFAULT_CLAUDE_MAX_TOKENS
+    when unset). OpenAI takes ``system`` as a leading system message and
+    ``stop_sequences`` as ``stop``. Other parameters pass through unchanged.
+    """
+    params = dict(params)
+    if get_provider(model_type) == "anthropic":
+        system = [m["content"] for m in messages if m.get("role") == "system"]
+        if system:
+            messages = [m for m in messages if m.get("role") != "system"]
+            if params.get("system"):
+                system.insert(0, params["system"])
+            params["system"] = "\n\n".join(system)
+        for key in [key for key in params if key in CLAUDE_PARAM_MAP and CLAUDE_PARAM_MAP[key] != key]:
+            value = params.pop(key)
+            if key == "stop" and not isinstance(value, list):
+                value = [value] if value is not None else None
+            if value is not None:
+                params.setdefault(CLAUDE_PARAM_MAP[key], value)
+        if params.get("max_tokens") is None:
+            params["max_tokens"] = DEFAULT_CLAUDE_MAX_TOKENS
+    else:
+        system = params.pop("system", None)
+        if system:
+            if not isinstance(system, str):
+                # Claude's list of text blocks
+                system = "\n\n".join(block.get("text", "") for block in system)
+            messages = [{"role": "system", "content": system}, *messages]
+        stop = params.pop("stop_sequences", None)
+        if stop is not None:
+            params.setdefault("stop", stop)
+    return messages, params
+
+# Far above any real completion; bounds what a misbehaving endpoint can make
+# a worker buffer
+DEFAULT_MAX_RESPONSE_BYTES = 32 * 1024 * 1024
+
+@dataclass
+class _HeldStream:
+    """What an open streaming response holds until release_stream."""
+    response: Any
+    pool: KeyPool
+    key: Any
+    limiter: Any
+    latency: float
+    trace: Optional[RequestTrace]
+    deadline: Optional[float]
+
 class LLMClient:
-    def __init__(self):
-        self.anthropic_base_url = "https://api.anthropic.com/v1/messages"
-        self.openai_base_url = "https://api.openai.com/v1/chat/completions"
+    def __init__(
+        self,
+        anthropic_base_url: str = "https://api.anthropic.com/v1/messages",
+        openai_base_url: str = "https://api.openai.com/v1/chat/completions",
+        transport: Optional[Transport] = None,
+        codec: Optional[JSONCodec] = None,
+        key_pools: Optional[Dict[str, KeyPool]] = None,
+        prompt_cache: Union[bool, PromptCachePlanner] = True,
+        limiter: Union[bool, LimiterGroup] = True,
+        tracer: Optional[Tracer] = None,
+        max_response_bytes: Optional[int] = DEFAULT_MAX_RESPONSE_BYTES,
+        compress_min_bytes: Optional[int] = None,
+        buffers: Optional[BufferMeter] = None,
+        timeout: Optional[float] = None,
+    ):
+        self.anthropic_base_url = anthropic_base_url
+        self.openai_base_url = openai_base_url
+        self.codec = codec or get_codec()
+        # Per-phase spans for a sample of requests; connection phases come
+        # from aiohttp hooks on the default transport's session
+        self.tracer = tracer
+        if transport is None:
+            trace_configs = [tracer.trace_config()] if tracer is not None else None
+            transport = HTTPTransport(self.codec, trace_configs=trace_configs, compress_min_bytes=compress_min_bytes)
+        self.transport = transport
+        # Bodies past this raise ResponseTooLargeError; None reads any size
+        self.max_response_bytes = max_response_bytes
+        # Request and response bytes buffered per in-flight request
+        self.buffers = buffers or BufferMeter()
+        # Seconds a call may take to its response (headers when streaming),
+        # and a stream may go without a line; API_TIMEOUT by default, 0 for none
+        if timeout is None:
+            from config.settings import get_settings
+            timeout = get_settings().api_timeout
+        self.timeout: Optional[float] = timeout or None
+        self.key_pools: Dict[str, KeyPool] = dict(key_pools or {})
+        # Adds cache_control breakpoints to Claude requests with repeated prefixes
+        if prompt_cache is True:
+            prompt_cache = PromptCachePlanner(codec=self.codec)
+        self.prompt_cache: Optional[PromptCachePlanner] = prompt_cache or None
+        # Adaptive in-flight limit per provider key
+        if limiter is True:
+            limiter = LimiterGroup()
+        self.limiter: Optional[LimiterGroup] = limiter or None
         self._session: Optional[aiohttp.ClientSession] = None
+        # Keys, limiter slots and traces held by open streaming responses,
+        # released by stream_response
+        self._stream_keys: Dict[int, _HeldStream] = {}
         self.logger = logging.getLogger(__name__)
 
     async def __aenter__(self):
-        self._session = aiohttp.ClientSession()
+        await self.transport.open()
+        # Only the HTTP transport has a session; provider batch calls need it
+        self._session = getattr(self.transport, "session", None)
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self._session:
-            await self._session.close()
+        # Streams the caller never finished would otherwise keep their keys
+        # and slots
+        for held in list(self._stream_keys.values()):
+            self.release_stream(held.response)
+        await self.transport.close()
+
+    def _key_pool(self, model_type: ModelType) -> KeyPool:
+        """Get the key pool of the model's provider."""
+        provider = get_provider(model_type)
+        pool = self.key_pools.get(provider)
+        if pool is None:
+            pool = self.key_pools[provider] = get_key_pool(provider)
+        return pool
 
     def _get_headers(self, model_type: ModelType) -> Dict[str, str]:
         """Get appropriate headers for the model type."""
-        api_key = get_api_key(model_type)
-        
-        if model_type == ModelType.CLAUDE:
-            return {
-                "x-api-key": api_key,
-                "anthropic-version": "2024-01-01",
-                "content-type": "application/json"
-            }
-        return {
-            "Authorization": f"Bearer {api_key}",
-            "content-type": "application/json"
-        }
+        return self._key_pool(model_type).select().headers
 
     def _get_api_url(self, model_type: ModelType) -> str:
-        """Get appropriate API URL for the model type."""
-        if model_type == ModelType.CLAUDE:
+        """Get appropriate API URL for the model type: its catalog endpoint, else its provider's."""
+        endpoint = get_registry().get(model_type).endpoint
+        if endpoint:
+            return endpoint
+        if get_provider(model_type) == "anthropic":
             return self.anthropic_base_url
         return self.openai_base_url
 
-    async def generate(
+    def _build_payload(
         self,
         model_type: ModelType,
         messages: List[Dict[str, str]],
@@ -64,6 +218,41 @@ class LLMClient:
         stream: bool = False,
         **kwargs
     ) -> Dict[str, Any]:
+        """Build the provider request body for the model type."""
+        if get_provider(model_type) == "anthropic":
+            return {
+                "model": model_type.value,
+                "messages": messages,
+                "max_tokens": max_tokens,
+                "temperature": temperature,
+                "stream": stream,
+                **kwargs
+            }
+        # OpenAI models
+        return {
+            "model": model_type.value,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "top_p": top_p,
+            "stream": stream,
+            **kwargs
+        }
+
+    async def generate(
+        self,
+        model_type: ModelType,
+        messages: List[Dict[str, str]],
+        max_tokens: Optional[int] = None,
+        temperature: float = 0.7,
+        top_p: float = 0.95,
+        stream: bool = False,
+        trace: Optional[RequestTrace] = None,
+        request_id: Optional[str] = None,
+        deadline: Optional[float] = None,
+        timeout: Optional[float] = None,
+        **kwargs
+    ) -> LLMResponse:
         """
         Generate a response from the specified model.
         
@@ -74,72 +263,225 @@ class LLMClient:
             temperature: Sampling temperature (0-1)
             top_p: Nucleus sampling parameter
             stream: Whether to stream the response
+            trace: Trace to record phases into, from a caller that started it
+                (such as the scheduler) and finishes it; otherwise the client
+                starts and finishes one when its tracer samples the request
+            request_id: Correlation id for logs and the trace
+            deadline: Absolute ``time.monotonic()`` deadline for the whole
+                call, including reading a stream
+            timeout: Seconds from now, combined with ``deadline``; the
+                client's timeout applies when neither is given
             **kwargs: Additional model-specific parameters
         
         Returns:
-            API response as a dictionary
+            The parsed-on-demand LLMResponse, or the open response when streaming
+
+        Raises:
+            DeadlineExceededError: the deadline passed first; the connection
+                is closed and the key and slot are released
         """
-        if not self._session:
+        # The caller's deadline also bounds the stream; the client's own
+        # timeout only bounds getting the response
+        deadline = resolve(deadline, timeout)
+        call_deadline = deadline if deadline is not None else resolve(None, self.timeout)
+        expired = lambda: DeadlineExceededError(f"Deadline exceeded waiting for {model_type.value}")
+        owned = trace is None and self.tracer is not None
+        if owned:
+            trace = self.tracer.start(request_id=request_id)
+        if trace is None:
+            async with within(call_deadline, expired):
+                return await self._generate(
+                    model_type, messages, max_tokens, temperature, top_p, stream, None, request_id, deadline, **kwargs
+                )
+        try:
+            async with within(call_deadline, expired):
+                response = await self._generate(
+                    model_type, messages, max_tokens, temperature, top_p, stream, trace, request_id, deadline, **kwargs
+                )
+        except BaseException as e:
+            if owned:
+                trace.finish(error=e)
+            raise
+        # A streamed trace is finished by release_stream
+        if owned and not stream:
+            trace.finish()
+        return response
+
+    async def _generate(
+        self,
+        model_type: ModelType,
+        messages: List[Dict[str, str]],
+        max_tokens: Optional[int],
+        temperature: float,
+        top_p: float,
+        stream: bool,
+        trace: Optional[RequestTrace],
+        request_id: Optional[str],
+        deadline: Optional[float],
+        **kwargs
+    ) -> LLMResponse:
+        if not self.transport.is_open:
             raise RuntimeError("Client not initialized. Use 'async with' context manager.")
 
         url = self._get_api_url(model_type)
-        headers = self._get_headers(model_type)
+        pool = self._key_pool(model_type)
+        key = None
+        holds_key = False
+        limiter = None
+        outcome: Dict[str, Any] = {}
+        buffered = self.buffers.lease()
+
+        if trace is not None:
+            trace.set(**{
+                "llm.model": model_type.value,
+                "llm.provider": get_provider(model_type),
+                "llm.stream": stream,
+            })
 
         try:
-            if model_type == ModelType.CLAUDE:
-                payload = {
-                    "model": model_type.value,
-                    "messages": messages,
-                    "max_tokens": max_tokens,
-                    "temperature": temperature,
-                    "stream": stream,
-                    **kwargs
-                }
-            else:  # OpenAI models
-                payload = {
-                    "model": model_type.value,
-                    "messages": messages,
-                    "max_tokens": max_tokens,
-                    "temperature": temperature,
-                    "top_p": top_p,
-                    "stream": stream,
-                    **kwargs
-                }
-
-            self.logger.debug(f"Sending request to {model_type.value}")
+            key, limiter = await self._reserve_key(get_provider(model_type), pool, trace)
+            if trace is not None:
+                trace.set(**{"llm.key": key.label})
+            payload = self._build_payload(
+                model_type, messages, max_tokens, temperature, top_p, stream, **kwargs
+            )
+            if self.prompt_cache is not None and get_provider(model_type) == "anthropic":
+                payload = self.prompt_cache.plan(payload)
+
+            self.logger.debug("Sending request %s to %s", request_id or "-", model_type.value)
             
-            async with self._session.post(url, headers=headers, json=payload) as response:
-                if response.status == 429:
-                    raise RateLimitError("Rate limit exceeded")
-                elif response.status == 400:
-                    error_data = await response.json()
-                    if "token limit" in error_data.get("error", {}).get("message", "").lower():
-                        raise TokenLimitError("Token limit exceeded")
-                    raise APIError(f"API error: {error_data}")
-                elif response.status != 200:
-                    raise APIError(f"API returned status code: {response.status}")
-                
-                if stream:
-                    return response  # Return the response object for streaming
-                return await response.json()
+            started = time.perf_counter()
+            response = await self.transport.post(url, key.headers, payload, trace=trace, buffer=buffered)
+            if trace is not None:
+                provider_id = response.headers.get("request-id") or response.headers.get("x-request-id")
+                trace.set(**{"http.status_code": response.status, "llm.provider_request_id": provider_id})
+            pool.record(key, response.status, response.headers)
+            if response.status in OVERLOAD_STATUSES:
+                outcome = {"dropped": True, "reason": str(response.status)}
+            if not stream:
+                async with response:
+                    await self._raise_for_status(response)
+                    if trace is None:
+                        body = await self.transport.read_body(response, self.max_response_bytes, buffered)
+                    else:
+                        with trace.span("download"):
+                            body = await self.transport.read_body(response, self.max_response_bytes, buffered)
+                # Parsing is deferred; only reject bodies that cannot be a JSON object
+                if not isinstance(body, dict) and not body.lstrip().startswith(b"{"):
+                    raise json.JSONDecodeError("Expected a JSON object", body[:64].decode(errors="replace"), 0)
+                result = LLMResponse(model_type, body, latency=time.perf_counter() - started)
+                outcome = {"latency": result.latency}
+                if self.prompt_cache is not None and get_provider(model_type) == "anthropic":
+                    self.prompt_cache.record(result)
+                return result
 
+            # The caller owns a streaming response; stream_response (or
+            # release_stream) closes it and gives the key and slot back
+            try:
+                await self._raise_for_status(response)
+            except BaseException:
+                response.close()
+                raise
+            # Stream length depends on the output, so the limiter is fed the
+            # time to the response headers instead
+            self._stream_keys[id(response)] = _HeldStream(
+                response, pool, key, limiter, time.perf_counter() - started, trace, deadline
+            )
+            if trace is not None:
+                trace.begin("stream")
+            holds_key = True
+            return response
+
+        except (asyncio.TimeoutError, aiohttp.ServerTimeoutError):
+            outcome = {"dropped": True, "reason": "timeout"}
+            raise
+        except BodyTooLargeError as e:
+            self.logger.error("Response too large: %s", e)
+            raise ResponseTooLargeError(str(e))
         except aiohttp.ClientError as e:
-            self.logger.error(f"Network error: {str(e)}")
-            raise APIError(f"Network error: {str(e)}")
+            self.logger.error("Network error: %s", e)
+            raise NetworkError(f"Network error: {str(e)}")
         except json.JSONDecodeError as e:
-            self.logger.error(f"JSON decode error: {str(e)}")
+            self.logger.error("JSON decode error: %s", e)
             raise APIError(f"Invalid JSON response: {str(e)}")
         except Exception as e:
-            self.logger.error(f"Unexpected error: {str(e)}")
+            self.logger.error("Unexpected error: %s", e)
             raise
+        finally:
+            buffered.close()
+            if trace is not None:
+                trace.set(**{"llm.peak_buffered_bytes": buffered.peak})
+            if not holds_key and key is not None:
+                pool.release(key)
+                if limiter is not None:
+                    limiter.release(**outcome)
+
+    async def _reserve_key(
+        self, provider: str, pool: KeyPool, trace: Optional[RequestTrace]
+    ) -> Tuple[PooledKey, Optional[AdaptiveLimiter]]:
+        """
+        Wait for a limiter slot on the key the pool prefers, then reserve the
+        key. The key is only counted in flight once the request can go, and
+        if a 429 set it aside during the wait, the slot is given back and the
+        pool's new choice waited for instead.
+        """
+        if self.limiter is None:
+            return pool.acquire(), None
+        while True:
+            key = pool.select()
+            slot = self.limiter.get(provider, key.label)
+            if trace is None:
+                await slot.acquire()
+            else:
+                with trace.span("limiter_wait"):
+                    await slot.acquire()
+            now = time.monotonic()
+            if key.quarantined_until <= now or pool.select().quarantined_until > now:
+                return pool.acquire(key.label), slot
+            slot.release()
+
+    async def _raise_for_status(self, response):
+        """Map provider error statuses to client exceptions."""
+        if response.status == 429:
+            raise RateLimitError("Rate limit exceeded", status=429)
+        elif response.status == 400:
+            error_data = await response.json()
+            if "token limit" in error_data.get("error", {}).get("message", "").lower():
+                raise TokenLimitError("Token limit exceeded", status=400)
+            raise APIError(f"API error: {error_data}", status=400)
+        elif response.status != 200:
+            raise APIError(f"API returned status code: {response.status}", status=response.status)
 
     @staticmethod
     def extract_response(model_type: ModelType, response: Dict[str, Any]) -> str:
         """Extract the response text from the API response."""
-        if model_type == ModelType.CLAUDE:
+        if isinstance(response, LLMResponse):
+            return response.text
+        if get_provider(model_type) == "anthropic":
             return response["content"][0]["text"]
         return response["choices"][0]["message"]["content"]
 
+    @staticmethod
+    def extract_usage(model_type: ModelType, response: Dict[str, Any]) -> Tuple[int, int]:
+        """Extract (input_tokens, output_tokens) from the API response; input excludes cached tokens."""
+        if isinstance(response, LLMResponse):
+            return response.usage.input_tokens, response.usage.output_tokens
+        usage = response.get("usage") or {}
+        if get_provider(model_type) == "anthropic":
+            return usage.get("input_tokens", 0), usage.get("output_tokens", 0)
+        cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+        return usage.get("prompt_tokens", 0) - cached, usage.get("completion_tokens", 0)
+
+    @staticmethod
+    def extract_cache_usage(model_type: ModelType, response: Dict[str, Any]) -> Tuple[int, int]:
+        """Extract (cache_read_tokens, cache_write_tokens) from the API response."""
+        if isinstance(response, LLMResponse):
+            return response.usage.cache_read_tokens, response.usage.cache_write_tokens
+        usage = response.get("usage") or {}
+        if get_provider(model_type) == "anthropic":
+            return usage.get("cache_read_input_tokens") or 0, usage.get("cache_creation_input_tokens") or 0
+        return (usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0, 0
+
     async def stream_response(self, response: aiohttp.ClientResponse) -> AsyncGenerator[str, None]:
         """
         Stream the response from the API.
@@ -151,14 +493,74 @@ class LLMClient:
             Chunks of the generated text
         """
         try:
-            async for line in response.content.iter_lines():
-                if line:
-                    if line.startswith(b"data: "):
-                        if line.strip() == b"data: [DONE]":
-                            break
-                        chunk = json.loads(line.removeprefix(b"data: ").decode())
-                        if chunk.get("choices") and chunk["choices"][0].get("delta"):
-                            if "content" in chunk["choices"][0]["delta"]:
-                                yield chunk["choices"][0]["delta"]["content"]
+            async for line in self._lines(response):
+                line = line.strip()
+                if not line.startswith(b"data: "):
+                    continue
+                if line == b"data: [DONE]":
+                    break
+                chunk = self.codec.loads(line[6:])
+                if chunk.get("type") == "content_block_delta":
+                    # Claude event stream
+                    text = chunk.get("delta", {}).get("text")
+                    if text:
+                        yield text
+                elif chunk.get("type") == "message_stop":
+                    break
+                elif chunk.get("choices") and chunk["choices"][0].get("delta"):
+                    if "content" in chunk["choices"][0]["delta"]:
+                        yield chunk["choices"][0]["delta"]["content"]
+        finally:
+            self.release_stream(response)
+
+    async def _lines(self, response) -> AsyncIterator[bytes]:
+        """
+        The lines of a stream, waiting for each no longer than the client's
+        timeout or past the deadline given to ``generate``.
+        """
+        held = self._stream_keys.get(id(response))
+        deadline = held.deadline if held is not None else None
+        stalled = lambda: DeadlineExceededError("Stream stalled or passed its deadline")
+        lines = aiter(response.content)
+        while True:
+            async with within(resolve(deadline, self.timeout), stalled):
+                line = await anext(lines, None)
+            if line is None:
+                return
+            yield line
+
+    @asynccontextmanager
+    async def stream(self, model_type: ModelType, messages: List[Dict[str, str]], **kwargs) -> AsyncIterator[AsyncGenerator[str, None]]:
+        """
+        Stream a response as text chunks, releasing the connection, key and
+        slot when the block exits, however it exits::
+
+            async with client.stream(ModelType.CLAUDE, messages, timeout=30) as chunks:
+                async for text in chunks:
+                    ...
+
+        Takes the arguments of ``generate``.
+        """
+        response = await self.generate(model_type, messages, stream=True, **kwargs)
+        chunks = self.stream_response(response)
+        try:
+            yield chunks
         finally:
-            response.close()
+            await chunks.aclose()
+            self.release_stream(response)
+
+    def release_stream(self, response):
+        """
+        Close a streaming response from ``generate`` and give back its key and
+        concurrency slot. ``stream_response`` does this itself; callers that
+        read the stream another way must call it when done. Safe to repeat.
+        """
+        response.close()
+        held = self._stream_keys.pop(id(response), None)
+        if held is not None:
+            held.pool.release(held.key)
+            if held.limiter is not None:
+                held.limiter.release(latency=held.latency)
+            if held.trace is not None:
+                held.trace.end("stream")
+                held.trace.finish()
@@ -0,0 +1,145 @@
+# core/api/codec.py
+"""
+JSON encoding for request bodies and decoding of responses.
+
+``orjson`` is used when installed (``pip install llm-api-interface[fast]``),
+otherwise the stdlib ``json`` module. Both codecs produce compact UTF-8 bytes
+and decode straight from bytes.
+
+Long conversations resend the same leading messages on every turn. Wrap them
+in a ``MessagePrefix`` once; requests whose messages start with it splice the
+cached bytes into the body instead of serializing the prefix again:
+
+    prefix = MessagePrefix(system_and_history)
+    await client.generate(model, prefix + [{"role": "user", "content": question}])
+"""
+import json
+from typing import Any, Dict, List, Iterable, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+class JSONCodec:
+    """Stdlib JSON codec."""
+
+    name = "json"
+
+    def dumps(self, obj: Any) -> bytes:
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+
+    def loads(self, data: bytes) -> Any:
+        return json.loads(data)
+
+    def encode_payload(self, payload: Dict[str, Any]) -> bytes:
+        """Serialize a request body, reusing pre-serialized message prefixes."""
+        messages = payload.get("messages")
+        if not isinstance(messages, PrefixedMessages) or not messages.intact():
+            return self.dumps(payload)
+
+        head = self.dumps({k: v for k, v in payload.items() if k != "messages"})
+        prefix = messages.prefix
+        parts = [prefix.encoded(self)]
+        if len(messages) > len(prefix):
+            parts.append(self.dumps(list(messages[len(prefix):]))[1:-1])
+        encoded = b"[" + b",".join(p for p in parts if p) + b"]"
+        separator = b"," if len(head) > 2 else b""
+        return head[:-1] + separator + b'"messages":' + encoded + b"}"
+
+class OrjsonCodec(JSONCodec):
+    """orjson codec; values orjson cannot encode fall back to stdlib."""
+
+    name = "orjson"
+
+    def dumps(self, obj: Any) -> bytes:
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            return super().dumps(obj)
+
+    def loads(self, data: bytes) -> Any:
+        return orjson.loads(data)
+
+_CODECS = {"json": JSONCodec, "orjson": OrjsonCodec}
+
+def get_codec(name: Optional[str] = None) -> JSONCodec:
+    """
+    Return a codec by name; by default the fastest one installed.
+
+    Raises:
+        ValueError: For an unknown name or an unavailable library
+    """
+    if name is None:
+        name = "orjson" if orjson is not None else "json"
+    if name not in _CODECS:
+        raise ValueError(f"Unknown JSON codec: {name}")
+    if name == "orjson" and orjson is None:
+        raise ValueError("orjson is not installed")
+    return _CODECS[name]()
+
+class MessagePrefix:
+    """
+    Leading messages serialized once per codec and reused across requests.
+
+    The messages must not be modified after the prefix is created.
+    """
+
+    __slots__ = ("messages", "_encoded", "_parts", "__weakref__")
+
+    def __init__(self, messages: Iterable[Dict[str, Any]]):
+        self.messages = tuple(messages)
+        self._encoded: Dict[str, bytes] = {}
+        self._parts: Dict[str, Tuple[bytes, ...]] = {}
+
+    def __len__(self) -> int:
+        return len(self.messages)
+
+    def __add__(self, tail: List[Dict[str, Any]]) -> "PrefixedMessages":
+        return PrefixedMessages(self, tail)
+
+    def parts(self, codec: JSONCodec) -> Tuple[bytes, ...]:
+        """Each prefix message serialized on its own."""
+        parts = self._parts.get(codec.name)
+        if parts is None:
+            parts = self._parts[codec.name] = tuple(codec.dumps(message) for message in self.messages)
+        return parts
+
+    def encoded(self, codec: JSONCodec) -> bytes:
+        """The prefix messages as comma-separated JSON objects, without brackets."""
+        data = self._encoded.get(codec.name)
+        if data is None:
+            parts = self._parts.get(codec.name)
+            data = b",".join(parts) if parts is not None else codec.dumps(list(self.messages))[1:-1]
+            self._encoded[codec.name] = data
+        return data
+
+    def replace(self, index: int, message: Dict[str, Any], codec: JSONCodec) -> "MessagePrefix":
+        """A prefix with one message swapped, serializing only that message."""
+        messages = list(self.messages)
+        messages[index] = message
+        prefix = MessagePrefix(messages)
+        parts = list(self.parts(codec))
+        parts[index] = codec.dumps(message)
+        prefix._parts[codec.name] = tuple(parts)
+        return prefix
+
+class PrefixedMessages(list):
+    """
+    A regular message list that remembers the MessagePrefix it starts with.
+
+    Everything that accepts a list of messages accepts it; only the codec
+    treats it specially.
+    """
+
+    def __init__(self, prefix: MessagePrefix, tail: Iterable[Dict[str, Any]] = ()):
+        super().__init__(prefix.messages)
+        self.extend(tail)
+        self.prefix = prefix
+
+    def intact(self) -> bool:
+        """Whether the list still starts with exactly the prefix messages."""
+        prefix = self.prefix.messages
+        if len(self) < len(prefix):
+            return False
+        return all(a is b for a, b in zip(self, prefix))
@@ -0,0 +1,50 @@
+# core/api/deadline.py
+"""
+Request deadlines.
+
+A deadline is an absolute ``time.monotonic()`` instant, the convention the
+RequestScheduler already uses. It can be handed unchanged from the scheduler
+to LLMClient.generate, through retries, fan-out branches and the stream
+reader, and each stage waits only for the time left. ``timeout`` arguments
+are relative and are converted once, where they enter.
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Optional
+
+def resolve(deadline: Optional[float] = None, timeout: Optional[float] = None) -> Optional[float]:
+    """The earlier of an absolute deadline and ``timeout`` seconds from now."""
+    if timeout is None:
+        return deadline
+    candidate = time.monotonic() + timeout
+    return candidate if deadline is None else min(deadline, candidate)
+
+def remaining(deadline: Optional[float]) -> Optional[float]:
+    """Seconds left before the deadline, never negative; None without one."""
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+def expired(deadline: Optional[float]) -> bool:
+    return deadline is not None and time.monotonic() >= deadline
+
+@asynccontextmanager
+async def within(deadline: Optional[float], error_factory):
+    """
+    Cancel the block when the deadline passes and raise ``error_factory()``
+    instead of TimeoutError. TimeoutErrors raised by the block itself (such
+    as aiohttp's socket timeouts) pass through unchanged.
+    """
+    if deadline is None:
+        yield
+        return
+    # The event loop clock is time.monotonic()
+    timeout = asyncio.timeout_at(deadline)
+    try:
+        async with timeout:
+            yield
+    except TimeoutError:
+        if timeout.expired():
+            raise error_factory() from None
+        raise
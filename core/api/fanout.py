@@ -0,0 +1,241 @@
+# core/api/fanout.py
+"""
+Send one prompt to several models at once and pick a result by policy.
+
+``first`` returns the first successful completion, ``quorum`` the first
+answer that ``n`` branches agree on, and ``best`` waits for every branch and
+returns the one a caller-provided scorer ranks highest. As soon as the
+policy is satisfied the remaining branches are cancelled, which closes their
+connections. Each branch's cost is logged to the ModelManager and to the
+``llm_fanout_*`` metrics under its branch name.
+"""
+import asyncio
+import inspect
+import logging
+import time
+from dataclasses import dataclass, field, replace
+from typing import Optional, Dict, Any, List, Callable, Union, Hashable, Awaitable
+
+from ..models.config import ModelType
+from ..models.manager import ModelManager
+from .client import LLMClient, FanOutError
+from .deadline import resolve
+from .response import LLMResponse
+from utils.metrics.registry import MetricsRegistry, get_registry
+
+class FanOutPolicy:
+    """How a fan-out picks its result."""
+    FIRST = "first"    # first successful completion
+    QUORUM = "quorum"  # first answer n branches agree on
+    BEST = "best"      # highest score once every branch is done
+
+Scorer = Callable[[LLMResponse], Union[float, Awaitable[float]]]
+
+@dataclass
+class Branch:
+    """One model request in a fan-out; kwargs override the shared generate arguments."""
+    model_type: ModelType
+    name: Optional[str] = None
+    messages: Optional[List[Dict[str, Any]]] = None
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+
+@dataclass
+class BranchResult:
+    name: str
+    model_type: ModelType
+    response: Optional[LLMResponse] = None
+    error: Optional[Exception] = None
+    cancelled: bool = False
+    latency: float = 0.0
+    cost: float = 0.0
+    score: Optional[float] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.response is not None
+
+@dataclass
+class FanOutResult:
+    policy: str
+    winner: Optional[BranchResult]
+    branches: List[BranchResult]
+
+    @property
+    def response(self) -> Optional[LLMResponse]:
+        return self.winner.response if self.winner else None
+
+    @property
+    def cost(self) -> float:
+        """Cost of every branch that completed, winning or not."""
+        return sum(branch.cost for branch in self.branches)
+
+def normalized_text(response: LLMResponse) -> str:
+    """Default quorum key: the response text, case- and whitespace-insensitive."""
+    return " ".join(response.text.split()).lower()
+
+class FanOut:
+    """
+    Parallel multi-model requests on top of LLMClient.
+
+    Branches are given as model types or ``Branch`` objects; names default
+    to the model name and are made unique with a ``#n`` suffix.
+    """
+
+    def __init__(
+        self,
+        client: LLMClient,
+        manager: Optional[ModelManager] = None,
+        metrics: Optional[MetricsRegistry] = None,
+    ):
+        self.client = client
+        self.manager = manager or ModelManager()
+        self.logger = logging.getLogger(__name__)
+        registry = metrics or get_registry()
+        self._branches = registry.counter(
+            "llm_fanout_branches_total", "Fan-out branches by outcome (won, completed, failed, cancelled)"
+        )
+        self._cost = registry.counter("llm_fanout_cost_dollars_total", "Cost of fan-out branches")
+        self._latency = registry.histogram("llm_fanout_latency_seconds", "Time until the fan-out policy was satisfied")
+
+    async def first(self, branches, messages, **kwargs) -> FanOutResult:
+        """Return the first successful completion and cancel the rest."""
+        return await self.run(branches, messages, FanOutPolicy.FIRST, **kwargs)
+
+    async def quorum(self, branches, messages, n: int = 2, key: Callable[[LLMResponse], Hashable] = normalized_text, **kwargs) -> FanOutResult:
+        """Return the first answer ``n`` branches agree on, compared by ``key``."""
+        return await self.run(branches, messages, FanOutPolicy.QUORUM, n=n, key=key, **kwargs)
+
+    async def best(self, branches, messages, scorer: Scorer, **kwargs) -> FanOutResult:
+        """Wait for every branch and return the completion with the highest score."""
+        return await self.run(branches, messages, FanOutPolicy.BEST, scorer=scorer, **kwargs)
+
+    @staticmethod
+    def _branches_from(branches) -> List[Branch]:
+        specs = []
+        seen: Dict[str, int] = {}
+        for branch in branches:
+            spec = branch if isinstance(branch, Branch) else Branch(branch)
+            base = spec.name or spec.model_type.value
+            seen[base] = seen.get(base, 0) + 1
+            specs.append(replace(spec, name=base if seen[base] == 1 else f"{base}#{seen[base]}"))
+        if not specs:
+            raise ValueError("A fan-out needs at least one branch")
+        return specs
+
+    async def run(
+        self,
+        branches: List[Union[ModelType, Branch]],
+        messages: List[Dict[str, Any]],
+        policy: str = FanOutPolicy.FIRST,
+        n: int = 2,
+        key: Callable[[LLMResponse], Hashable] = normalized_text,
+        scorer: Optional[Scorer] = None,
+        **kwargs
+    ) -> FanOutResult:
+        """
+        Send the request down every branch and resolve it by policy.
+
+        Raises:
+            FanOutError: no branch satisfied the policy; ``error.result``
+                holds the per-branch outcomes
+        """
+        if policy not in (FanOutPolicy.FIRST, FanOutPolicy.QUORUM, FanOutPolicy.BEST):
+            raise ValueError(f"Unknown fan-out policy: {policy}")
+        if policy == FanOutPolicy.BEST and scorer is None:
+            raise ValueError("The best policy needs a scorer")
+        if kwargs.get("stream"):
+            raise ValueError("Fan-out does not support streaming")
+        specs = self._branches_from(branches)
+        # Every branch races the same deadline
+        deadline = resolve(kwargs.pop("deadline", None), kwargs.pop("timeout", None))
+        if deadline is not None:
+            kwargs["deadline"] = deadline
+
+        started = time.perf_counter()
+        tasks = {asyncio.create_task(self._call(spec, messages, kwargs, started)): spec for spec in specs}
+        results: Dict[str, BranchResult] = {}
+        agreeing: Dict[Hashable, List[BranchResult]] = {}
+        winner: Optional[BranchResult] = None
+        pending = set(tasks)
+        try:
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for result in sorted((task.result() for task in done), key=lambda r: r.latency):
+                    results[result.name] = result
+                    if not result.ok or winner is not None:
+                        continue
+                    if policy == FanOutPolicy.FIRST:
+                        winner = result
+                    elif policy == FanOutPolicy.QUORUM:
+                        group = agreeing.setdefault(key(result.response), [])
+                        group.append(result)
+                        if len(group) >= n:
+                            winner = group[0]
+                if policy == FanOutPolicy.QUORUM and winner is None:
+                    largest = max((len(group) for group in agreeing.values()), default=0)
+                    if largest + len(pending) < n:
+                        break  # the remaining branches cannot reach a quorum
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        elapsed = time.perf_counter() - started
+        for spec in specs:
+            if spec.name not in results:
+                results[spec.name] = BranchResult(spec.name, spec.model_type, cancelled=True, latency=elapsed)
+
+        if policy == FanOutPolicy.BEST:
+            for result in results.values():
+                if result.ok:
+                    score = scorer(result.response)
+                    result.score = await score if inspect.isawaitable(score) else score
+            scored = [r for r in results.values() if r.ok]
+            if scored:
+                winner = max(scored, key=lambda r: (r.score, -r.latency))
+
+        outcome = FanOutResult(policy, winner, [results[spec.name] for spec in specs])
+        self._record(outcome, elapsed)
+        if winner is None:
+            errors = "; ".join(f"{r.name}: {r.error}" for r in outcome.branches if r.error is not None)
+            raise FanOutError(f"No branch satisfied the {policy} policy" + (f" ({errors})" if errors else ""), outcome)
+        return outcome
+
+    async def _call(self, spec: Branch, messages, kwargs: Dict[str, Any], started: float) -> BranchResult:
+        result = BranchResult(spec.name, spec.model_type)
+        try:
+            result.response = await self.client.generate(
+                model_type=spec.model_type,
+                messages=spec.messages if spec.messages is not None else messages,
+                **{**kwargs, **spec.kwargs}
+            )
+        except Exception as e:
+            result.error = e
+            self.logger.debug("Fan-out branch %s failed: %s", spec.name, e)
+        result.latency = time.perf_counter() - started
+        if result.ok:
+            usage = result.response.usage
+            result.cost = self.manager.calculate_cost(
+                spec.model_type, usage.input_tokens, usage.output_tokens,
+                cache_read_tokens=usage.cache_read_tokens, cache_write_tokens=usage.cache_write_tokens,
+            )
+            self.manager.log_usage(
+                spec.model_type, usage.input_tokens, usage.output_tokens,
+                usage.cache_read_tokens, usage.cache_write_tokens,
+            )
+        return result
+
+    def _record(self, outcome: FanOutResult, elapsed: float):
+        self._latency.observe(elapsed, policy=outcome.policy, outcome="ok" if outcome.winner else "failed")
+        for branch in outcome.branches:
+            if branch is outcome.winner:
+                status = "won"
+            elif branch.cancelled:
+                status = "cancelled"
+            elif branch.error is not None:
+                status = "failed"
+            else:
+                status = "completed"
+            self._branches.inc(policy=outcome.policy, branch=branch.name, outcome=status)
+            if branch.cost:
+                self._cost.inc(branch.cost, policy=outcome.policy, branch=branch.name)
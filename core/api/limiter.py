@@ -0,0 +1,191 @@
+# core/api/limiter.py
+"""
+Adaptive concurrency limits per provider key.
+
+A fixed cap is either too low to use the provider's capacity or high enough
+to set off 429 storms, and the right value moves with provider load. Each
+``AdaptiveLimiter`` follows AIMD with a latency gradient, in the style of
+TCP Vegas and Netflix's concurrency-limits:
+
+* while the limit is in use and recent latency stays within ``tolerance``
+  times its long-run baseline, the limit grows by about one per round trip
+  (``1 / limit`` per success);
+* on a 429, an overload status or a timeout, or when recent latency rises
+  past ``tolerance`` times the baseline, the limit is multiplied by
+  ``backoff``, at most once per recent round-trip time so one burst of
+  rejections counts as one signal.
+
+Requests over the limit wait in FIFO order.
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Optional, Dict, Any, Deque, Callable
+
+from utils.metrics.registry import MetricsRegistry, get_registry
+
+# Statuses that mean the provider is overloaded rather than the request bad
+OVERLOAD_STATUSES = (429, 503, 529)
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit for one provider key."""
+
+    def __init__(
+        self,
+        initial_limit: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 256,
+        backoff: float = 0.5,
+        tolerance: float = 2.0,
+        smoothing: float = 0.2,
+        baseline_smoothing: float = 0.02,
+        on_change: Optional[Callable[["AdaptiveLimiter", str], None]] = None,
+    ):
+        """
+        Args:
+            initial_limit: Starting number of concurrent requests
+            min_limit / max_limit: Bounds on the limit
+            backoff: Multiplier applied on a drop or latency rise
+            tolerance: Recent-to-baseline latency ratio treated as congestion
+            smoothing: EWMA weight of the recent latency
+            baseline_smoothing: EWMA weight of the long-run baseline latency
+            on_change: Called with (limiter, event) after every acquire and
+                release; event is "acquire", "release", "increase" or the
+                reason for a cut
+        """
+        self.limit = float(max(min_limit, min(initial_limit, max_limit)))
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.baseline_smoothing = baseline_smoothing
+        self.on_change = on_change
+        self.in_flight = 0
+        self.recent_latency: Optional[float] = None
+        self.baseline_latency: Optional[float] = None
+        self._last_cut = float("-inf")
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def _has_room(self) -> bool:
+        return self.in_flight < int(self.limit)
+
+    async def acquire(self):
+        """Wait for a slot under the current limit; pair with ``release``."""
+        if self._has_room() and not self._waiters:
+            self.in_flight += 1
+            self._changed("acquire")
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as we were cancelled
+                self.in_flight -= 1
+                self._wake()
+            else:
+                self._waiters.remove(waiter)
+            raise
+        self._changed("acquire")
+
+    def _wake(self):
+        while self._waiters and self._has_room():
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def release(self, latency: Optional[float] = None, dropped: bool = False, reason: str = "dropped"):
+        """
+        Give a slot back.
+
+        Args:
+            latency: Seconds the request took, for successful requests
+            dropped: The provider rejected or timed out the request
+            reason: Label for the drop, e.g. "429" or "timeout"
+        """
+        saturated = self.in_flight >= self.limit / 2
+        self.in_flight = max(0, self.in_flight - 1)
+        event = "release"
+        if dropped:
+            event = self._cut(reason) or event
+        elif latency is not None:
+            event = self._sample(latency, saturated) or event
+        self._wake()
+        self._changed(event)
+
+    def _sample(self, latency: float, saturated: bool) -> Optional[str]:
+        if self.recent_latency is None:
+            self.recent_latency = self.baseline_latency = latency
+        else:
+            self.recent_latency += self.smoothing * (latency - self.recent_latency)
+            self.baseline_latency += self.baseline_smoothing * (latency - self.baseline_latency)
+        if self.recent_latency > self.tolerance * self.baseline_latency:
+            return self._cut("latency")
+        if saturated and self.limit < self.max_limit:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            return "increase"
+        return None
+
+    def _cut(self, reason: str) -> Optional[str]:
+        now = time.monotonic()
+        if now - self._last_cut < (self.recent_latency or 0.0):
+            return None
+        self._last_cut = now
+        self.limit = max(float(self.min_limit), self.limit * self.backoff)
+        return reason
+
+    def _changed(self, event: str):
+        if self.on_change is not None:
+            self.on_change(self, event)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "recent_latency": self.recent_latency,
+            "baseline_latency": self.baseline_latency,
+        }
+
+class LimiterGroup:
+    """
+    One AdaptiveLimiter per (provider, key), created on first use with shared
+    settings, reporting to ``llm_concurrency_limit`` and friends.
+    """
+
+    def __init__(self, metrics: Optional[MetricsRegistry] = None, **options):
+        """
+        Args:
+            metrics: Registry for the limit gauges; the process registry by default
+            **options: AdaptiveLimiter settings
+        """
+        self.options = options
+        self._limiters: Dict[tuple, AdaptiveLimiter] = {}
+        registry = metrics or get_registry()
+        self._limit_gauge = registry.gauge("llm_concurrency_limit", "Adaptive in-flight request limit per provider key")
+        self._in_flight_gauge = registry.gauge("llm_concurrency_in_flight", "In-flight requests per provider key")
+        self._cuts = registry.counter("llm_concurrency_limit_cuts_total", "Multiplicative limit decreases by reason")
+
+    def get(self, provider: str, key: str) -> AdaptiveLimiter:
+        """The limiter of a provider key; ``key`` is a label such as PooledKey.label."""
+        limiter = self._limiters.get((provider, key))
+        if limiter is None:
+            def on_change(limiter: AdaptiveLimiter, event: str):
+                self._limit_gauge.set(int(limiter.limit), provider=provider, key=key)
+                self._in_flight_gauge.set(limiter.in_flight, provider=provider, key=key)
+                if event not in ("acquire", "release", "increase"):
+                    self._cuts.inc(provider=provider, key=key, reason=event)
+
+            limiter = self._limiters[(provider, key)] = AdaptiveLimiter(on_change=on_change, **self.options)
+            self._limit_gauge.set(int(limiter.limit), provider=provider, key=key)
+        return limiter
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {f"{provider}:{key}": limiter.snapshot() for (provider, key), limiter in self._limiters.items()}
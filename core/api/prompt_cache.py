@@ -0,0 +1,187 @@
+# core/api/prompt_cache.py
+"""
+Automatic prompt-cache breakpoints for Claude requests.
+
+Anthropic only caches a prompt prefix when the request marks where it ends
+with ``cache_control``. ``PromptCachePlanner`` remembers fingerprints of the
+prefixes of recent requests (the system prompt, then each message in turn)
+and, when a new request starts with a prefix already seen that is long
+enough to be cacheable, marks its last block. The first repeat writes the
+cache; later ones read it at a fraction of the input price and skip most of
+the prefill time.
+"""
+import hashlib
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, List, Tuple
+from weakref import WeakKeyDictionary
+
+from ..models.config import ModelType
+from ..models.manager import ModelManager
+from .codec import JSONCodec, MessagePrefix, PrefixedMessages, get_codec
+from .response import LLMResponse
+
+EPHEMERAL = {"type": "ephemeral"}
+
+@dataclass
+class PromptCacheStats:
+    requests: int = 0
+    responses: int = 0              # complete (non-streaming) responses recorded
+    breakpoints: int = 0            # requests sent with an automatic breakpoint
+    hits: int = 0                   # responses reporting cache reads
+    cache_read_tokens: int = 0
+    cache_write_tokens: int = 0
+    hit_latency: float = 0.0        # summed seconds, for means
+    miss_latency: float = 0.0
+
+def _has_breakpoint(payload: Dict[str, Any]) -> bool:
+    """Whether the caller already placed cache_control blocks themselves."""
+    blocks = payload.get("system") if isinstance(payload.get("system"), list) else []
+    for message in payload.get("messages", ()):
+        if isinstance(message.get("content"), list):
+            blocks = [*blocks, *message["content"]]
+    return any(isinstance(block, dict) and "cache_control" in block for block in blocks)
+
+def _mark(content: Any) -> List[Dict[str, Any]]:
+    """Content as a block list with a breakpoint on its last block."""
+    if isinstance(content, str):
+        return [{"type": "text", "text": content, "cache_control": EPHEMERAL}]
+    blocks = list(content)
+    blocks[-1] = {**blocks[-1], "cache_control": EPHEMERAL}
+    return blocks
+
+class PromptCachePlanner:
+    """
+    Insert a prompt-cache breakpoint at the longest previously seen prefix.
+
+    Args:
+        min_tokens: Smallest prefix worth marking; Anthropic does not cache
+            shorter prompts (1024 tokens on Sonnet). Tokens are estimated as
+            text bytes / 4.
+        max_entries: Prefix fingerprints remembered, least recently used
+            first out
+    """
+
+    def __init__(self, min_tokens: int = 1024, max_entries: int = 4096, codec: Optional[JSONCodec] = None):
+        self.min_tokens = min_tokens
+        self.max_entries = max_entries
+        self.codec = codec or get_codec()
+        self.stats = PromptCacheStats()
+        self._seen: "OrderedDict[bytes, None]" = OrderedDict()
+        # MessagePrefix -> (index, copy with a breakpoint on that message)
+        self._marked_prefixes: "WeakKeyDictionary[MessagePrefix, Tuple[int, MessagePrefix]]" = WeakKeyDictionary()
+
+    def _segment(self, message: Dict[str, Any]) -> bytes:
+        """Bytes identifying one message; only structured content is serialized."""
+        content = message.get("content")
+        if isinstance(content, str) and message.keys() <= {"role", "content"}:
+            return message.get("role", "").encode() + b"\0" + content.encode()
+        return self.codec.dumps(message)
+
+    def _prefixes(self, payload: Dict[str, Any]) -> List[tuple]:
+        """(fingerprint, estimated tokens) of each prefix, shortest first."""
+        system = payload.get("system")
+        segments = []
+        if system:
+            segments.append(b"system\0" + system.encode() if isinstance(system, str) else self.codec.dumps(system))
+        segments.extend(self._segment(message) for message in payload.get("messages", ()))
+        # Prompt caches are per model: the same prefix on another model is new
+        digest = hashlib.blake2b(str(payload.get("model")).encode(), digest_size=16)
+        size = 0
+        prefixes = []
+        for segment in segments:
+            digest.update(len(segment).to_bytes(8, "little"))
+            digest.update(segment)
+            size += len(segment)
+            prefixes.append((digest.copy().digest(), size // 4))
+        return prefixes
+
+    def _remember(self, fingerprint: bytes):
+        self._seen[fingerprint] = None
+        self._seen.move_to_end(fingerprint)
+        if len(self._seen) > self.max_entries:
+            self._seen.popitem(last=False)
+
+    def plan(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Return the payload, copied with a breakpoint added when a cacheable prefix repeats."""
+        self.stats.requests += 1
+        if _has_breakpoint(payload):
+            return payload
+        prefixes = self._prefixes(payload)
+        index = next(
+            (i for i in range(len(prefixes) - 1, -1, -1)
+             if prefixes[i][1] >= self.min_tokens and prefixes[i][0] in self._seen),
+            None,
+        )
+        for fingerprint, _ in prefixes:
+            self._remember(fingerprint)
+        if index is None:
+            return payload
+
+        self.stats.breakpoints += 1
+        payload = dict(payload)
+        if payload.get("system"):
+            if index == 0:
+                payload["system"] = _mark(payload["system"])
+                return payload
+            index -= 1
+        messages = payload["messages"]
+        marked = {**messages[index], "content": _mark(messages[index]["content"])}
+        if isinstance(messages, PrefixedMessages) and messages.intact():
+            payload["messages"] = self._mark_prefixed(messages, index, marked)
+            return payload
+        messages = list(messages)
+        messages[index] = marked
+        payload["messages"] = messages
+        return payload
+
+    def _mark_prefixed(self, messages: PrefixedMessages, index: int, marked: Dict[str, Any]) -> PrefixedMessages:
+        """The messages with one replaced, still led by a MessagePrefix so the codec can reuse its bytes."""
+        prefix = messages.prefix
+        tail = list(messages[len(prefix):])
+        if index >= len(prefix):
+            tail[index - len(prefix)] = marked
+            return PrefixedMessages(prefix, tail)
+        # The breakpoint usually lands on the same prefix message request
+        # after request; keep the marked copy of the prefix with the prefix
+        cached = self._marked_prefixes.get(prefix)
+        if cached is None or cached[0] != index:
+            cached = (index, prefix.replace(index, marked, self.codec))
+            self._marked_prefixes[prefix] = cached
+        return PrefixedMessages(cached[1], tail)
+
+    def record(self, response: LLMResponse):
+        """Count the cache usage a response reports."""
+        usage = response.usage
+        self.stats.responses += 1
+        self.stats.cache_read_tokens += usage.cache_read_tokens
+        self.stats.cache_write_tokens += usage.cache_write_tokens
+        if usage.cache_read_tokens:
+            self.stats.hits += 1
+            self.stats.hit_latency += response.latency or 0.0
+        else:
+            self.stats.miss_latency += response.latency or 0.0
+
+    def report(self, manager: Optional[ModelManager] = None, model: ModelType = ModelType.CLAUDE) -> Dict[str, Any]:
+        """
+        Summarize prompt caching: hit rate, tokens, cost saved at the model's
+        prices, and latency saved estimated from mean hit vs miss latency.
+        """
+        manager = manager or ModelManager()
+        stats = self.stats
+        misses = stats.responses - stats.hits
+        hit_mean = stats.hit_latency / stats.hits if stats.hits else None
+        miss_mean = stats.miss_latency / misses if misses else None
+        latency_saved = (miss_mean - hit_mean) * stats.hits if hit_mean is not None and miss_mean is not None else 0.0
+        return {
+            "requests": stats.requests,
+            "breakpoints": stats.breakpoints,
+            "hits": stats.hits,
+            "hit_rate": stats.hits / stats.responses if stats.responses else 0.0,
+            "cache_read_tokens": stats.cache_read_tokens,
+            "cache_write_tokens": stats.cache_write_tokens,
+            "cost_saved": manager.cache_savings(model, stats.cache_read_tokens, stats.cache_write_tokens),
+            "mean_latency_hit": hit_mean,
+            "mean_latency_miss": miss_mean,
+            "latency_saved": max(0.0, latency_saved),
+        }
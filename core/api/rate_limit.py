@@ -0,0 +1,63 @@
+# core/api/rate_limit.py
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Optional
+
+class TokenBucket:
+    """Token bucket refilled continuously at ``rate_per_minute``."""
+
+    def __init__(self, rate_per_minute: float, burst: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = burst if burst is not None else max(1.0, float(rate_per_minute))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """Take tokens if available. Returns 0 on success, else seconds until they would be."""
+        now = time.monotonic()
+        self._refill(now)
+        if self._tokens >= tokens:
+            self._tokens -= tokens
+            return 0.0
+        if self.rate <= 0:
+            return float("inf")
+        return (tokens - self._tokens) / self.rate
+
+    async def acquire(self, tokens: float = 1.0):
+        """Wait until tokens are available and take them."""
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait == 0.0:
+                return
+            await asyncio.sleep(wait)
+
+class RateLimiter:
+    """Per-key token buckets, e.g. one per API caller."""
+
+    def __init__(self, rate_per_minute: float, burst: Optional[float] = None, max_keys: int = 10000):
+        self.rate_per_minute = rate_per_minute
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    def _bucket(self, key: str) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.rate_per_minute, self.burst)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def try_acquire(self, key: str, tokens: float = 1.0) -> float:
+        """Take tokens for key. Returns 0 on success, else the suggested retry delay."""
+        return self._bucket(key).try_acquire(tokens)
+
+    async def acquire(self, key: str, tokens: float = 1.0):
+        await self._bucket(key).acquire(tokens)
@@ -0,0 +1,173 @@
+# core/api/response.py
+"""
+Provider-neutral response returned by ``LLMClient.generate``.
+
+An ``LLMResponse`` keeps the response body as the bytes it arrived in and
+parses it only when a field is first read. The normalized fields (text, tool
+calls, usage, stop reason) are extracted once and the parsed document is then
+dropped, so a response that has been read costs little more than its body.
+It is also a read-only Mapping over the provider's JSON, so code written
+against the raw dicts (``response["choices"][0]...``) keeps working.
+"""
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from ..models.config import ModelType, get_provider
+from .codec import get_codec
+
+_codec = get_codec()
+
+# OpenAI finish reasons mapped onto Anthropic's stop reasons
+OPENAI_STOP_REASONS = {
+    "stop": "end_turn",
+    "length": "max_tokens",
+    "tool_calls": "tool_use",
+    "function_call": "tool_use",
+    "content_filter": "content_filter",
+}
+
+class Usage(NamedTuple):
+    input_tokens: int = 0           # billed at the full input rate
+    output_tokens: int = 0
+    cache_read_tokens: int = 0      # prompt tokens served from the provider's prompt cache
+    cache_write_tokens: int = 0     # prompt tokens written to it
+
+    @property
+    def prompt_tokens(self) -> int:
+        """All prompt tokens, cached or not."""
+        return self.input_tokens + self.cache_read_tokens + self.cache_write_tokens
+
+class ToolCall(NamedTuple):
+    id: str
+    name: str
+    arguments: Any  # decoded JSON input; OpenAI's argument string if it is not valid JSON
+
+class LLMResponse(Mapping):
+    """Lazily parsed provider response."""
+
+    __slots__ = (
+        "model_type", "latency",
+        "_raw", "_data",
+        "_text", "_tool_calls", "_usage", "_stop_reason", "_id",
+    )
+
+    def __init__(self, model_type: ModelType, body: Union[bytes, Dict[str, Any]], latency: Optional[float] = None):
+        """
+        Args:
+            model_type: Model that produced the response
+            body: Response body as received, or an already decoded dict
+            latency: Seconds from sending the request to receiving the body
+        """
+        self.model_type = model_type
+        self.latency = latency
+        if isinstance(body, (bytes, bytearray, memoryview)):
+            self._raw, self._data = bytes(body), None
+        else:
+            self._raw, self._data = None, body
+        self._text = None
+
+    @property
+    def provider(self) -> str:
+        return get_provider(self.model_type)
+
+    @property
+    def raw(self) -> bytes:
+        """The response body as JSON bytes."""
+        if self._raw is None:
+            self._raw = _codec.dumps(self._data)
+        return self._raw
+
+    def _document(self) -> Dict[str, Any]:
+        return self._data if self._data is not None else _codec.loads(self._raw)
+
+    def _extract(self):
+        """Pull the normalized fields out of the document in one pass."""
+        if self._text is not None:
+            return
+        data = self._document()
+        usage = data.get("usage") or {}
+        tool_calls: List[ToolCall] = []
+        if self.provider == "anthropic":
+            texts = []
+            for block in data.get("content") or ():
+                kind = block.get("type", "text")
+                if kind == "text":
+                    texts.append(block.get("text", ""))
+                elif kind == "tool_use":
+                    tool_calls.append(ToolCall(block.get("id", ""), block.get("name", ""), block.get("input")))
+            text = "".join(texts)
+            stop_reason = data.get("stop_reason")
+            self._usage = Usage(
+                usage.get("input_tokens", 0), usage.get("output_tokens", 0),
+                usage.get("cache_read_input_tokens") or 0, usage.get("cache_creation_input_tokens") or 0,
+            )
+        else:
+            choice = (data.get("choices") or [{}])[0]
+            message = choice.get("message") or {}
+            text = message.get("content") or ""
+            for call in message.get("tool_calls") or ():
+                function = call.get("function") or {}
+                arguments = function.get("arguments")
+                try:
+                    arguments = _codec.loads(arguments) if isinstance(arguments, str) else arguments
+                except ValueError:
+                    pass
+                tool_calls.append(ToolCall(call.get("id", ""), function.get("name", ""), arguments))
+            reason = choice.get("finish_reason")
+            stop_reason = OPENAI_STOP_REASONS.get(reason, reason)
+            # OpenAI counts cached tokens inside prompt_tokens
+            cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+            self._usage = Usage(usage.get("prompt_tokens", 0) - cached, usage.get("completion_tokens", 0), cached)
+        self._tool_calls = tuple(tool_calls)
+        self._stop_reason = stop_reason
+        self._id = data.get("id")
+        self._text = text
+
+    @property
+    def text(self) -> str:
+        self._extract()
+        return self._text
+
+    @property
+    def tool_calls(self) -> Tuple[ToolCall, ...]:
+        self._extract()
+        return self._tool_calls
+
+    @property
+    def usage(self) -> Usage:
+        self._extract()
+        return self._usage
+
+    @property
+    def stop_reason(self) -> Optional[str]:
+        """Anthropic-style stop reason: end_turn, max_tokens, stop_sequence, tool_use, ..."""
+        self._extract()
+        return self._stop_reason
+
+    @property
+    def id(self) -> Optional[str]:
+        self._extract()
+        return self._id
+
+    def to_dict(self) -> Dict[str, Any]:
+        """The provider's JSON document."""
+        return self._document()
+
+    # Mapping over the raw document; the parse is kept since callers using
+    # this interface usually index more than once
+    def _mapping(self) -> Dict[str, Any]:
+        if self._data is None:
+            self._data = _codec.loads(self._raw)
+        return self._data
+
+    def __getitem__(self, key: str) -> Any:
+        return self._mapping()[key]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._mapping())
+
+    def __len__(self) -> int:
+        return len(self._mapping())
+
+    def __repr__(self) -> str:
+        return f"LLMResponse(model={self.model_type.value!r}, bytes={len(self.raw)})"
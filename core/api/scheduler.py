@@ -0,0 +1,341 @@
+# core/api/scheduler.py
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Optional, Dict, Any, List
+
+from ..models.config import ModelType
+from .client import LLMClient, QueueFullError, DeadlineExceededError
+from utils.metrics.registry import MetricsRegistry, get_registry
+
+class Priority(IntEnum):
+    """Priority classes, served strictly in ascending order."""
+    INTERACTIVE = 0
+    DEFAULT = 1
+    BATCH = 2
+
+class OverflowPolicy:
+    """What to do with a new request when the queue is full."""
+    BLOCK = "block"    # wait for space (backpressure)
+    REJECT = "reject"  # fail the new request immediately
+    SHED = "shed"      # evict queued lower-priority work, else reject
+
+@dataclass(order=True)
+class _QueuedRequest:
+    finish_tag: float
+    seq: int
+    priority: Priority = field(compare=False)
+    tenant: str = field(compare=False)
+    start_tag: float = field(compare=False)
+    enqueued_at: float = field(compare=False)
+    deadline: Optional[float] = field(compare=False)
+    model_type: ModelType = field(compare=False)
+    messages: List[Dict[str, str]] = field(compare=False)
+    kwargs: Dict[str, Any] = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    timer: Optional[asyncio.TimerHandle] = field(default=None, compare=False)
+    task: Optional[asyncio.Task] = field(default=None, compare=False)
+    done: bool = field(default=False, compare=False)
+    trace: Optional[Any] = field(default=None, compare=False)
+
+class RequestScheduler:
+    """
+    Priority scheduler in front of LLMClient.
+
+    Requests are served strictly by priority class. Within a class, tenants
+    share dispatch slots by weighted fair queuing (virtual finish tags), so a
+    tenant that floods the queue cannot starve the others. The queue is
+    bounded; on overflow the scheduler applies backpressure, rejects, or sheds
+    lower-priority work. Requests whose deadline passes while queued are
+    dropped without being sent; the rest take their deadline to the client.
+    """
+
+    def __init__(
+        self,
+        client: LLMClient,
+        max_concurrency: int = 16,
+        max_queue_size: int = 1000,
+        overflow: str = OverflowPolicy.BLOCK,
+        tenant_weights: Optional[Dict[str, float]] = None,
+        metrics: Optional[MetricsRegistry] = None,
+    ):
+        if overflow not in (OverflowPolicy.BLOCK, OverflowPolicy.REJECT, OverflowPolicy.SHED):
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self.client = client
+        self.max_concurrency = max_concurrency
+        self.max_queue_size = max_queue_size
+        self.overflow = overflow
+        self.tenant_weights = dict(tenant_weights or {})
+        self.logger = logging.getLogger(__name__)
+
+        self._queues: Dict[Priority, List[_QueuedRequest]] = {p: [] for p in Priority}
+        self._virtual_time: Dict[Priority, float] = {p: 0.0 for p in Priority}
+        self._last_finish: Dict[tuple, float] = {}
+        self._seq = itertools.count()
+        self._queued = 0
+        self._in_flight = 0
+        self._space_waiters: deque = deque()
+
+        registry = metrics or get_registry()
+        self._queue_wait = registry.histogram(
+            "llm_scheduler_queue_wait_seconds", "Time requests spend queued before dispatch"
+        )
+        self._provider_latency = registry.histogram(
+            "llm_provider_latency_seconds", "Time spent in LLMClient.generate"
+        )
+        self._queue_depth = registry.gauge("llm_scheduler_queue_depth", "Requests waiting in the scheduler")
+        self._in_flight_gauge = registry.gauge("llm_scheduler_in_flight", "Requests dispatched by the scheduler")
+        self._dropped = registry.counter("llm_scheduler_dropped_total", "Requests dropped before dispatch")
+
+    @property
+    def queued(self) -> int:
+        return self._queued
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    async def submit(
+        self,
+        model_type: ModelType,
+        messages: List[Dict[str, str]],
+        priority: Priority = Priority.DEFAULT,
+        tenant: str = "default",
+        timeout: Optional[float] = None,
+        deadline: Optional[float] = None,
+        cost: float = 1.0,
+        **kwargs
+    ) -> Any:
+        """
+        Queue a request and wait for its result.
+
+        Args:
+            model_type: The type of model to use
+            messages: List of message dictionaries with 'role' and 'content'
+            priority: Priority class of the request
+            tenant: Tenant or tag used for fair queuing within the class
+            timeout: Seconds from now after which the request is dropped
+            deadline: Absolute ``time.monotonic()`` deadline (overrides timeout)
+            cost: Relative cost of the request for fair queuing
+            **kwargs: Passed through to LLMClient.generate
+
+        Returns:
+            Whatever LLMClient.generate returns
+        """
+        priority = Priority(priority)
+        if deadline is None and timeout is not None:
+            deadline = time.monotonic() + timeout
+
+        await self._reserve_slot(priority, deadline)
+
+        # Started here so the trace covers queue wait; the client records
+        # the rest of the request into it
+        tracer = getattr(self.client, "tracer", None)
+        trace = None
+        if tracer is not None:
+            trace = tracer.start(
+                request_id=kwargs.get("request_id"),
+                **{"scheduler.priority": priority.name, "scheduler.tenant": tenant}
+            )
+
+        loop = asyncio.get_running_loop()
+        weight = self.tenant_weights.get(tenant, 1.0)
+        start_tag = max(self._virtual_time[priority], self._last_finish.get((priority, tenant), 0.0))
+        finish_tag = start_tag + cost / weight
+        self._last_finish[(priority, tenant)] = finish_tag
+
+        item = _QueuedRequest(
+            finish_tag=finish_tag,
+            seq=next(self._seq),
+            priority=priority,
+            tenant=tenant,
+            start_tag=start_tag,
+            enqueued_at=time.monotonic(),
+            deadline=deadline,
+            model_type=model_type,
+            messages=messages,
+            kwargs=kwargs,
+            future=loop.create_future(),
+            trace=trace,
+        )
+        if deadline is not None:
+            delay = max(0.0, deadline - time.monotonic())
+            item.timer = loop.call_later(delay, self._expire, item)
+
+        heapq.heappush(self._queues[priority], item)
+        self._queued += 1
+        self._queue_depth.set(self._queued)
+        self._dispatch()
+
+        try:
+            return await item.future
+        except asyncio.CancelledError:
+            if not item.done:
+                self._drop(item, "cancelled")
+            elif item.task is not None:
+                item.task.cancel()
+            raise
+
+    async def _reserve_slot(self, priority: Priority, deadline: Optional[float]):
+        """Make room for one more queued request according to the overflow policy."""
+        if self._queued < self.max_queue_size:
+            return
+        if self.overflow == OverflowPolicy.SHED and self._shed_below(priority):
+            return
+        if self.overflow in (OverflowPolicy.REJECT, OverflowPolicy.SHED):
+            self._dropped.inc(reason="rejected", priority=priority.name)
+            raise QueueFullError(f"Scheduler queue full ({self.max_queue_size} requests)")
+
+        loop = asyncio.get_running_loop()
+        while self._queued >= self.max_queue_size:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                self._dropped.inc(reason="expired", priority=priority.name)
+                raise DeadlineExceededError("Deadline exceeded while waiting for queue space")
+            waiter = loop.create_future()
+            self._space_waiters.append(waiter)
+            try:
+                await asyncio.wait_for(waiter, remaining)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                if not waiter.done():
+                    waiter.cancel()
+
+    def _shed_below(self, priority: Priority) -> bool:
+        """Evict the most recently scheduled request of the lowest class below priority."""
+        for victim_class in sorted(Priority, reverse=True):
+            if victim_class <= priority:
+                break
+            live = [item for item in self._queues[victim_class] if not item.done]
+            if live:
+                victim = max(live, key=lambda item: (item.finish_tag, item.seq))
+                self._drop(victim, "shed", QueueFullError("Request shed by higher-priority traffic"))
+                return True
+        return False
+
+    def _expire(self, item: _QueuedRequest):
+        if not item.done:
+            self._drop(item, "expired", DeadlineExceededError("Deadline exceeded while queued"))
+
+    def _drop(self, item: _QueuedRequest, reason: str, exc: Optional[Exception] = None):
+        """Remove a queued request without dispatching it (lazy heap deletion)."""
+        item.done = True
+        if item.timer:
+            item.timer.cancel()
+        self._queued -= 1
+        self._queue_depth.set(self._queued)
+        self._dropped.inc(reason=reason, priority=item.priority.name)
+        if exc is not None and not item.future.done():
+            item.future.set_exception(exc)
+        if item.trace is not None:
+            item.trace.finish(error=exc or asyncio.CancelledError())
+        self.logger.debug("Dropped %s request from tenant %s: %s", item.priority.name, item.tenant, reason)
+        self._notify_space()
+
+    def _notify_space(self):
+        while self._space_waiters:
+            waiter = self._space_waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+
+    def _next(self) -> Optional[_QueuedRequest]:
+        for priority in Priority:
+            queue = self._queues[priority]
+            while queue:
+                item = heapq.heappop(queue)
+                if item.done:
+                    continue
+                self._virtual_time[priority] = max(self._virtual_time[priority], item.start_tag)
+                return item
+        return None
+
+    def _dispatch(self):
+        while self._in_flight < self.max_concurrency:
+            item = self._next()
+            if item is None:
+                return
+            item.done = True
+            if item.timer:
+                item.timer.cancel()
+            self._queued -= 1
+            self._queue_depth.set(self._queued)
+            self._notify_space()
+
+            now = time.monotonic()
+            if item.deadline is not None and now >= item.deadline:
+                self._dropped.inc(reason="expired", priority=item.priority.name)
+                error = DeadlineExceededError("Deadline exceeded while queued")
+                item.future.set_exception(error)
+                if item.trace is not None:
+                    item.trace.finish(error=error)
+                continue
+
+            self._queue_wait.observe(now - item.enqueued_at, priority=item.priority.name)
+            if item.trace is not None:
+                item.trace.add("queue_wait", item.trace.root.start_ns)
+            self._in_flight += 1
+            self._in_flight_gauge.set(self._in_flight)
+            item.task = asyncio.get_running_loop().create_task(self._run(item))
+
+    async def _run(self, item: _QueuedRequest):
+        started = time.monotonic()
+        outcome = "ok"
+        kwargs = dict(item.kwargs)
+        if item.trace is not None:
+            kwargs["trace"] = item.trace
+        if item.deadline is not None:
+            # The provider call gets only what queueing left of the deadline
+            kwargs["deadline"] = item.deadline
+        error: Optional[BaseException] = None
+        try:
+            result = await self.client.generate(
+                model_type=item.model_type,
+                messages=item.messages,
+                **kwargs
+            )
+            if not item.future.done():
+                item.future.set_result(result)
+        except Exception as e:
+            outcome = type(e).__name__
+            error = e
+            if not item.future.done():
+                item.future.set_exception(e)
+        except asyncio.CancelledError as e:
+            error = e
+            raise
+        finally:
+            # The client finishes a streamed trace when the stream is released
+            if item.trace is not None and (error is not None or not item.kwargs.get("stream")):
+                item.trace.finish(error=error)
+            self._provider_latency.observe(
+                time.monotonic() - started,
+                model=item.model_type.value,
+                outcome=outcome
+            )
+            self._in_flight -= 1
+            self._in_flight_gauge.set(self._in_flight)
+            self._dispatch()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get queue and latency metrics, with queue wait kept apart from provider latency."""
+        return {
+            "queued": self._queued,
+            "in_flight": self._in_flight,
+            "queue_wait": {
+                p.name: {
+                    "count": self._queue_wait.count(priority=p.name),
+                    "p50": self._queue_wait.quantile(0.5, priority=p.name),
+                    "p95": self._queue_wait.quantile(0.95, priority=p.name),
+                }
+                for p in Priority
+            },
+            "provider_latency": self._provider_latency.snapshot(),
+            "dropped": self._dropped.snapshot(),
+        }
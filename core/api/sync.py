@@ -0,0 +1,242 @@
+# core/api/sync.py
+"""
+Blocking LLMClient for synchronous code.
+
+SyncLLMClient runs one event loop in a background thread and one LLMClient
+on it, so every call from Django views, thread-pool workers or scripts goes
+through the same connection pool, key pools and limiters instead of opening
+a new session per ``asyncio.run``. Its methods can be called from any number
+of threads at once; each call is scheduled on the loop and the calling
+thread waits for the result.
+
+    client = get_sync_client()
+    response = client.generate(ModelType.GPT4O, messages, timeout=30)
+    with client.stream(ModelType.CLAUDE, messages) as chunks:
+        for text in chunks:
+            ...
+"""
+import asyncio
+import threading
+import logging
+from concurrent.futures import Future
+from functools import lru_cache
+from typing import Optional, Dict, Any, List, Iterable, Iterator, Union, Coroutine, TypeVar
+
+from ..models.config import ModelType
+from .client import LLMClient
+from .deadline import resolve
+from .response import LLMResponse
+
+T = TypeVar("T")
+
+_END = object()
+
+class SyncStream:
+    """
+    Text chunks of a streaming response, read one blocking step at a time.
+
+    Iterate it, ideally inside ``with`` so the connection, key and slot are
+    released when the block exits even if the loop stops early; ``close``
+    does the same and is safe to repeat.
+    """
+
+    def __init__(self, client: "SyncLLMClient", context):
+        self._closed = True
+        self._client = client
+        self._context = context
+        self._chunks = client.run(context.__aenter__())
+        self._closed = False
+
+    def __iter__(self) -> Iterator[str]:
+        return self
+
+    def __next__(self) -> str:
+        if self._closed:
+            raise StopIteration
+        try:
+            text = self._client.run(self._next())
+        except BaseException:
+            self._close(quiet=True)
+            raise
+        if text is _END:
+            self.close()
+            raise StopIteration
+        return text
+
+    async def _next(self):
+        return await anext(self._chunks, _END)
+
+    def close(self):
+        self._close(quiet=False)
+
+    def _close(self, quiet: bool):
+        if self._closed:
+            return
+        self._closed = True
+        if self._client.closed:
+            return
+        try:
+            self._client.run(self._context.__aexit__(None, None, None))
+        except Exception:
+            # Keep the error that stopped the stream rather than this one
+            if not quiet:
+                raise
+
+    def __enter__(self) -> "SyncStream":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def __del__(self):
+        # An abandoned stream is released on the loop without waiting for it
+        if not self._closed and not self._client.closed:
+            self._closed = True
+            try:
+                self._client._submit(self._context.__aexit__(None, None, None))
+            except RuntimeError:
+                pass
+
+class SyncLLMClient:
+    """
+    Thread-safe blocking facade over one LLMClient on a background event loop.
+
+    Keyword arguments are passed to LLMClient, which is built on the loop
+    thread. Call ``close`` (or use it as a context manager) to close the
+    connection pool and stop the thread; the shared ``get_sync_client``
+    instance lives for the whole process.
+    """
+
+    def __init__(self, **client_kwargs):
+        self.logger = logging.getLogger(__name__)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, name="llm-sync-client", daemon=True)
+        self._lock = threading.Lock()
+        self._closed = False
+        self._thread.start()
+        self.client: LLMClient = self.run(self._open(client_kwargs))
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    @staticmethod
+    async def _open(client_kwargs: Dict[str, Any]) -> LLMClient:
+        # aiohttp sessions and asyncio primitives belong to the loop they
+        # were made on
+        return await LLMClient(**client_kwargs).__aenter__()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def _submit(self, coro: Coroutine[Any, Any, T]) -> "Future[T]":
+        with self._lock:
+            if self._closed:
+                coro.close()
+                raise RuntimeError("SyncLLMClient is closed")
+            return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def run(self, coro: Coroutine[Any, Any, T]) -> T:
+        """
+        Run a coroutine on the client's loop and wait for its result. If the
+        waiting thread is interrupted, the coroutine is cancelled.
+        """
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError("SyncLLMClient called from its own event loop; await the LLMClient instead")
+        future = self._submit(coro)
+        try:
+            return future.result()
+        except BaseException:
+            future.cancel()
+            raise
+
+    def generate(self, model_type: ModelType, messages: List[Dict[str, Any]], **kwargs) -> LLMResponse:
+        """Blocking ``LLMClient.generate``; takes the same arguments except ``stream``."""
+        if kwargs.get("stream"):
+            raise ValueError("Use SyncLLMClient.stream for streaming responses")
+        return self.run(self.client.generate(model_type, messages, **kwargs))
+
+    def generate_many(
+        self,
+        model_type: ModelType,
+        conversations: Iterable[List[Dict[str, Any]]],
+        max_concurrency: Optional[int] = None,
+        return_exceptions: bool = False,
+        **kwargs
+    ) -> List[Union[LLMResponse, BaseException]]:
+        """
+        Send several conversations to one model concurrently and wait for all
+        of them.
+
+        Args:
+            model_type: The model for every request
+            conversations: Message lists, one per request
+            max_concurrency: Requests in flight at once from this call; the
+                client's limiter still bounds each key
+            return_exceptions: Put a failed request's exception in its place
+                instead of raising the first one
+            **kwargs: Arguments to ``generate`` shared by every request;
+                ``timeout`` starts once for all of them
+
+        Returns:
+            Responses in the order of ``conversations``
+        """
+        # One deadline for the whole call, including requests still waiting
+        # for a turn
+        kwargs["deadline"] = resolve(kwargs.pop("deadline", None), kwargs.pop("timeout", None))
+        return self.run(self._generate_many(model_type, list(conversations), max_concurrency, return_exceptions, kwargs))
+
+    async def _generate_many(self, model_type, conversations, max_concurrency, return_exceptions, kwargs):
+        gate = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+
+        async def one(messages):
+            if gate is None:
+                return await self.client.generate(model_type, messages, **kwargs)
+            async with gate:
+                return await self.client.generate(model_type, messages, **kwargs)
+
+        tasks = [asyncio.create_task(one(messages)) for messages in conversations]
+        try:
+            return await asyncio.gather(*tasks, return_exceptions=return_exceptions)
+        finally:
+            # A failure without return_exceptions leaves the rest running
+            for task in tasks:
+                task.cancel()
+
+    def stream(self, model_type: ModelType, messages: List[Dict[str, Any]], **kwargs) -> SyncStream:
+        """
+        Blocking ``LLMClient.stream``: sends the request and returns an
+        iterator of text chunks once the response starts. Takes the arguments
+        of ``generate``; a ``timeout`` also bounds the whole stream.
+        """
+        return SyncStream(self, self.client.stream(model_type, messages, **kwargs))
+
+    def close(self):
+        """Release open streams, close the connection pool and stop the loop thread."""
+        if self._closed:
+            return
+        try:
+            self.run(self._shutdown())
+        finally:
+            with self._lock:
+                self._closed = True
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+
+    async def _shutdown(self):
+        await self.client.__aexit__(None, None, None)
+        await self._loop.shutdown_asyncgens()
+
+    def __enter__(self) -> "SyncLLMClient":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+@lru_cache
+def get_sync_client() -> SyncLLMClient:
+    """The process-wide SyncLLMClient with the default LLMClient settings."""
+    return SyncLLMClient()
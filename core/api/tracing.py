@@ -0,0 +1,390 @@
+# core/api/tracing.py
+"""
+Per-phase request tracing.
+
+A ``Tracer`` starts a ``RequestTrace`` for a sampled share of requests. The
+trace's root span covers the whole call, and child spans cover each phase
+where time can go:
+
+* ``queue_wait``: queued in a RequestScheduler
+* ``limiter_wait``: waiting for a slot from the adaptive concurrency limiter
+* ``connection_queue``, ``dns``, ``connect`` (TCP and TLS; aiohttp does not
+  separate them), ``upload`` and ``server`` (request sent until response
+  headers arrive): from aiohttp's ``TraceConfig`` hooks
+* ``download``: reading the response body, or ``stream`` for a streaming
+  response until it is released
+
+Spans of one request share a trace id and carry the ``request.id``
+attribute, so they can be correlated with logs and the gateway's
+``x-request-id``. Finished traces go to a ``TraceSink``: ``JSONLinesSink``
+writes one span per line and ``OTLPSink`` posts OTLP/HTTP JSON to a collector
+(``http://127.0.0.1:4318/v1/traces`` by default), both from a background
+thread, and ``InMemorySink`` keeps them for tests. Unsampled requests carry no trace,
+so all they cost is one random draw.
+"""
+import json
+import logging
+import queue
+import random
+import threading
+import time
+import urllib.request
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import partial
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Union
+
+import aiohttp
+
+def _span_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    start_ns: int
+    end_ns: int = 0
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    @property
+    def duration(self) -> float:
+        """Seconds."""
+        return (self.end_ns - self.start_ns) / 1e9
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": (self.end_ns - self.start_ns) / 1e6,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+class RequestTrace:
+    """The spans of one sampled request."""
+
+    def __init__(self, tracer: "Tracer", name: str, request_id: Optional[str] = None, **attributes):
+        self.tracer = tracer
+        self.trace_id = uuid.uuid4().hex
+        self.request_id = request_id or self.trace_id
+        self.root = Span(name, self.trace_id, _span_id(), None, time.time_ns(),
+                         attributes={"request.id": self.request_id, **attributes})
+        self.spans: List[Span] = [self.root]
+        self.finished = False
+        self._open: Dict[str, int] = {}
+        self._marks: Dict[str, int] = {}
+
+    def set(self, **attributes):
+        """Add attributes to the root span."""
+        self.root.attributes.update(attributes)
+
+    def add(self, name: str, start_ns: int, end_ns: Optional[int] = None, error: Optional[str] = None, **attributes) -> Span:
+        span = Span(name, self.trace_id, _span_id(), self.root.span_id, start_ns,
+                    end_ns or time.time_ns(), attributes, error)
+        self.spans.append(span)
+        return span
+
+    def begin(self, name: str):
+        """Open a phase closed later by ``end``, for hook pairs such as aiohttp's."""
+        self._open[name] = time.time_ns()
+
+    def end(self, name: str, **attributes) -> Optional[Span]:
+        started = self._open.pop(name, None)
+        return self.add(name, started, **attributes) if started is not None else None
+
+    def mark(self, name: str):
+        self._marks[name] = time.time_ns()
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        started = time.time_ns()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            self.add(name, started, error=error, **attributes)
+
+    def finish(self, error: Optional[BaseException] = None):
+        """End the root span and export the trace; later calls do nothing."""
+        if self.finished:
+            return
+        self.finished = True
+        self.root.end_ns = time.time_ns()
+        if error is not None:
+            self.root.error = type(error).__name__
+            self.root.attributes["error.message"] = str(error)[:200]
+        self.tracer.export(self)
+
+class TraceSink:
+    """Destination for finished spans."""
+
+    def export(self, spans: List[Span]):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+class InMemorySink(TraceSink):
+    """Keeps the most recent spans in memory."""
+
+    def __init__(self, max_spans: int = 10000):
+        self.max_spans = max_spans
+        self.spans: List[Span] = []
+
+    def export(self, spans: List[Span]):
+        self.spans.extend(spans)
+        del self.spans[:-self.max_spans]
+
+    def traces(self) -> Dict[str, List[Span]]:
+        grouped: Dict[str, List[Span]] = {}
+        for span in self.spans:
+            grouped.setdefault(span.trace_id, []).append(span)
+        return grouped
+
+class BatchingSink(TraceSink):
+    """
+    Hands spans to a background thread that writes them in batches of up to
+    ``batch_size`` or every ``interval`` seconds, so exporting never blocks
+    the event loop. Spans are dropped (and counted) when the queue is full.
+    Subclasses implement ``_write``.
+    """
+
+    def __init__(self, batch_size: int = 512, interval: float = 2.0, max_queue: int = 10000, name: str = "trace-exporter"):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.dropped = 0
+        self.logger = logging.getLogger(__name__)
+        self._queue: "queue.Queue[Optional[Span]]" = queue.Queue(max_queue)
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def export(self, spans: List[Span]):
+        for span in spans:
+            try:
+                self._queue.put_nowait(span)
+            except queue.Full:
+                self.dropped += 1
+
+    def _run(self):
+        batch: List[Span] = []
+        deadline = time.monotonic() + self.interval
+        stopping = False
+        while not stopping:
+            try:
+                span = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                if span is None:
+                    stopping = True
+                else:
+                    batch.append(span)
+            except queue.Empty:
+                pass
+            if batch and (stopping or len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                self._write(batch)
+                batch = []
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + self.interval
+        self._closed()
+
+    def _write(self, batch: List[Span]):
+        raise NotImplementedError
+
+    def _closed(self):
+        """Called on the writer thread once the last batch is written."""
+
+    def close(self, timeout: Optional[float] = None):
+        """Flush queued spans and stop the writer thread."""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout)
+
+class JSONLinesSink(BatchingSink):
+    """Appends one JSON object per span to a file, from a writer thread."""
+
+    def __init__(self, path: Union[str, Path], batch_size: int = 512, interval: float = 1.0, max_queue: int = 10000):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "a", encoding="utf-8")
+        super().__init__(batch_size, interval, max_queue, name="jsonl-trace-writer")
+
+    def _write(self, batch: List[Span]):
+        try:
+            self._file.write("".join(json.dumps(span.to_dict()) + "\n" for span in batch))
+            self._file.flush()
+        except OSError as e:
+            self.dropped += len(batch)
+            self.logger.warning("Writing %d spans to %s failed: %s", len(batch), self.path, e)
+
+    def _closed(self):
+        self._file.close()
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+def otlp_payload(spans: List[Span], service_name: str) -> Dict[str, Any]:
+    """Encode spans as an OTLP/HTTP JSON ExportTraceServiceRequest."""
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]},
+        "scopeSpans": [{
+            "scope": {"name": "llm-api-interface"},
+            "spans": [{
+                "traceId": span.trace_id,
+                "spanId": span.span_id,
+                **({"parentSpanId": span.parent_id} if span.parent_id else {}),
+                "name": span.name,
+                "kind": 3 if span.parent_id is None else 1,  # CLIENT root, INTERNAL phases
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns),
+                "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in span.attributes.items() if v is not None],
+                "status": {"code": 2, "message": span.error} if span.error else {"code": 0},
+            } for span in spans],
+        }],
+    }]}
+
+class OTLPSink(BatchingSink):
+    """
+    Posts spans to an OTLP/HTTP JSON endpoint from a background thread, in
+    batches of up to ``batch_size`` or every ``interval`` seconds. Spans are
+    dropped (and counted) rather than blocking requests when the queue is full
+    or the collector is unreachable.
+    """
+
+    def __init__(
+        self,
+        endpoint: str = "http://127.0.0.1:4318/v1/traces",
+        service_name: str = "llm-api-interface",
+        headers: Optional[Dict[str, str]] = None,
+        batch_size: int = 512,
+        interval: float = 2.0,
+        max_queue: int = 10000,
+        timeout: float = 5.0,
+    ):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.headers = {"content-type": "application/json", **(headers or {})}
+        self.timeout = timeout
+        super().__init__(batch_size, interval, max_queue, name="otlp-exporter")
+
+    def _write(self, batch: List[Span]):
+        body = json.dumps(otlp_payload(batch, self.service_name)).encode()
+        request = urllib.request.Request(self.endpoint, data=body, headers=self.headers, method="POST")
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+        except OSError as e:
+            self.dropped += len(batch)
+            self.logger.debug("OTLP export of %d spans failed: %s", len(batch), e)
+
+    def close(self, timeout: Optional[float] = None):
+        """Flush queued spans and stop the exporter thread."""
+        super().close(self.timeout + self.interval if timeout is None else timeout)
+
+class Tracer:
+    """Samples requests for tracing and exports their spans to a sink."""
+
+    def __init__(self, sink: TraceSink, sample_rate: float = 1.0, seed: Optional[int] = None):
+        """
+        Args:
+            sink: Where finished traces go
+            sample_rate: Share of requests traced, 0 to 1
+            seed: Seed for sampling decisions, for repeatable tests
+        """
+        if not 0.0 <= sample_rate <= 1.0:
+            raise ValueError("sample_rate must be between 0 and 1")
+        self.sink = sink
+        self.sample_rate = sample_rate
+        self._random = random.Random(seed).random
+
+    def start(self, name: str = "llm.request", request_id: Optional[str] = None, **attributes) -> Optional[RequestTrace]:
+        """A new trace, or None when this request is not sampled."""
+        if self.sample_rate < 1.0 and self._random() >= self.sample_rate:
+            return None
+        return RequestTrace(self, name, request_id, **attributes)
+
+    def export(self, trace: RequestTrace):
+        self.sink.export(trace.spans)
+
+    def close(self):
+        self.sink.close()
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """
+        aiohttp hooks recording connection and request phases of requests
+        sent with ``trace_request_ctx=<RequestTrace>``.
+        """
+        config = aiohttp.TraceConfig()
+        config.on_request_start.append(partial(_hook, _request_start))
+        config.on_connection_queued_start.append(partial(_hook, lambda t, p: t.begin("connection_queue")))
+        config.on_connection_queued_end.append(partial(_hook, lambda t, p: t.end("connection_queue")))
+        config.on_dns_resolvehost_start.append(partial(_hook, lambda t, p: t.begin("dns")))
+        config.on_dns_resolvehost_end.append(partial(_hook, lambda t, p: t.end("dns", host=p.host)))
+        config.on_connection_create_start.append(partial(_hook, lambda t, p: t.begin("connect")))
+        config.on_connection_create_end.append(partial(_hook, _connection_created))
+        config.on_connection_reuseconn.append(partial(_hook, _connection_reused))
+        config.on_request_headers_sent.append(partial(_hook, lambda t, p: t.mark("sent")))
+        config.on_request_chunk_sent.append(partial(_hook, lambda t, p: t.mark("sent")))
+        config.on_request_end.append(partial(_hook, _request_end))
+        config.on_request_exception.append(partial(_hook, _request_exception))
+        return config
+
+async def _hook(record, session, trace_config_ctx, params):
+    trace = trace_config_ctx.trace_request_ctx
+    if isinstance(trace, RequestTrace):
+        record(trace, params)
+
+def _request_start(trace: RequestTrace, params):
+    trace.mark("request_start")
+    trace.set(**{"http.url": str(params.url)})
+
+def _connection_created(trace: RequestTrace, params):
+    trace.end("connect")
+    trace.mark("connected")
+    trace.set(**{"connection.reused": False})
+
+def _connection_reused(trace: RequestTrace, params):
+    trace.mark("connected")
+    trace.set(**{"connection.reused": True})
+
+def _request_end(trace: RequestTrace, params):
+    now = time.time_ns()
+    connected = trace._marks.get("connected") or trace._marks.get("request_start") or now
+    sent = trace._marks.get("sent") or connected
+    trace.add("upload", connected, sent)
+    trace.add("server", sent, now, **{"http.status_code": params.response.status})
+
+def _request_exception(trace: RequestTrace, params):
+    trace.set(**{"http.exception": type(params.exception).__name__})
+
+def tracer_from_settings(settings) -> Optional[Tracer]:
+    """
+    The tracer configured by TRACE_EXPORTER ("jsonl" writes TRACE_FILE,
+    "otlp" posts to OTLP_ENDPOINT) and TRACE_SAMPLE_RATE; None when unset.
+    """
+    exporter = settings.trace_exporter
+    if not exporter:
+        return None
+    if exporter == "jsonl":
+        sink: TraceSink = JSONLinesSink(settings.trace_file)
+    elif exporter == "otlp":
+        sink = OTLPSink(settings.otlp_endpoint, service_name=settings.project_name)
+    else:
+        raise ValueError(f"Unknown trace exporter: {exporter}")
+    return Tracer(sink, sample_rate=settings.trace_sample_rate)
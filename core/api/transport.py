@@ -0,0 +1,395 @@
+# core/api/transport.py
+"""
+Transports carry LLMClient requests to a provider.
+
+``HTTPTransport`` is the default and talks to the real endpoints through an
+aiohttp session. ``InProcessTransport`` calls a handler coroutine directly,
+with no sockets or serialization, so client-side overhead can be measured on
+its own and tests need no monkeypatching. ``CassetteTransport`` records
+interactions to a JSON file and replays them later.
+
+Every transport returns an already-entered response exposing the parts of
+``aiohttp.ClientResponse`` the client uses: ``status``, ``headers``,
+``json()``, ``read()``, ``content`` (iterated line by line), ``close()`` and
+``release()``; it is also an async context manager.
+
+``HTTPTransport`` can gzip request bodies above a size threshold; an
+endpoint answering 415 to a compressed body is remembered and sent plain
+from then on. ``read_body`` reads a response in chunks and stops at
+``max_bytes`` instead of buffering an unbounded body.
+"""
+import asyncio
+import gzip
+import json
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Union, Callable, Awaitable, AsyncIterable, Iterable, Deque, Set
+
+import aiohttp
+
+from .codec import JSONCodec, get_codec
+
+class CassetteMissError(LookupError):
+    """Raised when replaying a request that is not in the cassette"""
+    pass
+
+class BodyTooLargeError(Exception):
+    """Raised by read_body when a response body exceeds max_bytes"""
+
+    def __init__(self, size: int, limit: int):
+        super().__init__(f"Response body of {size}+ bytes exceeds the {limit} byte limit")
+        self.size = size
+        self.limit = limit
+
+# Response bodies are read in chunks of this size
+READ_CHUNK_BYTES = 64 * 1024
+# Bodies larger than this are gzipped in a worker thread to keep the loop free
+THREADED_COMPRESS_BYTES = 256 * 1024
+
+@dataclass
+class TransportRequest:
+    method: str
+    url: str
+    headers: Dict[str, str]
+    payload: Dict[str, Any]
+
+class _LineReader:
+    """Async line iterator mirroring aiohttp.StreamReader."""
+
+    def __init__(self, source: Union[Iterable[bytes], AsyncIterable[bytes]]):
+        self._source = source
+
+    async def __aiter__(self):
+        if hasattr(self._source, "__aiter__"):
+            async for line in self._source:
+                yield line
+        else:
+            for line in self._source:
+                yield line
+
+    def iter_any(self):
+        return self.__aiter__()
+
+class TransportResponse:
+    """
+    Response produced without a socket.
+
+    ``body`` is returned from ``json()`` as-is when it is already decoded;
+    ``lines`` (sync or async iterable of bytes) backs streaming responses.
+    """
+
+    def __init__(
+        self,
+        status: int = 200,
+        body: Union[Dict[str, Any], bytes, None] = None,
+        lines: Union[Iterable[bytes], AsyncIterable[bytes], None] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ):
+        self.status = status
+        self.headers = headers or {}
+        self._body = body
+        if lines is None:
+            lines = self._raw().splitlines(keepends=True)
+        self.content = _LineReader(lines)
+        self.closed = False
+
+    def _raw(self) -> bytes:
+        if self._body is None:
+            return b""
+        if isinstance(self._body, bytes):
+            return self._body
+        return json.dumps(self._body).encode()
+
+    async def read(self) -> bytes:
+        if self._body is None:
+            return b"".join([line async for line in self.content])
+        return self._raw()
+
+    async def json(self) -> Any:
+        if isinstance(self._body, (dict, list)):
+            return self._body
+        return json.loads(await self.read())
+
+    async def payload(self) -> Union[Dict[str, Any], bytes]:
+        """The body as the decoded dict when there is one, otherwise as bytes."""
+        if isinstance(self._body, dict):
+            return self._body
+        return await self.read()
+
+    def close(self):
+        self.closed = True
+
+    def release(self):
+        self.closed = True
+
+    async def __aenter__(self) -> "TransportResponse":
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+Handler = Callable[[TransportRequest], Awaitable[Union[TransportResponse, Dict[str, Any]]]]
+
+class Transport(ABC):
+    """Base class for the ways LLMClient can reach a provider."""
+
+    is_open: bool = False
+
+    async def open(self):
+        self.is_open = True
+
+    async def close(self):
+        self.is_open = False
+
+    @abstractmethod
+    async def post(self, url: str, headers: Dict[str, str], payload: Dict[str, Any], trace=None, buffer=None):
+        """
+        Send a request and return the entered response; the caller closes it.
+        ``trace`` is the request's RequestTrace, if it is sampled, and
+        ``buffer`` its BufferLease for the encoded body.
+        """
+
+    async def read_body(self, response, max_bytes: Optional[int] = None, buffer=None) -> Union[Dict[str, Any], bytes]:
+        """
+        Read a complete response body without decoding it; LLMResponse parses
+        on first access. A body that is already decoded is returned as-is.
+
+        Raises BodyTooLargeError once more than ``max_bytes`` arrive (or are
+        announced by Content-Length), without reading the rest. Bytes read
+        are added to ``buffer``.
+        """
+        content = getattr(response, "content", None)
+        if isinstance(response, TransportResponse) or not hasattr(content, "iter_chunked"):
+            # Already in memory, or a response that can only be read whole
+            if isinstance(response, TransportResponse):
+                body = await response.payload()
+            else:
+                body = await response.read()
+            if isinstance(body, bytes):
+                if max_bytes is not None and len(body) > max_bytes:
+                    raise BodyTooLargeError(len(body), max_bytes)
+                if buffer is not None:
+                    buffer.add(len(body))
+            return body
+
+        length = response.content_length
+        # Content-Length counts encoded bytes; the limit applies to decoded ones
+        if max_bytes is not None and length is not None and length > max_bytes and not response.headers.get("content-encoding"):
+            raise BodyTooLargeError(length, max_bytes)
+        chunks = []
+        size = 0
+        async for chunk in content.iter_chunked(READ_CHUNK_BYTES):
+            size += len(chunk)
+            if max_bytes is not None and size > max_bytes:
+                raise BodyTooLargeError(size, max_bytes)
+            if buffer is not None:
+                buffer.add(len(chunk))
+            chunks.append(chunk)
+        return chunks[0] if len(chunks) == 1 else b"".join(chunks)
+
+class HTTPTransport(Transport):
+    """Real HTTP through an aiohttp session, encoding with the given codec."""
+
+    def __init__(
+        self,
+        codec: Optional[JSONCodec] = None,
+        trace_configs: Optional[List[aiohttp.TraceConfig]] = None,
+        compress_min_bytes: Optional[int] = None,
+        compress_level: int = 5,
+    ):
+        """
+        Args:
+            codec: JSON codec for request bodies
+            trace_configs: aiohttp trace hooks for the session
+            compress_min_bytes: Gzip request bodies of at least this many
+                bytes; None sends every body uncompressed
+            compress_level: gzip level, 1 (fastest) to 9
+        """
+        self.codec = codec or get_codec()
+        self.trace_configs = trace_configs
+        self.compress_min_bytes = compress_min_bytes
+        self.compress_level = compress_level
+        # Endpoints that answered 415 to a gzipped body
+        self._plain_urls: Set[str] = set()
+        self.session: Optional[aiohttp.ClientSession] = None
+
+    @property
+    def is_open(self) -> bool:
+        return self.session is not None and not self.session.closed
+
+    async def open(self):
+        self.session = aiohttp.ClientSession(trace_configs=self.trace_configs)
+
+    async def close(self):
+        if self.session:
+            await self.session.close()
+
+    async def post(self, url: str, headers: Dict[str, str], payload: Dict[str, Any], trace=None, buffer=None):
+        body = self.codec.encode_payload(payload)
+        held = len(body)
+        if buffer is not None:
+            buffer.add(held)
+        try:
+            if (
+                self.compress_min_bytes is not None
+                and len(body) >= self.compress_min_bytes
+                and url not in self._plain_urls
+            ):
+                if len(body) >= THREADED_COMPRESS_BYTES:
+                    compressed = await asyncio.to_thread(gzip.compress, body, self.compress_level)
+                else:
+                    compressed = gzip.compress(body, self.compress_level)
+                held += len(compressed)
+                if buffer is not None:
+                    buffer.add(len(compressed))
+                response = await self._send(url, {**headers, "content-encoding": "gzip"}, compressed, trace)
+                if response.status != 415:
+                    return response
+                response.release()
+                self._plain_urls.add(url)
+            return await self._send(url, headers, body, trace)
+        finally:
+            # The encoded bodies are dropped once the request is sent
+            if buffer is not None:
+                buffer.release(held)
+
+    async def _send(self, url: str, headers: Dict[str, str], body: bytes, trace):
+        # Enter the request by hand so the connection is not released on
+        # return: the caller owns the response
+        return await self.session.post(url, headers=headers, data=body, trace_request_ctx=trace).__aenter__()
+
+class InProcessTransport(Transport):
+    """
+    Call a handler coroutine directly instead of opening a connection.
+
+    The handler receives a TransportRequest and returns a TransportResponse,
+    or a plain dict for a 200 JSON response.
+    """
+
+    def __init__(self, handler: Handler):
+        self.handler = handler
+
+    async def post(self, url: str, headers: Dict[str, str], payload: Dict[str, Any], trace=None, buffer=None):
+        if trace is None:
+            result = await self.handler(TransportRequest("POST", url, headers, payload))
+        else:
+            with trace.span("server"):
+                result = await self.handler(TransportRequest("POST", url, headers, payload))
+        if isinstance(result, TransportResponse):
+            return result
+        return TransportResponse(body=result)
+
+@dataclass
+class _Interaction:
+    request: Dict[str, Any]
+    status: int
+    headers: Dict[str, str] = field(default_factory=dict)
+    body: Any = None
+    lines: Optional[List[str]] = None
+
+    def response(self) -> TransportResponse:
+        if self.lines is not None:
+            return TransportResponse(self.status, lines=[line.encode() for line in self.lines], headers=self.headers)
+        # Serialized per replay so callers mutating a response cannot alter later ones
+        return TransportResponse(self.status, body=json.dumps(self.body).encode(), headers=self.headers)
+
+class CassetteTransport(Transport):
+    """
+    Record interactions to a cassette file and replay them.
+
+    Modes:
+        ``replay``: serve only recorded responses; unknown requests raise
+            CassetteMissError
+        ``record``: send everything through ``inner`` and save it
+        ``auto``: replay when recorded, otherwise record
+
+    Requests are matched on method, URL and payload; request headers are never
+    written, so API keys stay out of cassettes. Identical requests replay
+    their recorded responses in order, repeating the last one.
+    """
+
+    MODES = ("replay", "record", "auto")
+
+    def __init__(self, path: Union[str, Path], mode: str = "replay", inner: Optional[Transport] = None):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown cassette mode: {mode}")
+        self.path = Path(path)
+        self.mode = mode
+        self.inner = inner if inner is not None or mode == "replay" else HTTPTransport()
+        self._recorded: Dict[str, Deque[_Interaction]] = {}
+        self._interactions: List[_Interaction] = []
+        self._dirty = False
+
+    @staticmethod
+    def _key(method: str, url: str, payload: Dict[str, Any]) -> str:
+        return f"{method} {url} {json.dumps(payload, sort_keys=True)}"
+
+    def _load(self):
+        self._recorded.clear()
+        self._interactions = []
+        if not self.path.exists():
+            return
+        with open(self.path) as f:
+            for data in json.load(f)["interactions"]:
+                interaction = _Interaction(**data)
+                request = interaction.request
+                key = self._key(request["method"], request["url"], request["payload"])
+                self._recorded.setdefault(key, deque()).append(interaction)
+                self._interactions.append(interaction)
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump({"interactions": [vars(i) for i in self._interactions]}, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    async def open(self):
+        self._load()
+        if self.inner is not None:
+            await self.inner.open()
+        await super().open()
+
+    async def close(self):
+        if self.inner is not None:
+            await self.inner.close()
+        if self._dirty:
+            self._save()
+            self._dirty = False
+        await super().close()
+
+    async def post(self, url: str, headers: Dict[str, str], payload: Dict[str, Any], trace=None, buffer=None):
+        key = self._key("POST", url, payload)
+        queue = self._recorded.get(key)
+        if self.mode != "record" and queue:
+            interaction = queue.popleft() if len(queue) > 1 else queue[0]
+            return interaction.response()
+        if self.mode == "replay":
+            raise CassetteMissError(f"No recorded response for POST {url}")
+
+        response = await self.inner.post(url, headers, payload, trace, buffer)
+        async with response:
+            interaction = _Interaction(
+                request={"method": "POST", "url": url, "payload": payload},
+                status=response.status,
+                headers={k.lower(): v for k, v in response.headers.items() if k.lower() in ("content-type", "retry-after")},
+            )
+            if "text/event-stream" in interaction.headers.get("content-type", ""):
+                interaction.lines = [line.decode() async for line in response.content]
+            else:
+                raw = await response.read()
+                try:
+                    interaction.body = json.loads(raw)
+                except ValueError:
+                    interaction.lines = [raw.decode()]
+        self._interactions.append(interaction)
+        self._dirty = True
+        return interaction.response()
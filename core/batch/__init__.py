@@ -0,0 +1,9 @@
+from .runner import BatchRunner, BatchItem, BatchStats
+from .packing import PromptPacker
+
+__all__ = [
+    'BatchRunner',
+    'BatchItem',
+    'BatchStats',
+    'PromptPacker'
+]
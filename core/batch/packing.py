@@ -0,0 +1,108 @@
+# core/batch/packing.py
+"""
+Prompt packing for batch jobs made of many tiny prompts.
+
+Items that share a model, parameters and every message but the last (the
+instructions), as sent to the provider once ``system`` and ``stop`` are
+translated, and whose last message is a short user prompt, are combined
+into one request asking for a JSON object keyed by input number. The answers
+are split back out per item; an item missing from the reply is sent again
+on its own.
+"""
+import json
+import re
+from typing import Optional, Dict, List
+
+from ..api.client import provider_params
+from .runner import BatchItem
+
+PACK_INSTRUCTIONS = (
+    "Apply the instructions above to each of the {count} inputs below independently. "
+    "Reply with only a JSON object mapping each input's id to your answer for it, "
+    'for example {{"1": "...", "2": "..."}}.'
+)
+
+_FENCE = re.compile(r"^```(?:json)?\s*|\s*```$")
+
+def split_tokens(total: int, weights: List[int]) -> List[int]:
+    """Apportion a token count by weight so the parts add up to the total."""
+    weight_sum = sum(weights)
+    if weight_sum <= 0:
+        weights, weight_sum = [1] * len(weights), len(weights)
+    parts = [total * w // weight_sum for w in weights]
+    parts[0] += total - sum(parts)
+    return parts
+
+class PromptPacker:
+    """
+    Group small compatible batch items into packed requests.
+
+    Args:
+        max_items: Items per packed request
+        max_item_tokens: Largest prompt, in estimated tokens (chars / 4),
+            that is packed; larger items are sent on their own
+        item_max_tokens: Output tokens budgeted per item when the item does
+            not set max_tokens
+    """
+
+    def __init__(self, max_items: int = 10, max_item_tokens: int = 500, item_max_tokens: int = 256):
+        if max_items < 2:
+            raise ValueError("max_items must be at least 2")
+        self.max_items = max_items
+        self.max_item_tokens = max_item_tokens
+        self.item_max_tokens = item_max_tokens
+
+    def key(self, item: BatchItem) -> Optional[str]:
+        """Compatibility key of a packable item, or None if it must be sent alone."""
+        if not item.messages:
+            return None
+        last = item.messages[-1]
+        content = last.get("content")
+        if last.get("role") != "user" or not isinstance(content, str):
+            return None
+        if len(content) // 4 > self.max_item_tokens:
+            return None
+        messages, params = provider_params(item.model_type, item.messages, item.params)
+        params.pop("max_tokens", None)
+        return json.dumps([item.model_type.value, params, messages[:-1]], sort_keys=True)
+
+    def pack(self, items: List[BatchItem]) -> BatchItem:
+        """Build the single request answering all items."""
+        first = items[0]
+        inputs = "\n\n".join(
+            f'<input id="{i}">\n{item.messages[-1]["content"]}\n</input>'
+            for i, item in enumerate(items, start=1)
+        )
+        prompt = PACK_INSTRUCTIONS.format(count=len(items)) + "\n\n" + inputs
+        params = dict(first.params)
+        params["max_tokens"] = sum(item.params.get("max_tokens") or self.item_max_tokens for item in items)
+        return BatchItem(
+            id=f"pack:{first.id}..{items[-1].id}",
+            model_type=first.model_type,
+            messages=[*first.messages[:-1], {"role": "user", "content": prompt}],
+            params=params,
+        )
+
+    @staticmethod
+    def unpack(text: str, count: int) -> Dict[int, str]:
+        """
+        Answers by 0-based item position from a packed reply; items the reply
+        leaves out or that cannot be parsed are absent.
+        """
+        text = _FENCE.sub("", text.strip())
+        start, end = text.find("{"), text.rfind("}")
+        if start < 0 or end < start:
+            return {}
+        try:
+            data = json.loads(text[start:end + 1])
+        except ValueError:
+            return {}
+        if not isinstance(data, dict):
+            return {}
+        answers = {}
+        for i in range(count):
+            value = data.get(str(i + 1))
+            if value is None:
+                continue
+            answers[i] = value if isinstance(value, str) else json.dumps(value)
+        return answers
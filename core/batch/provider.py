@@ -0,0 +1,407 @@
+# core/batch/provider.py
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass, field, asdict
+from typing import Optional, Dict, Any, List, AsyncIterator, Callable, Iterable
+
+import aiohttp
+
+from ..models.config import ModelType, get_provider
+from ..api.client import LLMClient, APIError, provider_params
+from ..security.keys import PooledKey
+from .runner import BatchItem
+
+# Statuses after which a job produces no further results
+FINISHED_STATUSES = {
+    "anthropic": {"ended"},
+    "openai": {"completed", "failed", "expired", "cancelled"},
+}
+
+@dataclass
+class ProviderBatchJob:
+    """A batch submitted to a provider; serializable so a restarted run can reattach."""
+    id: str
+    provider: str
+    model: str
+    item_ids: List[str]
+    status: str = "submitted"
+    submitted_at: float = field(default_factory=time.time)
+    results_url: Optional[str] = None
+    output_file_id: Optional[str] = None
+    error_file_id: Optional[str] = None
+    # The pooled key (PooledKey.label) that owns the job and its files
+    key_label: Optional[str] = None
+
+    @property
+    def model_type(self) -> ModelType:
+        return ModelType(self.model)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATUSES[self.provider]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ProviderBatchJob":
+        return cls(**data)
+
+@dataclass
+class BatchResult:
+    id: str
+    response: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    via_batch: bool = True
+
+class ProviderBatchClient:
+    """
+    Send requests through the providers' asynchronous batch endpoints.
+
+    Items are grouped by model and packed into batch submissions (Anthropic
+    Message Batches, OpenAI Batch API with an uploaded JSONL file). All
+    outstanding jobs are polled together with exponential backoff. Results are
+    yielded per item as each job ends. When the straggler timeout passes,
+    unfinished jobs are cancelled and, once the provider has stopped them,
+    their partial results collected; only items without a result (errored,
+    expired, cancelled, or in a job that did not stop within
+    ``cancel_timeout``) are sent through the regular synchronous endpoint.
+
+    Each job stays on one API key from upload to cancel: providers only
+    show a batch and its files to the project that created them, so the key
+    is taken from the client's pool at submission, recorded on the job for
+    reattaching, and held until the job's results are collected.
+
+    Endpoints are derived from the LLMClient base URLs, so pointing the client
+    at a local server exercises the whole lifecycle.
+    """
+
+    def __init__(
+        self,
+        client: LLMClient,
+        poll_interval: float = 5.0,
+        max_poll_interval: float = 60.0,
+        max_batch_size: int = 10000,
+        fallback_concurrency: int = 8,
+        cancel_timeout: float = 60.0,
+    ):
+        self.client = client
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.max_batch_size = max_batch_size
+        self.fallback_concurrency = fallback_concurrency
+        # Seconds to wait for cancelled jobs to stop before resending all
+        # their items
+        self.cancel_timeout = cancel_timeout
+        # Keys held by jobs this client is working on, by job id
+        self._job_keys: Dict[str, PooledKey] = {}
+        self.logger = logging.getLogger(__name__)
+
+    @property
+    def _session(self) -> aiohttp.ClientSession:
+        if not self.client._session:
+            raise RuntimeError("Client not initialized. Use 'async with' context manager.")
+        return self.client._session
+
+    def _anthropic_batches_url(self) -> str:
+        return self.client.anthropic_base_url.rstrip("/") + "/batches"
+
+    def _openai_root(self) -> str:
+        return self.client.openai_base_url.rstrip("/").removesuffix("/chat/completions")
+
+    def _request_body(self, item: BatchItem) -> Dict[str, Any]:
+        messages, params = provider_params(item.model_type, item.messages, item.params)
+        body = self.client._build_payload(item.model_type, messages, **params)
+        body.pop("stream", None)
+        return body
+
+    def _job_key(self, job: ProviderBatchJob) -> PooledKey:
+        """The key a job runs under, taken from the pool on first use."""
+        entry = self._job_keys.get(job.id)
+        if entry is None:
+            pool = self.client._key_pool(job.model_type)
+            try:
+                entry = pool.acquire(job.key_label)
+            except KeyError:
+                self.logger.warning(
+                    "Key %s of batch %s is no longer configured; the provider may reject it", job.key_label, job.id
+                )
+                entry = pool.acquire()
+            self._job_keys[job.id] = entry
+            job.key_label = entry.label
+        return entry
+
+    def release(self, job: ProviderBatchJob):
+        """Return a job's key to the pool once nothing more is sent for the job."""
+        entry = self._job_keys.pop(job.id, None)
+        if entry is not None:
+            self.client._key_pool(job.model_type).release(entry)
+
+    async def _request(self, method: str, url: str, key: PooledKey, **kwargs) -> aiohttp.ClientResponse:
+        headers = key.headers
+        if "data" in kwargs:
+            # Let aiohttp set the multipart content type
+            headers = {k: v for k, v in headers.items() if k.lower() != "content-type"}
+        response = await self._session.request(method, url, headers=headers, **kwargs)
+        try:
+            await self.client._raise_for_status(response)
+        except BaseException:
+            response.release()
+            raise
+        return response
+
+    async def _json(self, method: str, url: str, key: PooledKey, **kwargs) -> Dict[str, Any]:
+        response = await self._request(method, url, key, **kwargs)
+        async with response:
+            return await response.json()
+
+    async def _jsonl(self, url: str, key: PooledKey) -> List[Dict[str, Any]]:
+        response = await self._request("GET", url, key)
+        async with response:
+            return [json.loads(line) async for line in response.content if line.strip()]
+
+    async def submit(self, model_type: ModelType, items: List[BatchItem]) -> ProviderBatchJob:
+        """
+        Submit one batch; custom ids are positions so any item id is accepted.
+        The job holds its key until ``release``, which ``run`` calls when the
+        job is done.
+        """
+        provider = get_provider(model_type)
+        item_ids = [item.id for item in items]
+        pool = self.client._key_pool(model_type)
+        key = pool.acquire()
+        try:
+            job = await self._submit(model_type, provider, items, item_ids, key)
+        except BaseException:
+            pool.release(key)
+            raise
+        job.key_label = key.label
+        self._job_keys[job.id] = key
+        self.logger.info("Submitted %s batch %s with %d requests", provider, job.id, len(items))
+        return job
+
+    async def _submit(
+        self,
+        model_type: ModelType,
+        provider: str,
+        items: List[BatchItem],
+        item_ids: List[str],
+        key: PooledKey,
+    ) -> ProviderBatchJob:
+        if provider == "anthropic":
+            requests = [
+                {"custom_id": f"req-{i}", "params": self._request_body(item)}
+                for i, item in enumerate(items)
+            ]
+            data = await self._json("POST", self._anthropic_batches_url(), key, json={"requests": requests})
+            return ProviderBatchJob(data["id"], provider, model_type.value, item_ids,
+                                    status=data.get("processing_status", "in_progress"))
+
+        lines = "".join(
+            json.dumps({
+                "custom_id": f"req-{i}",
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": self._request_body(item),
+            }) + "\n"
+            for i, item in enumerate(items)
+        )
+        form = aiohttp.FormData()
+        form.add_field("purpose", "batch")
+        form.add_field("file", lines.encode(), filename="batch.jsonl", content_type="application/jsonl")
+        uploaded = await self._json("POST", f"{self._openai_root()}/files", key, data=form)
+        data = await self._json("POST", f"{self._openai_root()}/batches", key, json={
+            "input_file_id": uploaded["id"],
+            "endpoint": "/v1/chat/completions",
+            "completion_window": "24h",
+        })
+        return ProviderBatchJob(data["id"], provider, model_type.value, item_ids,
+                                status=data.get("status", "validating"))
+
+    async def refresh(self, job: ProviderBatchJob) -> ProviderBatchJob:
+        """Update a job's status from the provider."""
+        key = self._job_key(job)
+        if job.provider == "anthropic":
+            data = await self._json("GET", f"{self._anthropic_batches_url()}/{job.id}", key)
+            job.status = data.get("processing_status", job.status)
+            job.results_url = data.get("results_url") or job.results_url
+        else:
+            data = await self._json("GET", f"{self._openai_root()}/batches/{job.id}", key)
+            job.status = data.get("status", job.status)
+            job.output_file_id = data.get("output_file_id") or job.output_file_id
+            job.error_file_id = data.get("error_file_id") or job.error_file_id
+        return job
+
+    async def cancel(self, job: ProviderBatchJob):
+        """Ask the provider to stop a job; failures are logged, not raised."""
+        if job.provider == "anthropic":
+            url = f"{self._anthropic_batches_url()}/{job.id}/cancel"
+        else:
+            url = f"{self._openai_root()}/batches/{job.id}/cancel"
+        try:
+            await self._json("POST", url, self._job_key(job))
+        except (APIError, aiohttp.ClientError) as e:
+            self.logger.warning("Failed to cancel batch %s: %s", job.id, e)
+
+    async def fetch_results(self, job: ProviderBatchJob) -> Dict[str, BatchResult]:
+        """Download a finished job's results keyed by item id."""
+        results: Dict[str, BatchResult] = {}
+
+        def item_id(custom_id: str) -> Optional[str]:
+            try:
+                return job.item_ids[int(custom_id.removeprefix("req-"))]
+            except (ValueError, IndexError):
+                return None
+
+        if job.provider == "anthropic":
+            if not job.results_url:
+                return results
+            for line in await self._jsonl(job.results_url, self._job_key(job)):
+                key = item_id(line.get("custom_id", ""))
+                if key is None:
+                    continue
+                result = line.get("result", {})
+                if result.get("type") == "succeeded":
+                    results[key] = BatchResult(key, response=result["message"])
+                else:
+                    results[key] = BatchResult(key, error=json.dumps(result.get("error") or result.get("type")))
+            return results
+
+        for file_id in (job.output_file_id, job.error_file_id):
+            if not file_id:
+                continue
+            for line in await self._jsonl(f"{self._openai_root()}/files/{file_id}/content", self._job_key(job)):
+                key = item_id(line.get("custom_id", ""))
+                if key is None:
+                    continue
+                response = line.get("response") or {}
+                if response.get("status_code") == 200 and not line.get("error"):
+                    results[key] = BatchResult(key, response=response["body"])
+                else:
+                    results[key] = BatchResult(key, error=json.dumps(line.get("error") or response.get("body")))
+        return results
+
+    async def run(
+        self,
+        items: Iterable[BatchItem],
+        straggler_timeout: Optional[float] = None,
+        jobs: Optional[List[ProviderBatchJob]] = None,
+        on_submit: Optional[Callable[[ProviderBatchJob], None]] = None,
+    ) -> AsyncIterator[BatchResult]:
+        """
+        Submit items, wait for the jobs, and yield one result per item.
+
+        Args:
+            items: Items to process, including those of already submitted jobs
+            straggler_timeout: Seconds to wait for batches before cancelling
+                them and sending what is left synchronously
+            jobs: Previously submitted jobs to reattach to instead of resubmitting
+            on_submit: Called with each newly submitted job (e.g. to checkpoint it)
+        """
+        items_by_id = {item.id: item for item in items}
+        jobs = list(jobs or [])
+        attached = {item_id for job in jobs for item_id in job.item_ids}
+
+        groups: Dict[ModelType, List[BatchItem]] = {}
+        for item in items_by_id.values():
+            if item.id not in attached:
+                groups.setdefault(item.model_type, []).append(item)
+        try:
+            for model_type, group in groups.items():
+                for start in range(0, len(group), self.max_batch_size):
+                    job = await self.submit(model_type, group[start:start + self.max_batch_size])
+                    jobs.append(job)
+                    if on_submit:
+                        on_submit(job)
+
+            deadline = time.monotonic() + straggler_timeout if straggler_timeout is not None else None
+            interval = self.poll_interval
+            outstanding = list(jobs)
+            stragglers: List[str] = []
+
+            def collect(job: ProviderBatchJob, results: Dict[str, BatchResult]) -> List[BatchResult]:
+                """A job's successful results; the rest of its items become stragglers."""
+                succeeded = []
+                for item_id in job.item_ids:
+                    result = results.get(item_id)
+                    if result is not None and result.error is None:
+                        succeeded.append(result)
+                    elif item_id in items_by_id:
+                        stragglers.append(item_id)
+                return succeeded
+
+            while outstanding:
+                await asyncio.gather(*(self.refresh(job) for job in outstanding if not job.finished))
+                for job in [job for job in outstanding if job.finished]:
+                    outstanding.remove(job)
+                    results = await self.fetch_results(job)
+                    self.release(job)
+                    for result in collect(job, results):
+                        yield result
+                if not outstanding:
+                    break
+
+                if deadline is not None and time.monotonic() >= deadline:
+                    for job in outstanding:
+                        self.logger.info("Batch %s still %s at deadline; cancelling", job.id, job.status)
+                        await self.cancel(job)
+                    # Items the provider finished before the cancel are already
+                    # paid for at the batch price; collect them before resending
+                    await self._settle(outstanding)
+                    for job in outstanding:
+                        if not job.finished:
+                            self.logger.warning("Batch %s did not stop after cancelling; resending all of it", job.id)
+                        results = await self.fetch_results(job) if job.finished else {}
+                        self.release(job)
+                        for result in collect(job, results):
+                            yield result
+                    break
+
+                sleep = interval if deadline is None else min(interval, max(0.0, deadline - time.monotonic()))
+                await asyncio.sleep(sleep)
+                interval = min(interval * 1.5, self.max_poll_interval)
+        finally:
+            # Jobs left unfinished (an error, or the caller stopped early) keep
+            # running at the provider; reattaching takes their key again
+            for job in jobs:
+                self.release(job)
+
+        async for result in self._fallback([items_by_id[i] for i in stragglers]):
+            yield result
+
+    async def _settle(self, jobs: List[ProviderBatchJob]):
+        """Poll cancelled jobs until they end or ``cancel_timeout`` passes."""
+        until = time.monotonic() + self.cancel_timeout
+        interval = self.poll_interval
+        while True:
+            await asyncio.gather(*(self.refresh(job) for job in jobs if not job.finished))
+            left = until - time.monotonic()
+            if all(job.finished for job in jobs) or left <= 0:
+                return
+            await asyncio.sleep(min(interval, left))
+            interval = min(interval * 1.5, self.max_poll_interval)
+
+    async def _fallback(self, items: List[BatchItem]) -> AsyncIterator[BatchResult]:
+        """Send items through the synchronous endpoint with bounded concurrency."""
+        if not items:
+            return
+        limit = asyncio.Semaphore(self.fallback_concurrency)
+
+        async def send(item: BatchItem) -> BatchResult:
+            messages, params = provider_params(item.model_type, item.messages, item.params)
+            async with limit:
+                try:
+                    response = await self.client.generate(
+                        model_type=item.model_type,
+                        messages=messages,
+                        **params
+                    )
+                    return BatchResult(item.id, response=response, via_batch=False)
+                except Exception as e:
+                    # One item's timeout or network error must not end the others
+                    return BatchResult(item.id, error=str(e) or type(e).__name__, via_batch=False)
+
+        for future in asyncio.as_completed([send(item) for item in items]):
+            yield await future
@@ -0,0 +1,460 @@
+# core/batch/runner.py
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Iterator, Callable, Set, Tuple, Union, TYPE_CHECKING
+
+from ..models.config import ModelType, get_provider
+from ..models.manager import ModelManager
+from ..api.client import LLMClient, APIError, RateLimitError, NetworkError, DeadlineExceededError, provider_params
+from ..api.deadline import resolve, remaining, within
+from ..api.response import LLMResponse
+
+if TYPE_CHECKING:
+    from .packing import PromptPacker
+    from .provider import ProviderBatchClient
+
+# Request fields copied from an input line into LLMClient.generate, in
+# either provider's form; provider_params fits them to the item's model
+GENERATE_PARAMS = ("max_tokens", "temperature", "top_p", "system", "stop_sequences", "stop")
+# Per-provider ceiling when concurrency is left to the client's adaptive limiter
+ADAPTIVE_CONCURRENCY = 256
+
+@dataclass
+class BatchItem:
+    id: str
+    model_type: ModelType
+    messages: List[Dict[str, Any]]
+    params: Dict[str, Any] = field(default_factory=dict)
+
+@dataclass
+class BatchStats:
+    total: int = 0
+    skipped: int = 0
+    completed: int = 0
+    failed: int = 0
+    cost: float = 0.0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_read_tokens: int = 0
+    cache_write_tokens: int = 0
+    cache_savings: float = 0.0
+    packed_requests: int = 0    # packed requests answered
+    packed_items: int = 0       # items answered by them
+    unpacked: int = 0           # items a packed reply missed, resent on their own
+    started_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def done(self) -> int:
+        return self.completed + self.failed
+
+    @property
+    def remaining(self) -> int:
+        return max(0, self.total - self.skipped - self.done)
+
+    @property
+    def throughput(self) -> float:
+        """Items finished per second in this run."""
+        elapsed = time.monotonic() - self.started_at
+        return self.done / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def eta(self) -> Optional[float]:
+        """Seconds until the remaining items finish at the current rate."""
+        rate = self.throughput
+        return self.remaining / rate if rate > 0 else None
+
+def parse_item(line: str, line_number: int, default_model: Optional[ModelType] = None) -> BatchItem:
+    """
+    Parse one input line.
+
+    Each line is a JSON object with ``messages`` (or a ``prompt`` string) and
+    optionally ``id``, ``model`` and generation parameters. Lines without an
+    id are identified by their line number.
+    """
+    data = json.loads(line)
+    if "messages" in data:
+        messages = data["messages"]
+    elif "prompt" in data:
+        messages = [{"role": "user", "content": data["prompt"]}]
+    else:
+        raise ValueError(f"Line {line_number}: expected 'messages' or 'prompt'")
+
+    model = data.get("model")
+    if model is not None:
+        model_type = ModelType(model)
+    elif default_model is not None:
+        model_type = default_model
+    else:
+        raise ValueError(f"Line {line_number}: no 'model' and no default model")
+
+    params = {k: data[k] for k in GENERATE_PARAMS if k in data}
+    return BatchItem(
+        id=str(data.get("id", line_number)),
+        model_type=model_type,
+        messages=messages,
+        params=params,
+    )
+
+def iter_lines(path: Path) -> Iterator[Tuple[int, str]]:
+    """Lazily read (line_number, line) pairs from a JSONL file, skipping blank lines."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if line.strip():
+                yield line_number, line
+
+def count_lines(path: Path) -> int:
+    """Count non-empty lines without parsing them."""
+    count = 0
+    with open(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                count += 1
+    return count
+
+def load_checkpoint(output_path: Path, stats: BatchStats) -> Set[str]:
+    """
+    Read the ids already written to the output file.
+
+    The output file is the checkpoint: a result line is appended and flushed
+    as soon as an item succeeds. A line cut short by a crash is truncated
+    away so new results are appended cleanly.
+    """
+    done: Set[str] = set()
+    if not output_path.exists():
+        return done
+
+    valid_bytes = 0
+    with open(output_path, "rb") as f:
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                break
+            try:
+                record = json.loads(raw)
+            except json.JSONDecodeError:
+                break
+            valid_bytes += len(raw)
+            if not isinstance(record, dict) or "id" not in record:
+                # Complete but not a result line; keep it, but it marks nothing done
+                continue
+            done.add(str(record["id"]))
+            usage = record.get("usage") or {}
+            stats.input_tokens += usage.get("input_tokens", 0)
+            stats.output_tokens += usage.get("output_tokens", 0)
+            stats.cost += record.get("cost", 0.0)
+
+    if valid_bytes < output_path.stat().st_size:
+        with open(output_path, "r+b") as f:
+            f.truncate(valid_bytes)
+    return done
+
+def is_transient(error: BaseException) -> bool:
+    """Whether a failed request may succeed if sent again."""
+    if isinstance(error, DeadlineExceededError):
+        return False
+    if isinstance(error, (RateLimitError, NetworkError, asyncio.TimeoutError)):
+        return True
+    return isinstance(error, APIError) and error.status is not None and error.status >= 500
+
+class BatchRunner:
+    """
+    Run a JSONL file of requests through LLMClient with bounded concurrency per provider.
+
+    Results are appended to the output file as they complete, so an
+    interrupted job can be rerun with the same arguments and only the
+    unfinished items are sent. Failed items go to ``<output>.errors.jsonl``
+    and are retried on the next run.
+
+    With a ProviderBatchClient the items are sent through the providers'
+    discounted batch endpoints instead; submitted job ids are checkpointed in
+    ``<output>.jobs.json`` so a restarted run reattaches to them.
+
+    With a PromptPacker, small compatible items are combined into packed
+    requests when sending synchronously.
+
+    With ``concurrency=None`` the runner sets no cap of its own and the
+    client's adaptive per-key limiter decides how many requests are in flight.
+    """
+
+    def __init__(
+        self,
+        client: LLMClient,
+        manager: Optional[ModelManager] = None,
+        concurrency: Union[int, Dict[str, int], None] = 8,
+        max_retries: int = 3,
+        retry_backoff: float = 1.0,
+        default_model: Optional[ModelType] = None,
+        on_progress: Optional[Callable[[BatchStats], None]] = None,
+        provider_batch: Optional["ProviderBatchClient"] = None,
+        straggler_timeout: Optional[float] = None,
+        packer: Optional["PromptPacker"] = None,
+    ):
+        self.client = client
+        self.manager = manager or ModelManager()
+        if concurrency is None:
+            concurrency = ADAPTIVE_CONCURRENCY
+        if isinstance(concurrency, int):
+            concurrency = {"anthropic": concurrency, "openai": concurrency}
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.default_model = default_model
+        self.on_progress = on_progress
+        self.provider_batch = provider_batch
+        self.straggler_timeout = straggler_timeout
+        self.packer = packer
+        self.logger = logging.getLogger(__name__)
+        self._limits = {provider: asyncio.Semaphore(n) for provider, n in concurrency.items()}
+
+    async def run(self, input_path: Path, output_path: Path) -> BatchStats:
+        """Process every item in input_path not already present in output_path."""
+        input_path, output_path = Path(input_path), Path(output_path)
+        errors_path = output_path.with_name(output_path.name + ".errors.jsonl")
+        stats = BatchStats(total=count_lines(input_path))
+        done = load_checkpoint(output_path, stats)
+        if errors_path.exists():
+            errors_path.unlink()
+
+        with open(output_path, "a", encoding="utf-8") as out, open(errors_path, "a", encoding="utf-8") as err:
+            if self.provider_batch is not None:
+                await self._run_provider_batch(input_path, output_path, done, out, err, stats)
+            else:
+                await self._run_sync(input_path, done, out, err, stats)
+        return self._finish(errors_path, stats)
+
+    async def _run_sync(self, input_path: Path, done: Set[str], out, err, stats: BatchStats):
+        # Bound read-ahead so input is consumed lazily
+        window = asyncio.Semaphore(2 * sum(self.concurrency.values()))
+        pending: Set[asyncio.Task] = set()
+        # Packable items waiting for their group to fill, by compatibility key
+        groups: Dict[str, List[BatchItem]] = {}
+
+        async def dispatch(work):
+            await window.acquire()
+            task = asyncio.create_task(work)
+            pending.add(task)
+            task.add_done_callback(lambda t: (pending.discard(t), window.release()))
+
+        try:
+            for line_number, line in iter_lines(input_path):
+                try:
+                    item = parse_item(line, line_number, self.default_model)
+                except (ValueError, KeyError, TypeError) as e:
+                    self._record_error(err, str(line_number), None, e, stats)
+                    continue
+                if item.id in done:
+                    stats.skipped += 1
+                    continue
+                key = self.packer.key(item) if self.packer is not None else None
+                if key is None:
+                    await dispatch(self._process(item, out, err, stats))
+                    continue
+                group = groups.setdefault(key, [])
+                group.append(item)
+                if len(group) >= self.packer.max_items:
+                    del groups[key]
+                    await dispatch(self._process_packed(group, out, err, stats))
+            for group in groups.values():
+                if len(group) > 1:
+                    await dispatch(self._process_packed(group, out, err, stats))
+                else:
+                    await dispatch(self._process(group[0], out, err, stats))
+            if pending:
+                await asyncio.gather(*pending)
+        finally:
+            leftover = list(pending)
+            for task in leftover:
+                task.cancel()
+            if leftover:
+                await asyncio.gather(*leftover, return_exceptions=True)
+
+    def _finish(self, errors_path: Path, stats: BatchStats) -> BatchStats:
+        if errors_path.exists() and errors_path.stat().st_size == 0:
+            errors_path.unlink()
+        return stats
+
+    async def _run_provider_batch(self, input_path: Path, output_path: Path, done: Set[str], out, err, stats: BatchStats):
+        from .provider import ProviderBatchJob
+
+        jobs_path = output_path.with_name(output_path.name + ".jobs.json")
+        jobs: List[ProviderBatchJob] = []
+        if jobs_path.exists():
+            jobs = [ProviderBatchJob.from_dict(data) for data in json.loads(jobs_path.read_text())]
+
+        items: List[BatchItem] = []
+        for line_number, line in iter_lines(input_path):
+            try:
+                item = parse_item(line, line_number, self.default_model)
+            except (ValueError, KeyError, TypeError) as e:
+                self._record_error(err, str(line_number), None, e, stats)
+                continue
+            if item.id in done:
+                stats.skipped += 1
+            else:
+                items.append(item)
+        by_id = {item.id: item for item in items}
+
+        def save_job(job: ProviderBatchJob):
+            jobs.append(job)
+            tmp_path = jobs_path.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps([j.to_dict() for j in jobs]))
+            tmp_path.replace(jobs_path)
+
+        pending_jobs = [job for job in jobs if any(i in by_id for i in job.item_ids)]
+        async for result in self.provider_batch.run(
+            items,
+            straggler_timeout=self.straggler_timeout,
+            jobs=pending_jobs,
+            on_submit=save_job,
+        ):
+            item = by_id[result.id]
+            if result.error is not None:
+                self._record_error(err, item.id, item.model_type, APIError(result.error), stats)
+            else:
+                self._write_result(item, result.response, out, stats, batch=result.via_batch)
+
+        if jobs_path.exists():
+            jobs_path.unlink()
+
+    async def _process(self, item: BatchItem, out, err, stats: BatchStats):
+        try:
+            response = await self._send(item)
+        except Exception as e:
+            self._record_error(err, item.id, item.model_type, e, stats)
+        else:
+            self._write_result(item, response, out, stats)
+
+    async def _process_packed(self, items: List[BatchItem], out, err, stats: BatchStats):
+        """Send items as one packed request, then resend any the reply missed on their own."""
+        packed = self.packer.pack(items)
+        answers: Dict[int, str] = {}
+        try:
+            response = await self._send(packed)
+        except Exception as e:
+            self.logger.debug("Packed request %s failed, sending items alone: %s", packed.id, e)
+        else:
+            stats.packed_requests += 1
+            answers = self.packer.unpack(self.client.extract_response(packed.model_type, response), len(items))
+            if answers:
+                self._write_packed(packed, items, answers, response, out, stats)
+
+        missed = [item for i, item in enumerate(items) if i not in answers]
+        stats.unpacked += len(missed)
+        if missed:
+            await asyncio.gather(*(self._process(item, out, err, stats) for item in missed))
+
+    def _write_packed(self, packed: BatchItem, items: List[BatchItem], answers: Dict[int, str], response, out, stats: BatchStats):
+        """Write one result per answered item, splitting the packed request's usage among them."""
+        from .packing import split_tokens
+
+        answered = sorted(answers)
+        input_weights = [len(items[i].messages[-1]["content"]) for i in answered]
+        output_weights = [len(answers[i]) for i in answered]
+        input_tokens, output_tokens = self.client.extract_usage(packed.model_type, response)
+        cache_read, cache_write = self.client.extract_cache_usage(packed.model_type, response)
+        stats.packed_items += len(answered)
+        for i, usage in zip(answered, zip(
+            split_tokens(input_tokens, input_weights),
+            split_tokens(output_tokens, output_weights),
+            split_tokens(cache_read, input_weights),
+            split_tokens(cache_write, input_weights),
+        )):
+            self._write_record(items[i], answers[i], *usage, out, stats, via="packed", extra={"pack": packed.id})
+
+    def _write_result(self, item: BatchItem, response: Dict[str, Any], out, stats: BatchStats, batch: bool = False):
+        input_tokens, output_tokens = self.client.extract_usage(item.model_type, response)
+        cache_read, cache_write = self.client.extract_cache_usage(item.model_type, response)
+        self._write_record(
+            item, self.client.extract_response(item.model_type, response),
+            input_tokens, output_tokens, cache_read, cache_write, out, stats,
+            via="batch" if batch else "sync",
+            extra={"response": response.to_dict() if isinstance(response, LLMResponse) else response},
+        )
+
+    def _write_record(
+        self,
+        item: BatchItem,
+        text: str,
+        input_tokens: int,
+        output_tokens: int,
+        cache_read: int,
+        cache_write: int,
+        out,
+        stats: BatchStats,
+        via: str,
+        extra: Dict[str, Any],
+    ):
+        cost = self.manager.calculate_cost(
+            item.model_type, input_tokens, output_tokens, batch=via == "batch",
+            cache_read_tokens=cache_read, cache_write_tokens=cache_write,
+        )
+        self.manager.log_usage(item.model_type, input_tokens, output_tokens, cache_read, cache_write)
+        usage = {"input_tokens": input_tokens, "output_tokens": output_tokens}
+        if cache_read or cache_write:
+            usage.update(cache_read_tokens=cache_read, cache_write_tokens=cache_write)
+        record = {
+            "id": item.id,
+            "model": item.model_type.value,
+            "text": text,
+            "usage": usage,
+            "cost": cost,
+            "via": via,
+            **extra,
+        }
+        out.write(json.dumps(record) + "\n")
+        out.flush()
+        stats.completed += 1
+        stats.cost += cost
+        stats.input_tokens += input_tokens
+        stats.output_tokens += output_tokens
+        stats.cache_read_tokens += cache_read
+        stats.cache_write_tokens += cache_write
+        stats.cache_savings += self.manager.cache_savings(item.model_type, cache_read, cache_write)
+        if self.on_progress:
+            self.on_progress(stats)
+
+    def _record_error(self, err, item_id: str, model_type: Optional[ModelType], error: Exception, stats: BatchStats):
+        stats.failed += 1
+        record = {"id": item_id, "model": model_type.value if model_type else None, "error": str(error)}
+        err.write(json.dumps(record) + "\n")
+        err.flush()
+        self.logger.warning("Batch item %s failed: %s", item_id, error)
+        if self.on_progress:
+            self.on_progress(stats)
+
+    async def _send(self, item: BatchItem) -> Dict[str, Any]:
+        """
+        Send one item, retrying rate limits, 5xx responses, timeouts and
+        network errors with backoff; other errors fail the item at once. A
+        ``deadline`` or ``timeout`` in the item's params covers all attempts
+        and the waits between them.
+        """
+        limit = self._limits[get_provider(item.model_type)]
+        messages, params = provider_params(item.model_type, item.messages, item.params)
+        deadline = resolve(params.pop("deadline", None), params.pop("timeout", None))
+        if deadline is not None:
+            params["deadline"] = deadline
+        attempt = 0
+        while True:
+            async with within(deadline, lambda: DeadlineExceededError(f"Deadline exceeded for item {item.id}")):
+                async with limit:
+                    try:
+                        return await self.client.generate(
+                            model_type=item.model_type,
+                            messages=messages,
+                            **params
+                        )
+                    except (APIError, asyncio.TimeoutError) as e:
+                        if not is_transient(e) or attempt >= self.max_retries:
+                            raise
+                        error = e
+            attempt += 1
+            delay = self.retry_backoff * (2 ** (attempt - 1))
+            if deadline is not None and remaining(deadline) <= delay:
+                # Another attempt could not finish in time
+                raise error
+            self.logger.debug("Retrying %s in %.1fs after %s", item.id, delay, error)
+            await asyncio.sleep(delay)
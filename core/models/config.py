@@ -1,12 +1,47 @@
 # core/models/config.py
+import os
+import tomllib
 from dataclasses import dataclass
 from enum import Enum
-from typing import List
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
 
-class ModelType(Enum):
-    GPT4O = "gpt-4o"                        # GPT-4o
-    O1_PREVIEW = "o1-preview"               # o1-preview
-    CLAUDE = "claude-3-5-sonnet-20241022"   # Claude Sonnet (latest)
+# The bundled model catalog; see the file for its format
+CATALOG_FILE = Path(__file__).resolve().parents[2] / "config" / "models.toml"
+
+def catalog_files() -> List[Path]:
+    """The bundled catalog, then MODELS_FILE if set; later files override earlier ones."""
+    files = [CATALOG_FILE]
+    if os.environ.get("MODELS_FILE"):
+        files.append(Path(os.environ["MODELS_FILE"]))
+    return files
+
+def load_catalog(files: Sequence[Path]) -> Dict[str, Any]:
+    """Read catalog files and merge them, table by table, in order; a file's routing rules replace earlier ones."""
+    catalog: Dict[str, Any] = {"selection": {}, "models": {}, "routing": []}
+    for path in files:
+        with open(path, "rb") as f:
+            data = tomllib.load(f)
+        catalog["selection"].update(data.get("selection", {}))
+        for name, table in data.get("models", {}).items():
+            catalog["models"].setdefault(name, {}).update(table)
+        # Rules are ordered, so a file's rules replace the earlier ones whole
+        if "routing" in data:
+            catalog["routing"] = data["routing"]
+    return catalog
+
+# One member per catalog model, e.g. ModelType.GPT4O == ModelType("gpt-4o")
+ModelType = Enum(
+    "ModelType",
+    [(name, table["id"]) for name, table in load_catalog(catalog_files())["models"].items()],
+    module=__name__,
+    qualname="ModelType",
+)
+
+def get_provider(model_type: ModelType) -> str:
+    """Get the provider that serves a model type."""
+    from .registry import get_registry
+    return get_registry().get(model_type).provider
 
 @dataclass
 class ModelConfig:
@@ -16,4 +51,9 @@ class ModelConfig:
     max_tokens: int
     context_window: int
     capabilities: List[str]
-    typical_latency: float  # seconds
\ No newline at end of file
+    typical_latency: float  # seconds
+    batch_discount: float = 0.5  # price multiplier for provider batch endpoints
+    cache_read_multiplier: float = 0.1    # input price multiplier for prompt-cache reads
+    cache_write_multiplier: float = 1.25  # and for prompt-cache writes
+    provider: str = "openai"
+    endpoint: Optional[str] = None  # request URL; None uses the provider's
@@ -3,38 +3,19 @@ from typing import Dict, Optional
 import logging
 from datetime import datetime
 from .config import ModelType, ModelConfig
+from .registry import ModelRegistry, get_registry
 
 class ModelManager:
-    def __init__(self):
-        self._models: Dict[ModelType, ModelConfig] = {
-            ModelType.GPT4O: ModelConfig(
-                model_type=ModelType.GPT4O,
-                cost_per_1k_input_tokens=0.01,
-                cost_per_1k_output_tokens=0.03,
-                max_tokens=128000,
-                context_window=128000,
-                capabilities=["complex_reasoning", "code", "analysis"],
-                typical_latency=2.0
-            ),
-            ModelType.O1_PREVIEW: ModelConfig(
-                model_type=ModelType.O1_PREVIEW,
-                cost_per_1k_input_tokens=0.01,
-                cost_per_1k_output_tokens=0.03,
-                max_tokens=128000,
-                context_window=128000,
-                capabilities=["complex_reasoning", "code", "analysis"],
-                typical_latency=1.5
-            ),
-            ModelType.CLAUDE: ModelConfig(
-                model_type=ModelType.CLAUDE,
-                cost_per_1k_input_tokens=0.015,
-                cost_per_1k_output_tokens=0.075,
-                max_tokens=200000,
-                context_window=200000,
-                capabilities=["complex_reasoning", "code", "analysis"],
-                typical_latency=3.0
-            )
-        }
+    """
+    Model selection, pricing and usage accounting over the model catalog.
+
+    Models, prices and limits come from ``registry`` (the shared
+    ``get_registry()`` by default), so catalog changes apply without a
+    restart.
+    """
+
+    def __init__(self, registry: Optional[ModelRegistry] = None):
+        self.registry = registry or get_registry()
         self._usage_metrics = {}
         self.logger = logging.getLogger(__name__)
 
@@ -44,79 +25,89 @@ class ModelManager:
         input_length: int,
         priority: str = "balanced",
         budget: Optional[float] = None,
+        provider: Optional[str] = None,
     ) -> ModelType:
-        """Select optimal model based on requirements."""
+        """Select optimal model based on requirements; see ``ModelRegistry.select``."""
         try:
-            self.logger.info(f"Selecting model for task: {task_type}, length: {input_length}, priority: {priority}")
-            
-            # For budget-conscious tasks
-            if budget is not None:
-                if budget < 0.02:  # Low budget
-                    return ModelType.GPT4O
-                elif budget < 0.05:  # Medium budget
-                    return ModelType.CLAUDE
-                else:  # High budget
-                    if task_type in ["cot", "complex_reasoning", "analysis"]:
-                        return ModelType.O1_PREVIEW
-            
-            # For chain of thought and complex reasoning (with sufficient budget)
-            if task_type in ["cot", "complex_reasoning", "analysis"]:
-                return ModelType.O1_PREVIEW
-            
-            # For very long inputs, prefer Claude due to context window
-            if input_length > 100000:
-                return ModelType.CLAUDE
-            
-            # For code generation
-            if task_type == "code":
-                return ModelType.GPT4O
-            
-            # For creative tasks
-            if task_type in ["creative", "writing"]:
-                return ModelType.CLAUDE
-            
-            # For speed-priority tasks
-            if priority == "speed":
-                return ModelType.GPT4O
-
-            # Default to GPT4O for balanced performance
-            return ModelType.GPT4O
+            self.logger.debug(
+                "Selecting model for task: %s, length: %s, priority: %s", task_type, input_length, priority
+            )
+            return self.registry.select(task_type, input_length, priority=priority, budget=budget, provider=provider)
 
         except Exception as e:
-            self.logger.error(f"Model selection error: {e}")
-            # Default to GPT4O as fallback
-            return ModelType.GPT4O
+            self.logger.error("Model selection error: %s", e)
+            # Default to the first catalog model as fallback
+            return next(iter(ModelType))
 
     def calculate_cost(
         self,
         model: ModelType,
         input_tokens: int,
-        output_tokens: int
+        output_tokens: int,
+        batch: bool = False,
+        cache_read_tokens: int = 0,
+        cache_write_tokens: int = 0
     ) -> float:
-        """Calculate cost for a model run."""
-        config = self._models[model]
-        input_cost = (input_tokens / 1000) * config.cost_per_1k_input_tokens
+        """
+        Calculate cost for a model run, discounted if sent through a provider batch endpoint.
+
+        ``input_tokens`` are the prompt tokens billed at the full rate; prompt-cache
+        reads and writes are priced separately with the model's cache multipliers.
+        """
+        config = self.registry.get(model)
+        input_cost = (
+            input_tokens
+            + cache_read_tokens * config.cache_read_multiplier
+            + cache_write_tokens * config.cache_write_multiplier
+        ) / 1000 * config.cost_per_1k_input_tokens
         output_cost = (output_tokens / 1000) * config.cost_per_1k_output_tokens
+        if batch:
+            return (input_cost + output_cost) * config.batch_discount
         return input_cost + output_cost
 
+    def cache_savings(self, model: ModelType, cache_read_tokens: int, cache_write_tokens: int = 0) -> float:
+        """Cost saved by prompt caching compared with sending the same tokens uncached; negative if writes outweigh reads."""
+        config = self.registry.get(model)
+        saved = (
+            cache_read_tokens * (1 - config.cache_read_multiplier)
+            - cache_write_tokens * (config.cache_write_multiplier - 1)
+        )
+        return saved / 1000 * config.cost_per_1k_input_tokens
+
     def get_model_config(self, model_type: ModelType) -> ModelConfig:
         """Get model configuration."""
-        return self._models[model_type]
+        return self.registry.get(model_type)
 
-    def log_usage(self, model: ModelType, input_tokens: int, output_tokens: int):
+    def log_usage(
+        self,
+        model: ModelType,
+        input_tokens: int,
+        output_tokens: int,
+        cache_read_tokens: int = 0,
+        cache_write_tokens: int = 0
+    ):
         """Log model usage metrics."""
-        cost = self.calculate_cost(model, input_tokens, output_tokens)
+        cost = self.calculate_cost(
+            model, input_tokens, output_tokens,
+            cache_read_tokens=cache_read_tokens, cache_write_tokens=cache_write_tokens
+        )
         self._usage_metrics.setdefault(model, {
             'total_input_tokens': 0,
             'total_output_tokens': 0,
+            'total_cache_read_tokens': 0,
+            'total_cache_write_tokens': 0,
             'total_cost': 0.0,
+            'cache_savings': 0.0,
             'calls': 0
         })
         
         metrics = self._usage_metrics[model]
         metrics['total_input_tokens'] += input_tokens
         metrics['total_output_tokens'] += output_tokens
+        metrics['total_cache_read_tokens'] += cache_read_tokens
+        metrics['total_cache_write_tokens'] += cache_write_tokens
         metrics['total_cost'] += cost
+        metrics['cache_savings'] += self.cache_savings(model, cache_read_tokens, cache_write_tokens)
         metrics['calls'] += 1
 
     def get_metrics(self) -> Dict:
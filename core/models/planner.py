@@ -0,0 +1,268 @@
+# core/models/planner.py
+"""
+Price a whole logged workload on every model and under routing policies.
+
+``ModelManager.calculate_cost`` prices one request; planning means pricing
+millions of them on every ``ModelType``. ``load_workload`` reads token
+counts from CSV, JSONL or the output of ``llm-cli batch run`` into NumPy
+columns, ``CostPlanner.cost_matrix`` prices every request on every model in
+one pass, and ``CostPlanner.plan`` compares routing policies:
+
+* ``logged``: the model each request actually used
+* a model name, e.g. ``gpt-4o``: everything on that model
+* ``cheapest``: the cheapest model whose context window fits the request
+* ``select:<priority>``: ``ModelManager.select_model`` with that priority
+  (``select`` uses each request's own ``priority`` column)
+
+``select_model`` is evaluated once per distinct (task type, priority,
+budget, length band) combination, not once per request; prompt lengths are
+banded at the catalog's context windows and routing thresholds. Prompt-cache
+token counts are assumed to carry over when a request is rerouted.
+
+Needs NumPy (``pip install llm-api-interface[planning]``).
+"""
+import csv
+import json
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional, Dict, Any, List, Iterable, Sequence
+
+import numpy as np
+
+from .config import ModelType
+from .manager import ModelManager
+
+MODELS: List[ModelType] = list(ModelType)
+
+TOKEN_COLUMNS = ("input_tokens", "output_tokens", "cache_read_tokens", "cache_write_tokens")
+
+DEFAULT_POLICIES = ("logged", "select:balanced", "select:speed", "cheapest")
+
+PERCENTILES = (50, 90, 99)
+
+@dataclass
+class Workload:
+    """Column-oriented token counts of logged requests; ``model`` holds indexes into MODELS, -1 if unknown."""
+    input_tokens: np.ndarray
+    output_tokens: np.ndarray
+    cache_read_tokens: np.ndarray
+    cache_write_tokens: np.ndarray
+    model: np.ndarray
+    batch: np.ndarray
+    task_type: np.ndarray
+    priority: np.ndarray
+    budget: np.ndarray  # NaN where no budget was given
+
+    def __len__(self) -> int:
+        return len(self.input_tokens)
+
+    @property
+    def prompt_tokens(self) -> np.ndarray:
+        return self.input_tokens + self.cache_read_tokens + self.cache_write_tokens
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]]) -> "Workload":
+        """
+        Build a workload from dict rows.
+
+        Rows carry ``input_tokens`` and ``output_tokens`` (or ``prompt_tokens``
+        and ``completion_tokens``), either top-level or under ``usage`` as in
+        batch output, plus optional ``cache_read_tokens``,
+        ``cache_write_tokens``, ``model``, ``task_type``, ``priority``,
+        ``budget`` and ``batch`` (or ``via: batch``). Rows with an ``error``
+        and no usage are skipped.
+        """
+        index = {model.value: i for i, model in enumerate(MODELS)}
+        columns: Dict[str, list] = {name: [] for name in (*TOKEN_COLUMNS, "model", "batch", "task_type", "priority", "budget")}
+        for row in records:
+            usage = row.get("usage") or row
+            if "error" in row and not row.get("usage"):
+                continue
+            counts = (
+                usage.get("input_tokens", usage.get("prompt_tokens")),
+                usage.get("output_tokens", usage.get("completion_tokens")),
+                usage.get("cache_read_tokens"),
+                usage.get("cache_write_tokens"),
+            )
+            for name, value in zip(TOKEN_COLUMNS, counts):
+                columns[name].append(_number(value))
+            model = row.get("model") or ""
+            if model and model not in index:
+                raise ValueError(f"Unknown model: {model}")
+            columns["model"].append(index.get(model, -1))
+            columns["batch"].append(row.get("via") == "batch" or _flag(row.get("batch")))
+            columns["task_type"].append(row.get("task_type") or "chat")
+            columns["priority"].append(row.get("priority") or "balanced")
+            budget = row.get("budget")
+            columns["budget"].append(float(budget) if budget not in (None, "") else np.nan)
+        return cls(
+            **{name: np.asarray(columns[name], dtype=np.int64) for name in TOKEN_COLUMNS},
+            model=np.asarray(columns["model"], dtype=np.int16),
+            batch=np.asarray(columns["batch"], dtype=bool),
+            task_type=np.asarray(columns["task_type"], dtype=str),
+            priority=np.asarray(columns["priority"], dtype=str),
+            budget=np.asarray(columns["budget"], dtype=np.float64),
+        )
+
+def _number(value) -> int:
+    return int(float(value)) if value not in (None, "") else 0
+
+def _flag(value) -> bool:
+    if isinstance(value, str):
+        return value.strip().lower() in ("1", "true", "yes")
+    return bool(value)
+
+def load_workload(path: Path) -> Workload:
+    """Read a workload from a ``.csv`` file with a header row, or from JSONL (one object per line)."""
+    path = Path(path)
+    with open(path, encoding="utf-8", newline="") as f:
+        if path.suffix.lower() == ".csv":
+            return Workload.from_records(csv.DictReader(f))
+        return Workload.from_records(json.loads(line) for line in f if line.strip())
+
+@dataclass
+class PolicyResult:
+    name: str
+    total: float
+    mean: float
+    percentiles: Dict[int, float]
+    max: float
+    requests: Dict[str, int]             # requests routed to each model
+    costs: Dict[str, float]              # cost on each model
+    savings: Optional[float] = None      # against the baseline policy
+    unroutable: int = 0                  # requests no model's context window fits
+
+@dataclass
+class CostPlan:
+    requests: int
+    model_totals: Dict[str, float]       # the whole workload on each model
+    policies: List[PolicyResult] = field(default_factory=list)
+    baseline: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "model_totals": self.model_totals,
+            "baseline": self.baseline,
+            "policies": [vars(policy) for policy in self.policies],
+        }
+
+class CostPlanner:
+    """Vectorized cost simulation over a Workload."""
+
+    def __init__(self, manager: Optional[ModelManager] = None):
+        self.manager = manager or ModelManager()
+        configs = [self.manager.get_model_config(model) for model in MODELS]
+        self._input_price = np.array([c.cost_per_1k_input_tokens for c in configs]) / 1000
+        self._output_price = np.array([c.cost_per_1k_output_tokens for c in configs]) / 1000
+        self._read_multiplier = np.array([c.cache_read_multiplier for c in configs])
+        self._write_multiplier = np.array([c.cache_write_multiplier for c in configs])
+        self._batch_discount = np.array([c.batch_discount for c in configs])
+        self._context_window = np.array([c.context_window for c in configs])
+
+    def cost_matrix(self, workload: Workload) -> np.ndarray:
+        """Cost of every request on every model, shape (requests, len(MODELS)); same prices as calculate_cost."""
+        billed_input = (
+            workload.input_tokens[:, None]
+            + workload.cache_read_tokens[:, None] * self._read_multiplier
+            + workload.cache_write_tokens[:, None] * self._write_multiplier
+        )
+        cost = billed_input * self._input_price + workload.output_tokens[:, None] * self._output_price
+        return np.where(workload.batch[:, None], cost * self._batch_discount, cost)
+
+    def route(self, workload: Workload, policy: str, costs: Optional[np.ndarray] = None) -> np.ndarray:
+        """Model index per request under a policy; -1 where it cannot be routed."""
+        if policy == "logged":
+            if (workload.model < 0).any():
+                raise ValueError("The logged policy needs a model on every row")
+            return workload.model.astype(np.intp)
+        if policy == "cheapest":
+            costs = self.cost_matrix(workload) if costs is None else costs
+            fits = (workload.prompt_tokens + workload.output_tokens)[:, None] <= self._context_window
+            routed = np.where(fits, costs, np.inf).argmin(axis=1)
+            return np.where(fits.any(axis=1), routed, -1)
+        if policy == "select" or policy.startswith("select:"):
+            return self._select(workload, policy.partition(":")[2] or None)
+        try:
+            model = MODELS.index(ModelType(policy))
+        except ValueError:
+            raise ValueError(f"Unknown policy: {policy}") from None
+        return np.full(len(workload), model, dtype=np.intp)
+
+    def _select(self, workload: Workload, priority: Optional[str]) -> np.ndarray:
+        # select_model only looks at these fields, and at the prompt length
+        # only through which band between the registry's length bounds it
+        # falls in, so call it once per combination; NaN never compares
+        # equal, so missing budgets become -1
+        tiers = np.array(self.manager.registry.length_bounds)
+        # Each band's shortest length: band 0 starts at 0, band i just past
+        # bound i - 1
+        tier_lengths = np.concatenate([[0], tiers + 1])
+        columns = [
+            workload.task_type,
+            workload.priority if priority is None else np.full(len(workload), priority),
+            np.where(np.isnan(workload.budget), -1.0, workload.budget),
+            np.searchsorted(tiers, workload.prompt_tokens, side="left"),
+        ]
+        values, codes = zip(*(np.unique(column, return_inverse=True) for column in columns))
+        combined = np.zeros(len(workload), dtype=np.int64)
+        for value, code in zip(values, codes):
+            combined = combined * len(value) + code.reshape(-1)
+        combos, first, inverse = np.unique(combined, return_index=True, return_inverse=True)
+
+        # select_model is a coroutine wrapping the registry's synchronous
+        # select; calling that directly keeps route() usable from async code
+        select = self.manager.registry.select
+        chosen = np.array([
+            MODELS.index(select(
+                str(columns[0][i]),
+                int(tier_lengths[columns[3][i]]),
+                priority=str(columns[1][i]),
+                budget=None if columns[2][i] < 0 else float(columns[2][i]),
+            ))
+            for i in first
+        ], dtype=np.intp)
+        return chosen[inverse.reshape(-1)]
+
+    def plan(self, workload: Workload, policies: Sequence[str] = DEFAULT_POLICIES, baseline: Optional[str] = None) -> CostPlan:
+        """
+        Price the workload under each policy.
+
+        The baseline for savings defaults to the first policy; policies that
+        need a column the workload lacks (``logged`` without models) are
+        skipped.
+        """
+        costs = self.cost_matrix(workload)
+        rows = np.arange(len(workload))
+        plan = CostPlan(
+            requests=len(workload),
+            model_totals={model.value: float(costs[:, i].sum()) for i, model in enumerate(MODELS)},
+        )
+        if policies is DEFAULT_POLICIES and (workload.model < 0).any():
+            policies = [p for p in policies if p != "logged"]
+        for name in policies:
+            routed = self.route(workload, name, costs)
+            routable = routed >= 0
+            per_request = costs[rows[routable], routed[routable]]
+            counts = np.bincount(routed[routable], minlength=len(MODELS))
+            by_model = np.bincount(routed[routable], weights=per_request, minlength=len(MODELS))
+            plan.policies.append(PolicyResult(
+                name=name,
+                total=float(per_request.sum()),
+                mean=float(per_request.mean()) if per_request.size else 0.0,
+                percentiles={
+                    p: float(v) for p, v in zip(PERCENTILES, np.percentile(per_request, PERCENTILES))
+                } if per_request.size else {p: 0.0 for p in PERCENTILES},
+                max=float(per_request.max()) if per_request.size else 0.0,
+                requests={model.value: int(counts[i]) for i, model in enumerate(MODELS) if counts[i]},
+                costs={model.value: float(by_model[i]) for i, model in enumerate(MODELS) if counts[i]},
+                unroutable=int((~routable).sum()),
+            ))
+        if plan.policies:
+            base = next((p for p in plan.policies if p.name == baseline), None) if baseline else plan.policies[0]
+            if base is None:
+                raise ValueError(f"Baseline {baseline} is not among the policies")
+            plan.baseline = base.name
+            for policy in plan.policies:
+                policy.savings = base.total - policy.total
+        return plan
@@ -0,0 +1,391 @@
+# core/models/registry.py
+"""
+The model catalog and the indexes model selection runs on.
+
+``ModelRegistry`` loads the catalog files (``config/models.toml`` and
+MODELS_FILE, see ``catalog_files``) into a ``Catalog`` snapshot holding each
+model's ``ModelConfig`` and one ``TierIndex`` per (capability, provider)
+pair, with None standing for any. An index lists its models by context
+window together with suffix tables of the cheapest, fastest and priciest
+model from each position, so "the cheapest model with this capability whose
+window fits the input" is one dict lookup and one bisect, however many
+models the catalog holds.
+
+The catalog's ``[[routing]]`` rules come first: a request goes to the first
+fitting model of the first rule it matches, by task type, priority, input
+length or budget. Requests no rule places fall back to the indexes.
+
+Accesses check the files for changes at most every ``reload_interval``
+seconds and swap in a new snapshot when they have; readers always see one
+complete snapshot. A file that fails to load is logged and the previous
+snapshot kept. Fields of existing models reload; a model added to the files
+needs a restart, since ``ModelType`` members are fixed at import.
+"""
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field, fields, replace
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional, Any, Dict, FrozenSet, List, Sequence, Tuple, Callable
+
+from .config import ModelType, ModelConfig, catalog_files, load_catalog
+
+logger = logging.getLogger(__name__)
+
+# How often, at most, an access checks the catalog files for changes
+RELOAD_INTERVAL = 2.0
+
+FIELDS = {f.name for f in fields(ModelConfig)} - {"model_type"}
+NUMBERS = (
+    "cost_per_1k_input_tokens", "cost_per_1k_output_tokens", "max_tokens", "context_window",
+    "typical_latency", "batch_discount", "cache_read_multiplier", "cache_write_multiplier",
+)
+
+# Wire formats the client speaks; a model on another OpenAI-compatible
+# service uses "openai" with its own endpoint
+PROVIDERS = ("openai", "anthropic")
+
+# (capability, provider); None matches any
+IndexKey = Tuple[Optional[str], Optional[str]]
+
+@dataclass(frozen=True)
+class TierIndex:
+    """Models sharing an index key, ordered by context window."""
+    windows: Tuple[int, ...]
+    models: Tuple[ModelType, ...]
+    # cheapest[i] is the cheapest of models[i:], and so on
+    cheapest: Tuple[ModelType, ...]
+    fastest: Tuple[ModelType, ...]
+    priciest: Tuple[ModelType, ...]
+    # by_cost[i] holds models[i:] by reference cost, costs[i] the costs
+    by_cost: Tuple[Tuple[ModelType, ...], ...]
+    costs: Tuple[Tuple[float, ...], ...]
+
+    def fits(self, input_length: int) -> int:
+        """Position of the first model whose window holds ``input_length`` tokens."""
+        return bisect_left(self.windows, input_length)
+
+ROUTING_FIELDS = {"models", "tasks", "priorities", "min_input_tokens", "budget_below"}
+
+@dataclass(frozen=True)
+class RoutingRule:
+    """One ``[[routing]]`` entry of the catalog."""
+    models: Tuple[ModelType, ...]  # in order of preference
+    tasks: Optional[FrozenSet[str]] = None  # None matches any
+    priorities: Optional[FrozenSet[str]] = None
+    min_input_tokens: int = 0
+    budget_below: Optional[float] = None  # only requests with a budget under this
+
+    def matches(self, priority: str, budget: Optional[float], input_length: int) -> bool:
+        if self.priorities is not None and priority not in self.priorities:
+            return False
+        if input_length < self.min_input_tokens:
+            return False
+        if self.budget_below is not None and (budget is None or budget >= self.budget_below):
+            return False
+        return True
+
+@dataclass(frozen=True)
+class Catalog:
+    """One loaded version of the catalog."""
+    models: Dict[ModelType, ModelConfig]
+    indexes: Dict[IndexKey, TierIndex]
+    tiers: Tuple[int, ...]  # distinct context windows, ascending
+    budget_input_tokens: int
+    budget_output_tokens: int
+    # The routing rules that can match each task type named in a rule, and
+    # under None those for every other task type
+    rules: Dict[Optional[str], Tuple[RoutingRule, ...]] = field(default_factory=dict)
+    # Input lengths past which the choice can change: the context windows
+    # and routing thresholds, ascending
+    length_bounds: Tuple[int, ...] = ()
+    # (mtime, size) of each file when loaded
+    stamp: Tuple[Any, ...] = ()
+
+    def reference_cost(self, model_type: ModelType) -> float:
+        """What a reference request costs on a model; ``select``'s budget is compared with it."""
+        config = self.models[model_type]
+        return (
+            self.budget_input_tokens * config.cost_per_1k_input_tokens
+            + self.budget_output_tokens * config.cost_per_1k_output_tokens
+        ) / 1000
+
+def _model_config(name: str, table: Dict[str, Any]) -> ModelConfig:
+    model_type = ModelType[name]
+    table = dict(table)
+    model_id = table.pop("id", None)
+    if model_id != model_type.value:
+        raise ValueError(f"Model {name} changed id from {model_type.value!r} to {model_id!r}; restart to apply")
+    unknown = set(table) - FIELDS
+    if unknown:
+        raise ValueError(f"Model {name} has unknown fields: {', '.join(sorted(unknown))}")
+    try:
+        config = ModelConfig(model_type=model_type, **table)
+    except TypeError as e:
+        raise ValueError(f"Model {name} is incomplete: {e}") from None
+    for number in NUMBERS:
+        value = getattr(config, number)
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+            raise ValueError(f"Model {name} has an invalid {number}: {value!r}")
+    if config.provider not in PROVIDERS:
+        raise ValueError(f"Model {name} has an unknown provider: {config.provider!r}")
+    if not isinstance(config.capabilities, list):
+        raise ValueError(f"Model {name} has invalid capabilities: {config.capabilities!r}")
+    return config
+
+def _names(index: int, table: Dict[str, Any], name: str) -> Optional[FrozenSet[str]]:
+    value = table.get(name)
+    if value is None:
+        return None
+    if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+        raise ValueError(f"Routing rule {index} has invalid {name}: {value!r}")
+    return frozenset(value)
+
+def _routing_rule(index: int, table: Dict[str, Any]) -> Optional[RoutingRule]:
+    """A validated rule, or None if none of its models is loaded."""
+    if not isinstance(table, dict):
+        raise ValueError(f"Routing rule {index} is not a table")
+    unknown = set(table) - ROUTING_FIELDS
+    if unknown:
+        raise ValueError(f"Routing rule {index} has unknown fields: {', '.join(sorted(unknown))}")
+    names = table.get("models")
+    if not isinstance(names, list) or not names or not all(isinstance(name, str) for name in names):
+        raise ValueError(f"Routing rule {index} has invalid models: {names!r}")
+    models = []
+    for name in names:
+        if name in ModelType.__members__:
+            models.append(ModelType[name])
+        else:
+            logger.warning("Routing rule %d skips %s, which is not loaded", index, name)
+    for number in ("min_input_tokens", "budget_below"):
+        value = table.get(number, 0)
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+            raise ValueError(f"Routing rule {index} has an invalid {number}: {value!r}")
+    if not models:
+        return None
+    return RoutingRule(
+        models=tuple(models),
+        tasks=_names(index, table, "tasks"),
+        priorities=_names(index, table, "priorities"),
+        min_input_tokens=int(table.get("min_input_tokens", 0)),
+        budget_below=table.get("budget_below"),
+    )
+
+def _suffix(configs: List[ModelConfig], key: Callable[[ModelConfig], float]) -> Tuple[ModelType, ...]:
+    """For each position, the model with the lowest key from there on; ties go to the earlier one."""
+    best = None
+    result = []
+    for config in reversed(configs):
+        if best is None or key(config) <= key(best):
+            best = config
+        result.append(best.model_type)
+    return tuple(reversed(result))
+
+def _tier_index(configs: List[ModelConfig], cost: Callable[[ModelConfig], float]) -> TierIndex:
+    configs = sorted(configs, key=lambda c: c.context_window)
+    by_cost = [sorted(configs[i:], key=cost) for i in range(len(configs))]
+    return TierIndex(
+        windows=tuple(c.context_window for c in configs),
+        models=tuple(c.model_type for c in configs),
+        cheapest=_suffix(configs, cost),
+        fastest=_suffix(configs, lambda c: c.typical_latency),
+        priciest=_suffix(configs, lambda c: -cost(c)),
+        by_cost=tuple(tuple(c.model_type for c in ranked) for ranked in by_cost),
+        costs=tuple(tuple(cost(c) for c in ranked) for ranked in by_cost),
+    )
+
+def build_catalog(data: Dict[str, Any], stamp: Tuple[Any, ...] = ()) -> Catalog:
+    """Validate merged catalog data and build its indexes; raises ValueError if invalid."""
+    tables = data.get("models", {})
+    models: Dict[ModelType, ModelConfig] = {}
+    for name, table in tables.items():
+        if name not in ModelType.__members__:
+            logger.warning("Model %s is not loaded; new models need a restart", name)
+            continue
+        models[ModelType[name]] = _model_config(name, table)
+    missing = [model.name for model in ModelType if model not in models]
+    if missing:
+        raise ValueError(f"Models missing from the catalog: {', '.join(missing)}")
+
+    routing = data.get("routing", [])
+    if not isinstance(routing, list):
+        raise ValueError("routing must be an array of tables")
+    rules = [rule for rule in (_routing_rule(i, table) for i, table in enumerate(routing)) if rule is not None]
+    tasks = set().union(*(rule.tasks for rule in rules if rule.tasks is not None))
+    by_task = {
+        task: tuple(rule for rule in rules if rule.tasks is None or task in rule.tasks)
+        for task in (None, *tasks)
+    }
+    tiers = tuple(sorted({c.context_window for c in models.values()}))
+
+    selection = data.get("selection", {})
+    catalog = Catalog(
+        models=models,
+        indexes={},
+        tiers=tiers,
+        budget_input_tokens=selection.get("budget_input_tokens", 1000),
+        budget_output_tokens=selection.get("budget_output_tokens", 500),
+        rules=by_task,
+        length_bounds=tuple(sorted({*tiers, *(r.min_input_tokens - 1 for r in rules if r.min_input_tokens > 0)})),
+        stamp=stamp,
+    )
+
+    def cost(config: ModelConfig) -> float:
+        return catalog.reference_cost(config.model_type)
+
+    keys = set()
+    for config in models.values():
+        for capability in (None, *config.capabilities):
+            keys.add((capability, None))
+            keys.add((capability, config.provider))
+    for capability, provider in keys:
+        matching = [
+            c for c in models.values()
+            if (capability is None or capability in c.capabilities) and (provider is None or c.provider == provider)
+        ]
+        catalog.indexes[(capability, provider)] = _tier_index(matching, cost)
+    return catalog
+
+class ModelRegistry:
+    """
+    The current model catalog, reloaded when its files change.
+
+    Args:
+        files: Catalog files, merged in order; ``catalog_files()`` by default
+        reload_interval: Seconds between checks for changed files; None never reloads
+    """
+
+    def __init__(self, files: Optional[Sequence[Path]] = None, reload_interval: Optional[float] = RELOAD_INTERVAL):
+        self.files = [Path(path) for path in files] if files is not None else catalog_files()
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._catalog = build_catalog(load_catalog(self.files), self._stamp())
+        self._checked = time.monotonic()
+
+    def _stamp(self) -> Tuple[Any, ...]:
+        stamp = []
+        for path in self.files:
+            try:
+                stat = os.stat(path)
+                stamp.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                stamp.append(None)
+        return tuple(stamp)
+
+    @property
+    def catalog(self) -> Catalog:
+        """The current snapshot; checks for changed files if the interval has passed."""
+        if self.reload_interval is not None and time.monotonic() - self._checked >= self.reload_interval:
+            self.reload()
+        return self._catalog
+
+    def reload(self, force: bool = False) -> bool:
+        """Load the files if they changed since the last load; True if a new snapshot was swapped in."""
+        # Another thread is already checking; keep serving the current snapshot
+        if not self._lock.acquire(blocking=False):
+            return False
+        try:
+            self._checked = time.monotonic()
+            stamp = self._stamp()
+            if stamp == self._catalog.stamp and not force:
+                return False
+            try:
+                catalog = build_catalog(load_catalog(self.files), stamp)
+            except (OSError, ValueError) as e:
+                logger.error("Keeping the current model catalog; the new one failed to load: %s", e)
+                # Don't retry until the files change again
+                self._catalog = replace(self._catalog, stamp=stamp)
+                return False
+            self._catalog = catalog
+            logger.info("Reloaded model catalog from %s", ", ".join(str(path) for path in self.files))
+            return True
+        finally:
+            self._lock.release()
+
+    def get(self, model_type: ModelType) -> ModelConfig:
+        """A model's configuration."""
+        return self.catalog.models[model_type]
+
+    @property
+    def tiers(self) -> Tuple[int, ...]:
+        """The distinct context windows in the catalog, ascending."""
+        return self.catalog.tiers
+
+    @property
+    def length_bounds(self) -> Tuple[int, ...]:
+        """
+        Input lengths past which ``select`` can choose differently, ascending:
+        lengths between two bounds always get the same model.
+        """
+        return self.catalog.length_bounds
+
+    def find(
+        self,
+        capability: Optional[str] = None,
+        provider: Optional[str] = None,
+        input_length: int = 0,
+    ) -> Tuple[ModelType, ...]:
+        """Models with a capability and provider (any if None) whose window holds ``input_length`` tokens, smallest window first."""
+        index = self.catalog.indexes.get((capability, provider))
+        if index is None:
+            return ()
+        return index.models[index.fits(input_length):]
+
+    def select(
+        self,
+        task_type: str,
+        input_length: int,
+        priority: str = "balanced",
+        budget: Optional[float] = None,
+        provider: Optional[str] = None,
+    ) -> ModelType:
+        """
+        Pick a model for a request.
+
+        The catalog's routing rules are tried in order; the first rule the
+        request matches that lists a model from ``provider`` whose window
+        holds ``input_length`` tokens decides. Otherwise candidates have
+        ``task_type`` as a capability (any model if no model has it) and a
+        window holding the input. With a budget, the priciest candidate
+        whose reference cost is within it wins, or the cheapest if none is.
+        Otherwise ``priority`` decides: "speed" takes the fastest, "quality"
+        the priciest and anything else the cheapest. If no model's window
+        holds the input, the one with the largest window is returned.
+        """
+        catalog = self.catalog
+        rules = catalog.rules.get(task_type)
+        for rule in rules if rules is not None else catalog.rules.get(None, ()):
+            if not rule.matches(priority, budget, input_length):
+                continue
+            for model in rule.models:
+                config = catalog.models[model]
+                if config.context_window >= input_length and (provider is None or config.provider == provider):
+                    return model
+
+        index = catalog.indexes.get((task_type, provider))
+        start = index.fits(input_length) if index is not None else 0
+        if index is None or start == len(index.models):
+            index = catalog.indexes.get((None, provider))
+            if index is None:
+                raise ValueError(f"No models from provider {provider!r}")
+            start = index.fits(input_length)
+            if start == len(index.models):
+                return index.models[-1]
+        if budget is not None:
+            affordable = bisect_right(index.costs[start], budget)
+            if affordable == 0:
+                return index.cheapest[start]
+            return index.by_cost[start][affordable - 1]
+        if priority == "speed":
+            return index.fastest[start]
+        if priority == "quality":
+            return index.priciest[start]
+        return index.cheapest[start]
+
+@lru_cache
+def get_registry() -> ModelRegistry:
+    """The registry for the catalog files, shared by the process."""
+    return ModelRegistry()
@@ -1,20 +1,218 @@
 # core/security/keys.py
+import hashlib
 import os
-from typing import Dict
-from dotenv import load_dotenv
-from ..models.config import ModelType
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import lru_cache
+from itertools import count
+from typing import Dict, Any, List, Optional, Mapping
+from ..models.config import ModelType, get_provider
 
-load_dotenv()
+# Single-key and comma-separated multi-key variables per provider
+KEY_ENV_VARS = {
+    "anthropic": ("ANTHROPIC_API_KEYS", "ANTHROPIC_API_KEY"),
+    "openai": ("OPENAI_API_KEYS", "OPENAI_API_KEY"),
+}
 
-API_KEYS: Dict[ModelType, str] = {
-    ModelType.CLAUDE: os.getenv("ANTHROPIC_API_KEY", ""),
-    ModelType.GPT4O: os.getenv("OPENAI_API_KEY", ""),
-    ModelType.O1_PREVIEW: os.getenv("OPENAI_API_KEY", "")
+# Response headers reporting a key's remaining quota
+REMAINING_HEADERS = {
+    "anthropic": ("anthropic-ratelimit-requests-remaining", "anthropic-ratelimit-requests-reset"),
+    "openai": ("x-ratelimit-remaining-requests", "x-ratelimit-reset-requests"),
 }
 
+def _load_dotenv():
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+@lru_cache
+def load_provider_keys(provider: str) -> List[str]:
+    """Read a provider's API keys from the environment, loading .env on first use."""
+    _load_dotenv()
+    multi, single = KEY_ENV_VARS[provider]
+    keys = [k.strip() for k in os.getenv(multi, "").split(",") if k.strip()]
+    if os.getenv(single):
+        keys.append(os.getenv(single))
+    return list(dict.fromkeys(keys))
+
+@lru_cache
+def load_api_keys() -> Dict[ModelType, str]:
+    """The first key of each model's provider."""
+    return {
+        model_type: next(iter(load_provider_keys(get_provider(model_type))), "")
+        for model_type in ModelType
+    }
+
 def get_api_key(model_type: ModelType) -> str:
     """Get API key for specified model type."""
-    key = API_KEYS.get(model_type)
+    key = load_api_keys().get(model_type)
     if not key:
         raise ValueError(f"API key not found for model {model_type}")
-    return key
\ No newline at end of file
+    return key
+
+def provider_headers(provider: str, api_key: str) -> Dict[str, str]:
+    """Request headers authenticating with the given key."""
+    if provider == "anthropic":
+        return {
+            "x-api-key": api_key,
+            "anthropic-version": "2024-01-01",
+            "content-type": "application/json"
+        }
+    return {
+        "Authorization": f"Bearer {api_key}",
+        "content-type": "application/json"
+    }
+
+def _parse_reset(value: str) -> Optional[float]:
+    """Seconds until a quota resets, from an RFC 3339 time or a '1m30s'-style duration."""
+    try:
+        return max(0.0, datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp() - time.time())
+    except ValueError:
+        pass
+    seconds, number = 0.0, ""
+    i = 0
+    while i < len(value):
+        ch = value[i]
+        if ch.isdigit() or ch == ".":
+            number += ch
+        elif value.startswith("ms", i) and number:
+            seconds += float(number) / 1000
+            number = ""
+            i += 1
+        elif ch in "hms" and number:
+            seconds += float(number) * {"h": 3600, "m": 60, "s": 1}[ch]
+            number = ""
+        else:
+            return None
+        i += 1
+    return seconds if not number else None
+
+@dataclass
+class PooledKey:
+    """One API key with its cached headers and observed state."""
+    key: str
+    headers: Dict[str, str]
+    in_flight: int = 0
+    remaining: Optional[int] = None     # requests left in the provider's window, if reported
+    reset_at: float = 0.0               # monotonic time the window resets
+    quarantined_until: float = 0.0
+    order: int = field(default=0, repr=False)
+    # Stands in for the key in logs and metrics; a hash of the whole key, as
+    # keys of one account often share their last characters
+    label: str = field(init=False)
+
+    def __post_init__(self):
+        self.label = "key-" + hashlib.sha256(self.key.encode()).hexdigest()[:10]
+
+class KeyPool:
+    """
+    Spread a provider's requests across several API keys.
+
+    Each request takes the available key with the most remaining quota per
+    in-flight request; quota comes from the provider's rate-limit response
+    headers, and keys that have not reported any are assumed to have
+    ``default_capacity``. Keys answering 429 are set aside until their
+    retry-after passes, 401/403 for ``auth_quarantine`` seconds. When every
+    key is set aside the one available soonest is used anyway, so callers
+    still see the provider's error rather than a local one.
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        keys: List[str],
+        default_capacity: int = 1000,
+        rate_limit_quarantine: float = 30.0,
+        auth_quarantine: float = 300.0,
+    ):
+        self.provider = provider
+        self.default_capacity = default_capacity
+        self.rate_limit_quarantine = rate_limit_quarantine
+        self.auth_quarantine = auth_quarantine
+        self._keys = [
+            PooledKey(key, provider_headers(provider, key), order=i)
+            for i, key in enumerate(dict.fromkeys(keys))
+        ]
+        self._turn = count()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _score(self, entry: PooledKey, now: float) -> float:
+        remaining = entry.remaining
+        if remaining is None or now >= entry.reset_at > 0:
+            remaining = self.default_capacity
+        return remaining / (entry.in_flight + 1)
+
+    def select(self) -> PooledKey:
+        """The key the next request should use, without reserving it."""
+        if not self._keys:
+            raise ValueError(f"API key not found for provider {self.provider}")
+        now = time.monotonic()
+        available = [k for k in self._keys if k.quarantined_until <= now]
+        if not available:
+            return min(self._keys, key=lambda k: k.quarantined_until)
+        # Rotate the starting point so equally good keys take turns
+        turn = next(self._turn) % len(self._keys)
+        return max(available, key=lambda k: (self._score(k, now), -((k.order - turn) % len(self._keys))))
+
+    def acquire(self, label: Optional[str] = None) -> PooledKey:
+        """
+        Reserve a key for one request, or the key with ``label`` when work
+        must stay on one key; pair with ``release``. Raises KeyError for an
+        unknown label.
+        """
+        if label is None:
+            entry = self.select()
+        else:
+            entry = next((k for k in self._keys if k.label == label), None)
+            if entry is None:
+                raise KeyError(f"No {self.provider} key labelled {label}")
+        entry.in_flight += 1
+        return entry
+
+    def release(self, entry: PooledKey):
+        entry.in_flight = max(0, entry.in_flight - 1)
+
+    def record(self, entry: PooledKey, status: int, headers: Mapping[str, str]):
+        """Update a key's quota and quarantine from a provider response."""
+        now = time.monotonic()
+        remaining_header, reset_header = REMAINING_HEADERS[self.provider]
+        remaining = headers.get(remaining_header)
+        if remaining is not None and remaining.isdigit():
+            entry.remaining = int(remaining)
+            reset = _parse_reset(headers.get(reset_header, ""))
+            entry.reset_at = now + reset if reset is not None else 0.0
+
+        if status == 429:
+            retry_after = headers.get("retry-after")
+            try:
+                delay = float(retry_after) if retry_after is not None else self.rate_limit_quarantine
+            except ValueError:
+                delay = self.rate_limit_quarantine
+            entry.quarantined_until = now + delay
+        elif status in (401, 403):
+            entry.quarantined_until = now + self.auth_quarantine
+
+    def stats(self) -> List[Dict[str, Any]]:
+        now = time.monotonic()
+        return [
+            {
+                "key": entry.label,
+                "in_flight": entry.in_flight,
+                "remaining": entry.remaining,
+                "quarantined_for": max(0.0, entry.quarantined_until - now),
+            }
+            for entry in self._keys
+        ]
+
+@lru_cache
+def get_key_pool(provider: str) -> KeyPool:
+    """The process-wide key pool for a provider."""
+    return KeyPool(provider, load_provider_keys(provider))
+
+def __getattr__(name: str) -> Any:
+    if name == "API_KEYS":
+        return load_api_keys()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
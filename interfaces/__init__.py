@@ -1,4 +1,9 @@
 # interfaces/__init__.py
-from interfaces.cli.main import app as cli_app
+__all__ = ['cli_app']
 
-__all__ = ['cli_app']
\ No newline at end of file
+def __getattr__(name):
+    # Imported on demand so `interfaces.api` does not load the CLI and vice versa
+    if name == 'cli_app':
+        from interfaces.cli.main import app
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
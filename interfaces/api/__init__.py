@@ -0,0 +1,4 @@
+# interfaces/api/__init__.py
+from interfaces.api.gateway import create_app
+
+__all__ = ['create_app']
@@ -0,0 +1,428 @@
+# interfaces/api/gateway.py
+import asyncio
+import json
+import logging
+import time
+import uuid
+import zlib
+from contextlib import asynccontextmanager
+from typing import Optional, Callable, Dict, Any, List, AsyncIterator, Tuple, Union, Literal
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse, Response
+
+from core.models.config import ModelType, get_provider
+from core.models.manager import ModelManager
+from core.api.client import LLMClient, APIError, RateLimitError, TokenLimitError, CLAUDE_PARAM_MAP, provider_params
+from core.api.rate_limit import RateLimiter
+from core.api.response import LLMResponse
+from core.api.tracing import tracer_from_settings
+from utils.cache.manager import CacheManager
+from utils.cache.shared import cache_from_settings
+from utils.metrics.registry import MetricsRegistry, get_registry
+
+logger = logging.getLogger(__name__)
+
+CLAUDE_STOP_REASONS = {
+    "end_turn": "stop",
+    "stop_sequence": "stop",
+    "max_tokens": "length",
+    "tool_use": "tool_calls",
+}
+
+OVERHEAD_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.00075, 0.001,
+    0.0025, 0.005, 0.01, 0.025, 0.1,
+)
+
+# Largest request body accepted once decompressed
+MAX_REQUEST_BYTES = 64 * 1024 * 1024
+
+def _gunzip(data: bytes, limit: int = MAX_REQUEST_BYTES) -> bytes:
+    """Decompress a gzip request body, refusing to inflate past ``limit`` bytes."""
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    body = decompressor.decompress(data, limit + 1)
+    if len(body) > limit or decompressor.unconsumed_tail:
+        raise ValueError(f"Decompressed body exceeds {limit} bytes")
+    if not decompressor.eof:
+        raise ValueError("Truncated gzip body")
+    return body
+
+def _error(status: int, message: str, error_type: str, headers: Optional[Dict[str, str]] = None) -> JSONResponse:
+    """Build an OpenAI-style error body."""
+    return JSONResponse(
+        status_code=status,
+        content={"error": {"message": message, "type": error_type, "code": status}},
+        headers=headers,
+    )
+
+def split_request(model_type: ModelType, body: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """Translate an OpenAI chat completion body into LLMClient.generate arguments."""
+    messages = body["messages"]
+    params: Dict[str, Any] = {
+        "max_tokens": body.get("max_tokens"),
+        "temperature": body.get("temperature", 0.7),
+        "top_p": body.get("top_p", 0.95),
+    }
+    reserved = {"model", "messages", "stream", "max_tokens", "temperature", "top_p"}
+    # Claude gets the fields it has an equivalent for, OpenAI everything
+    claude = get_provider(model_type) == "anthropic"
+    params.update({k: v for k, v in body.items() if k not in reserved and (not claude or k in CLAUDE_PARAM_MAP)})
+    return provider_params(model_type, messages, params)
+
+def claude_to_openai(data: Dict[str, Any], model: str) -> Dict[str, Any]:
+    """Convert a Claude messages response into a chat.completion object."""
+    text = "".join(
+        block.get("text", "")
+        for block in data.get("content", [])
+        if block.get("type", "text") == "text"
+    )
+    usage = data.get("usage", {})
+    cached_tokens = usage.get("cache_read_input_tokens") or 0
+    # OpenAI's prompt_tokens include cached ones; Claude reports them apart
+    prompt_tokens = usage.get("input_tokens", 0) + cached_tokens + (usage.get("cache_creation_input_tokens") or 0)
+    completion_tokens = usage.get("output_tokens", 0)
+    completion = {
+        "id": data.get("id") or f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": text},
+            "finish_reason": CLAUDE_STOP_REASONS.get(data.get("stop_reason"), "stop"),
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+    if cached_tokens:
+        completion["usage"]["prompt_tokens_details"] = {"cached_tokens": cached_tokens}
+    return completion
+
+async def passthrough_stream(response, release: Optional[Callable] = None) -> AsyncIterator[bytes]:
+    """Relay provider SSE bytes as they arrive, without re-framing."""
+    try:
+        async for chunk in response.content.iter_any():
+            yield chunk
+    finally:
+        if release is not None:
+            # Also gives the client's key and concurrency slot back
+            release(response)
+        else:
+            response.close()
+
+async def claude_stream_to_openai(response, model: str, release: Optional[Callable] = None) -> AsyncIterator[bytes]:
+    """Translate a Claude event stream into chat.completion.chunk events, line by line."""
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    created = int(time.time())
+
+    def chunk(delta: Dict[str, Any], finish_reason: Optional[str] = None) -> bytes:
+        event = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        return b"data: " + json.dumps(event).encode() + b"\n\n"
+
+    try:
+        yield chunk({"role": "assistant"})
+        finish_reason = "stop"
+        async for line in response.content:
+            if not line.startswith(b"data: "):
+                continue
+            event = json.loads(line[6:])
+            event_type = event.get("type")
+            if event_type == "content_block_delta":
+                text = event.get("delta", {}).get("text")
+                if text:
+                    yield chunk({"content": text})
+            elif event_type == "message_delta":
+                stop_reason = event.get("delta", {}).get("stop_reason")
+                finish_reason = CLAUDE_STOP_REASONS.get(stop_reason, finish_reason)
+            elif event_type == "message_stop":
+                break
+        yield chunk({}, finish_reason)
+        yield b"data: [DONE]\n\n"
+    finally:
+        if release is not None:
+            # Also gives the client's key and concurrency slot back
+            release(response)
+        else:
+            response.close()
+
+class ReleasingStreamingResponse(StreamingResponse):
+    """
+    A StreamingResponse that calls ``release`` however sending ends. The body
+    iterator's own cleanup never runs if the client disconnects before
+    iteration starts, which would leave the upstream key and slot held.
+    """
+
+    def __init__(self, content, release: Callable[[], None], **kwargs):
+        super().__init__(content, **kwargs)
+        self.release = release
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.release()
+
+def create_app(
+    client_factory: Optional[Callable[[], LLMClient]] = None,
+    cache: Union[CacheManager, None, Literal[False]] = None,
+    rate_limiter: Optional[RateLimiter] = None,
+    metrics: Optional[MetricsRegistry] = None,
+    settings=None,
+) -> FastAPI:
+    """
+    Create the OpenAI-compatible gateway application.
+
+    One LLMClient (and its connection pool) is shared by every request the
+    process serves, and caching, rate limiting and metrics are applied here
+    rather than in each calling service. With CACHE_BACKEND=sqlite every
+    worker process on the host shares one response cache and its in-flight
+    leases, so identical requests arriving at different workers are sent
+    upstream once.
+
+    Args:
+        client_factory: Builds the LLMClient entered for the app's lifetime;
+            defaults to one tracing requests as TRACE_EXPORTER configures
+        cache: Response cache; defaults to a CacheManager when caching is
+            enabled, False disables caching regardless of settings
+        rate_limiter: Per-caller limiter; defaults to RATE_LIMIT requests/minute
+        metrics: Registry exposed on /metrics
+        settings: Settings instance; defaults to the global settings
+    """
+    if settings is None:
+        from config.settings import get_settings
+        settings = get_settings()
+    owned_cache = None
+    if cache is False:
+        cache = None
+    elif cache is None and settings.CACHE_ENABLED:
+        cache = owned_cache = cache_from_settings(settings)
+    if rate_limiter is None:
+        rate_limiter = RateLimiter(settings.rate_limit_per_minute)
+    registry = metrics or get_registry()
+    manager = ModelManager()
+    tracer = None
+    if client_factory is None:
+        tracer = tracer_from_settings(settings)
+        client_factory = lambda: LLMClient(tracer=tracer)
+
+    requests_total = registry.counter("llm_gateway_requests_total", "Gateway requests by model and status")
+    cache_total = registry.counter("llm_gateway_cache_total", "Gateway cache lookups by result")
+    cost_total = registry.counter("llm_gateway_cost_dollars_total", "Estimated spend by model")
+    upstream_seconds = registry.histogram("llm_gateway_upstream_seconds", "Time waiting on the provider")
+    overhead_seconds = registry.histogram(
+        "llm_gateway_overhead_seconds",
+        "Gateway time excluding the provider call",
+        buckets=OVERHEAD_BUCKETS,
+    )
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        async with client_factory() as client:
+            app.state.client = client
+            yield
+        if tracer is not None:
+            tracer.close()
+        if owned_cache is not None:
+            await owned_cache.close()
+
+    app = FastAPI(title="LLM API Gateway", lifespan=lifespan)
+    app.state.cache = cache
+    app.state.rate_limiter = rate_limiter
+    app.state.metrics = registry
+    app.state.manager = manager
+    # Identical cacheable requests in flight in this process share one upstream call
+    pending: Dict[str, asyncio.Future] = {}
+
+    @app.get("/v1/models")
+    async def list_models():
+        return {
+            "object": "list",
+            "data": [{"id": m.value, "object": "model", "owned_by": "llm-api-interface"} for m in ModelType],
+        }
+
+    @app.get("/metrics")
+    async def prometheus_metrics():
+        return Response(registry.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        started = time.perf_counter()
+        raw = await request.body()
+        encoding = request.headers.get("content-encoding", "identity").lower()
+        if encoding == "gzip":
+            try:
+                raw = _gunzip(raw)
+            except (ValueError, zlib.error) as e:
+                return _error(400, f"Invalid gzip body: {e}", "invalid_request_error")
+        elif encoding != "identity":
+            return _error(415, f"Unsupported content-encoding: {encoding}", "invalid_request_error")
+        try:
+            body = json.loads(raw)
+            model = body["model"]
+            body["messages"]
+        except (ValueError, KeyError, TypeError):
+            return _error(400, "Request must be JSON with 'model' and 'messages'", "invalid_request_error")
+        try:
+            model_type = ModelType(model)
+        except ValueError:
+            requests_total.inc(model=str(model), status=404)
+            return _error(404, f"The model '{model}' does not exist", "invalid_request_error")
+
+        caller = request.headers.get("authorization") or (request.client.host if request.client else "anonymous")
+        retry_after = rate_limiter.try_acquire(caller)
+        if retry_after:
+            requests_total.inc(model=model, status=429)
+            return _error(
+                429, "Rate limit exceeded", "rate_limit_error",
+                headers={"Retry-After": str(max(1, int(retry_after + 0.999)))},
+            )
+
+        stream = bool(body.get("stream", False))
+        messages, params = split_request(model_type, body)
+        use_cache = (
+            cache is not None
+            and not stream
+            and "no-cache" not in request.headers.get("cache-control", "")
+        )
+
+        def cache_hit(cached: Dict[str, Any], kind: str) -> JSONResponse:
+            cache_total.inc(result=kind)
+            requests_total.inc(model=model, status=200)
+            overhead = time.perf_counter() - started
+            overhead_seconds.observe(overhead, model=model)
+            return JSONResponse(cached, headers={
+                "x-cache": "hit",
+                "server-timing": f"gateway;dur={overhead * 1000:.3f}",
+            })
+
+        cache_key = None
+        claimed = False
+        if use_cache:
+            cached = await cache.aget(model, messages, params)
+            if cached is not None:
+                return cache_hit(cached, "hit")
+
+            cache_key = cache._get_cache_key(model, messages, params)
+            leader = pending.get(cache_key)
+            if leader is not None:
+                cached = await asyncio.shield(leader)
+                if cached is not None:
+                    return cache_hit(cached, "coalesced")
+            else:
+                # Registered before claiming, so identical requests arriving
+                # during the claim wait on this one
+                leader = pending[cache_key] = asyncio.get_running_loop().create_future()
+                try:
+                    claimed = await asyncio.to_thread(cache.claim, model, messages, params)
+                    if not claimed:
+                        # Another worker is already computing this entry
+                        cached = await cache.wait(model, messages, params, timeout=settings.api_timeout)
+                        if cached is not None:
+                            pending.pop(cache_key, None)
+                            leader.set_result(cached)
+                            return cache_hit(cached, "shared_wait")
+                except BaseException:
+                    pending.pop(cache_key, None)
+                    if not leader.done():
+                        leader.set_result(None)
+                    raise
+            cache_total.inc(result="miss")
+            if cache_key not in pending:
+                pending[cache_key] = asyncio.get_running_loop().create_future()
+
+        try:
+            return await _complete(request, model, model_type, messages, params, stream, started, use_cache, cache_key)
+        finally:
+            if cache_key is not None:
+                leader = pending.pop(cache_key, None)
+                if leader is not None and not leader.done():
+                    leader.set_result(None)
+            if claimed:
+                await asyncio.to_thread(cache.release, model, messages, params)
+
+    async def _complete(request, model, model_type, messages, params, stream, started, use_cache, cache_key):
+        """Send the request upstream and build the response."""
+        client = request.app.state.client
+        upstream_started = time.perf_counter()
+        try:
+            # The caller's request id tags the upstream request's logs and trace
+            upstream_params = dict(params)
+            if request.headers.get("x-request-id"):
+                upstream_params["request_id"] = request.headers["x-request-id"]
+            result = await client.generate(model_type=model_type, messages=messages, stream=stream, **upstream_params)
+        except RateLimitError as e:
+            requests_total.inc(model=model, status=429)
+            return _error(429, str(e), "rate_limit_error")
+        except TokenLimitError as e:
+            requests_total.inc(model=model, status=400)
+            return _error(400, str(e), "invalid_request_error")
+        except APIError as e:
+            requests_total.inc(model=model, status=502)
+            logger.warning("Upstream error for %s: %s", model, e)
+            return _error(502, str(e), "upstream_error")
+        upstream = time.perf_counter() - upstream_started
+        upstream_seconds.observe(upstream, model=model)
+
+        if stream:
+            requests_total.inc(model=model, status=200)
+            if get_provider(model_type) == "anthropic":
+                body_iter = claude_stream_to_openai(result, model)
+            else:
+                body_iter = passthrough_stream(result)
+            overhead_seconds.observe(time.perf_counter() - started - upstream, model=model)
+            return ReleasingStreamingResponse(
+                body_iter,
+                release=lambda: client.release_stream(result),
+                media_type="text/event-stream",
+                headers={"cache-control": "no-cache"},
+            )
+
+        if isinstance(result, LLMResponse):
+            result = result.to_dict()
+        if get_provider(model_type) == "anthropic":
+            completion = claude_to_openai(result, model)
+        else:
+            completion = result
+
+        if result.get("usage"):
+            input_tokens, output_tokens = LLMClient.extract_usage(model_type, result)
+            cache_read, cache_write = LLMClient.extract_cache_usage(model_type, result)
+            manager.log_usage(model_type, input_tokens, output_tokens, cache_read, cache_write)
+            cost_total.inc(
+                manager.calculate_cost(
+                    model_type, input_tokens, output_tokens,
+                    cache_read_tokens=cache_read, cache_write_tokens=cache_write,
+                ),
+                model=model,
+            )
+        if use_cache:
+            await cache.aset(model, messages, completion, params)
+            leader = pending.get(cache_key)
+            if leader is not None and not leader.done():
+                leader.set_result(completion)
+
+        requests_total.inc(model=model, status=200)
+        overhead = time.perf_counter() - started - upstream
+        overhead_seconds.observe(overhead, model=model)
+        return JSONResponse(completion, headers={
+            "x-cache": "miss" if use_cache else "bypass",
+            "server-timing": f"upstream;dur={upstream * 1000:.3f}, gateway;dur={overhead * 1000:.3f}",
+        })
+
+    return app
+
+def serve_app() -> FastAPI:
+    """App factory for ``llm-cli serve``: queued logging as LOG_* configures, then ``create_app()``."""
+    from utils.log.setup import configure_logging
+    configure_logging()
+    return create_app()
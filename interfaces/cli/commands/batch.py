@@ -0,0 +1,131 @@
+# interfaces/cli/commands/batch.py
+from pathlib import Path
+from typing import Optional
+
+import typer
+
+from core.models.config import ModelType
+from interfaces.cli.console import console
+
+app = typer.Typer(help="Offline batch jobs")
+
+def _format_eta(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "--:--"
+    minutes, secs = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes:02d}:{secs:02d}"
+
+@app.command("run")
+def run(
+    input_path: Path = typer.Argument(..., exists=True, dir_okay=False, help="Input JSONL file"),
+    output: Path = typer.Option(..., "--output", "-o", help="Output JSONL file (also the resume checkpoint)"),
+    model: Optional[str] = typer.Option(None, "--model", "-m", help="Model for lines without a 'model' field"),
+    concurrency: int = typer.Option(8, "--concurrency", "-c", help="Max concurrent requests per provider (0 adapts to provider load)"),
+    max_retries: Optional[int] = typer.Option(None, help="Retries per item (default: MAX_RETRIES)"),
+    provider_batch: bool = typer.Option(
+        False, "--provider-batch", help="Send through the providers' discounted asynchronous batch endpoints"
+    ),
+    straggler_timeout: Optional[float] = typer.Option(
+        None, help="With --provider-batch: seconds to wait before sending unfinished items synchronously"
+    ),
+    poll_interval: float = typer.Option(30.0, help="With --provider-batch: initial seconds between status polls"),
+    pack: int = typer.Option(
+        0, "--pack", help="Combine up to N small prompts sharing instructions into one request (0 disables)"
+    ),
+):
+    """Run a JSONL file of prompts, resuming where a previous run stopped"""
+    import asyncio
+    from rich.progress import Progress, BarColumn, MofNCompleteColumn, TextColumn
+    from core.api.client import LLMClient
+    from core.batch.packing import PromptPacker
+    from core.batch.provider import ProviderBatchClient
+    from core.batch.runner import BatchRunner
+    from config.settings import get_settings
+
+    default_model = None
+    if model is not None:
+        try:
+            default_model = ModelType(model)
+        except ValueError:
+            console.print(f"[red]Invalid model: {model}[/red]")
+            raise typer.Exit(code=1)
+
+    if pack and provider_batch:
+        console.print("[red]--pack applies to synchronous runs only; drop --provider-batch[/red]")
+        raise typer.Exit(code=1)
+    if pack == 1 or pack < 0:
+        console.print("[red]--pack needs at least 2 items per request[/red]")
+        raise typer.Exit(code=1)
+
+    if concurrency < 0:
+        console.print("[red]--concurrency must be 0 (adaptive) or more[/red]")
+        raise typer.Exit(code=1)
+
+    retries = max_retries if max_retries is not None else get_settings().max_retries
+
+    progress = Progress(
+        TextColumn("[bold]batch"),
+        BarColumn(),
+        MofNCompleteColumn(),
+        TextColumn("{task.fields[rate]:.1f} items/s  ETA {task.fields[eta]}  ${task.fields[cost]:.4f}"),
+        TextColumn("[red]{task.fields[failed]} failed"),
+        console=console.get(),
+    )
+
+    async def run_job():
+        with progress:
+            task_id = progress.add_task("batch", total=None, rate=0.0, eta="--:--", cost=0.0, failed=0)
+
+            def on_progress(stats):
+                progress.update(
+                    task_id,
+                    total=stats.total,
+                    completed=stats.skipped + stats.done,
+                    rate=stats.throughput,
+                    eta=_format_eta(stats.eta),
+                    cost=stats.cost,
+                    failed=stats.failed,
+                )
+
+            async with LLMClient() as client:
+                runner = BatchRunner(
+                    client,
+                    concurrency=concurrency or None,
+                    max_retries=retries,
+                    default_model=default_model,
+                    on_progress=on_progress,
+                    provider_batch=(
+                        ProviderBatchClient(client, poll_interval=poll_interval, fallback_concurrency=concurrency or 8)
+                        if provider_batch else None
+                    ),
+                    straggler_timeout=straggler_timeout,
+                    packer=PromptPacker(max_items=pack) if pack else None,
+                )
+                stats = await runner.run(input_path, output)
+                on_progress(stats)
+                return stats
+
+    try:
+        stats = asyncio.run(run_job())
+    except KeyboardInterrupt:
+        console.print("[yellow]Interrupted; rerun the same command to resume[/yellow]")
+        raise typer.Exit(code=130)
+
+    console.print(
+        f"Completed {stats.completed}, skipped {stats.skipped} already done, "
+        f"failed {stats.failed}. Total cost: ${stats.cost:.4f}"
+    )
+    if stats.packed_requests:
+        console.print(
+            f"Packed {stats.packed_items} items into {stats.packed_requests} requests; "
+            f"{stats.unpacked} resent individually"
+        )
+    if stats.cache_read_tokens or stats.cache_write_tokens:
+        console.print(
+            f"Prompt cache: {stats.cache_read_tokens} tokens read, {stats.cache_write_tokens} written, "
+            f"${stats.cache_savings:.4f} saved"
+        )
+    if stats.failed:
+        console.print(f"[yellow]Failures written to {output}.errors.jsonl; rerun to retry them[/yellow]")
+        raise typer.Exit(code=2)
@@ -0,0 +1,123 @@
+# interfaces/cli/commands/bench.py
+import json
+from pathlib import Path
+from typing import Optional
+
+import typer
+
+from interfaces.cli.console import console
+
+def bench(
+    base_url: Optional[str] = typer.Option(
+        None, "--base-url", help="Endpoint serving /v1/messages and /v1/chat/completions (default: a local mock server)"
+    ),
+    transport: str = typer.Option("http", help="With the mock: 'inprocess' skips sockets to measure client overhead alone"),
+    mode: str = typer.Option("closed", help="closed: keep --concurrency in flight; open: send at --rate"),
+    concurrency: int = typer.Option(8, "--concurrency", "-c", help="Workers (closed) or in-flight cap (open)"),
+    rate: float = typer.Option(0.0, help="Open loop: requests per second"),
+    requests: Optional[int] = typer.Option(
+        None, "--requests", "-n", help="Measured requests (default: 1000 unless --duration is set)"
+    ),
+    duration: Optional[float] = typer.Option(None, help="Stop after this many seconds"),
+    warmup: int = typer.Option(50, help="Unmeasured requests sent first"),
+    mix: str = typer.Option("gpt-4o", help="Models with optional weights, e.g. gpt-4o:3,claude-3-5-sonnet-20241022:1"),
+    prompt_tokens: str = typer.Option("64", help="Prompt sizes in tokens, comma-separated, drawn evenly"),
+    max_tokens: int = typer.Option(256, help="max_tokens per request"),
+    stream_fraction: float = typer.Option(0.0, help="Share of streaming requests (0-1)"),
+    adaptive: bool = typer.Option(False, help="Keep the client's adaptive concurrency limit on"),
+    mock_latency: str = typer.Option("fixed:0.05", help="Mock latency distribution, e.g. lognormal:0.2,0.5"),
+    mock_tokens_per_second: float = typer.Option(0.0, help="Mock streaming pace"),
+    mock_output_tokens: int = typer.Option(64, help="Tokens per mock response"),
+    mock_rate_429: float = typer.Option(0.0, help="Share of mock requests answered with 429"),
+    seed: int = typer.Option(0, help="Seed for the request mix and arrivals"),
+    output: Optional[Path] = typer.Option(None, "--output", "-o", help="Write results as JSON"),
+):
+    """Measure LLMClient throughput and latency under load"""
+    import asyncio
+    import logging
+    import os
+    from rich.table import Table
+    from core.api.client import LLMClient
+    from core.api.transport import InProcessTransport
+    from utils.bench.loadgen import LoadConfig, LoadGenerator, parse_mix, start_mock_server
+
+    try:
+        config = LoadConfig(
+            mix=parse_mix(mix, [int(n) for n in prompt_tokens.split(",")], max_tokens, stream_fraction),
+            mode=mode,
+            concurrency=concurrency,
+            rate=rate,
+            requests=requests if requests is not None or duration is not None else 1000,
+            duration=duration,
+            warmup=warmup,
+            seed=seed,
+        )
+    except ValueError as e:
+        console.print(f"[red]{e}[/red]")
+        raise typer.Exit(code=1)
+
+    mock_args = [
+        "--latency", mock_latency,
+        "--tokens-per-second", str(mock_tokens_per_second),
+        "--output-tokens", str(mock_output_tokens),
+        "--rate-429", str(mock_rate_429),
+        "--seed", str(seed),
+    ]
+    process = None
+    if base_url is None:
+        # The mock ignores credentials, but the client still needs keys
+        os.environ.setdefault("ANTHROPIC_API_KEY", "bench")
+        os.environ.setdefault("OPENAI_API_KEY", "bench")
+    if base_url is None and transport == "inprocess":
+        from utils.mock.server import MockProviderServer, MockConfig
+
+        server = MockProviderServer(MockConfig(
+            latency=mock_latency,
+            tokens_per_second=mock_tokens_per_second,
+            output_tokens=mock_output_tokens,
+            rate_429=mock_rate_429,
+            seed=seed,
+        ))
+        client = LLMClient(transport=InProcessTransport(server.handle), limiter=adaptive)
+    else:
+        if base_url is None:
+            process, base_url = start_mock_server(*mock_args)
+        base_url = base_url.rstrip("/")
+        client = LLMClient(
+            anthropic_base_url=f"{base_url}/v1/messages",
+            openai_base_url=f"{base_url}/v1/chat/completions",
+            limiter=adaptive,
+        )
+
+    async def run():
+        async with client:
+            return await LoadGenerator(client, config).run()
+
+    # Errors are counted in the report, not logged per request
+    logging.getLogger("core.api").setLevel(logging.CRITICAL)
+    try:
+        result = asyncio.run(run())
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    table = Table(title=f"{config.mode} loop, {result.sent} requests in {result.wall_seconds:.1f}s")
+    table.add_column("Metric")
+    table.add_column("Value", justify="right")
+    table.add_row("Throughput", f"{result.throughput:.1f} req/s")
+    for name, histogram in (("Latency", result.latency), ("TTFT", result.ttft)):
+        if histogram.count:
+            for label, value in histogram.percentiles().items():
+                table.add_row(f"{name} {label}", f"{value * 1000:.2f} ms")
+            table.add_row(f"{name} max", f"{histogram.max * 1000:.2f} ms")
+    table.add_row("Client CPU", f"{result.cpu_ms_per_request:.3f} ms/req")
+    if result.dropped:
+        table.add_row("Dropped (all slots busy)", str(result.dropped))
+    for error, count in result.errors.most_common():
+        table.add_row(f"Errors: {error}", str(count))
+    console.print(table)
+
+    if output is not None:
+        output.write_text(json.dumps(result.to_dict(), indent=2))
+        console.print(f"Results written to {output}")
@@ -0,0 +1,71 @@
+# interfaces/cli/commands/cache.py
+from pathlib import Path
+from typing import Optional, List
+
+import typer
+
+from interfaces.cli.console import console
+
+app = typer.Typer(help="Response cache maintenance")
+
+def _open_cache(backend: Optional[str]):
+    from config.settings import get_settings
+    from utils.cache.shared import cache_from_settings
+
+    settings = get_settings()
+    if backend is not None:
+        settings = settings.model_copy(update={"cache_backend": backend})
+    if settings.cache_backend not in ("file", "sqlite"):
+        console.print(f"[red]Snapshots support the file and sqlite caches, not {settings.cache_backend}[/red]")
+        raise typer.Exit(code=1)
+    return cache_from_settings(settings)
+
+def _format_size(size: int) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+@app.command("export")
+def export(
+    output: Path = typer.Argument(..., dir_okay=False, help="Snapshot file to write"),
+    model: Optional[List[str]] = typer.Option(None, "--model", "-m", help="Only entries for this model; repeatable"),
+    max_age_hours: Optional[float] = typer.Option(
+        None, "--max-age-hours", help="Only entries cached within this many hours (default: CACHE_TTL)"
+    ),
+    backend: Optional[str] = typer.Option(None, help="Cache to read: file or sqlite (default: CACHE_BACKEND)"),
+):
+    """Write the response cache to one compressed, indexed snapshot file"""
+    from utils.cache.snapshot import export_snapshot
+
+    cache = _open_cache(backend)
+    max_age = max_age_hours * 3600 if max_age_hours is not None else cache.settings.CACHE_TTL
+    stats = export_snapshot(cache, output, models=model or None, max_age=max_age)
+    console.print(
+        f"Exported {stats.entries} entries in {stats.blocks} blocks to {output} "
+        f"({_format_size(stats.bytes)}, {stats.elapsed:.2f}s)"
+    )
+    for name, count in sorted(stats.models.items()):
+        console.print(f"  {name}: {count}")
+
+@app.command("import")
+def import_(
+    snapshot: Path = typer.Argument(..., exists=True, dir_okay=False, help="Snapshot file from `cache export`"),
+    model: Optional[List[str]] = typer.Option(None, "--model", "-m", help="Only entries for this model; repeatable"),
+    backend: Optional[str] = typer.Option(None, help="Cache to fill: file or sqlite (default: CACHE_BACKEND)"),
+):
+    """Load a snapshot into the response cache, skipping expired and already cached entries"""
+    from utils.cache.snapshot import import_snapshot, SnapshotError
+
+    cache = _open_cache(backend)
+    try:
+        stats = import_snapshot(cache, snapshot, models=model or None)
+    except SnapshotError as e:
+        console.print(f"[red]{e}[/red]")
+        raise typer.Exit(code=1)
+    console.print(
+        f"Imported {stats.imported} of {stats.entries} entries in {stats.elapsed:.2f}s: "
+        f"{stats.expired} expired, {stats.duplicates} already cached, {stats.filtered} other models "
+        f"({stats.blocks} blocks read)"
+    )
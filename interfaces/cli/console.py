@@ -0,0 +1,21 @@
+# interfaces/cli/console.py
+from typing import Any
+
+class LazyConsole:
+    """Stands in for a rich Console, importing rich only when first used."""
+
+    def __init__(self):
+        self._console = None
+
+    def get(self):
+        """The underlying rich Console."""
+        if self._console is None:
+            from rich.console import Console
+
+            self._console = Console()
+        return self._console
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.get(), name)
+
+console = LazyConsole()
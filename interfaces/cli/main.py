@@ -1,19 +1,27 @@
 # interfaces/cli/main.py
 import typer
-from rich.console import Console
-from rich.table import Table
-from typing import Optional
-import asyncio
+from pathlib import Path
+from typing import Optional, List
 
-from core import ModelType, ModelManager, LLMClient
-from config.settings import settings
+from core.models.config import ModelType
+from core.models.manager import ModelManager
+from interfaces.cli.commands import batch, bench, cache
+from interfaces.cli.console import console
+
+# Startup cost matters for scripted and containerized use: aiohttp, rich
+# renderables and settings are imported inside the commands that need them.
+# Check with `python -m benchmarks.bench_import`.
 
 app = typer.Typer(help="LLM API Interface CLI")
-console = Console()
+app.add_typer(batch.app, name="batch")
+app.add_typer(cache.app, name="cache")
+app.command("bench")(bench.bench)
 
 @app.command()
 def list_models():
     """List available models and their capabilities"""
+    from rich.table import Table
+
     table = Table(show_lines=True)
     table.add_column("Model", width=30)
     table.add_column("Max Tokens", justify="right")
@@ -39,6 +47,9 @@ def chat(
     temperature: float = typer.Option(0.7, help="Temperature for sampling"),
 ):
     """Start an interactive chat session"""
+    import asyncio
+    from core.api.client import LLMClient
+
     try:
         model_type = ModelType(model)
     except ValueError:
@@ -93,5 +104,91 @@ def cost_estimate(
         list_models()
         raise typer.Exit(code=1)
 
+@app.command()
+def cost_plan(
+    workload_path: Path = typer.Argument(..., exists=True, dir_okay=False, help="CSV, JSONL or batch output of token counts"),
+    policy: Optional[List[str]] = typer.Option(
+        None, "--policy", "-p",
+        help="logged, cheapest, select[:priority] or a model name; repeatable (default: logged, select:balanced, select:speed, cheapest)",
+    ),
+    baseline: Optional[str] = typer.Option(None, help="Policy savings are measured against (default: the first)"),
+    as_json: bool = typer.Option(False, "--json", help="Print the plan as JSON"),
+):
+    """Price a logged workload on every model and under routing policies"""
+    import json
+    from rich.table import Table
+
+    try:
+        from core.models.planner import CostPlanner, load_workload, DEFAULT_POLICIES, PERCENTILES
+    except ImportError:
+        console.print("[red]cost-plan needs NumPy: pip install llm-api-interface[planning][/red]")
+        raise typer.Exit(code=1)
+
+    try:
+        workload = load_workload(workload_path)
+        plan = CostPlanner().plan(workload, policy or DEFAULT_POLICIES, baseline=baseline)
+    except (ValueError, KeyError, TypeError) as e:
+        console.print(f"[red]{e}[/red]")
+        raise typer.Exit(code=1)
+
+    if as_json:
+        typer.echo(json.dumps(plan.to_dict()))
+        return
+
+    totals = Table(title=f"{plan.requests} requests on each model")
+    totals.add_column("Model")
+    totals.add_column("Cost", justify="right")
+    for model, cost in plan.model_totals.items():
+        totals.add_row(model, f"${cost:,.4f}")
+    console.print(totals)
+
+    policies = Table(title=f"Routing policies (savings against {plan.baseline})")
+    policies.add_column("Policy", no_wrap=True)
+    policies.add_column("Total", justify="right")
+    policies.add_column("Savings", justify="right")
+    policies.add_column("Routing")
+    spread = Table(title="Cost per request")
+    spread.add_column("Policy", no_wrap=True)
+    for column in ["Mean", *(f"p{p}" for p in PERCENTILES), "Max"]:
+        spread.add_column(column, justify="right")
+    for result in plan.policies:
+        routing = ", ".join(f"{model}: {count}" for model, count in result.requests.items())
+        if result.unroutable:
+            routing += f", too long: {result.unroutable}"
+        policies.add_row(result.name, f"${result.total:,.4f}", f"${result.savings:,.4f}", routing)
+        spread.add_row(
+            result.name,
+            *(f"${value:.6f}" for value in (result.mean, *(result.percentiles[p] for p in PERCENTILES), result.max)),
+        )
+    console.print(policies)
+    console.print(spread)
+
+@app.command()
+def serve(
+    host: str = typer.Option("127.0.0.1", help="Interface to bind"),
+    port: int = typer.Option(8000, help="Port to listen on"),
+    workers: int = typer.Option(1, help="Worker processes; >1 shares one SQLite response cache"),
+    log_level: str = typer.Option("warning", help="Uvicorn log level"),
+):
+    """Run the OpenAI-compatible HTTP gateway"""
+    import os
+    import uvicorn
+    from config.settings import get_settings
+
+    if workers > 1 and get_settings().cache_backend == "file":
+        # Workers are separate processes; they only see each other's cache
+        # entries and in-flight requests through a shared store, so the
+        # per-process file cache is swapped for SQLite. Redis is shared already.
+        os.environ["CACHE_BACKEND"] = "sqlite"
+
+    uvicorn.run(
+        "interfaces.api.gateway:serve_app",
+        factory=True,
+        host=host,
+        port=port,
+        workers=workers,
+        log_level=log_level,
+    )
+
 if __name__ == "__main__":
     app()
\ No newline at end of file
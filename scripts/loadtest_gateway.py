@@ -0,0 +1,136 @@
+# scripts/loadtest_gateway.py
+"""
+Load test for the gateway's added latency.
+
+Starts a canned upstream on localhost, the gateway in front of it, and
+compares p50/p95 latency of calling the upstream directly through LLMClient
+against calling it through the gateway. The gateway's own overhead (handler
+time minus provider time, from its Server-Timing header) must stay under the
+budget at p50, otherwise the script exits non-zero.
+
+    python -m scripts.loadtest_gateway --requests 2000 --budget-ms 1.0
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import sys
+import time
+
+import aiohttp
+from aiohttp import web
+import uvicorn
+
+# The canned upstream ignores credentials, but the client still needs a key
+os.environ.setdefault("OPENAI_API_KEY", "load-test")
+
+from core.api.client import LLMClient
+from core.api.rate_limit import RateLimiter
+from core.models.config import ModelType
+from interfaces.api.gateway import create_app
+from utils.metrics.registry import MetricsRegistry
+
+CANNED = {
+    "id": "chatcmpl-load",
+    "object": "chat.completion",
+    "choices": [{"index": 0, "message": {"role": "assistant", "content": "ok"}, "finish_reason": "stop"}],
+    "usage": {"prompt_tokens": 8, "completion_tokens": 1, "total_tokens": 9},
+}
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+async def start_upstream(port: int) -> web.AppRunner:
+    async def completions(request):
+        await request.read()
+        return web.json_response(CANNED)
+
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", completions)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    return runner
+
+async def run(requests: int, warmup: int) -> dict:
+    upstream_port, gateway_port = free_port(), free_port()
+    upstream_url = f"http://127.0.0.1:{upstream_port}/v1/chat/completions"
+    upstream = await start_upstream(upstream_port)
+
+    app = create_app(
+        client_factory=lambda: LLMClient(openai_base_url=upstream_url),
+        # Every request would be a cache hit after the first; measure the proxy path
+        cache=False,
+        rate_limiter=RateLimiter(rate_per_minute=1e9),
+        metrics=MetricsRegistry(),
+    )
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=gateway_port, log_level="error"))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+
+    messages = [{"role": "user", "content": "ping"}]
+    direct, through, overhead = [], [], []
+    try:
+        async with LLMClient(openai_base_url=upstream_url) as client:
+            for i in range(warmup + requests):
+                started = time.perf_counter()
+                await client.generate(ModelType.GPT4O, messages, max_tokens=1)
+                if i >= warmup:
+                    direct.append(time.perf_counter() - started)
+
+        gateway_url = f"http://127.0.0.1:{gateway_port}/v1/chat/completions"
+        body = {"model": ModelType.GPT4O.value, "messages": messages, "max_tokens": 1}
+        async with aiohttp.ClientSession() as session:
+            for i in range(warmup + requests):
+                started = time.perf_counter()
+                async with session.post(gateway_url, json=body) as response:
+                    await response.read()
+                    timing = response.headers.get("server-timing", "")
+                if i >= warmup:
+                    through.append(time.perf_counter() - started)
+                    for part in timing.split(","):
+                        name, _, dur = part.strip().partition(";dur=")
+                        if name == "gateway":
+                            overhead.append(float(dur) / 1000)
+    finally:
+        server.should_exit = True
+        await server_task
+        await upstream.cleanup()
+
+    return {
+        "direct_p50_ms": statistics.median(direct) * 1000,
+        "direct_p95_ms": percentile(direct, 0.95) * 1000,
+        "gateway_p50_ms": statistics.median(through) * 1000,
+        "gateway_p95_ms": percentile(through, 0.95) * 1000,
+        "added_e2e_p50_ms": (statistics.median(through) - statistics.median(direct)) * 1000,
+        "overhead_p50_ms": statistics.median(overhead) * 1000,
+        "overhead_p95_ms": percentile(overhead, 0.95) * 1000,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=200)
+    parser.add_argument("--budget-ms", type=float, default=1.0, help="Max gateway overhead at p50")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.requests, args.warmup))
+    for name, value in results.items():
+        print(f"{name:>18}: {value:8.3f}")
+    # End-to-end figures include the extra loopback hop and HTTP parsing;
+    # the budget applies to what the gateway itself adds around the provider call
+    if results["overhead_p50_ms"] > args.budget_ms:
+        print(f"FAIL: gateway overhead p50 exceeds {args.budget_ms} ms")
+        sys.exit(1)
+    print("OK")
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,5 @@
 # tests/unit/test_api_client.py
+import json
 import pytest
 import aiohttp
 from unittest.mock import Mock, patch
@@ -13,6 +14,7 @@ def mock_response():
         def __init__(self, status=200, json_data=None):
             self._status = status
             self._json_data = json_data or {}
+            self.headers = {}
 
         @property
         def status(self):
@@ -21,6 +23,9 @@ def mock_response():
         async def json(self):
             return self._json_data
 
+        async def read(self):
+            return json.dumps(self._json_data).encode()
+
         async def __aenter__(self):
             return self
 
@@ -35,18 +40,22 @@ def mock_response():
 @pytest.fixture
 def mock_streaming_response():
     class MockStreamingResponse:
-        def __init__(self):
-            self.content = Mock()
-            async def async_iter():
-                for line in [
-                    b'data: {"choices":[{"delta":{"content":"Hello"}}]}',
-                    b'data: {"choices":[{"delta":{"content":" World"}}]}',
-                    b'data: [DONE]'
-                ]:
-                    yield line
-            
-            self.content.iter_lines = async_iter
+        def __init__(self, lines=None):
+            lines = lines or [
+                b'data: {"choices":[{"delta":{"content":"Hello"}}]}\n',
+                b'data: {"choices":[{"delta":{"content":" World"}}]}\n',
+                b'data: [DONE]\n'
+            ]
+
+            class Content:
+                # Mirrors aiohttp.StreamReader, which iterates line by line
+                async def __aiter__(self):
+                    for line in lines:
+                        yield line
+
+            self.content = Content()
             self.status = 200
+            self.headers = {}
             
         def close(self):
             pass
@@ -167,6 +176,27 @@ class TestLLMClient:
                 
                 assert chunks == ["Hello", " World"]
 
+    async def test_claude_streaming_response(self, mock_streaming_response):
+        mock_resp = mock_streaming_response([
+            b'event: message_start\n',
+            b'data: {"type":"message_start","message":{}}\n',
+            b'\n',
+            b'event: content_block_delta\n',
+            b'data: {"type":"content_block_delta","index":0,"delta":{"type":"text_delta","text":"Hello"}}\n',
+            b'data: {"type":"content_block_delta","index":0,"delta":{"type":"text_delta","text":" World"}}\n',
+            b'data: {"type":"message_stop"}\n',
+        ])
+
+        async with LLMClient() as client:
+            with patch.object(client._session, 'post', return_value=mock_resp):
+                response = await client.generate(
+                    model_type=ModelType.CLAUDE,
+                    messages=[{"role": "user", "content": "test"}],
+                    stream=True
+                )
+                chunks = [chunk async for chunk in client.stream_response(response)]
+                assert chunks == ["Hello", " World"]
+
     async def test_model_config_validation(self):
         client = LLMClient()
         
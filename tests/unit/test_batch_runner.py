@@ -0,0 +1,188 @@
+# tests/unit/test_batch_runner.py
+import asyncio
+import json
+import pytest
+from core.api.client import LLMClient, APIError, NetworkError, RateLimitError, TokenLimitError, DEFAULT_CLAUDE_MAX_TOKENS
+from core.api.transport import InProcessTransport
+from core.batch.runner import BatchRunner, load_checkpoint, BatchStats
+from core.models.config import ModelType
+from core.models.manager import ModelManager
+
+pytestmark = pytest.mark.asyncio
+
+class FakeClient:
+    extract_response = staticmethod(LLMClient.extract_response)
+    extract_usage = staticmethod(LLMClient.extract_usage)
+    extract_cache_usage = staticmethod(LLMClient.extract_cache_usage)
+
+    def __init__(self, delay=0.0, failures=None):
+        self.delay = delay
+        self.failures = dict(failures or {})
+        self.sent = []
+        self.in_flight = {"anthropic": 0, "openai": 0}
+        self.peak = {"anthropic": 0, "openai": 0}
+
+    async def generate(self, model_type, messages, **kwargs):
+        provider = "anthropic" if model_type == ModelType.CLAUDE else "openai"
+        self.in_flight[provider] += 1
+        self.peak[provider] = max(self.peak[provider], self.in_flight[provider])
+        try:
+            prompt = messages[0]["content"]
+            self.sent.append(prompt)
+            await asyncio.sleep(self.delay)
+            error = self.failures.get(prompt)
+            if error is not None:
+                if isinstance(error, list):
+                    if error:
+                        raise error.pop(0)
+                else:
+                    raise error
+            if model_type == ModelType.CLAUDE:
+                return {"content": [{"text": f"re:{prompt}"}], "usage": {"input_tokens": 100, "output_tokens": 10}}
+            return {
+                "choices": [{"message": {"content": f"re:{prompt}"}}],
+                "usage": {"prompt_tokens": 100, "completion_tokens": 10},
+            }
+        finally:
+            self.in_flight[provider] -= 1
+
+def write_input(path, n, model="gpt-4o"):
+    with open(path, "w") as f:
+        for i in range(n):
+            f.write(json.dumps({"id": f"item-{i}", "model": model, "prompt": f"p{i}"}) + "\n")
+
+def read_output(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+class TestBatchRunner:
+    async def test_runs_all_items(self, tmp_path):
+        input_path, output_path = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+        write_input(input_path, 10)
+        client = FakeClient()
+        stats = await BatchRunner(client, concurrency=3).run(input_path, output_path)
+
+        records = read_output(output_path)
+        assert stats.completed == 10 and stats.failed == 0
+        assert {r["id"] for r in records} == {f"item-{i}" for i in range(10)}
+        assert records[0]["text"].startswith("re:p")
+        expected = ModelManager().calculate_cost(ModelType.GPT4O, 100, 10)
+        assert stats.cost == pytest.approx(expected * 10)
+
+    async def test_resume_skips_completed(self, tmp_path):
+        input_path, output_path = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+        write_input(input_path, 6)
+        with open(output_path, "w") as f:
+            for i in range(3):
+                f.write(json.dumps({"id": f"item-{i}", "text": "done", "cost": 0.5}) + "\n")
+            f.write('{"id": "item-3", "te')  # torn write from a crash
+
+        client = FakeClient()
+        stats = await BatchRunner(client).run(input_path, output_path)
+
+        assert sorted(client.sent) == ["p3", "p4", "p5"]
+        assert stats.skipped == 3
+        assert stats.cost > 1.5
+        records = read_output(output_path)
+        assert len(records) == 6
+        assert len({r["id"] for r in records}) == 6
+
+    async def test_failures_written_and_retried_next_run(self, tmp_path):
+        input_path, output_path = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+        write_input(input_path, 3)
+        errors_path = tmp_path / "out.jsonl.errors.jsonl"
+
+        client = FakeClient(failures={"p1": TokenLimitError("too long")})
+        stats = await BatchRunner(client).run(input_path, output_path)
+        assert stats.failed == 1
+        assert json.loads(errors_path.read_text())["id"] == "item-1"
+
+        client = FakeClient()
+        stats = await BatchRunner(client).run(input_path, output_path)
+        assert client.sent == ["p1"]
+        assert stats.failed == 0
+        assert not errors_path.exists()
+
+    async def test_retries_rate_limits(self, tmp_path):
+        input_path, output_path = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+        write_input(input_path, 1)
+        client = FakeClient(failures={"p0": [RateLimitError("slow down"), RateLimitError("slow down")]})
+        stats = await BatchRunner(client, max_retries=3, retry_backoff=0.001).run(input_path, output_path)
+        assert stats.completed == 1
+        assert client.sent == ["p0", "p0", "p0"]
+
+    async def test_retries_only_transient_errors(self, tmp_path):
+        input_path, output_path = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+        write_input(input_path, 2)
+        client = FakeClient(failures={
+            "p0": [APIError("overloaded", status=503), NetworkError("reset"), asyncio.TimeoutError()],
+            "p1": APIError("bad request", status=400),
+        })
+        stats = await BatchRunner(client, max_retries=3, retry_backoff=0.001).run(input_path, output_path)
+        assert stats.completed == 1
+        assert stats.failed == 1
+        assert client.sent.count("p0") == 4
+        assert client.sent.count("p1") == 1
+
+    async def test_concurrency_bounded_per_provider(self, tmp_path):
+        input_path, output_path = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+        with open(input_path, "w") as f:
+            for i in range(20):
+                model = ModelType.CLAUDE.value if i % 2 else "gpt-4o"
+                f.write(json.dumps({"id": i, "model": model, "prompt": f"p{i}"}) + "\n")
+        client = FakeClient(delay=0.01)
+        await BatchRunner(client, concurrency={"anthropic": 2, "openai": 3}).run(input_path, output_path)
+        assert client.peak == {"anthropic": 2, "openai": 3}
+
+    async def test_invalid_lines_reported(self, tmp_path):
+        input_path, output_path = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+        input_path.write_text('{"prompt": "ok"}\nnot json\n{"model": "nope", "prompt": "x"}\n')
+        stats = await BatchRunner(FakeClient(), default_model=ModelType.GPT4O).run(input_path, output_path)
+        assert stats.completed == 1
+        assert stats.failed == 2
+
+    async def test_progress_callback(self, tmp_path):
+        input_path, output_path = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+        write_input(input_path, 4)
+        seen = []
+        stats = await BatchRunner(FakeClient(), on_progress=lambda s: seen.append(s.done)).run(input_path, output_path)
+        assert seen == [1, 2, 3, 4]
+        assert stats.total == 4
+        assert stats.remaining == 0
+        assert stats.throughput > 0
+
+async def test_load_checkpoint_missing_file(tmp_path):
+    assert load_checkpoint(tmp_path / "missing.jsonl", BatchStats()) == set()
+
+async def test_load_checkpoint_skips_records_without_id(tmp_path):
+    path = tmp_path / "out.jsonl"
+    path.write_text('{"id": "a", "cost": 0.5}\n{"cost": 9.0}\n[1, 2]\n{"id": "b"}\n')
+    stats = BatchStats()
+    assert load_checkpoint(path, stats) == {"a", "b"}
+    assert stats.cost == 0.5
+
+async def test_params_translated_per_provider(tmp_path, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "sk-ant-test")
+    payloads = {}
+
+    async def reply(request):
+        payloads[request.payload["model"]] = request.payload
+        if "claude" in request.payload["model"]:
+            return {"content": [{"type": "text", "text": "ok"}], "usage": {"input_tokens": 1, "output_tokens": 1}}
+        return {"choices": [{"message": {"content": "ok"}}], "usage": {"prompt_tokens": 1, "completion_tokens": 1}}
+
+    input_path, output_path = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    with open(input_path, "w") as f:
+        for model in ("gpt-4o", "claude-3-5-sonnet-20241022"):
+            f.write(json.dumps({"id": model, "model": model, "prompt": "hi", "system": "Be brief.", "stop": "END"}) + "\n")
+    async with LLMClient(transport=InProcessTransport(reply)) as client:
+        stats = await BatchRunner(client).run(input_path, output_path)
+    assert stats.completed == 2
+
+    openai = payloads["gpt-4o"]
+    assert openai["messages"] == [{"role": "system", "content": "Be brief."}, {"role": "user", "content": "hi"}]
+    assert openai["stop"] == "END" and "system" not in openai and "stop_sequences" not in openai
+    claude = payloads["claude-3-5-sonnet-20241022"]
+    assert claude["system"] == "Be brief." and claude["messages"] == [{"role": "user", "content": "hi"}]
+    assert claude["stop_sequences"] == ["END"] and "stop" not in claude
+    assert claude["max_tokens"] == DEFAULT_CLAUDE_MAX_TOKENS
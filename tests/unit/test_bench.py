@@ -0,0 +1,91 @@
+# tests/unit/test_bench.py
+import json
+import random
+import pytest
+from typer.testing import CliRunner
+from core.api.client import LLMClient
+from core.api.transport import InProcessTransport
+from core.models.config import ModelType
+from interfaces.cli.main import app
+from utils.bench.hdr import HdrHistogram
+from utils.bench.loadgen import LoadConfig, LoadGenerator, MixEntry, parse_mix
+from utils.mock.server import MockProviderServer, MockConfig
+
+def test_hdr_percentiles_within_precision():
+    rng = random.Random(1)
+    samples = sorted(rng.lognormvariate(-3, 1) for _ in range(20000))
+    histogram = HdrHistogram(significant_digits=3)
+    for sample in samples:
+        histogram.record(sample)
+    for q in (50, 90, 99, 99.9):
+        exact = samples[int(q / 100 * len(samples)) - 1]
+        assert histogram.percentile(q) == pytest.approx(exact, rel=2e-3, abs=2e-6)
+    assert histogram.percentile(100) == histogram.max == samples[-1]
+
+def test_hdr_merge_and_round_trip():
+    first, second = HdrHistogram(), HdrHistogram()
+    for i in range(100):
+        (first if i % 2 else second).record(i / 1000)
+    first.merge(second)
+    restored = HdrHistogram.from_dict(json.loads(json.dumps(first.to_dict())))
+    assert restored.count == 100
+    assert restored.percentile(50) == pytest.approx(0.049, rel=1e-3)
+    with pytest.raises(ValueError):
+        first.merge(HdrHistogram(significant_digits=2))
+
+def test_parse_mix_weights():
+    mix = parse_mix("gpt-4o:3,claude-3-5-sonnet-20241022", [10, 100], stream_fraction=0.5)
+    assert len(mix) == 8
+    assert sum(e.weight for e in mix if e.model_type == ModelType.GPT4O) == pytest.approx(3)
+    assert {e.prompt_tokens for e in mix} == {10, 100}
+    with pytest.raises(ValueError):
+        parse_mix("gpt-5", [10])
+
+def test_config_validation():
+    with pytest.raises(ValueError):
+        LoadConfig([MixEntry(ModelType.GPT4O)], mode="open")
+    with pytest.raises(ValueError):
+        LoadConfig([MixEntry(ModelType.GPT4O)], requests=None)
+
+async def run_load(config, **mock):
+    server = MockProviderServer(MockConfig(**mock))
+    async with LLMClient(transport=InProcessTransport(server.handle), limiter=False) as client:
+        return await LoadGenerator(client, config).run(), server
+
+@pytest.mark.asyncio
+async def test_closed_loop_counts_errors_and_ttft():
+    mix = [MixEntry(ModelType.GPT4O, stream=True), MixEntry(ModelType.CLAUDE)]
+    result, server = await run_load(LoadConfig(mix, concurrency=4, requests=200), rate_429=0.1, seed=2)
+    assert result.sent == 200
+    assert result.completed + sum(result.errors.values()) == 200
+    assert result.errors["RateLimitError"] == server.stats["openai_429"] + server.stats["anthropic_429"] > 0
+    assert result.latency.count == result.completed
+    assert 0 < result.ttft.count <= result.by_entry["gpt-4o/64/stream"]
+    assert result.cpu_seconds > 0
+    data = result.to_dict()
+    assert data["config"]["mix"][0]["stream"] is True and data["latency"]["p99"] > 0
+
+@pytest.mark.asyncio
+async def test_open_loop_drops_when_saturated():
+    config = LoadConfig([MixEntry(ModelType.GPT4O)], mode="open", rate=500, concurrency=2, requests=60)
+    result, _ = await run_load(config, latency="fixed:0.05")
+    assert result.sent + result.dropped == 60
+    assert result.dropped > 0
+    # Latency is measured from the scheduled start, so queueing is included
+    assert result.latency.percentile(50) >= 0.05
+
+def test_bench_command(tmp_path):
+    output = tmp_path / "bench.json"
+    result = CliRunner().invoke(app, [
+        "bench", "--transport", "inprocess", "-n", "40", "--warmup", "0",
+        "--mock-latency", "fixed:0", "--stream-fraction", "0.5", "-o", str(output),
+    ])
+    assert result.exit_code == 0, result.stdout
+    assert "Throughput" in result.stdout
+    report = json.loads(output.read_text())
+    assert report["sent"] == 40 and report["ttft"]["count"] > 0
+
+def test_bench_command_rejects_open_loop_without_rate():
+    result = CliRunner().invoke(app, ["bench", "--mode", "open"])
+    assert result.exit_code == 1
+    assert "rate" in result.stdout
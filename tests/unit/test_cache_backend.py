@@ -0,0 +1,148 @@
+# tests/unit/test_cache_backend.py
+import asyncio
+import threading
+import time
+import pytest
+from config.settings import Settings
+from utils.cache.backend import FileBackend
+from utils.cache.manager import CacheManager
+from utils.cache.shared import SqliteBackend
+from utils.cache.resp import RedisBackend, RespError, RespProtocolError, encode_command, parse_reply, INCOMPLETE
+from utils.mock.resp_server import FakeRespServer
+
+pytestmark = pytest.mark.asyncio
+
+MESSAGES = [{"role": "user", "content": "test"}]
+
+@pytest.fixture
+def settings(monkeypatch):
+    settings = Settings()
+    monkeypatch.setattr(settings, "CACHE_ENABLED", True)
+    monkeypatch.setattr(settings, "CACHE_TTL", 3600)
+    return settings
+
+async def test_parse_reply_handles_partial_input():
+    reply = b"*3\r\n$3\r\nabc\r\n$-1\r\n:42\r\n"
+    assert parse_reply(reply) == ([b"abc", None, 42], len(reply))
+    for cut in range(len(reply)):
+        assert parse_reply(reply[:cut])[0] is INCOMPLETE
+    assert isinstance(parse_reply(b"-ERR boom\r\n")[0], RespError)
+    assert parse_reply(encode_command("SET", "k", b"v\r\n"))[0] == [b"SET", b"k", b"v\r\n"]
+    for garbage in (b"?what\r\n", b"$x\r\n", b"*1\r\n:1.5\r\n"):
+        with pytest.raises(RespProtocolError):
+            parse_reply(garbage)
+
+@pytest.mark.parametrize("kind", ["file", "sqlite", "redis"])
+async def test_backend_protocol(kind, tmp_path):
+    async with FakeRespServer() as server:
+        if kind == "file":
+            backend = FileBackend(tmp_path)
+        elif kind == "sqlite":
+            backend = SqliteBackend(tmp_path / "cache.sqlite3")
+        else:
+            backend = RedisBackend.from_url(server.url)
+        await backend.set_many({"a": b"1", "b": b"22"}, ttl=60)
+        a, missing, b = await backend.get_many(["a", "missing", "b"])
+        assert missing is None
+        assert (a.value, a.size, b.value, b.size) == (b"1", 1, b"22", 2)
+        if kind != "file":
+            assert b.expires_at == pytest.approx(time.time() + 60, abs=1)
+        assert sorted([key async for key in backend.scan()]) == ["a", "b"]
+        assert await backend.delete_many(["a", "missing"]) == 1
+        await backend.clear()
+        assert await backend.get("b") is None
+        await backend.close()
+
+async def test_redis_batches_are_pipelined_over_pooled_connections():
+    async with FakeRespServer(delay=0.05) as server:
+        backend = RedisBackend.from_url(server.url, max_connections=4)
+        items = {f"k{i}": b"x" * i for i in range(100)}
+        started = time.monotonic()
+        await backend.set_many(items, ttl=60)
+        records = await backend.get_many(list(items))
+        # Two round trips, not 300
+        assert time.monotonic() - started < 0.5
+        assert [r.size for r in records] == list(range(100))
+
+        await asyncio.gather(*(backend.get_many(["k1", "k2"]) for _ in range(40)))
+        assert backend.pool.opened <= 4
+        assert server.stats["connections"] == backend.pool.opened
+        await backend.close()
+
+async def test_redis_expiry_auth_and_reconnect():
+    async with FakeRespServer(password="s3cret") as server:
+        with pytest.raises(RespError):
+            await RedisBackend.from_url(server.url.replace("s3cret", "wrong")).get("a")
+        backend = RedisBackend.from_url(server.url)
+        await backend.set("short", b"v", ttl=0.05)
+        await backend.set("long", b"v")
+        await asyncio.sleep(0.1)
+        assert await backend.get("short") is None
+        assert (await backend.get("long")).expires_at is None
+
+        server.drop_connections()
+        await asyncio.sleep(0.01)
+        assert (await backend.get("long")).value == b"v"
+        await backend.close()
+
+async def test_redis_out_of_step_or_slow_connections_are_closed():
+    async def garbage(reader, writer):
+        await reader.read(65536)
+        writer.write(b"?not a reply\r\n")
+        await writer.drain()
+
+    server = await asyncio.start_server(garbage, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    backend = RedisBackend.from_url(f"redis://127.0.0.1:{port}")
+    with pytest.raises(RespProtocolError):
+        await backend.get("a")
+    assert backend.pool._idle == []
+    server.close()
+    await server.wait_closed()
+
+    async with FakeRespServer(delay=1.0) as slow:
+        backend = RedisBackend.from_url(slow.url, command_timeout=0.05)
+        started = time.monotonic()
+        with pytest.raises(asyncio.TimeoutError):
+            await backend.get("a")
+        assert time.monotonic() - started < 0.5
+        assert backend.pool._idle == []
+        await backend.close()
+
+async def test_cache_manager_over_redis(settings, tmp_path):
+    async with FakeRespServer() as server:
+        cache = CacheManager(settings=settings, backend=RedisBackend.from_url(server.url, prefix="t:"))
+        await cache.aset("gpt-4o", MESSAGES, {"text": "hi"}, {"temperature": 0})
+        assert await cache.aget("gpt-4o", MESSAGES, {"temperature": 0}) == {"text": "hi"}
+        assert await cache.aget("gpt-4o", MESSAGES) is None
+        await cache.set_many([("m", MESSAGES, {"n": 1}), ("m", MESSAGES, {"n": 2}, {"p": 1})])
+        assert await cache.get_many([("m", MESSAGES), ("m", MESSAGES, {"p": 1}), ("x", MESSAGES)]) == [
+            {"n": 1}, {"n": 2}, None
+        ]
+        # The server expires entries after CACHE_TTL
+        key = cache._get_cache_key("m", MESSAGES)
+        _, expires_at = server.data[(0, f"t:{key}".encode())]
+        assert expires_at == pytest.approx(time.time() + 3600, abs=1)
+        with pytest.raises(TypeError):
+            cache.get("m", MESSAGES)
+        await cache.close()
+
+async def test_async_api_on_file_store_matches_sync(settings, tmp_path):
+    cache = CacheManager(cache_dir=tmp_path, settings=settings)
+    await cache.aset("m", MESSAGES, {"text": "hi"})
+    assert cache.get("m", MESSAGES) == {"text": "hi"}
+    cache.set("n", MESSAGES, {"text": "there"})
+    assert await cache.get_many([("m", MESSAGES), ("n", MESSAGES)]) == [{"text": "hi"}, {"text": "there"}]
+
+@pytest.mark.parametrize("kind", ["file", "sqlite"])
+async def test_local_backends_do_io_off_the_loop(kind, tmp_path, monkeypatch):
+    backend = FileBackend(tmp_path) if kind == "file" else SqliteBackend(tmp_path / "cache.sqlite3")
+    threads = []
+    for name in ("read_many", "write_many", "remove_many"):
+        method = getattr(backend, name)
+        monkeypatch.setattr(backend, name, lambda *args, method=method: threads.append(threading.get_ident()) or method(*args))
+    await backend.set_many({"a": b"1"})
+    assert (await backend.get("a")).value == b"1"
+    assert await backend.delete("a")
+    assert len(threads) == 3 and threading.get_ident() not in threads
+    await backend.close()
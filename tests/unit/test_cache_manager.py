@@ -153,4 +153,24 @@ class TestCacheManager:
     def test_cache_settings_propagation(self, cache_manager, mock_settings):
         """Test that settings changes are properly propagated"""
         assert cache_manager.settings.CACHE_ENABLED is True
-        assert cache_manager.settings.CACHE_TTL == 3600
\ No newline at end of file
+        assert cache_manager.settings.CACHE_TTL == 3600
+    @pytest.mark.asyncio
+    async def test_cache_generate_result(self, cache_manager, monkeypatch):
+        """A response from generate() can be cached as the quick-start guide shows"""
+        from core.api.client import LLMClient
+        from core.api.transport import InProcessTransport
+        from core.models.config import ModelType
+
+        monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+        body = {"choices": [{"message": {"content": "hi"}}], "usage": {"prompt_tokens": 1, "completion_tokens": 1}}
+
+        async def reply(request):
+            return body
+
+        messages = [{"role": "user", "content": "test"}]
+        async with LLMClient(transport=InProcessTransport(reply)) as client:
+            response = await client.generate(ModelType.GPT4O, messages)
+        cache_manager.set(ModelType.GPT4O.value, messages, response)
+        await cache_manager.aset("other", messages, response)
+        assert cache_manager.get(ModelType.GPT4O.value, messages) == body
+        assert await cache_manager.aget("other", messages) == body
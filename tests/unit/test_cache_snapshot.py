@@ -0,0 +1,99 @@
+# tests/unit/test_cache_snapshot.py
+import time
+import pytest
+from typer.testing import CliRunner
+from config.settings import Settings
+from interfaces.cli.main import app
+from utils.cache.manager import CacheManager, CacheEntry
+from utils.cache.shared import SharedCacheManager
+from utils.cache.snapshot import export_snapshot, import_snapshot, read_index, write_snapshot, SnapshotError
+
+def messages(i):
+    return [{"role": "user", "content": f"question {i}"}]
+
+@pytest.fixture
+def settings(monkeypatch):
+    settings = Settings()
+    monkeypatch.setattr(settings, "CACHE_ENABLED", True)
+    monkeypatch.setattr(settings, "CACHE_TTL", 3600)
+    return settings
+
+@pytest.fixture
+def source(tmp_path, settings):
+    cache = CacheManager(cache_dir=tmp_path / "source", settings=settings)
+    for i in range(30):
+        cache.set("gpt-4o" if i % 3 else "claude", messages(i), {"text": f"answer {i}" * 50})
+    return cache
+
+def test_roundtrip_between_backends(tmp_path, settings, source):
+    path = tmp_path / "cache.snap"
+    stats = export_snapshot(source, path, block_bytes=4096)
+    assert stats.entries == 30 and stats.blocks > 1
+    assert stats.models == {"gpt-4o": 20, "claude": 10}
+
+    target = SharedCacheManager(db_path=tmp_path / "target" / "responses.sqlite3", settings=settings)
+    stats = import_snapshot(target, path)
+    assert stats.imported == 30 and stats.duplicates == 0
+    assert target.get("gpt-4o", messages(1)) == {"text": "answer 1" * 50}
+
+    # And back into an empty file cache, keeping entry times and messages
+    again = tmp_path / "again.snap"
+    export_snapshot(target, again)
+    files = CacheManager(cache_dir=tmp_path / "files", settings=settings)
+    assert import_snapshot(files, again).imported == 30
+    original = {e.key: e.cached_at for e in source.iter_entries()}
+    assert {e.key: e.cached_at for e in files.iter_entries()} == pytest.approx(original)
+
+def test_export_filters_by_model_and_age(tmp_path, settings, source):
+    now = time.time()
+    source.put_entries([CacheEntry("old", "gpt-4o", now - 7200, {"text": "old"})])
+    path = tmp_path / "cache.snap"
+    stats = export_snapshot(source, path, models=["gpt-4o"], max_age=3600)
+    assert stats.entries == 20
+    assert {model for _, model, _, _ in read_index(path).entries} == {"gpt-4o"}
+
+def test_import_skips_expired_duplicates_and_unneeded_blocks(tmp_path, settings, source):
+    now = time.time()
+    old = [CacheEntry(f"old-{i}", "gpt-4o", now - 7200, {"text": "x" * 500}) for i in range(10)]
+    source.put_entries(old)
+    path = tmp_path / "cache.snap"
+    # Expired entries sort into their own blocks here: written last
+    entries = list(source.iter_entries())
+    entries.sort(key=lambda e: e.key.startswith("old-"))
+    write_snapshot(path, entries, block_bytes=2048)
+    total_blocks = len(read_index(path).blocks)
+
+    target = CacheManager(cache_dir=tmp_path / "target", settings=settings)
+    target.set("gpt-4o", messages(1), {"text": "newer"})
+    stats = import_snapshot(target, path)
+    assert stats.entries == 40
+    assert stats.expired == 10
+    assert stats.duplicates == 1
+    assert stats.imported == 29
+    assert stats.blocks < total_blocks
+    assert target.get("gpt-4o", messages(1)) == {"text": "newer"}
+    assert import_snapshot(target, path, models=["claude"]).filtered == 30
+
+    path.write_bytes(path.read_bytes()[:-10])
+    with pytest.raises(SnapshotError):
+        import_snapshot(target, path)
+
+def test_cli_export_import(tmp_path, monkeypatch, source):
+    runner = CliRunner()
+    path = tmp_path / "cache.snap"
+    monkeypatch.setenv("CACHE_DIR", str(source.cache_dir))
+    from config.settings import get_settings
+    get_settings.cache_clear()
+    try:
+        result = runner.invoke(app, ["cache", "export", str(path), "-m", "claude"])
+        assert result.exit_code == 0, result.stdout
+        assert "Exported 10 entries" in result.stdout
+
+        monkeypatch.setenv("CACHE_DIR", str(tmp_path / "fresh"))
+        get_settings.cache_clear()
+        result = runner.invoke(app, ["cache", "import", str(path), "--backend", "sqlite"])
+        assert result.exit_code == 0, result.stdout
+        assert "Imported 10 of 10 entries" in result.stdout
+        assert (tmp_path / "fresh" / "responses.sqlite3").exists()
+    finally:
+        get_settings.cache_clear()
@@ -1,4 +1,7 @@
 # tests/unit/test_cli.py
+import json
+import subprocess
+import sys
 import pytest
 from typer.testing import CliRunner
 from interfaces.cli.main import app
@@ -35,9 +38,68 @@ def test_cost_estimate_invalid_model():
     assert result.exit_code == 1
     assert "Invalid model" in result.stdout
 
+def test_cost_plan(tmp_path):
+    workload = tmp_path / "workload.csv"
+    workload.write_text("model,input_tokens,output_tokens,task_type\ngpt-4o,1000,100,chat\no1-preview,2000,400,code\n")
+    result = runner.invoke(app, ["cost-plan", str(workload)])
+    assert result.exit_code == 0
+    assert "cheapest" in result.stdout and "select:speed" in result.stdout
+
+    result = runner.invoke(app, ["cost-plan", str(workload), "-p", "gpt-4o", "-p", "cheapest", "--json"])
+    plan = json.loads(result.stdout)
+    assert [p["name"] for p in plan["policies"]] == ["gpt-4o", "cheapest"]
+
+def test_cost_plan_unknown_policy(tmp_path):
+    workload = tmp_path / "workload.csv"
+    workload.write_text("input_tokens,output_tokens\n10,10\n")
+    result = runner.invoke(app, ["cost-plan", str(workload), "-p", "fastest"])
+    assert result.exit_code == 1
+    assert "Unknown policy" in result.stdout
+
 @pytest.mark.asyncio
 async def test_chat_invalid_model():
     result = runner.invoke(app, ["chat", "--model", "invalid-model"])
     assert result.exit_code == 0
     assert "Invalid model" in result.stdout
-    assert "Available models" in result.stdout
\ No newline at end of file
+    assert "Available models" in result.stdout
+
+def test_batch_run_invalid_model(tmp_path):
+    input_path = tmp_path / "in.jsonl"
+    input_path.write_text('{"prompt": "hi"}\n')
+    result = runner.invoke(app, [
+        "batch", "run", str(input_path),
+        "-o", str(tmp_path / "out.jsonl"),
+        "-m", "invalid-model"
+    ])
+    assert result.exit_code == 1
+    assert "Invalid model" in result.stdout
+
+def test_static_commands_skip_heavy_imports():
+    # A fresh interpreter, since this test process has already imported everything
+    code = (
+        "import sys\n"
+        "from interfaces.cli.main import app\n"
+        "try:\n"
+        "    app(['list-models'])\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        "print('loaded:' + ','.join(m for m in ('aiohttp', 'pydantic_settings', 'dotenv', 'config.settings') if m in sys.modules))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert result.stdout.splitlines()[-1] == "loaded:"
+
+@pytest.mark.parametrize("configured, expected", [("file", "sqlite"), ("redis", "redis"), ("sqlite", "sqlite")])
+def test_serve_workers_share_cache(monkeypatch, configured, expected):
+    import os
+    import uvicorn
+    from config.settings import get_settings
+
+    monkeypatch.setattr(uvicorn, "run", lambda *args, **kwargs: None)
+    monkeypatch.setenv("CACHE_BACKEND", configured)
+    get_settings.cache_clear()
+    try:
+        result = runner.invoke(app, ["serve", "--workers", "2"])
+        assert result.exit_code == 0, result.stdout
+        assert os.environ["CACHE_BACKEND"] == expected
+    finally:
+        get_settings.cache_clear()
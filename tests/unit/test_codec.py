@@ -0,0 +1,76 @@
+# tests/unit/test_codec.py
+import json
+import pytest
+from core.api.client import LLMClient
+from core.api.codec import JSONCodec, OrjsonCodec, MessagePrefix, PrefixedMessages, get_codec, orjson
+from core.models.config import ModelType
+from utils.mock.server import MockProviderServer
+
+CODECS = [JSONCodec()] + ([OrjsonCodec()] if orjson is not None else [])
+
+HISTORY = [
+    {"role": "user", "content": "Summarize this document: " + "lorem ipsum " * 50},
+    {"role": "assistant", "content": "It is about lorem ipsum — ünïcode included."},
+]
+
+@pytest.fixture(params=CODECS, ids=lambda c: c.name)
+def codec(request):
+    return request.param
+
+def test_roundtrip(codec):
+    value = {"text": "héllo", "n": [1, 2.5, None, True]}
+    encoded = codec.dumps(value)
+    assert isinstance(encoded, bytes)
+    assert codec.loads(encoded) == value
+
+def test_prefixed_payload_matches_plain(codec):
+    prefix = MessagePrefix(HISTORY)
+    messages = prefix + [{"role": "user", "content": "and again?"}]
+    payload = {"model": "gpt-4o", "messages": messages, "max_tokens": 10}
+
+    assert isinstance(messages, PrefixedMessages)
+    assert messages == HISTORY + [{"role": "user", "content": "and again?"}]
+    assert json.loads(codec.encode_payload(payload)) == json.loads(json.dumps(payload))
+
+@pytest.mark.parametrize("tail", [[], [{"role": "user", "content": "x"}]])
+def test_prefix_edge_cases(codec, tail):
+    messages = MessagePrefix(HISTORY) + tail
+    assert json.loads(codec.encode_payload({"messages": messages})) == {"messages": HISTORY + tail}
+    empty = MessagePrefix([]) + tail
+    assert json.loads(codec.encode_payload({"messages": empty, "stream": False})) == {"messages": tail, "stream": False}
+
+def test_prefix_serialized_once(codec):
+    calls = []
+
+    class Counting(type(codec)):
+        def dumps(self, obj):
+            calls.append(obj)
+            return super().dumps(obj)
+
+    counting = Counting()
+    prefix = MessagePrefix(HISTORY)
+    for i in range(3):
+        counting.encode_payload({"messages": prefix + [{"role": "user", "content": str(i)}]})
+    assert sum(1 for obj in calls if obj == HISTORY) == 1
+
+def test_edited_list_falls_back(codec):
+    messages = MessagePrefix(HISTORY) + [{"role": "user", "content": "q"}]
+    messages[0] = {"role": "user", "content": "replaced"}
+    assert not messages.intact()
+    assert json.loads(codec.encode_payload({"messages": messages}))["messages"][0]["content"] == "replaced"
+
+def test_get_codec():
+    assert get_codec("json").name == "json"
+    assert get_codec().name == ("orjson" if orjson is not None else "json")
+    with pytest.raises(ValueError):
+        get_codec("yaml")
+
+@pytest.mark.asyncio
+async def test_prefixed_request_over_http(codec):
+    async with MockProviderServer() as server:
+        async with LLMClient(anthropic_base_url=server.anthropic_url, codec=codec) as client:
+            messages = MessagePrefix(HISTORY) + [{"role": "user", "content": "q"}]
+            response = await client.generate(ModelType.CLAUDE, messages, max_tokens=8)
+    assert client.extract_response(ModelType.CLAUDE, response).startswith("tok")
+    # The mock estimates input tokens from the messages it received
+    assert response["usage"]["input_tokens"] == len(json.dumps(HISTORY + [{"role": "user", "content": "q"}])) // 4
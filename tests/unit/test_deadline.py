@@ -0,0 +1,153 @@
+# tests/unit/test_deadline.py
+import asyncio
+import time
+import pytest
+from core.api.client import LLMClient, DeadlineExceededError, APIError
+from core.api.deadline import resolve, remaining
+from core.api.fanout import FanOut
+from core.api.limiter import LimiterGroup
+from core.api.scheduler import RequestScheduler
+from core.batch.runner import BatchRunner, BatchItem
+from core.models.config import ModelType
+from utils.metrics.registry import MetricsRegistry
+from utils.mock.server import MockProviderServer, MockConfig
+
+pytestmark = pytest.mark.asyncio
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+@pytest.fixture(autouse=True)
+def keys(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test-1234")
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "sk-ant-test-1234")
+
+def assert_released(client: LLMClient):
+    """No connection, key, slot, buffer or stream is still held."""
+    assert not client.transport.session.connector._acquired
+    assert client._stream_keys == {}
+    assert client.buffers.current == 0
+    assert all(state["in_flight"] == 0 for state in client.limiter.snapshot().values())
+    assert all(key["in_flight"] == 0 for key in client._key_pool(ModelType.GPT4O).stats())
+
+async def test_resolve_takes_the_earlier():
+    now = time.monotonic()
+    assert resolve(None, None) is None
+    assert resolve(now + 10, 1) == pytest.approx(now + 1, abs=0.05)
+    assert resolve(now + 1, 10) == now + 1
+    assert remaining(now - 5) == 0.0
+
+async def test_generate_deadline_closes_connection():
+    async with MockProviderServer(MockConfig(latency="fixed:0.6")) as server:
+        async with LLMClient(openai_base_url=server.openai_url, limiter=LimiterGroup(metrics=MetricsRegistry())) as client:
+            started = time.monotonic()
+            with pytest.raises(DeadlineExceededError):
+                await client.generate(ModelType.GPT4O, MESSAGES, timeout=0.1)
+            assert time.monotonic() - started < 0.5
+            assert_released(client)
+
+async def test_client_timeout_applies_by_default():
+    async with MockProviderServer(MockConfig(latency="fixed:0.6")) as server:
+        async with LLMClient(openai_base_url=server.openai_url, timeout=0.1) as client:
+            with pytest.raises(DeadlineExceededError):
+                await client.generate(ModelType.GPT4O, MESSAGES)
+
+async def test_limiter_wait_uses_deadline():
+    group = LimiterGroup(metrics=MetricsRegistry(), initial_limit=1)
+    async with MockProviderServer() as server:
+        async with LLMClient(openai_base_url=server.openai_url, limiter=group) as client:
+            slot = group.get("openai", client._key_pool(ModelType.GPT4O).select().label)
+            await slot.acquire()
+            with pytest.raises(DeadlineExceededError):
+                await client.generate(ModelType.GPT4O, MESSAGES, deadline=time.monotonic() + 0.05)
+            assert slot.waiting == 0
+            slot.release()
+            assert (await client.generate(ModelType.GPT4O, MESSAGES)).text
+
+async def test_stream_deadline_and_idle_timeout():
+    config = MockConfig(tokens_per_second=5, output_tokens=50)
+    async with MockProviderServer(config) as server:
+        async with LLMClient(openai_base_url=server.openai_url) as client:
+            chunks = []
+            with pytest.raises(DeadlineExceededError):
+                async with client.stream(ModelType.GPT4O, MESSAGES, timeout=0.5) as stream:
+                    async for text in stream:
+                        chunks.append(text)
+            assert 0 < len(chunks) < 50
+            assert_released(client)
+
+        async with LLMClient(openai_base_url=server.openai_url, timeout=0.05) as client:
+            with pytest.raises(DeadlineExceededError):
+                async with client.stream(ModelType.GPT4O, MESSAGES) as stream:
+                    async for text in stream:
+                        pass
+            assert_released(client)
+
+async def test_mass_cancellation_leaks_nothing():
+    config = MockConfig(latency="uniform:0.01,0.2", tokens_per_second=50, output_tokens=100)
+    async with MockProviderServer(config) as server:
+        async with LLMClient(openai_base_url=server.openai_url, limiter=LimiterGroup(metrics=MetricsRegistry())) as client:
+            async def call(i):
+                if i % 3 == 0:
+                    return await client.generate(ModelType.GPT4O, MESSAGES)
+                if i % 3 == 1:
+                    async with client.stream(ModelType.GPT4O, MESSAGES) as stream:
+                        return [text async for text in stream]
+                # Holds the raw stream without reading it
+                await client.generate(ModelType.GPT4O, MESSAGES, stream=True)
+                await asyncio.sleep(10)
+
+            tasks = [asyncio.create_task(call(i)) for i in range(150)]
+            await asyncio.sleep(0.15)
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            assert any(task.cancelled() for task in tasks)
+            # Only the raw streams that reached the caller still hold a
+            # connection each; everything else was released on cancellation
+            assert len(client.transport.session.connector._acquired) == len(client._stream_keys)
+            limiters = client.limiter
+        # Leaving the client releases the raw streams too
+        assert client._stream_keys == {}
+        assert all(state["in_flight"] == 0 for state in limiters.snapshot().values())
+        assert all(key["in_flight"] == 0 for key in client._key_pool(ModelType.GPT4O).stats())
+        assert client.buffers.current == 0
+
+async def test_scheduler_passes_deadline_to_client():
+    seen = []
+
+    class Client:
+        async def generate(self, model_type, messages, **kwargs):
+            seen.append(kwargs.get("deadline"))
+            return "ok"
+
+    scheduler = RequestScheduler(Client(), metrics=MetricsRegistry())
+    deadline = time.monotonic() + 5
+    await scheduler.submit(ModelType.GPT4O, MESSAGES, deadline=deadline)
+    await scheduler.submit(ModelType.GPT4O, MESSAGES)
+    assert seen == [deadline, None]
+
+async def test_fanout_branches_share_deadline():
+    async with MockProviderServer(MockConfig(latency="fixed:0.6")) as server:
+        async with LLMClient(openai_base_url=server.openai_url) as client:
+            fanout = FanOut(client, metrics=MetricsRegistry())
+            started = time.monotonic()
+            with pytest.raises(APIError) as info:
+                await fanout.first([ModelType.GPT4O, ModelType.GPT4O], MESSAGES, timeout=0.1)
+            assert time.monotonic() - started < 0.5
+            assert all(isinstance(b.error, DeadlineExceededError) for b in info.value.result.branches)
+
+async def test_batch_retries_stop_at_deadline(tmp_path):
+    attempts = []
+
+    class Client:
+        async def generate(self, model_type, messages, **kwargs):
+            attempts.append(kwargs["deadline"])
+            raise APIError("API returned status code: 500", status=500)
+
+    runner = BatchRunner(Client(), retry_backoff=0.2, max_retries=10)
+    item = BatchItem("a", ModelType.GPT4O, MESSAGES, {"timeout": 0.5})
+    started = time.monotonic()
+    with pytest.raises(APIError):
+        await runner._send(item)
+    assert time.monotonic() - started < 0.5
+    assert 1 < len(attempts) < 4 and len(set(attempts)) == 1
@@ -0,0 +1,118 @@
+# tests/unit/test_fanout.py
+import asyncio
+import pytest
+from core.api.client import LLMClient, FanOutError
+from core.api.fanout import FanOut, Branch
+from core.api.transport import InProcessTransport, TransportResponse
+from core.models.config import ModelType
+from utils.metrics.registry import MetricsRegistry
+
+pytestmark = pytest.mark.asyncio
+
+MESSAGES = [{"role": "user", "content": "2 + 2?"}]
+
+class Provider:
+    """Handler answering per model after a per-model delay, noting cancellations."""
+
+    def __init__(self, delays, answers=None, failing=()):
+        self.delays = {m.value: d for m, d in delays.items()}
+        self.answers = {m.value: a for m, a in (answers or {}).items()}
+        self.failing = {m.value for m in failing}
+        self.cancelled = []
+        self.requests = []
+
+    async def __call__(self, request):
+        model = request.payload["model"]
+        self.requests.append(request.payload)
+        try:
+            await asyncio.sleep(self.delays[model])
+        except asyncio.CancelledError:
+            self.cancelled.append(model)
+            raise
+        if model in self.failing:
+            return TransportResponse(500, body={"error": {"message": "boom"}})
+        text = self.answers.get(model, model)
+        if model == ModelType.CLAUDE.value:
+            return {"content": [{"type": "text", "text": text}], "usage": {"input_tokens": 100, "output_tokens": 10}}
+        return {"choices": [{"message": {"content": text}}], "usage": {"prompt_tokens": 100, "completion_tokens": 10}}
+
+ALL = [ModelType.GPT4O, ModelType.CLAUDE, ModelType.O1_PREVIEW]
+
+async def fan_out(provider, registry=None):
+    client = LLMClient(transport=InProcessTransport(provider), prompt_cache=False)
+    await client.__aenter__()
+    return FanOut(client, metrics=registry or MetricsRegistry())
+
+async def test_first_wins_and_cancels_the_rest():
+    provider = Provider({ModelType.GPT4O: 0.01, ModelType.CLAUDE: 5, ModelType.O1_PREVIEW: 5})
+    registry = MetricsRegistry()
+    result = await (await fan_out(provider, registry)).first(ALL, MESSAGES)
+
+    assert result.winner.name == "gpt-4o"
+    assert result.response.text == "gpt-4o"
+    assert sorted(provider.cancelled) == sorted([ModelType.CLAUDE.value, ModelType.O1_PREVIEW.value])
+    assert [b.cancelled for b in result.branches] == [False, True, True]
+    assert result.cost == result.winner.cost > 0
+    branches = registry.get("llm_fanout_branches_total")
+    assert branches.value(policy="first", branch="gpt-4o", outcome="won") == 1
+    assert branches.value(policy="first", branch=ModelType.CLAUDE.value, outcome="cancelled") == 1
+    assert registry.get("llm_fanout_cost_dollars_total").value(policy="first", branch="gpt-4o") == pytest.approx(result.cost)
+
+async def test_first_skips_failed_branches():
+    provider = Provider({ModelType.GPT4O: 0.0, ModelType.CLAUDE: 0.02}, failing=[ModelType.GPT4O])
+    result = await (await fan_out(provider)).first([ModelType.GPT4O, ModelType.CLAUDE], MESSAGES)
+    assert result.winner.name == ModelType.CLAUDE.value
+    assert result.branches[0].error is not None
+
+async def test_all_failed_raises_with_branch_results():
+    provider = Provider({ModelType.GPT4O: 0.0, ModelType.CLAUDE: 0.0}, failing=[ModelType.GPT4O, ModelType.CLAUDE])
+    with pytest.raises(FanOutError) as info:
+        await (await fan_out(provider)).first([ModelType.GPT4O, ModelType.CLAUDE], MESSAGES)
+    assert all(b.error is not None for b in info.value.result.branches)
+
+async def test_quorum_returns_agreed_answer():
+    provider = Provider(
+        {ModelType.GPT4O: 0.0, ModelType.CLAUDE: 0.01, ModelType.O1_PREVIEW: 0.02},
+        answers={ModelType.GPT4O: "5", ModelType.CLAUDE: "4", ModelType.O1_PREVIEW: " 4 "},
+    )
+    result = await (await fan_out(provider)).quorum(ALL, MESSAGES, n=2)
+    assert result.winner.name == ModelType.CLAUDE.value
+    assert result.response.text == "4"
+    assert result.cost == pytest.approx(sum(b.cost for b in result.branches if b.ok))
+
+async def test_quorum_gives_up_once_unreachable():
+    provider = Provider(
+        {ModelType.GPT4O: 0.0, ModelType.CLAUDE: 0.0, ModelType.O1_PREVIEW: 5},
+        answers={ModelType.GPT4O: "5", ModelType.CLAUDE: "4"},
+    )
+    with pytest.raises(FanOutError):
+        await asyncio.wait_for((await fan_out(provider)).quorum(ALL, MESSAGES, n=3), timeout=1)
+    assert provider.cancelled == [ModelType.O1_PREVIEW.value]
+
+async def test_best_uses_scorer():
+    provider = Provider(
+        {ModelType.GPT4O: 0.0, ModelType.CLAUDE: 0.01},
+        answers={ModelType.GPT4O: "short", ModelType.CLAUDE: "a much longer answer"},
+    )
+
+    async def scorer(response):
+        return len(response.text)
+
+    result = await (await fan_out(provider)).best([ModelType.GPT4O, ModelType.CLAUDE], MESSAGES, scorer=scorer)
+    assert result.winner.name == ModelType.CLAUDE.value
+    assert [b.score for b in result.branches] == [5, 20]
+
+async def test_branch_overrides_and_unique_names():
+    provider = Provider({ModelType.GPT4O: 0.0})
+    branches = [Branch(ModelType.GPT4O, kwargs={"temperature": 0.0}), Branch(ModelType.GPT4O, kwargs={"temperature": 1.0})]
+    result = await (await fan_out(provider)).best(branches, MESSAGES, scorer=lambda r: 0)
+    assert [b.name for b in result.branches] == ["gpt-4o", "gpt-4o#2"]
+    assert sorted(p["temperature"] for p in provider.requests) == [0.0, 1.0]
+    assert branches[1].name is None
+
+async def test_rejects_streaming_and_unknown_policy():
+    fan = await fan_out(Provider({ModelType.GPT4O: 0.0}))
+    with pytest.raises(ValueError):
+        await fan.first([ModelType.GPT4O], MESSAGES, stream=True)
+    with pytest.raises(ValueError):
+        await fan.run([ModelType.GPT4O], MESSAGES, policy="fastest")
@@ -0,0 +1,282 @@
+# tests/unit/test_gateway.py
+import asyncio
+import gzip
+import json
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from starlette.requests import ClientDisconnect
+from interfaces.api.gateway import create_app, split_request, claude_to_openai
+from core.api.client import RateLimitError
+from core.api.rate_limit import RateLimiter
+from core.models.config import ModelType
+from utils.cache.manager import CacheManager
+from utils.metrics.registry import MetricsRegistry
+from config.settings import Settings
+
+class FakeStream:
+    def __init__(self, lines):
+        self._lines = lines
+        self.closed = False
+
+        class Content:
+            async def __aiter__(inner):
+                for line in lines:
+                    yield line
+
+            async def iter_any(inner):
+                for line in lines:
+                    yield line
+
+        self.content = Content()
+
+    def close(self):
+        self.closed = True
+
+class FakeClient:
+    def __init__(self):
+        self.calls = []
+        self.error = None
+        self.released = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+    def release_stream(self, response):
+        response.close()
+        self.released.append(response)
+
+    async def generate(self, model_type, messages, stream=False, **kwargs):
+        self.calls.append({"model_type": model_type, "messages": messages, "stream": stream, **kwargs})
+        if self.error:
+            raise self.error
+        if model_type == ModelType.CLAUDE:
+            if stream:
+                return FakeStream([
+                    b'event: content_block_delta\n',
+                    b'data: {"type":"content_block_delta","delta":{"type":"text_delta","text":"Hi"}}\n',
+                    b'data: {"type":"message_delta","delta":{"stop_reason":"max_tokens"}}\n',
+                    b'data: {"type":"message_stop"}\n',
+                ])
+            return {
+                "id": "msg_1",
+                "content": [{"type": "text", "text": "Hello from Claude"}],
+                "stop_reason": "end_turn",
+                "usage": {"input_tokens": 10, "output_tokens": 5},
+            }
+        if stream:
+            return FakeStream([
+                b'data: {"choices":[{"delta":{"content":"Hi"}}]}\n\n',
+                b'data: [DONE]\n\n',
+            ])
+        return {
+            "id": "chatcmpl-1",
+            "object": "chat.completion",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "Hello"}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 3, "completion_tokens": 1, "total_tokens": 4},
+        }
+
+@pytest.fixture
+def fake_client():
+    return FakeClient()
+
+@pytest.fixture
+def settings():
+    return Settings()
+
+@pytest.fixture
+def registry():
+    return MetricsRegistry()
+
+@pytest.fixture
+def gateway(fake_client, settings, registry, tmp_path):
+    app = create_app(
+        client_factory=lambda: fake_client,
+        cache=CacheManager(cache_dir=tmp_path, settings=settings),
+        rate_limiter=RateLimiter(rate_per_minute=600),
+        metrics=registry,
+        settings=settings,
+    )
+    with TestClient(app) as client:
+        yield client
+
+def chat(model, **extra):
+    return {"model": model, "messages": [{"role": "user", "content": "hi"}], **extra}
+
+class TestGateway:
+    def test_openai_passthrough(self, gateway, fake_client):
+        response = gateway.post("/v1/chat/completions", json=chat("gpt-4o", temperature=0.2, n=1))
+        assert response.status_code == 200
+        assert response.json()["choices"][0]["message"]["content"] == "Hello"
+        assert fake_client.calls[0]["model_type"] == ModelType.GPT4O
+        assert fake_client.calls[0]["temperature"] == 0.2
+        assert fake_client.calls[0]["n"] == 1
+        assert "gateway;dur=" in response.headers["server-timing"]
+
+    def test_claude_translated(self, gateway, fake_client):
+        body = chat(ModelType.CLAUDE.value, stop="END", n=2)
+        body["messages"].insert(0, {"role": "system", "content": "Be brief"})
+        response = gateway.post("/v1/chat/completions", json=body)
+        data = response.json()
+        assert data["object"] == "chat.completion"
+        assert data["choices"][0]["message"]["content"] == "Hello from Claude"
+        assert data["usage"]["total_tokens"] == 15
+
+        call = fake_client.calls[0]
+        assert call["system"] == "Be brief"
+        assert call["stop_sequences"] == ["END"]
+        assert call["max_tokens"] > 0
+        assert "n" not in call
+        assert all(m["role"] != "system" for m in call["messages"])
+
+    def test_unknown_model(self, gateway):
+        response = gateway.post("/v1/chat/completions", json=chat("no-such-model"))
+        assert response.status_code == 404
+        assert "error" in response.json()
+
+    def test_invalid_body(self, gateway):
+        response = gateway.post("/v1/chat/completions", content=b"not json")
+        assert response.status_code == 400
+
+    def test_gzip_body(self, gateway, fake_client):
+        body = gzip.compress(json.dumps(chat("gpt-4o")).encode())
+        headers = {"content-encoding": "gzip", "content-type": "application/json", "x-request-id": "abc"}
+        response = gateway.post("/v1/chat/completions", content=body, headers=headers)
+        assert response.status_code == 200
+        assert fake_client.calls[0]["request_id"] == "abc"
+
+        response = gateway.post("/v1/chat/completions", content=body[:20], headers=headers)
+        assert response.status_code == 400
+        response = gateway.post("/v1/chat/completions", content=body, headers={"content-encoding": "br"})
+        assert response.status_code == 415
+
+    def test_cache_hit(self, gateway, fake_client):
+        first = gateway.post("/v1/chat/completions", json=chat("gpt-4o"))
+        second = gateway.post("/v1/chat/completions", json=chat("gpt-4o"))
+        assert first.headers["x-cache"] == "miss"
+        assert second.headers["x-cache"] == "hit"
+        assert second.json() == first.json()
+        assert len(fake_client.calls) == 1
+
+        # Different sampling parameters must not share an entry
+        gateway.post("/v1/chat/completions", json=chat("gpt-4o", temperature=0.0))
+        assert len(fake_client.calls) == 2
+
+    def test_cache_bypass_header(self, gateway, fake_client):
+        gateway.post("/v1/chat/completions", json=chat("gpt-4o"))
+        gateway.post("/v1/chat/completions", json=chat("gpt-4o"), headers={"cache-control": "no-cache"})
+        assert len(fake_client.calls) == 2
+
+    def test_rate_limit(self, fake_client, settings, registry):
+        app = create_app(
+            client_factory=lambda: fake_client,
+            cache=False,
+            rate_limiter=RateLimiter(rate_per_minute=60, burst=1),
+            metrics=registry,
+            settings=settings,
+        )
+        with TestClient(app) as client:
+            assert client.post("/v1/chat/completions", json=chat("gpt-4o")).status_code == 200
+            limited = client.post("/v1/chat/completions", json=chat("gpt-4o"))
+            assert limited.status_code == 429
+            assert app.state.cache is None
+            assert "retry-after" in limited.headers
+            # A different caller has its own bucket
+            other = client.post(
+                "/v1/chat/completions", json=chat("gpt-4o"), headers={"authorization": "Bearer other"}
+            )
+            assert other.status_code == 200
+
+    def test_upstream_rate_limit(self, gateway, fake_client):
+        fake_client.error = RateLimitError("Rate limit exceeded")
+        response = gateway.post("/v1/chat/completions", json=chat("gpt-4o"), headers={"cache-control": "no-cache"})
+        assert response.status_code == 429
+
+    def test_openai_stream_passthrough(self, gateway, fake_client):
+        with gateway.stream("POST", "/v1/chat/completions", json=chat("gpt-4o", stream=True)) as response:
+            body = b"".join(response.iter_bytes())
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert body == b'data: {"choices":[{"delta":{"content":"Hi"}}]}\n\ndata: [DONE]\n\n'
+        assert len(fake_client.released) == 1 and fake_client.released[0].closed
+
+    @pytest.mark.parametrize("model", ["gpt-4o", ModelType.CLAUDE.value])
+    def test_stream_released_when_client_disconnects_before_first_chunk(self, gateway, fake_client, model):
+        body = json.dumps(chat(model, stream=True)).encode()
+        scope = {
+            "type": "http", "asgi": {"version": "3.0", "spec_version": "2.4"}, "http_version": "1.1",
+            "method": "POST", "scheme": "http", "path": "/v1/chat/completions", "raw_path": b"/v1/chat/completions",
+            "query_string": b"", "root_path": "", "headers": [(b"content-type", b"application/json")],
+            "client": ("127.0.0.1", 1234), "server": ("gateway", 80),
+        }
+
+        async def receive():
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                raise OSError("client went away")
+
+        async def call():
+            with pytest.raises(ClientDisconnect):
+                await gateway.app(scope, receive, send)
+
+        gateway.portal.call(call)
+        assert len(fake_client.released) == 1 and fake_client.released[0].closed
+
+    def test_claude_stream_translated(self, gateway):
+        with gateway.stream("POST", "/v1/chat/completions", json=chat(ModelType.CLAUDE.value, stream=True)) as response:
+            events = [
+                line[6:] for line in response.iter_lines()
+                if line.startswith("data: ")
+            ]
+        assert events[-1] == "[DONE]"
+        chunks = [json.loads(e) for e in events[:-1]]
+        assert all(c["object"] == "chat.completion.chunk" for c in chunks)
+        assert "".join(c["choices"][0]["delta"].get("content", "") for c in chunks) == "Hi"
+        assert chunks[-1]["choices"][0]["finish_reason"] == "length"
+
+    def test_metrics_endpoint(self, gateway):
+        gateway.post("/v1/chat/completions", json=chat("gpt-4o"))
+        text = gateway.get("/metrics").text
+        assert "llm_gateway_requests_total" in text
+        assert "llm_gateway_overhead_seconds_bucket" in text
+
+    def test_list_models(self, gateway):
+        ids = {m["id"] for m in gateway.get("/v1/models").json()["data"]}
+        assert ids == {m.value for m in ModelType}
+
+def test_split_request_openai_keeps_extra_params():
+    messages, params = split_request(ModelType.GPT4O, chat("gpt-4o", presence_penalty=0.5))
+    assert params["presence_penalty"] == 0.5
+    assert "model" not in params
+
+def test_claude_to_openai_stop_reason():
+    data = claude_to_openai({"content": [{"type": "text", "text": "x"}], "stop_reason": "max_tokens"}, "m")
+    assert data["choices"][0]["finish_reason"] == "length"
+
+@pytest.mark.asyncio
+async def test_identical_requests_coalesced(settings, registry, tmp_path):
+    class SlowClient(FakeClient):
+        async def generate(self, model_type, messages, stream=False, **kwargs):
+            await asyncio.sleep(0.05)
+            return await super().generate(model_type, messages, stream=stream, **kwargs)
+
+    slow = SlowClient()
+    app = create_app(
+        client_factory=lambda: slow,
+        cache=CacheManager(cache_dir=tmp_path, settings=settings),
+        rate_limiter=RateLimiter(rate_per_minute=600),
+        metrics=registry,
+        settings=settings,
+    )
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://gateway") as client:
+            responses = await asyncio.gather(*(
+                client.post("/v1/chat/completions", json=chat("gpt-4o")) for _ in range(5)
+            ))
+    assert all(r.status_code == 200 for r in responses)
+    assert len(slow.calls) == 1
@@ -0,0 +1,121 @@
+# tests/unit/test_key_pool.py
+import asyncio
+import time
+import pytest
+from core.api.client import LLMClient, RateLimitError
+from core.api.transport import InProcessTransport
+from core.models.config import ModelType
+from core.security import keys
+from core.security.keys import KeyPool, _parse_reset
+from utils.mock.server import MockProviderServer, MockConfig
+
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+def test_keys_from_environment(monkeypatch):
+    monkeypatch.setattr(keys, "_load_dotenv", lambda: None)
+    monkeypatch.setenv("OPENAI_API_KEYS", "k1, k2,,k3")
+    monkeypatch.setenv("OPENAI_API_KEY", "k2")
+    keys.load_provider_keys.cache_clear()
+    try:
+        assert keys.load_provider_keys("openai") == ["k1", "k2", "k3"]
+    finally:
+        keys.load_provider_keys.cache_clear()
+
+def test_labels_distinct_for_keys_sharing_a_suffix():
+    pool = KeyPool("openai", ["sk-proj-aaaa-1234", "sk-proj-bbbb-1234"])
+    labels = [entry["key"] for entry in pool.stats()]
+    assert len(set(labels)) == 2
+    assert not any("1234" in label for label in labels)
+
+def test_headers_prebuilt_per_key():
+    pool = KeyPool("anthropic", ["a", "b"])
+    first = pool.acquire()
+    assert first.headers["x-api-key"] == first.key
+    assert pool.acquire().headers is not first.headers
+    pool.release(first)
+    assert pool.select() is first
+    assert pool.select().headers is first.headers
+
+def test_spreads_by_in_flight():
+    pool = KeyPool("openai", ["a", "b", "c"])
+    held = [pool.acquire() for _ in range(6)]
+    assert sorted(entry.in_flight for entry in {id(e): e for e in held}.values()) == [2, 2, 2]
+
+def test_prefers_remaining_quota():
+    pool = KeyPool("openai", ["a", "b"])
+    a, b = pool._keys
+    pool.record(a, 200, {"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "30s"})
+    pool.record(b, 200, {"x-ratelimit-remaining-requests": "50", "x-ratelimit-reset-requests": "30s"})
+    assert all(pool.acquire() is b for _ in range(10))
+
+def test_quota_forgotten_after_reset():
+    pool = KeyPool("openai", ["a", "b"])
+    a, b = pool._keys
+    pool.record(a, 200, {"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "0s"})
+    pool.record(b, 200, {"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "60s"})
+    assert pool.select() is a
+
+@pytest.mark.parametrize("status,headers,expected", [
+    (429, {"retry-after": "12"}, 12),
+    (429, {}, 30),
+    (401, {}, 300),
+])
+def test_quarantine(status, headers, expected):
+    pool = KeyPool("anthropic", ["a", "b"])
+    a, b = pool._keys
+    pool.record(a, status, headers)
+    assert a.quarantined_until - time.monotonic() == pytest.approx(expected, abs=1)
+    assert all(pool.select() is b for _ in range(5))
+
+def test_all_quarantined_uses_soonest():
+    pool = KeyPool("anthropic", ["a", "b"])
+    a, b = pool._keys
+    pool.record(a, 429, {"retry-after": "20"})
+    pool.record(b, 429, {"retry-after": "5"})
+    assert pool.select() is b
+
+def test_empty_pool():
+    with pytest.raises(ValueError):
+        KeyPool("openai", []).acquire()
+
+@pytest.mark.parametrize("value,seconds", [
+    ("1m30s", 90), ("20ms", 0.02), ("6m0s", 360), ("0.5s", 0.5), ("bogus", None),
+])
+def test_parse_reset(value, seconds):
+    result = _parse_reset(value)
+    assert result == (pytest.approx(seconds) if seconds is not None else None)
+
+def test_parse_reset_timestamp():
+    assert _parse_reset("2000-01-01T00:00:00Z") == 0.0
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("model_type", [ModelType.CLAUDE, ModelType.GPT4O])
+@pytest.mark.parametrize("key_count,expected_ok", [(1, 5), (3, 15)])
+async def test_throughput_scales_with_keys(model_type, key_count, expected_ok):
+    server = MockProviderServer(MockConfig(key_limit=5, latency="fixed:0.01"))
+    provider = "anthropic" if model_type == ModelType.CLAUDE else "openai"
+    pool = KeyPool(provider, [f"key-{i}" for i in range(key_count)])
+
+    async def call(client):
+        try:
+            await client.generate(model_type, MESSAGES)
+            return True
+        except RateLimitError:
+            return False
+
+    async with LLMClient(transport=InProcessTransport(server.handle), key_pools={provider: pool}) as client:
+        results = await asyncio.gather(*(call(client) for _ in range(15)))
+
+    assert sum(results) == expected_ok
+    assert all(entry["in_flight"] == 0 for entry in pool.stats())
+    assert all(entry["remaining"] == 0 for entry in pool.stats())
+
+@pytest.mark.asyncio
+async def test_stream_holds_key_until_consumed():
+    pool = KeyPool("openai", ["a"])
+    server = MockProviderServer(MockConfig(output_tokens=2))
+    async with LLMClient(transport=InProcessTransport(server.handle), key_pools={"openai": pool}) as client:
+        response = await client.generate(ModelType.GPT4O, MESSAGES, stream=True)
+        assert pool.stats()[0]["in_flight"] == 1
+        assert [chunk async for chunk in client.stream_response(response)] == ["tok ", "tok "]
+    assert pool.stats()[0]["in_flight"] == 0
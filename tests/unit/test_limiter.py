@@ -0,0 +1,147 @@
+# tests/unit/test_limiter.py
+import asyncio
+import pytest
+from core.api.client import LLMClient, RateLimitError
+from core.api.limiter import AdaptiveLimiter, LimiterGroup
+from core.security.keys import KeyPool
+from core.api.transport import InProcessTransport, TransportResponse
+from core.models.config import ModelType
+from utils.metrics.registry import MetricsRegistry
+
+pytestmark = pytest.mark.asyncio
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+async def fill(limiter, count):
+    for _ in range(count):
+        await limiter.acquire()
+
+async def test_grows_while_saturated():
+    limiter = AdaptiveLimiter(initial_limit=4)
+    for _ in range(20):
+        await fill(limiter, 4)
+        for _ in range(4):
+            limiter.release(latency=0.1)
+    assert limiter.limit > 6
+
+async def test_no_growth_when_idle():
+    limiter = AdaptiveLimiter(initial_limit=4)
+    for _ in range(20):
+        await limiter.acquire()
+        limiter.release(latency=0.1)
+    assert limiter.limit == 4
+
+async def test_drop_cuts_once_per_round_trip():
+    limiter = AdaptiveLimiter(initial_limit=16)
+    await fill(limiter, 3)
+    limiter.release(latency=10.0)
+    limiter.release(dropped=True, reason="429")
+    limiter.release(dropped=True, reason="429")
+    assert limiter.limit == 8
+
+async def test_latency_rise_cuts():
+    limiter = AdaptiveLimiter(initial_limit=16, smoothing=1.0)
+    await fill(limiter, 2)
+    limiter.release(latency=0.1)
+    limiter.release(latency=1.0)
+    assert limiter.limit == 8
+
+async def test_waiters_are_served_in_order_and_cancellable():
+    limiter = AdaptiveLimiter(initial_limit=1)
+    await limiter.acquire()
+    order = []
+
+    async def wait(name):
+        await limiter.acquire()
+        order.append(name)
+
+    first, cancelled, last = (asyncio.create_task(wait(n)) for n in ("first", "cancelled", "last"))
+    await asyncio.sleep(0)
+    assert limiter.waiting == 3
+    cancelled.cancel()
+    await asyncio.sleep(0)
+    limiter.release()
+    await first
+    limiter.release()
+    await last
+    assert order == ["first", "last"]
+    assert limiter.in_flight == 1 and limiter.waiting == 0
+
+async def test_group_reports_gauges():
+    registry = MetricsRegistry()
+    group = LimiterGroup(metrics=registry, initial_limit=4)
+    limiter = group.get("openai", "...abcd")
+    assert group.get("openai", "...abcd") is limiter
+    await fill(limiter, 2)
+    assert registry.get("llm_concurrency_in_flight").value(provider="openai", key="...abcd") == 2
+    limiter.release(dropped=True, reason="429")
+    assert registry.get("llm_concurrency_limit").value(provider="openai", key="...abcd") == 2
+    assert registry.get("llm_concurrency_limit_cuts_total").value(provider="openai", key="...abcd", reason="429") == 1
+
+async def test_client_cuts_limit_on_429(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test-1234")
+    statuses = iter([429, 200])
+
+    async def handler(request):
+        if next(statuses) == 429:
+            return TransportResponse(429, body={"error": {"message": "slow down"}})
+        return {"choices": [{"message": {"content": "ok"}}], "usage": {"prompt_tokens": 1, "completion_tokens": 1}}
+
+    group = LimiterGroup(metrics=MetricsRegistry(), initial_limit=8)
+    async with LLMClient(transport=InProcessTransport(handler), limiter=group) as client:
+        with pytest.raises(RateLimitError):
+            await client.generate(ModelType.GPT4O, MESSAGES)
+        response = await client.generate(ModelType.GPT4O, MESSAGES)
+    assert response.text == "ok"
+    (state,) = group.snapshot().values()
+    assert state["limit"] == 4 and state["in_flight"] == 0
+    assert state["recent_latency"] == pytest.approx(response.latency)
+
+async def test_stream_slot_released(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test-1234")
+
+    async def handler(request):
+        return TransportResponse(lines=[b'data: {"choices":[{"delta":{"content":"hi"}}]}\n', b"data: [DONE]\n"])
+
+    group = LimiterGroup(metrics=MetricsRegistry(), initial_limit=1)
+    async with LLMClient(transport=InProcessTransport(handler), limiter=group) as client:
+        for _ in range(3):
+            response = await client.generate(ModelType.GPT4O, MESSAGES, stream=True)
+            client.release_stream(response)
+            client.release_stream(response)
+    (state,) = group.snapshot().values()
+    assert state["in_flight"] == 0
+
+async def test_key_reserved_after_limiter_wait():
+    pool = KeyPool("openai", ["sk-a", "sk-b"])
+    replies = {}
+    used = []
+
+    async def handler(request):
+        key = request.headers["Authorization"]
+        used.append(key)
+        status = 200
+        if len(used) <= 2:
+            replies[key] = asyncio.get_running_loop().create_future()
+            status = await replies[key]
+        return TransportResponse(status, body={"choices": [{"message": {"content": "ok"}}], "usage": {}})
+
+    group = LimiterGroup(metrics=MetricsRegistry(), initial_limit=1)
+    async with LLMClient(transport=InProcessTransport(handler), limiter=group, key_pools={"openai": pool}) as client:
+        first = [asyncio.create_task(client.generate(ModelType.GPT4O, MESSAGES)) for _ in range(2)]
+        await asyncio.sleep(0)
+        waiting = asyncio.create_task(client.generate(ModelType.GPT4O, MESSAGES))
+        await asyncio.sleep(0)
+        # The waiting request holds no key yet
+        assert [k["in_flight"] for k in pool.stats()] == [1, 1]
+
+        # The key it waited for is rate limited meanwhile: it moves to the other
+        busy, other = used
+        replies[busy].set_result(429)
+        await asyncio.sleep(0.01)
+        assert len(used) == 2
+        replies[other].set_result(200)
+        await waiting
+        assert used == [busy, other, other]
+        await asyncio.gather(*first, return_exceptions=True)
+    assert [k["in_flight"] for k in pool.stats()] == [0, 0]
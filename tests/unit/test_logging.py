@@ -0,0 +1,64 @@
+# tests/unit/test_logging.py
+import io
+import logging
+import threading
+import pytest
+from config.settings import Settings
+from utils.log.setup import configure_logging, stop_logging, DebugSampler, DeferredQueueHandler
+
+@pytest.fixture
+def root():
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    yield root
+    stop_logging()
+    root.handlers[:] = handlers
+    root.setLevel(level)
+
+def test_records_are_written_by_the_listener_thread(root):
+    stream = io.StringIO()
+    threads = []
+
+    class Recording(logging.StreamHandler):
+        def emit(self, record):
+            threads.append(threading.current_thread())
+            super().emit(record)
+
+    configure_logging("INFO", "%(levelname)s %(message)s", 1, handler=Recording(stream))
+    logging.getLogger("test.logging").info("request %s took %.1f ms", "abc", 12.34)
+    logging.getLogger("test.logging").debug("hidden")
+    stop_logging()
+    assert stream.getvalue() == "INFO request abc took 12.3 ms\n"
+    assert threads and threads[0] is not threading.current_thread()
+    assert [type(h) for h in root.handlers] == [DeferredQueueHandler]
+
+def test_configured_from_settings(root, monkeypatch):
+    monkeypatch.setenv("LOG_LEVEL", "WARNING")
+    monkeypatch.setenv("LOG_FORMAT", "[%(name)s] %(message)s")
+    stream = io.StringIO()
+    configure_logging(stream=stream, settings=Settings())
+    logging.getLogger("test.logging").info("skipped")
+    logging.getLogger("test.logging").warning("kept")
+    stop_logging()
+    assert stream.getvalue() == "[test.logging] kept\n"
+
+def test_mutable_arguments_are_formatted_when_logged(root):
+    stream = io.StringIO()
+    configure_logging("INFO", "%(message)s", 1, stream=stream)
+    state = {"attempt": 1}
+    logging.getLogger("test.logging").info("state %s", state)
+    state["attempt"] = 2
+    stop_logging()
+    assert stream.getvalue() == "state {'attempt': 1}\n"
+
+def test_debug_sampling_per_call_site():
+    sampler = DebugSampler(every=10)
+
+    def record(level, lineno):
+        return logging.LogRecord("test", level, __file__, lineno, "msg", None, None)
+
+    kept = [sampler.filter(record(logging.DEBUG, 1)) for _ in range(25)]
+    assert sum(kept) == 3 and kept[0]
+    assert sampler.filter(record(logging.DEBUG, 2))
+    assert all(sampler.filter(record(logging.INFO, 1)) for _ in range(5))
+    assert sampler.dropped == 22
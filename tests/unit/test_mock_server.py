@@ -0,0 +1,88 @@
+# tests/unit/test_mock_server.py
+import random
+import pytest
+from core.api.client import LLMClient, APIError, RateLimitError
+from core.models.config import ModelType
+from utils.mock.server import MockProviderServer, MockConfig, parse_latency
+
+pytestmark = pytest.mark.asyncio
+
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+def make_client(server):
+    return LLMClient(anthropic_base_url=server.anthropic_url, openai_base_url=server.openai_url)
+
+@pytest.mark.parametrize("spec,low,high", [
+    ("fixed:0.25", 0.25, 0.25),
+    ("uniform:0.1,0.2", 0.1, 0.2),
+    ("lognormal:0.1,0.5", 0.0, 10.0),
+    ("exponential:0.1", 0.0, 10.0),
+    ("normal:0.1,0.5", 0.0, 10.0),
+])
+async def test_parse_latency(spec, low, high):
+    sampler = parse_latency(spec)
+    rng = random.Random(1)
+    assert all(low <= sampler(rng) <= high for _ in range(100))
+
+async def test_parse_latency_unknown():
+    with pytest.raises(ValueError):
+        parse_latency("gamma:1")
+
+@pytest.mark.parametrize("model_type", [ModelType.CLAUDE, ModelType.GPT4O])
+async def test_completion(model_type):
+    async with MockProviderServer(MockConfig(output_tokens=5)) as server:
+        async with make_client(server) as client:
+            response = await client.generate(model_type, MESSAGES)
+    assert LLMClient.extract_response(model_type, response) == "tok " * 5
+    assert LLMClient.extract_usage(model_type, response)[1] == 5
+
+@pytest.mark.parametrize("model_type", [ModelType.CLAUDE, ModelType.GPT4O])
+async def test_streaming_paced(model_type):
+    async with MockProviderServer(MockConfig(output_tokens=4, tokens_per_second=1000)) as server:
+        async with make_client(server) as client:
+            response = await client.generate(model_type, MESSAGES, stream=True)
+            chunks = [chunk async for chunk in client.stream_response(response)]
+    assert chunks == ["tok "] * 4
+
+async def test_max_tokens_caps_output():
+    async with MockProviderServer(MockConfig(output_tokens=50)) as server:
+        async with make_client(server) as client:
+            response = await client.generate(ModelType.GPT4O, MESSAGES, max_tokens=3)
+    assert response["usage"]["completion_tokens"] == 3
+
+async def test_large_payload():
+    async with MockProviderServer(MockConfig(payload_bytes=2 * 1024 * 1024)) as server:
+        async with make_client(server) as client:
+            response = await client.generate(ModelType.CLAUDE, MESSAGES)
+    assert len(LLMClient.extract_response(ModelType.CLAUDE, response)) >= 2 * 1024 * 1024
+
+async def test_error_injection():
+    config = MockConfig(rate_429=0.3, rate_5xx=0.3, seed=7)
+    outcomes = {"ok": 0, "429": 0, "5xx": 0}
+    async with MockProviderServer(config) as server:
+        async with make_client(server) as client:
+            for _ in range(60):
+                try:
+                    await client.generate(ModelType.GPT4O, MESSAGES)
+                    outcomes["ok"] += 1
+                except RateLimitError:
+                    outcomes["429"] += 1
+                except APIError:
+                    outcomes["5xx"] += 1
+        assert server.stats["openai_requests"] == 60
+    assert all(count > 0 for count in outcomes.values())
+
+async def test_seeded_runs_repeat():
+    async def run():
+        seen = []
+        async with MockProviderServer(MockConfig(rate_429=0.5, seed=3)) as server:
+            async with make_client(server) as client:
+                for _ in range(20):
+                    try:
+                        await client.generate(ModelType.CLAUDE, MESSAGES)
+                        seen.append(True)
+                    except RateLimitError:
+                        seen.append(False)
+        return seen
+
+    assert await run() == await run()
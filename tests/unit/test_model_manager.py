@@ -93,4 +93,15 @@ def test_cost_calculation(model_manager):
             output_tokens=output_tokens
         )
         assert cost >= 0, f"Cost should be non-negative for {model_type}"
-        assert isinstance(cost, float), f"Cost should be float for {model_type}"
\ No newline at end of file
+        assert isinstance(cost, float), f"Cost should be float for {model_type}"
+
+
+def test_cached_token_pricing(model_manager):
+    """Cache reads are discounted and Claude cache writes carry a premium"""
+    full = model_manager.calculate_cost(ModelType.CLAUDE, 1000, 0)
+    assert model_manager.calculate_cost(ModelType.CLAUDE, 0, 0, cache_read_tokens=1000) == pytest.approx(full * 0.1)
+    assert model_manager.calculate_cost(ModelType.CLAUDE, 0, 0, cache_write_tokens=1000) == pytest.approx(full * 1.25)
+    assert model_manager.cache_savings(ModelType.CLAUDE, 1000, 1000) == pytest.approx(full * 0.65)
+    assert model_manager.calculate_cost(ModelType.GPT4O, 0, 0, cache_read_tokens=1000) == pytest.approx(
+        model_manager.calculate_cost(ModelType.GPT4O, 500, 0)
+    )
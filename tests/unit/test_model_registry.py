@@ -0,0 +1,121 @@
+# tests/unit/test_model_registry.py
+import pytest
+from core.models.config import ModelType, CATALOG_FILE
+from core.models.manager import ModelManager
+from core.models.registry import ModelRegistry
+
+def overlay(path, text):
+    path.write_text(text)
+    return ModelRegistry([CATALOG_FILE, path], reload_interval=0)
+
+def test_indexes_by_capability_provider_and_window():
+    registry = ModelRegistry([CATALOG_FILE])
+    assert registry.find("code") == (ModelType.GPT4O, ModelType.O1_PREVIEW, ModelType.CLAUDE)
+    assert set(registry.find(provider="openai")) == {ModelType.GPT4O, ModelType.O1_PREVIEW}
+    assert registry.find("code", input_length=150000) == (ModelType.CLAUDE,)
+    assert registry.find("code", provider="openai", input_length=150000) == ()
+    assert registry.find("unknown") == ()
+    assert registry.tiers == (128000, 200000)
+    assert registry.length_bounds == (100000, 128000, 200000)
+
+    # No rule names an Anthropic model for code: the indexes decide
+    assert registry.select("code", 1000, provider="anthropic") == ModelType.CLAUDE
+    # Nothing fits: the largest window
+    assert registry.select("chat", 500000) == ModelType.CLAUDE
+    with pytest.raises(ValueError):
+        registry.select("chat", 1000, provider="mistral")
+
+@pytest.mark.parametrize("task, input_length, priority, budget, expected", [
+    ("cot", 1000, "balanced", None, ModelType.O1_PREVIEW),
+    ("complex_reasoning", 1000, "balanced", None, ModelType.O1_PREVIEW),
+    ("analysis", 1000, "balanced", None, ModelType.O1_PREVIEW),
+    ("analysis", 1000, "speed", None, ModelType.O1_PREVIEW),
+    ("analysis", 1000, "quality", None, ModelType.O1_PREVIEW),
+    ("analysis", 110000, "balanced", None, ModelType.O1_PREVIEW),
+    # Past o1-preview's window: the long-input rule
+    ("analysis", 150000, "balanced", None, ModelType.CLAUDE),
+    ("code", 1000, "balanced", None, ModelType.GPT4O),
+    ("code", 1000, "speed", None, ModelType.GPT4O),
+    ("code", 100000, "balanced", None, ModelType.GPT4O),
+    ("code", 100001, "balanced", None, ModelType.CLAUDE),
+    ("creative", 1000, "balanced", None, ModelType.CLAUDE),
+    ("writing", 1000, "speed", None, ModelType.CLAUDE),
+    ("chat", 1000, "balanced", None, ModelType.GPT4O),
+    ("chat", 1000, "speed", None, ModelType.GPT4O),
+    ("chat", 1000, "quality", None, ModelType.GPT4O),
+    ("translation", 1000, "speed", None, ModelType.GPT4O),
+    ("chat", 150000, "speed", None, ModelType.CLAUDE),
+    ("analysis", 1000, "balanced", 0.01, ModelType.GPT4O),
+    ("chat", 1000, "balanced", 0.03, ModelType.CLAUDE),
+    ("analysis", 1000, "balanced", 0.06, ModelType.O1_PREVIEW),
+    ("chat", 1000, "balanced", 0.06, ModelType.GPT4O),
+])
+def test_bundled_routing(task, input_length, priority, budget, expected):
+    registry = ModelRegistry([CATALOG_FILE])
+    assert registry.select(task, input_length, priority=priority, budget=budget) == expected
+
+def test_overlay_changes_prices_and_selection(tmp_path):
+    registry = overlay(tmp_path / "models.toml", """
+routing = []
+
+[models.CLAUDE]
+cost_per_1k_input_tokens = 0.001
+cost_per_1k_output_tokens = 0.002
+endpoint = "http://localhost:9000/v1/messages"
+""")
+    config = registry.get(ModelType.CLAUDE)
+    assert config.cost_per_1k_input_tokens == 0.001
+    assert config.endpoint == "http://localhost:9000/v1/messages"
+    assert config.context_window == 200000
+    # Without routing rules, Claude is now the cheapest model for the task
+    assert registry.select("code", 1000) == ModelType.CLAUDE
+    assert registry.select("code", 1000, priority="speed") == ModelType.O1_PREVIEW
+    assert registry.length_bounds == registry.tiers
+    assert ModelManager(registry).calculate_cost(ModelType.CLAUDE, 1000, 1000) == pytest.approx(0.003)
+
+@pytest.mark.asyncio
+async def test_hot_reload(tmp_path):
+    path = tmp_path / "models.toml"
+    registry = overlay(path, "")
+    manager = ModelManager(registry)
+    assert await manager.select_model("creative", 1000) == ModelType.CLAUDE
+
+    path.write_text("""
+[[routing]]
+tasks = ["creative"]
+models = ["NEW", "GPT4O"]
+
+[models.GPT4O]
+cost_per_1k_output_tokens = 0.001
+""")
+    assert await manager.select_model("creative", 1000) == ModelType.GPT4O
+    # The file's rules replace the bundled ones
+    assert await manager.select_model("analysis", 1000) == ModelType.GPT4O
+    assert manager.get_model_config(ModelType.GPT4O).cost_per_1k_output_tokens == 0.001
+    assert not registry.reload()
+
+def test_bad_catalog_keeps_previous(tmp_path):
+    path = tmp_path / "models.toml"
+    registry = overlay(path, "")
+    before = registry.catalog
+
+    for text in (
+        "[models.GPT4O\n",
+        '[models.GPT4O]\nid = "gpt-4o-2024-08-06"\n',
+        '[models.GPT4O]\nprovider = "mistral"\n',
+        '[models.GPT4O]\ncontext_window = "large"\n',
+        '[models.GPT4O]\ncolor = "blue"\n',
+        '[[routing]]\nmodels = "GPT4O"\n',
+        '[[routing]]\nmodels = ["GPT4O"]\nbudget_below = -1\n',
+        '[[routing]]\nmodels = ["GPT4O"]\ntasks = "code"\n',
+        '[[routing]]\nmodels = ["GPT4O"]\nweight = 2\n',
+    ):
+        path.write_text(text)
+        assert not registry.reload()
+        assert registry.get(ModelType.GPT4O) == before.models[ModelType.GPT4O]
+
+    # A new model is skipped, but the rest of the file still applies
+    path.write_text('[models.NEW]\nid = "new-model"\n\n[models.GPT4O]\ntypical_latency = 0.5\n')
+    assert registry.reload()
+    assert registry.get(ModelType.GPT4O).typical_latency == 0.5
+    assert "NEW" not in ModelType.__members__
@@ -0,0 +1,111 @@
+# tests/unit/test_packing.py
+import json
+import pytest
+from core.api.client import LLMClient
+from core.api.transport import InProcessTransport
+from core.batch.packing import PromptPacker, split_tokens
+from core.batch.runner import BatchRunner, BatchItem
+from core.models.config import ModelType
+from utils.mock.server import MockProviderServer, MockConfig
+
+def item(i, prompt="tiny", model_type=ModelType.GPT4O, system="classify", **params):
+    return BatchItem(str(i), model_type, [{"role": "user", "content": prompt}], {"system": system, **params})
+
+def test_compatible_items_share_key():
+    packer = PromptPacker()
+    assert packer.key(item(1, max_tokens=5)) == packer.key(item(2, "other", max_tokens=9))
+    assert packer.key(item(1)) != packer.key(item(2, system="summarize"))
+    assert packer.key(item(1)) != packer.key(item(2, model_type=ModelType.CLAUDE))
+
+def test_key_compares_translated_requests():
+    packer = PromptPacker()
+    leading = BatchItem("2", ModelType.GPT4O, [{"role": "system", "content": "classify"}, {"role": "user", "content": "x"}])
+    assert packer.key(item(1)) == packer.key(leading)
+    claude = packer.key(item(1, model_type=ModelType.CLAUDE, stop="END"))
+    assert claude == packer.key(item(2, model_type=ModelType.CLAUDE, stop_sequences=["END"]))
+
+def test_unpackable_items():
+    packer = PromptPacker(max_item_tokens=10)
+    assert packer.key(item(1, "x" * 100)) is None
+    blocks = BatchItem("2", ModelType.GPT4O, [{"role": "user", "content": [{"type": "text", "text": "x"}]}])
+    assert packer.key(blocks) is None
+
+def test_pack_keeps_instructions_and_numbers_inputs():
+    packed = PromptPacker(item_max_tokens=50).pack([item(1, "first", max_tokens=8), item(2, "second")])
+    assert packed.params == {"system": "classify", "max_tokens": 58}
+    prompt = packed.messages[-1]["content"]
+    assert '<input id="1">\nfirst\n</input>' in prompt
+    assert '<input id="2">\nsecond\n</input>' in prompt
+
+@pytest.mark.parametrize("text,expected", [
+    ('{"1": "pos", "2": "neg"}', {0: "pos", 1: "neg"}),
+    ('```json\n{"2": "neg"}\n```', {1: "neg"}),
+    ('Sure! {"1": {"label": "pos"}}', {0: '{"label": "pos"}'}),
+    ("not json", {}),
+    ('["pos", "neg"]', {}),
+])
+def test_unpack(text, expected):
+    assert PromptPacker.unpack(text, 2) == expected
+
+def test_split_tokens_adds_up():
+    assert split_tokens(10, [1, 1, 1]) == [4, 3, 3]
+    assert sum(split_tokens(1001, [5, 0, 7])) == 1001
+    assert split_tokens(4, [0, 0]) == [2, 2]
+
+def write_items(path, count, model="gpt-4o", **extra):
+    with open(path, "w") as f:
+        for i in range(count):
+            f.write(json.dumps({"id": f"r{i}", "model": model, "system": "classify", "prompt": f"review {i}", **extra}) + "\n")
+
+def recording(server):
+    """A transport handler for the mock server that keeps each request body."""
+    bodies = []
+
+    async def handle(request):
+        bodies.append(request.payload)
+        return await server.handle(request)
+    return handle, bodies
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("model,provider", [("gpt-4o", "openai"), ("claude-3-5-sonnet-20241022", "anthropic")])
+async def test_runner_packs_and_resends_missed_items(tmp_path, model, provider):
+    input_path, output_path = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    write_items(input_path, 25, model=model, stop="END")
+    server = MockProviderServer(MockConfig(output_tokens=2, pack_drop_rate=0.2, seed=3))
+    handle, bodies = recording(server)
+    async with LLMClient(transport=InProcessTransport(handle)) as client:
+        stats = await BatchRunner(client, retry_backoff=0.0, packer=PromptPacker(max_items=10)).run(input_path, output_path)
+
+    records = [json.loads(line) for line in output_path.read_text().splitlines()]
+    assert sorted(r["id"] for r in records) == sorted(f"r{i}" for i in range(25))
+    assert stats.packed_requests == 3
+    assert stats.unpacked > 0
+    assert stats.packed_items + stats.unpacked == 25
+    assert server.stats[f"{provider}_requests"] == 3 + stats.unpacked
+    packed_bodies = [b for b in bodies if '<input id="1">' in b["messages"][-1]["content"]]
+    assert len(packed_bodies) == 3
+    for body in packed_bodies:
+        if provider == "openai":
+            assert "system" not in body and body["stop"] == "END"
+            assert body["messages"][0] == {"role": "system", "content": "classify"}
+        else:
+            assert body["system"] == "classify" and body["stop_sequences"] == ["END"]
+            assert "stop" not in body
+            assert all(m["role"] != "system" for m in body["messages"])
+    assert sorted(b["max_tokens"] for b in packed_bodies) == [1280, 2560, 2560]
+    packed = [r for r in records if r["via"] == "packed"]
+    assert all(r["text"] == "tok tok " and r["pack"].startswith("pack:") for r in packed)
+    assert stats.cost == pytest.approx(sum(r["cost"] for r in records))
+
+@pytest.mark.asyncio
+async def test_runner_sends_lone_and_large_items_unpacked(tmp_path):
+    input_path, output_path = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    write_items(input_path, 1)
+    with open(input_path, "a") as f:
+        f.write(json.dumps({"id": "big", "model": "gpt-4o", "system": "classify", "prompt": "x" * 4000}) + "\n")
+    server = MockProviderServer(MockConfig(output_tokens=2))
+    async with LLMClient(transport=InProcessTransport(server.handle)) as client:
+        stats = await BatchRunner(client, packer=PromptPacker()).run(input_path, output_path)
+    assert stats.completed == 2
+    assert stats.packed_requests == 0
+    assert {json.loads(line)["via"] for line in output_path.read_text().splitlines()} == {"sync"}
@@ -0,0 +1,76 @@
+# tests/unit/test_planner.py
+import json
+import numpy as np
+import pytest
+from core.models.config import ModelType
+from core.models.manager import ModelManager
+from core.models.planner import CostPlanner, Workload, load_workload, MODELS
+
+ROWS = [
+    {"model": "gpt-4o", "input_tokens": 1000, "output_tokens": 200, "task_type": "code"},
+    {"model": ModelType.CLAUDE.value, "input_tokens": 5000, "output_tokens": 800, "cache_read_tokens": 4000, "task_type": "creative"},
+    {"model": "o1-preview", "input_tokens": 300, "output_tokens": 2000, "task_type": "analysis", "budget": 0.01},
+    {"model": "gpt-4o", "input_tokens": 150000, "output_tokens": 100, "batch": True},
+]
+
+def test_cost_matrix_matches_calculate_cost():
+    workload = Workload.from_records(ROWS)
+    costs = CostPlanner().cost_matrix(workload)
+    manager = ModelManager()
+    for i, row in enumerate(ROWS):
+        for j, model in enumerate(MODELS):
+            expected = manager.calculate_cost(
+                model, row["input_tokens"], row["output_tokens"], batch=row.get("batch", False),
+                cache_read_tokens=row.get("cache_read_tokens", 0),
+            )
+            assert costs[i, j] == pytest.approx(expected)
+
+def test_select_policy_matches_select_model():
+    workload = Workload.from_records(ROWS)
+    routed = CostPlanner().route(workload, "select:balanced")
+    assert [MODELS[i] for i in routed] == [ModelType.GPT4O, ModelType.CLAUDE, ModelType.GPT4O, ModelType.CLAUDE]
+
+@pytest.mark.asyncio
+async def test_select_policy_inside_event_loop():
+    routed = CostPlanner().route(Workload.from_records(ROWS), "select:balanced")
+    assert [MODELS[i] for i in routed] == [ModelType.GPT4O, ModelType.CLAUDE, ModelType.GPT4O, ModelType.CLAUDE]
+
+def test_cheapest_respects_context_window():
+    rows = [{"input_tokens": 100, "output_tokens": 10}, {"input_tokens": 150000, "output_tokens": 10}, {"input_tokens": 250000, "output_tokens": 0}]
+    routed = CostPlanner().route(Workload.from_records(rows), "cheapest")
+    assert list(routed) == [MODELS.index(ModelType.GPT4O), MODELS.index(ModelType.CLAUDE), -1]
+
+def test_plan_totals_and_savings():
+    workload = Workload.from_records(ROWS)
+    plan = CostPlanner().plan(workload, ["logged", "gpt-4o", "cheapest"])
+    logged, fixed, cheapest = plan.policies
+    costs = CostPlanner().cost_matrix(workload)
+    assert plan.baseline == "logged"
+    assert logged.total == pytest.approx(costs[np.arange(4), workload.model].sum())
+    assert fixed.total == pytest.approx(plan.model_totals["gpt-4o"])
+    assert fixed.requests == {"gpt-4o": 4}
+    assert cheapest.savings == pytest.approx(logged.total - cheapest.total)
+    assert logged.percentiles[50] <= logged.percentiles[99] <= logged.max
+
+def test_plan_skips_logged_without_models():
+    plan = CostPlanner().plan(Workload.from_records([{"input_tokens": 10, "output_tokens": 10}]))
+    assert [p.name for p in plan.policies] == ["select:balanced", "select:speed", "cheapest"]
+    with pytest.raises(ValueError):
+        CostPlanner().plan(Workload.from_records([{"input_tokens": 10}]), ["logged"])
+    with pytest.raises(ValueError):
+        CostPlanner().plan(Workload.from_records([{"input_tokens": 10}]), ["fastest"])
+
+def test_load_csv_and_batch_output(tmp_path):
+    csv_path = tmp_path / "workload.csv"
+    csv_path.write_text("model,input_tokens,output_tokens,budget\ngpt-4o,100,10,\nclaude-3-5-sonnet-20241022,200,20,0.03\n")
+    workload = load_workload(csv_path)
+    assert list(workload.input_tokens) == [100, 200]
+    assert np.isnan(workload.budget[0]) and workload.budget[1] == 0.03
+
+    jsonl_path = tmp_path / "results.jsonl"
+    jsonl_path.write_text("\n".join(json.dumps(r) for r in [
+        {"id": "a", "model": "gpt-4o", "usage": {"input_tokens": 50, "output_tokens": 5}, "via": "batch"},
+        {"id": "b", "model": "gpt-4o", "error": "boom"},
+    ]) + "\n")
+    workload = load_workload(jsonl_path)
+    assert len(workload) == 1 and workload.batch[0]
@@ -0,0 +1,148 @@
+# tests/unit/test_prompt_cache.py
+import json
+import pytest
+from core.api.codec import JSONCodec, MessagePrefix, PrefixedMessages
+from core.api.client import LLMClient
+from core.api.prompt_cache import PromptCachePlanner, EPHEMERAL
+from core.api.response import LLMResponse
+from core.api.transport import InProcessTransport
+from core.models.config import ModelType
+from utils.mock.server import MockProviderServer, MockConfig
+
+SYSTEM = "Answer from this document.\n" + "lorem ipsum " * 2000
+DOCUMENT = {"role": "user", "content": "Document:\n" + "dolor sit " * 2000}
+
+def payload(*messages, system=SYSTEM):
+    body = {"model": ModelType.CLAUDE.value, "messages": list(messages), "max_tokens": 10}
+    if system:
+        body["system"] = system
+    return body
+
+def question(i):
+    return {"role": "user", "content": f"question {i}"}
+
+def test_first_request_is_left_alone():
+    planner = PromptCachePlanner()
+    body = payload(question(1))
+    assert planner.plan(body) is body
+
+def test_repeated_system_prompt_gets_breakpoint():
+    planner = PromptCachePlanner()
+    planner.plan(payload(question(1)))
+    planned = planner.plan(payload(question(2)))
+    assert planned["system"] == [{"type": "text", "text": SYSTEM, "cache_control": EPHEMERAL}]
+    assert planned["messages"] == [question(2)]
+
+def test_breakpoint_at_longest_shared_prefix():
+    planner = PromptCachePlanner()
+    planner.plan(payload(DOCUMENT, question(1)))
+    messages = [DOCUMENT, question(2)]
+    planned = planner.plan(payload(*messages))
+    assert planned["system"] == SYSTEM
+    assert planned["messages"][0]["content"][-1]["cache_control"] == EPHEMERAL
+    assert planned["messages"][1] == question(2)
+    # The caller's messages are not modified
+    assert messages[0] is DOCUMENT and isinstance(DOCUMENT["content"], str)
+
+def test_prefixed_messages_keep_their_serialized_prefix():
+    calls = []
+
+    class Counting(JSONCodec):
+        def dumps(self, obj):
+            calls.append(obj)
+            return super().dumps(obj)
+
+    codec = Counting()
+    planner = PromptCachePlanner(codec=codec)
+    prefix = MessagePrefix([DOCUMENT, {"role": "assistant", "content": "Read."}])
+    for i in range(3):
+        planned = planner.plan(payload(system=None) | {"messages": prefix + [question(i)]})
+        messages = planned["messages"]
+        # The breakpoint lands inside the prefix, which the codec can still splice in
+        assert isinstance(messages, PrefixedMessages) and messages.intact()
+        assert json.loads(codec.encode_payload(planned)) == json.loads(json.dumps(planned))
+    assert messages[1]["content"][-1]["cache_control"] == EPHEMERAL
+    assert prefix.messages[1]["content"] == "Read."
+    # Each prefix message is serialized once, not on every request
+    assert sum(1 for obj in calls if obj is DOCUMENT) == 1
+
+def test_breakpoint_in_tail_keeps_prefix():
+    planner = PromptCachePlanner()
+    prefix = MessagePrefix([question(0)])
+    planner.plan(payload(system=None) | {"messages": prefix + [DOCUMENT, question(1)]})
+    planned = planner.plan(payload(system=None) | {"messages": prefix + [DOCUMENT, question(2)]})
+    messages = planned["messages"]
+    assert messages.prefix is prefix and messages.intact()
+    assert messages[1]["content"][-1]["cache_control"] == EPHEMERAL
+
+def test_short_prefixes_not_marked():
+    planner = PromptCachePlanner()
+    planner.plan(payload(question(1), system="short"))
+    body = payload(question(2), system="short")
+    assert planner.plan(body) is body
+
+def test_prefix_seen_on_another_model_not_marked():
+    planner = PromptCachePlanner()
+    planner.plan(payload(question(1)) | {"model": "claude-3-opus-20240229"})
+    body = payload(question(2))
+    assert planner.plan(body) is body
+
+def test_text_messages_fingerprinted_without_serializing():
+    calls = []
+
+    class Counting(JSONCodec):
+        def dumps(self, obj):
+            calls.append(obj)
+            return super().dumps(obj)
+
+    planner = PromptCachePlanner(codec=Counting())
+    planner.plan(payload(DOCUMENT, question(1)))
+    planned = planner.plan(payload(DOCUMENT, question(2)))
+    assert planned["messages"][0]["content"][-1]["cache_control"] == EPHEMERAL
+    assert calls == []
+
+def test_caller_breakpoints_respected():
+    planner = PromptCachePlanner()
+    marked = {"role": "user", "content": [{"type": "text", "text": "x", "cache_control": EPHEMERAL}]}
+    planner.plan(payload(marked))
+    body = payload(marked)
+    assert planner.plan(body) is body
+
+def test_cache_usage_parsed():
+    claude = LLMResponse(ModelType.CLAUDE, {"usage": {
+        "input_tokens": 10, "output_tokens": 5, "cache_read_input_tokens": 900, "cache_creation_input_tokens": 100,
+    }})
+    assert claude.usage.cache_read_tokens == 900
+    assert claude.usage.cache_write_tokens == 100
+    assert claude.usage.prompt_tokens == 1010
+    openai = {"choices": [{"message": {"content": ""}}], "usage": {
+        "prompt_tokens": 1000, "completion_tokens": 5, "prompt_tokens_details": {"cached_tokens": 800},
+    }}
+    assert LLMResponse(ModelType.GPT4O, openai).usage[:3] == (200, 5, 800)
+    assert LLMClient.extract_usage(ModelType.GPT4O, openai) == (200, 5)
+    assert LLMClient.extract_cache_usage(ModelType.GPT4O, openai) == (800, 0)
+
+@pytest.mark.asyncio
+async def test_client_reads_cache_from_third_request():
+    server = MockProviderServer(MockConfig(output_tokens=2))
+    async with LLMClient(transport=InProcessTransport(server.handle)) as client:
+        responses = [
+            await client.generate(ModelType.CLAUDE, [question(i)], system=SYSTEM)
+            for i in range(4)
+        ]
+    reads = [r.usage.cache_read_tokens for r in responses]
+    writes = [r.usage.cache_write_tokens for r in responses]
+    assert reads[:2] == [0, 0] and all(reads[2:])
+    assert writes[0] == 0 and writes[1] > 0 and writes[2:] == [0, 0]
+    report = client.prompt_cache.report()
+    assert report["hits"] == 2
+    assert report["cost_saved"] > 0
+
+@pytest.mark.asyncio
+async def test_prompt_cache_can_be_disabled():
+    server = MockProviderServer(MockConfig(output_tokens=2))
+    async with LLMClient(transport=InProcessTransport(server.handle), prompt_cache=False) as client:
+        for i in range(3):
+            response = await client.generate(ModelType.CLAUDE, [question(i)], system=SYSTEM)
+    assert client.prompt_cache is None
+    assert response.usage.cache_read_tokens == 0
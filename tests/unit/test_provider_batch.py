@@ -0,0 +1,411 @@
+# tests/unit/test_provider_batch.py
+import asyncio
+import json
+import socket
+import pytest
+from aiohttp import web
+from core.api.client import LLMClient
+from core.batch.provider import ProviderBatchClient, ProviderBatchJob
+from core.batch.runner import BatchItem, BatchRunner
+from core.security.keys import KeyPool
+from core.models.config import ModelType
+
+pytestmark = pytest.mark.asyncio
+
+class BatchStandIn:
+    """Local server emulating the Anthropic and OpenAI batch lifecycles."""
+
+    def __init__(self, polls_until_done=2, never_finish=False):
+        self.polls_until_done = polls_until_done
+        self.never_finish = never_finish
+        self.batches = {}
+        self.files = {}
+        self.sync_calls = []
+        self.sync_bodies = []
+        self.cancelled = []
+        # Credential of every batch-endpoint request
+        self.batch_keys = []
+        self.base = None
+
+    @staticmethod
+    def _reply(prompt):
+        return f"re:{prompt}"
+
+    def app(self) -> web.Application:
+        @web.middleware
+        async def record_key(request, handler):
+            if "batches" in request.path or "files" in request.path:
+                self.batch_keys.append(request.headers.get("x-api-key") or request.headers.get("Authorization"))
+            return await handler(request)
+
+        app = web.Application(middlewares=[record_key])
+        app.router.add_post("/v1/messages", self.claude_sync)
+        app.router.add_post("/v1/messages/batches", self.claude_create)
+        app.router.add_get("/v1/messages/batches/{id}", self.claude_get)
+        app.router.add_get("/v1/messages/batches/{id}/results", self.claude_results)
+        app.router.add_post("/v1/messages/batches/{id}/cancel", self.cancel)
+        app.router.add_post("/v1/chat/completions", self.openai_sync)
+        app.router.add_post("/v1/files", self.openai_upload)
+        app.router.add_get("/v1/files/{id}/content", self.openai_file)
+        app.router.add_post("/v1/batches", self.openai_create)
+        app.router.add_get("/v1/batches/{id}", self.openai_get)
+        app.router.add_post("/v1/batches/{id}/cancel", self.cancel)
+        return app
+
+    def _advance(self, batch):
+        batch["polls"] += 1
+        if batch.get("cancelled"):
+            return True
+        return not self.never_finish and batch["polls"] >= self.polls_until_done
+
+    @staticmethod
+    def _stopped(batch, prompt):
+        """Whether a cancel stopped this request before it ran; "slow" ones never get to run."""
+        return batch.get("cancelled") and "slow" in prompt
+
+    def _claude_message(self, body):
+        prompt = body["messages"][-1]["content"]
+        return {
+            "content": [{"type": "text", "text": self._reply(prompt)}],
+            "usage": {"input_tokens": 10, "output_tokens": 2},
+        }
+
+    def _openai_completion(self, body):
+        prompt = body["messages"][-1]["content"]
+        return {
+            "choices": [{"message": {"content": self._reply(prompt)}}],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 2},
+        }
+
+    async def claude_sync(self, request):
+        body = await request.json()
+        self.sync_bodies.append(body)
+        self.sync_calls.append(body["messages"][-1]["content"])
+        return web.json_response(self._claude_message(body))
+
+    async def claude_create(self, request):
+        assert request.headers.get("x-api-key")
+        body = await request.json()
+        batch_id = f"msgbatch_{len(self.batches)}"
+        self.batches[batch_id] = {"requests": body["requests"], "polls": 0}
+        return web.json_response({"id": batch_id, "processing_status": "in_progress"})
+
+    async def claude_get(self, request):
+        batch_id = request.match_info["id"]
+        if self._advance(self.batches[batch_id]):
+            return web.json_response({
+                "id": batch_id,
+                "processing_status": "ended",
+                "results_url": f"{self.base}/v1/messages/batches/{batch_id}/results",
+            })
+        return web.json_response({"id": batch_id, "processing_status": "in_progress", "results_url": None})
+
+    async def claude_results(self, request):
+        lines = []
+        batch = self.batches[request.match_info["id"]]
+        for req in batch["requests"]:
+            prompt = req["params"]["messages"][-1]["content"]
+            if self._stopped(batch, prompt):
+                result = {"type": "canceled"}
+            elif "fail" in prompt:
+                result = {"type": "errored", "error": {"type": "overloaded_error"}}
+            else:
+                result = {"type": "succeeded", "message": self._claude_message(req["params"])}
+            lines.append(json.dumps({"custom_id": req["custom_id"], "result": result}))
+        return web.Response(text="\n".join(lines) + "\n", content_type="application/binary")
+
+    async def openai_sync(self, request):
+        body = await request.json()
+        self.sync_bodies.append(body)
+        self.sync_calls.append(body["messages"][-1]["content"])
+        return web.json_response(self._openai_completion(body))
+
+    async def openai_upload(self, request):
+        assert request.headers["Authorization"].startswith("Bearer ")
+        form = await request.post()
+        assert form["purpose"] == "batch"
+        file_id = f"file-{len(self.files)}"
+        self.files[file_id] = form["file"].file.read().decode()
+        return web.json_response({"id": file_id})
+
+    async def openai_file(self, request):
+        return web.Response(text=self.files[request.match_info["id"]], content_type="application/jsonl")
+
+    async def openai_create(self, request):
+        body = await request.json()
+        assert body["endpoint"] == "/v1/chat/completions"
+        batch_id = f"batch_{len(self.batches)}"
+        self.batches[batch_id] = {"input": body["input_file_id"], "polls": 0}
+        return web.json_response({"id": batch_id, "status": "validating"})
+
+    async def openai_get(self, request):
+        batch_id = request.match_info["id"]
+        batch = self.batches[batch_id]
+        if not self._advance(batch):
+            return web.json_response({"id": batch_id, "status": "in_progress"})
+        output, errors = [], []
+        for line in self.files[batch["input"]].splitlines():
+            req = json.loads(line)
+            prompt = req["body"]["messages"][-1]["content"]
+            if self._stopped(batch, prompt):
+                continue
+            if "fail" in prompt:
+                errors.append({"custom_id": req["custom_id"], "response": None, "error": {"code": "server_error"}})
+            else:
+                output.append({
+                    "custom_id": req["custom_id"],
+                    "response": {"status_code": 200, "body": self._openai_completion(req["body"])},
+                    "error": None,
+                })
+        out_id, err_id = f"file-out-{batch_id}", f"file-err-{batch_id}"
+        self.files[out_id] = "".join(json.dumps(o) + "\n" for o in output)
+        self.files[err_id] = "".join(json.dumps(e) + "\n" for e in errors)
+        return web.json_response({
+            "id": batch_id,
+            "status": "cancelled" if batch.get("cancelled") else "completed",
+            "output_file_id": out_id,
+            "error_file_id": err_id,
+        })
+
+    async def cancel(self, request):
+        self.cancelled.append(request.match_info["id"])
+        self.batches[request.match_info["id"]]["cancelled"] = True
+        return web.json_response({"id": request.match_info["id"]})
+
+async def start(stand_in, unused_port):
+    runner = web.AppRunner(stand_in.app())
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", unused_port).start()
+    stand_in.base = f"http://127.0.0.1:{unused_port}"
+    return runner
+
+@pytest.fixture
+def unused_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def make_client(stand_in):
+    return LLMClient(
+        anthropic_base_url=f"{stand_in.base}/v1/messages",
+        openai_base_url=f"{stand_in.base}/v1/chat/completions",
+    )
+
+def items(model_type, prompts):
+    return [
+        BatchItem(id=f"{model_type.name}:{p}", model_type=model_type, messages=[{"role": "user", "content": p}])
+        for p in prompts
+    ]
+
+class TestProviderBatchClient:
+    @pytest.mark.parametrize("model_type", [ModelType.CLAUDE, ModelType.GPT4O])
+    async def test_lifecycle_maps_results_to_ids(self, unused_port, model_type):
+        stand_in = BatchStandIn()
+        runner = await start(stand_in, unused_port)
+        try:
+            async with make_client(stand_in) as client:
+                batch = ProviderBatchClient(client, poll_interval=0.01)
+                work = items(model_type, ["a", "b", "c"])
+                results = {r.id: r async for r in batch.run(work)}
+        finally:
+            await runner.cleanup()
+
+        assert set(results) == {item.id for item in work}
+        for item in work:
+            text = LLMClient.extract_response(model_type, results[item.id].response)
+            assert text == f"re:{item.messages[0]['content']}"
+            assert results[item.id].via_batch
+        assert stand_in.sync_calls == []
+
+    async def test_failed_items_fall_back_to_sync(self, unused_port):
+        stand_in = BatchStandIn()
+        runner = await start(stand_in, unused_port)
+        try:
+            async with make_client(stand_in) as client:
+                batch = ProviderBatchClient(client, poll_interval=0.01)
+                work = items(ModelType.CLAUDE, ["ok", "fail-me"]) + items(ModelType.GPT4O, ["fail-too", "fine"])
+                results = {r.id: r async for r in batch.run(work)}
+        finally:
+            await runner.cleanup()
+
+        assert sorted(stand_in.sync_calls) == ["fail-me", "fail-too"]
+        assert not results["CLAUDE:fail-me"].via_batch
+        assert results["CLAUDE:fail-me"].error is None
+        assert results["GPT4O:fine"].via_batch
+
+    async def test_fallback_requests_translated_per_provider(self, unused_port):
+        stand_in = BatchStandIn()
+        runner = await start(stand_in, unused_port)
+        params = {"system": "Be brief.", "stop": "END"}
+        try:
+            async with make_client(stand_in) as client:
+                batch = ProviderBatchClient(client, poll_interval=0.01)
+                work = [
+                    BatchItem(f"{m.name}:fail", m, [{"role": "user", "content": "fail-me"}], params)
+                    for m in (ModelType.CLAUDE, ModelType.GPT4O)
+                ]
+                results = {r.id: r async for r in batch.run(work)}
+        finally:
+            await runner.cleanup()
+
+        assert all(r.error is None and not r.via_batch for r in results.values())
+        claude, openai = sorted(stand_in.sync_bodies, key=lambda body: "system" not in body)
+        assert claude["system"] == "Be brief." and claude["stop_sequences"] == ["END"] and "stop" not in claude
+        assert openai["messages"][0] == {"role": "system", "content": "Be brief."}
+        assert openai["stop"] == "END" and "system" not in openai
+
+    async def test_fallback_item_timeout_fails_only_that_item(self, unused_port):
+        stand_in = BatchStandIn()
+        runner = await start(stand_in, unused_port)
+        try:
+            async with make_client(stand_in) as client:
+                generate = client.generate
+
+                async def time_out_one(model_type, messages, **params):
+                    if messages[-1]["content"] == "fail-slow":
+                        raise asyncio.TimeoutError()
+                    return await generate(model_type, messages, **params)
+
+                client.generate = time_out_one
+                batch = ProviderBatchClient(client, poll_interval=0.01)
+                work = items(ModelType.CLAUDE, ["ok", "fail-me", "fail-slow"])
+                results = {r.id: r async for r in batch.run(work)}
+        finally:
+            await runner.cleanup()
+
+        assert set(results) == {item.id for item in work}
+        assert results["CLAUDE:fail-slow"].error == "TimeoutError"
+        assert results["CLAUDE:fail-me"].error is None and not results["CLAUDE:fail-me"].via_batch
+        assert results["CLAUDE:ok"].via_batch
+
+    @pytest.mark.parametrize("model_type", [ModelType.CLAUDE, ModelType.GPT4O])
+    async def test_stragglers_cancelled_and_only_unfinished_sent_sync(self, unused_port, model_type):
+        stand_in = BatchStandIn(never_finish=True)
+        runner = await start(stand_in, unused_port)
+        try:
+            async with make_client(stand_in) as client:
+                batch = ProviderBatchClient(client, poll_interval=0.01)
+                work = items(model_type, ["quick-1", "slow-1", "slow-2"])
+                results = {r.id: r async for r in batch.run(work, straggler_timeout=0.05)}
+        finally:
+            await runner.cleanup()
+
+        assert len(stand_in.cancelled) == 1
+        # The request the provider finished before the cancel is kept, not paid for twice
+        assert sorted(stand_in.sync_calls) == ["slow-1", "slow-2"]
+        assert results[f"{model_type.name}:quick-1"].via_batch
+        assert all(r.error is None for r in results.values())
+
+    async def test_cancelled_job_that_never_stops_is_resent(self, unused_port):
+        stand_in = BatchStandIn(never_finish=True)
+
+        async def ignore_cancel(request):
+            return web.json_response({"id": request.match_info["id"]})
+
+        stand_in.cancel = ignore_cancel
+        runner = await start(stand_in, unused_port)
+        try:
+            async with make_client(stand_in) as client:
+                batch = ProviderBatchClient(client, poll_interval=0.01, cancel_timeout=0.05)
+                work = items(ModelType.GPT4O, ["quick-1", "slow-1"])
+                results = {r.id: r async for r in batch.run(work, straggler_timeout=0.05)}
+        finally:
+            await runner.cleanup()
+
+        assert sorted(stand_in.sync_calls) == ["quick-1", "slow-1"]
+        assert all(not r.via_batch for r in results.values())
+
+    @pytest.mark.parametrize("model_type", [ModelType.CLAUDE, ModelType.GPT4O])
+    async def test_job_stays_on_one_key(self, unused_port, model_type):
+        stand_in = BatchStandIn(polls_until_done=3)
+        runner = await start(stand_in, unused_port)
+        provider = "anthropic" if model_type == ModelType.CLAUDE else "openai"
+        pool = KeyPool(provider, ["key-one", "key-two"])
+        try:
+            async with LLMClient(
+                anthropic_base_url=f"{stand_in.base}/v1/messages",
+                openai_base_url=f"{stand_in.base}/v1/chat/completions",
+                key_pools={provider: pool},
+            ) as client:
+                batch = ProviderBatchClient(client, poll_interval=0.01)
+                work = items(model_type, ["a", "b"])
+                job = await batch.submit(model_type, work)
+                # A restarted run reattaches under the key recorded on the job
+                restored = ProviderBatchJob.from_dict(json.loads(json.dumps(job.to_dict())))
+                batch.release(job)
+                # Makes the pool's choice the other key
+                other = pool.acquire()
+                results = [r async for r in ProviderBatchClient(client, poll_interval=0.01).run(work, jobs=[restored])]
+                pool.release(other)
+        finally:
+            await runner.cleanup()
+
+        assert len(results) == 2
+        assert len(stand_in.batch_keys) >= 5
+        assert len(set(stand_in.batch_keys)) == 1
+        assert [entry["in_flight"] for entry in pool.stats()] == [0, 0]
+
+    async def test_large_input_split_into_batches(self, unused_port):
+        stand_in = BatchStandIn(polls_until_done=1)
+        runner = await start(stand_in, unused_port)
+        try:
+            async with make_client(stand_in) as client:
+                batch = ProviderBatchClient(client, poll_interval=0.01, max_batch_size=4)
+                work = items(ModelType.CLAUDE, [str(i) for i in range(10)])
+                submitted = []
+                results = [r async for r in batch.run(work, on_submit=submitted.append)]
+        finally:
+            await runner.cleanup()
+
+        assert [len(job.item_ids) for job in submitted] == [4, 4, 2]
+        assert len(results) == 10
+
+    async def test_reattach_to_submitted_job(self, unused_port):
+        stand_in = BatchStandIn()
+        runner = await start(stand_in, unused_port)
+        try:
+            async with make_client(stand_in) as client:
+                batch = ProviderBatchClient(client, poll_interval=0.01)
+                work = items(ModelType.CLAUDE, ["x", "y"])
+                job = await batch.submit(ModelType.CLAUDE, work)
+                restored = ProviderBatchJob.from_dict(json.loads(json.dumps(job.to_dict())))
+                results = [r async for r in batch.run(work, jobs=[restored])]
+        finally:
+            await runner.cleanup()
+
+        assert len(stand_in.batches) == 1
+        assert {r.id for r in results} == {item.id for item in work}
+
+async def test_batch_runner_provider_mode(unused_port, tmp_path):
+    stand_in = BatchStandIn()
+    runner = await start(stand_in, unused_port)
+    input_path, output_path = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    with open(input_path, "w") as f:
+        for i in range(4):
+            model = ModelType.CLAUDE.value if i % 2 else ModelType.GPT4O.value
+            f.write(json.dumps({"id": i, "model": model, "prompt": f"p{i}"}) + "\n")
+    try:
+        async with make_client(stand_in) as client:
+            batch = ProviderBatchClient(client, poll_interval=0.01)
+            stats = await BatchRunner(client, provider_batch=batch).run(input_path, output_path)
+    finally:
+        await runner.cleanup()
+
+    records = [json.loads(line) for line in output_path.read_text().splitlines()]
+    assert stats.completed == 4
+    assert {r["via"] for r in records} == {"batch"}
+    assert not (tmp_path / "out.jsonl.jobs.json").exists()
+    # Batch results are billed at the discounted rate
+    sync_cost = BatchRunner(client).manager.calculate_cost(ModelType.GPT4O, 10, 2)
+    gpt = next(r for r in records if r["model"] == ModelType.GPT4O.value)
+    assert gpt["cost"] == pytest.approx(sync_cost * 0.5)
+
+async def test_request_bodies_translated_per_provider():
+    batch = ProviderBatchClient(LLMClient())
+    params = {"system": "Be brief.", "stop": "END"}
+    openai = batch._request_body(BatchItem("a", ModelType.GPT4O, [{"role": "user", "content": "hi"}], params))
+    assert openai["messages"][0] == {"role": "system", "content": "Be brief."}
+    assert openai["stop"] == "END" and "system" not in openai
+    claude = batch._request_body(BatchItem("b", ModelType.CLAUDE, [{"role": "user", "content": "hi"}], params))
+    assert claude["system"] == "Be brief." and claude["stop_sequences"] == ["END"] and "stop" not in claude
+    assert claude["max_tokens"] == 1024
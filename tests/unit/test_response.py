@@ -0,0 +1,106 @@
+# tests/unit/test_response.py
+import json
+import pytest
+from core.api.client import LLMClient, APIError
+from core.api.response import LLMResponse, Usage, ToolCall
+from core.api.transport import InProcessTransport, TransportResponse
+from core.models.config import ModelType
+from utils.mock.server import MockProviderServer, MockConfig
+
+CLAUDE_BODY = {
+    "id": "msg_1",
+    "content": [
+        {"type": "text", "text": "Let me check. "},
+        {"type": "tool_use", "id": "tu_1", "name": "weather", "input": {"city": "Oslo"}},
+        {"type": "text", "text": "Done."},
+    ],
+    "stop_reason": "tool_use",
+    "usage": {"input_tokens": 12, "output_tokens": 7},
+}
+
+OPENAI_BODY = {
+    "id": "chatcmpl-1",
+    "choices": [{
+        "message": {
+            "role": "assistant",
+            "content": None,
+            "tool_calls": [
+                {"id": "call_1", "type": "function", "function": {"name": "weather", "arguments": "{\"city\": \"Oslo\"}"}},
+                {"id": "call_2", "type": "function", "function": {"name": "broken", "arguments": "{not json"}},
+            ],
+        },
+        "finish_reason": "tool_calls",
+    }],
+    "usage": {"prompt_tokens": 20, "completion_tokens": 4},
+}
+
+def test_claude_fields():
+    response = LLMResponse(ModelType.CLAUDE, json.dumps(CLAUDE_BODY).encode())
+    assert response.text == "Let me check. Done."
+    assert response.tool_calls == (ToolCall("tu_1", "weather", {"city": "Oslo"}),)
+    assert response.usage == Usage(12, 7)
+    assert response.stop_reason == "tool_use"
+    assert response.id == "msg_1"
+    assert response.provider == "anthropic"
+
+def test_openai_fields():
+    response = LLMResponse(ModelType.GPT4O, json.dumps(OPENAI_BODY).encode())
+    assert response.text == ""
+    assert response.tool_calls[0] == ToolCall("call_1", "weather", {"city": "Oslo"})
+    assert response.tool_calls[1].arguments == "{not json"
+    assert response.usage == Usage(20, 4)
+    assert response.stop_reason == "tool_use"
+
+@pytest.mark.parametrize("reason,expected", [("stop", "end_turn"), ("length", "max_tokens"), ("other", "other")])
+def test_openai_stop_reason_normalized(reason, expected):
+    body = {"choices": [{"message": {"content": "x"}, "finish_reason": reason}]}
+    assert LLMResponse(ModelType.GPT4O, body).stop_reason == expected
+
+def test_fields_do_not_keep_parsed_document():
+    response = LLMResponse(ModelType.CLAUDE, json.dumps(CLAUDE_BODY).encode())
+    assert response._data is None
+    response.text
+    assert response._data is None
+    assert response.raw == json.dumps(CLAUDE_BODY).encode()
+
+def test_mapping_access_matches_raw_document():
+    response = LLMResponse(ModelType.CLAUDE, json.dumps(CLAUDE_BODY).encode())
+    assert response["content"][0]["text"] == "Let me check. "
+    assert response.get("missing") is None
+    assert response == CLAUDE_BODY
+    assert response.to_dict() == CLAUDE_BODY
+    assert json.loads(LLMResponse(ModelType.CLAUDE, CLAUDE_BODY).raw) == CLAUDE_BODY
+
+def test_slots():
+    response = LLMResponse(ModelType.CLAUDE, b"{}")
+    assert not hasattr(response, "__dict__")
+    with pytest.raises(AttributeError):
+        response.extra = 1
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("model_type", [ModelType.CLAUDE, ModelType.GPT4O])
+async def test_generate_returns_unparsed_response(model_type):
+    server = MockProviderServer(MockConfig(output_tokens=3))
+
+    async def handler(request):
+        status, headers, payload = await server._respond(
+            "anthropic" if model_type == ModelType.CLAUDE else "openai", request.payload, request.headers
+        )
+        return TransportResponse(status, body=json.dumps(payload).encode(), headers=headers)
+
+    async with LLMClient(transport=InProcessTransport(handler)) as client:
+        response = await client.generate(model_type, [{"role": "user", "content": "hi"}])
+    assert isinstance(response, LLMResponse)
+    assert response._data is None
+    assert response.latency > 0
+    assert response.text == "tok " * 3
+    assert LLMClient.extract_usage(model_type, response) == (response.usage.input_tokens, 3)
+
+@pytest.mark.asyncio
+async def test_generate_rejects_non_json_body():
+    async def handler(request):
+        return TransportResponse(200, body=b"<html>bad gateway</html>")
+
+    async with LLMClient(transport=InProcessTransport(handler)) as client:
+        with pytest.raises(APIError, match="Invalid JSON"):
+            await client.generate(ModelType.CLAUDE, [{"role": "user", "content": "hi"}])
@@ -0,0 +1,181 @@
+# tests/unit/test_scheduler.py
+import asyncio
+import pytest
+from core.api.scheduler import RequestScheduler, Priority, OverflowPolicy
+from core.api.client import QueueFullError, DeadlineExceededError
+from core.models.config import ModelType
+from utils.metrics.registry import MetricsRegistry
+
+pytestmark = pytest.mark.asyncio
+
+class FakeClient:
+    """Records dispatch order; each call blocks until released."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+    async def generate(self, model_type, messages, **kwargs):
+        self.calls.append(messages[0]["content"])
+        await self.gate.wait()
+        await asyncio.sleep(self.delay)
+        return {"echo": messages[0]["content"]}
+
+def msg(text):
+    return [{"role": "user", "content": text}]
+
+@pytest.fixture
+def registry():
+    return MetricsRegistry()
+
+class TestRequestScheduler:
+    async def test_submit_returns_result(self, registry):
+        scheduler = RequestScheduler(FakeClient(), metrics=registry)
+        result = await scheduler.submit(ModelType.GPT4O, msg("hi"))
+        assert result == {"echo": "hi"}
+        assert scheduler.queued == 0
+        assert scheduler.in_flight == 0
+
+    async def test_priority_order(self, registry):
+        client = FakeClient()
+        client.gate.clear()
+        scheduler = RequestScheduler(client, max_concurrency=1, metrics=registry)
+
+        blocker = asyncio.create_task(scheduler.submit(ModelType.GPT4O, msg("blocker")))
+        await asyncio.sleep(0)
+        tasks = [
+            asyncio.create_task(scheduler.submit(ModelType.GPT4O, msg("batch"), priority=Priority.BATCH)),
+            asyncio.create_task(scheduler.submit(ModelType.GPT4O, msg("default"))),
+            asyncio.create_task(scheduler.submit(ModelType.GPT4O, msg("interactive"), priority=Priority.INTERACTIVE)),
+        ]
+        await asyncio.sleep(0)
+        client.gate.set()
+        await asyncio.gather(blocker, *tasks)
+
+        assert client.calls == ["blocker", "interactive", "default", "batch"]
+
+    async def test_fair_queuing_across_tenants(self, registry):
+        client = FakeClient()
+        client.gate.clear()
+        scheduler = RequestScheduler(client, max_concurrency=1, metrics=registry)
+
+        blocker = asyncio.create_task(scheduler.submit(ModelType.GPT4O, msg("blocker"), tenant="x"))
+        await asyncio.sleep(0)
+        tasks = [
+            asyncio.create_task(scheduler.submit(ModelType.GPT4O, msg(f"bulk-{i}"), tenant="bulk"))
+            for i in range(4)
+        ]
+        tasks.append(asyncio.create_task(scheduler.submit(ModelType.GPT4O, msg("small-0"), tenant="small")))
+        await asyncio.sleep(0)
+        client.gate.set()
+        await asyncio.gather(blocker, *tasks)
+
+        # The late tenant is interleaved instead of waiting behind the whole bulk backlog
+        assert client.calls.index("small-0") <= 2
+
+    async def test_tenant_weights(self, registry):
+        client = FakeClient()
+        client.gate.clear()
+        scheduler = RequestScheduler(
+            client, max_concurrency=1, tenant_weights={"heavy": 3.0}, metrics=registry
+        )
+        blocker = asyncio.create_task(scheduler.submit(ModelType.GPT4O, msg("blocker"), tenant="x"))
+        await asyncio.sleep(0)
+        tasks = []
+        for i in range(6):
+            tasks.append(asyncio.create_task(scheduler.submit(ModelType.GPT4O, msg(f"heavy-{i}"), tenant="heavy")))
+            tasks.append(asyncio.create_task(scheduler.submit(ModelType.GPT4O, msg(f"light-{i}"), tenant="light")))
+        await asyncio.sleep(0)
+        client.gate.set()
+        await asyncio.gather(blocker, *tasks)
+
+        first_eight = client.calls[1:9]
+        assert sum(c.startswith("heavy") for c in first_eight) == 6
+
+    async def test_reject_when_full(self, registry):
+        client = FakeClient()
+        client.gate.clear()
+        scheduler = RequestScheduler(
+            client, max_concurrency=1, max_queue_size=1, overflow=OverflowPolicy.REJECT, metrics=registry
+        )
+        running = asyncio.create_task(scheduler.submit(ModelType.GPT4O, msg("running")))
+        await asyncio.sleep(0)
+        queued = asyncio.create_task(scheduler.submit(ModelType.GPT4O, msg("queued")))
+        await asyncio.sleep(0)
+
+        with pytest.raises(QueueFullError):
+            await scheduler.submit(ModelType.GPT4O, msg("rejected"))
+
+        client.gate.set()
+        await asyncio.gather(running, queued)
+
+    async def test_shed_lower_priority(self, registry):
+        client = FakeClient()
+        client.gate.clear()
+        scheduler = RequestScheduler(
+            client, max_concurrency=1, max_queue_size=1, overflow=OverflowPolicy.SHED, metrics=registry
+        )
+        running = asyncio.create_task(scheduler.submit(ModelType.GPT4O, msg("running")))
+        await asyncio.sleep(0)
+        batch = asyncio.create_task(scheduler.submit(ModelType.GPT4O, msg("batch"), priority=Priority.BATCH))
+        await asyncio.sleep(0)
+        urgent = asyncio.create_task(
+            scheduler.submit(ModelType.GPT4O, msg("urgent"), priority=Priority.INTERACTIVE)
+        )
+        await asyncio.sleep(0)
+
+        with pytest.raises(QueueFullError):
+            await batch
+
+        client.gate.set()
+        assert (await urgent) == {"echo": "urgent"}
+        await running
+        assert "batch" not in client.calls
+
+    async def test_backpressure_blocks_until_space(self, registry):
+        client = FakeClient()
+        client.gate.clear()
+        scheduler = RequestScheduler(client, max_concurrency=1, max_queue_size=1, metrics=registry)
+        running = asyncio.create_task(scheduler.submit(ModelType.GPT4O, msg("running")))
+        await asyncio.sleep(0)
+        queued = asyncio.create_task(scheduler.submit(ModelType.GPT4O, msg("queued")))
+        await asyncio.sleep(0)
+        waiting = asyncio.create_task(scheduler.submit(ModelType.GPT4O, msg("waiting")))
+        await asyncio.sleep(0.01)
+        assert not waiting.done()
+        assert scheduler.queued == 1
+
+        client.gate.set()
+        results = await asyncio.gather(running, queued, waiting)
+        assert [r["echo"] for r in results] == ["running", "queued", "waiting"]
+
+    async def test_expired_request_not_sent(self, registry):
+        client = FakeClient()
+        client.gate.clear()
+        scheduler = RequestScheduler(client, max_concurrency=1, metrics=registry)
+        running = asyncio.create_task(scheduler.submit(ModelType.GPT4O, msg("running")))
+        await asyncio.sleep(0)
+
+        with pytest.raises(DeadlineExceededError):
+            await scheduler.submit(ModelType.GPT4O, msg("late"), timeout=0.01)
+
+        client.gate.set()
+        await running
+        assert client.calls == ["running"]
+        assert scheduler.queued == 0
+
+    async def test_queue_wait_measured_separately(self, registry):
+        client = FakeClient(delay=0.02)
+        scheduler = RequestScheduler(client, max_concurrency=1, metrics=registry)
+        await asyncio.gather(*(scheduler.submit(ModelType.GPT4O, msg(str(i))) for i in range(3)))
+
+        metrics = scheduler.get_metrics()
+        assert metrics["queue_wait"]["DEFAULT"]["count"] == 3
+        wait = registry.get("llm_scheduler_queue_wait_seconds")
+        latency = registry.get("llm_provider_latency_seconds")
+        assert latency.count(model=ModelType.GPT4O.value, outcome="ok") == 3
+        # Later requests waited behind earlier ones; provider time is tracked on its own
+        assert wait.sum(priority="DEFAULT") >= 0.02
+        assert latency.sum(model=ModelType.GPT4O.value, outcome="ok") >= 0.06
@@ -34,7 +34,8 @@ def test_settings_cache():
 def test_settings_paths():
     settings = Settings()
     assert settings.base_dir.is_dir()
-    assert settings.cache_dir.is_dir()  # Should be created in __init__
+    # Created by the cache on first use, not by Settings
+    assert settings.cache_dir == settings.base_dir / ".cache"
 
 def test_settings_model_config():
     settings = Settings()
@@ -0,0 +1,136 @@
+# tests/unit/test_shared_cache.py
+import asyncio
+import multiprocessing
+import pytest
+from utils.cache.shared import SharedCacheManager
+from config.settings import Settings
+
+MESSAGES = [{"role": "user", "content": "test"}]
+
+@pytest.fixture
+def mock_settings(monkeypatch):
+    settings = Settings()
+    monkeypatch.setattr(settings, "CACHE_ENABLED", True)
+    monkeypatch.setattr(settings, "CACHE_TTL", 3600)
+    return settings
+
+@pytest.fixture
+def db_path(tmp_path):
+    return tmp_path / "cache" / "responses.sqlite3"
+
+@pytest.fixture
+def cache(db_path, mock_settings):
+    return SharedCacheManager(db_path=db_path, settings=mock_settings)
+
+def _worker_write_read(db_path, worker, rounds, queue):
+    settings = Settings()
+    cache = SharedCacheManager(db_path=db_path, settings=settings)
+    hits = 0
+    for i in range(rounds):
+        messages = [{"role": "user", "content": f"shared-{i}"}]
+        if cache.get("m", messages) is not None:
+            hits += 1
+        cache.set("m", messages, {"worker": worker, "i": i})
+    queue.put(hits)
+
+def _worker_claim(db_path, queue):
+    cache = SharedCacheManager(db_path=db_path, settings=Settings())
+    queue.put(cache.claim("m", MESSAGES))
+
+class TestSharedCacheManager:
+    def test_set_and_get(self, cache):
+        cache.set("test-model", MESSAGES, {"response": "ok"})
+        assert cache.get("test-model", MESSAGES) == {"response": "ok"}
+        assert cache.get("other-model", MESSAGES) is None
+
+    def test_params_are_part_of_key(self, cache):
+        cache.set("m", MESSAGES, {"r": 1}, params={"temperature": 0})
+        assert cache.get("m", MESSAGES, params={"temperature": 0}) == {"r": 1}
+        assert cache.get("m", MESSAGES, params={"temperature": 1}) is None
+
+    def test_expiration(self, cache, mock_settings, monkeypatch):
+        cache.set("m", MESSAGES, {"r": 1})
+        monkeypatch.setattr(mock_settings, "CACHE_TTL", -1)
+        assert cache.get("m", MESSAGES) is None
+        assert cache.get_stats()["entries"] == 0
+
+    def test_disabled(self, cache, mock_settings, monkeypatch):
+        monkeypatch.setattr(mock_settings, "CACHE_ENABLED", False)
+        cache.set("m", MESSAGES, {"r": 1})
+        assert cache.get("m", MESSAGES) is None
+        assert cache.get_stats()["entries"] == 0
+
+    def test_clear(self, cache):
+        cache.set("m", MESSAGES, {"r": 1})
+        cache.clear(age_hours=1)
+        assert cache.get("m", MESSAGES) == {"r": 1}
+        cache.clear()
+        assert cache.get("m", MESSAGES) is None
+
+    def test_wal_mode(self, cache):
+        assert cache.backend._connect().execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    def test_claim_is_exclusive_between_managers(self, db_path, mock_settings):
+        first = SharedCacheManager(db_path=db_path, settings=mock_settings)
+        second = SharedCacheManager(db_path=db_path, settings=mock_settings)
+        assert first.claim("m", MESSAGES)
+        assert not second.claim("m", MESSAGES)
+        first.release("m", MESSAGES)
+        assert second.claim("m", MESSAGES)
+
+    def test_expired_lease_can_be_taken_over(self, db_path, mock_settings):
+        first = SharedCacheManager(db_path=db_path, settings=mock_settings, lease_seconds=-1)
+        second = SharedCacheManager(db_path=db_path, settings=mock_settings)
+        assert first.claim("m", MESSAGES)
+        assert second.claim("m", MESSAGES)
+
+    async def test_wait_returns_entry_from_other_worker(self, db_path, mock_settings):
+        leader = SharedCacheManager(db_path=db_path, settings=mock_settings)
+        follower = SharedCacheManager(db_path=db_path, settings=mock_settings)
+        assert leader.claim("m", MESSAGES)
+
+        async def finish():
+            await asyncio.sleep(0.02)
+            leader.set("m", MESSAGES, {"r": "done"})
+            leader.release("m", MESSAGES)
+
+        task = asyncio.create_task(finish())
+        assert await follower.wait("m", MESSAGES, timeout=5) == {"r": "done"}
+        await task
+
+    async def test_wait_gives_up_when_lease_released(self, db_path, mock_settings):
+        leader = SharedCacheManager(db_path=db_path, settings=mock_settings)
+        follower = SharedCacheManager(db_path=db_path, settings=mock_settings)
+        leader.claim("m", MESSAGES)
+        leader.release("m", MESSAGES)
+        assert await follower.wait("m", MESSAGES, timeout=5) is None
+
+    def test_processes_share_entries(self, db_path, mock_settings):
+        SharedCacheManager(db_path=db_path, settings=mock_settings)
+        ctx = multiprocessing.get_context("spawn")
+        queue = ctx.Queue()
+        rounds = 50
+        procs = [ctx.Process(target=_worker_write_read, args=(db_path, w, rounds, queue)) for w in range(4)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join(30)
+            assert p.exitcode == 0
+        hits = sum(queue.get() for _ in procs)
+
+        reader = SharedCacheManager(db_path=db_path, settings=mock_settings)
+        assert reader.get_stats()["entries"] == rounds
+        # Workers see each other's writes instead of each keeping a private cache
+        assert hits > 0
+
+    def test_only_one_process_wins_claim(self, db_path, mock_settings):
+        SharedCacheManager(db_path=db_path, settings=mock_settings)
+        ctx = multiprocessing.get_context("spawn")
+        queue = ctx.Queue()
+        procs = [ctx.Process(target=_worker_claim, args=(db_path, queue)) for _ in range(4)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join(30)
+        results = [queue.get() for _ in procs]
+        assert results.count(True) == 1
@@ -0,0 +1,91 @@
+# tests/unit/test_sync_client.py
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from core.api.client import DeadlineExceededError
+from core.api.sync import SyncLLMClient
+from core.api.transport import InProcessTransport
+from core.models.config import ModelType
+from utils.mock.server import MockProviderServer, MockConfig
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+@pytest.fixture(autouse=True)
+def keys(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test-1234")
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "sk-ant-test-1234")
+
+@pytest.fixture
+def server():
+    """A mock provider served over HTTP from its own loop thread."""
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    server = MockProviderServer(MockConfig(latency="fixed:0.05", tokens_per_second=500, output_tokens=20))
+    asyncio.run_coroutine_threadsafe(server.start(), loop).result()
+    yield server
+    asyncio.run_coroutine_threadsafe(server.stop(), loop).result()
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+def test_threads_share_one_loop_and_connection_pool(server):
+    with SyncLLMClient(openai_base_url=server.openai_url) as client:
+        loops = set()
+        original = client.client.generate
+
+        async def generate(*args, **kwargs):
+            loops.add(asyncio.get_running_loop())
+            return await original(*args, **kwargs)
+
+        client.client.generate = generate
+        session = client.client.transport.session
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            responses = list(pool.map(lambda _: client.generate(ModelType.GPT4O, MESSAGES), range(64)))
+        assert all(response.text for response in responses)
+        assert len(loops) == 1
+        assert client.client.transport.session is session
+        # Connections were reused rather than opened per call
+        assert len(session.connector._conns) >= 1
+        assert not session.connector._acquired
+    assert client.closed and session.closed
+    with pytest.raises(RuntimeError):
+        client.generate(ModelType.GPT4O, MESSAGES)
+
+def test_generate_many_keeps_order():
+    seen = []
+
+    async def handler(request):
+        content = request.payload["messages"][0]["content"]
+        seen.append(content)
+        await asyncio.sleep(0.01 * (5 - int(content)))
+        return {"choices": [{"message": {"content": content}}], "usage": {"prompt_tokens": 1, "completion_tokens": 1}}
+
+    with SyncLLMClient(transport=InProcessTransport(handler)) as client:
+        conversations = [[{"role": "user", "content": str(i)}] for i in range(5)]
+        responses = client.generate_many(ModelType.GPT4O, conversations, max_concurrency=2)
+        assert [r.text for r in responses] == ["0", "1", "2", "3", "4"]
+        assert sorted(seen) == ["0", "1", "2", "3", "4"]
+
+def test_generate_many_deadline_and_exceptions(server):
+    with SyncLLMClient(openai_base_url=server.openai_url) as client:
+        started = time.monotonic()
+        results = client.generate_many(
+            ModelType.GPT4O, [MESSAGES] * 4, max_concurrency=1, return_exceptions=True, timeout=0.08
+        )
+        assert time.monotonic() - started < 0.5
+        assert results[0].text
+        assert all(isinstance(r, DeadlineExceededError) for r in results[2:])
+
+def test_stream_iterates_and_releases(server):
+    with SyncLLMClient(openai_base_url=server.openai_url) as client:
+        with client.stream(ModelType.GPT4O, MESSAGES) as chunks:
+            assert len(list(chunks)) == 20
+        # Stopping early releases the connection, key and slot too
+        with client.stream(ModelType.GPT4O, MESSAGES) as chunks:
+            assert next(chunks)
+        assert client.client._stream_keys == {}
+        assert not client.client.transport.session.connector._acquired
+        assert all(key["in_flight"] == 0 for key in client.client._key_pool(ModelType.GPT4O).stats())
@@ -0,0 +1,146 @@
+# tests/unit/test_tracing.py
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import pytest
+from core.api.client import LLMClient, RateLimitError
+from core.api.scheduler import RequestScheduler
+from core.api.tracing import Tracer, InMemorySink, JSONLinesSink, OTLPSink
+from core.api.transport import InProcessTransport, TransportResponse
+from core.models.config import ModelType
+from utils.metrics.registry import MetricsRegistry
+from utils.mock.server import MockProviderServer, MockConfig
+
+pytestmark = pytest.mark.asyncio
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+@pytest.fixture(autouse=True)
+def keys(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test-1234")
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "sk-ant-test-1234")
+
+async def reply(request):
+    return {"choices": [{"message": {"content": "ok"}}], "usage": {"prompt_tokens": 1, "completion_tokens": 1}}
+
+def names(spans):
+    return [span.name for span in spans]
+
+async def test_in_process_phases():
+    sink = InMemorySink()
+    client = LLMClient(transport=InProcessTransport(reply), tracer=Tracer(sink))
+    async with client:
+        await client.generate(ModelType.GPT4O, MESSAGES, request_id="req-1")
+    root, *phases = sink.spans
+    assert root.name == "llm.request" and root.parent_id is None and root.error is None
+    assert names(phases) == ["limiter_wait", "server", "download"]
+    assert root.attributes["request.id"] == "req-1"
+    assert root.attributes["llm.model"] == "gpt-4o"
+    assert all(span.trace_id == root.trace_id and span.parent_id == root.span_id for span in phases)
+    assert all(root.start_ns <= span.start_ns <= span.end_ns <= root.end_ns for span in phases)
+
+async def test_http_phases_from_aiohttp_hooks():
+    sink = InMemorySink()
+    async with MockProviderServer(MockConfig(latency="fixed:0.02")) as server:
+        # A host name rather than the IP, so the DNS phase is recorded
+        url = server.openai_url.replace("127.0.0.1", "localhost")
+        client = LLMClient(openai_base_url=url, tracer=Tracer(sink))
+        async with client:
+            await client.generate(ModelType.GPT4O, MESSAGES)
+            await client.generate(ModelType.GPT4O, MESSAGES)
+    first, second = sink.traces().values()
+    assert {"dns", "connect", "upload", "server", "download"} <= set(names(first))
+    assert "connect" not in names(second)
+    assert first[0].attributes["connection.reused"] is False
+    assert second[0].attributes["connection.reused"] is True
+    (server_span,) = [span for span in second if span.name == "server"]
+    assert server_span.duration >= 0.02
+    assert server_span.attributes["http.status_code"] == 200
+
+async def test_errors_and_sampling():
+    async def limited(request):
+        return TransportResponse(429, body={"error": {"message": "slow down"}})
+
+    sink = InMemorySink()
+    async with LLMClient(transport=InProcessTransport(limited), tracer=Tracer(sink)) as client:
+        with pytest.raises(RateLimitError):
+            await client.generate(ModelType.GPT4O, MESSAGES)
+    assert sink.spans[0].error == "RateLimitError"
+
+    unsampled = InMemorySink()
+    async with LLMClient(transport=InProcessTransport(reply), tracer=Tracer(unsampled, sample_rate=0.0)) as client:
+        await client.generate(ModelType.GPT4O, MESSAGES)
+    assert unsampled.spans == []
+    with pytest.raises(ValueError):
+        Tracer(unsampled, sample_rate=2)
+
+async def test_stream_trace_ends_on_release():
+    async def handler(request):
+        return TransportResponse(lines=[b'data: {"choices":[{"delta":{"content":"hi"}}]}\n', b"data: [DONE]\n"])
+
+    sink = InMemorySink()
+    async with LLMClient(transport=InProcessTransport(handler), tracer=Tracer(sink)) as client:
+        response = await client.generate(ModelType.GPT4O, MESSAGES, stream=True)
+        assert sink.spans == []
+        assert [chunk async for chunk in client.stream_response(response)] == ["hi"]
+    assert names(sink.spans) == ["llm.request", "limiter_wait", "server", "stream"]
+
+async def test_scheduler_queue_wait():
+    sink = InMemorySink()
+    client = LLMClient(transport=InProcessTransport(reply), tracer=Tracer(sink))
+    async with client:
+        scheduler = RequestScheduler(client, metrics=MetricsRegistry())
+        await scheduler.submit(ModelType.GPT4O, MESSAGES, tenant="acme")
+    root, *phases = sink.spans
+    assert names(phases) == ["queue_wait", "limiter_wait", "server", "download"]
+    assert root.attributes["scheduler.tenant"] == "acme"
+    assert root.end_ns > 0
+
+async def test_jsonl_sink(tmp_path):
+    path = tmp_path / "traces" / "spans.jsonl"
+    sink = JSONLinesSink(path, interval=60)
+    writers = []
+    write = sink._file.write
+    sink._file.write = lambda text: writers.append(threading.current_thread()) or write(text)
+    tracer = Tracer(sink)
+    async with LLMClient(transport=InProcessTransport(reply), tracer=tracer) as client:
+        await client.generate(ModelType.GPT4O, MESSAGES)
+    tracer.close()
+    # Written once, off the event loop's thread
+    assert writers == [sink._thread]
+    spans = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [span["name"] for span in spans] == ["llm.request", "limiter_wait", "server", "download"]
+    assert len({span["trace_id"] for span in spans}) == 1
+
+async def test_otlp_sink_posts_batches():
+    received = []
+
+    class Collector(BaseHTTPRequestHandler):
+        def do_POST(self):
+            received.append((self.path, json.loads(self.rfile.read(int(self.headers["content-length"])))))
+            self.send_response(200)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Collector)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        sink = OTLPSink(f"http://127.0.0.1:{server.server_port}/v1/traces", interval=60)
+        async with LLMClient(transport=InProcessTransport(reply), tracer=Tracer(sink)) as client:
+            await client.generate(ModelType.GPT4O, MESSAGES, request_id="req-7")
+        sink.close()
+    finally:
+        server.shutdown()
+    (path, payload), = received
+    assert path == "/v1/traces"
+    resource = payload["resourceSpans"][0]
+    assert resource["resource"]["attributes"][0]["value"] == {"stringValue": "llm-api-interface"}
+    spans = resource["scopeSpans"][0]["spans"]
+    assert [span["name"] for span in spans] == ["llm.request", "limiter_wait", "server", "download"]
+    attributes = {a["key"]: a["value"] for a in spans[0]["attributes"]}
+    assert attributes["request.id"] == {"stringValue": "req-7"}
+    assert attributes["llm.stream"] == {"boolValue": False}
+    assert sink.dropped == 0
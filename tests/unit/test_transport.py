@@ -0,0 +1,170 @@
+# tests/unit/test_transport.py
+import json
+import pytest
+from aiohttp import web
+from core.api.client import LLMClient, RateLimitError, TokenLimitError, ResponseTooLargeError
+from core.api.transport import (
+    InProcessTransport, CassetteTransport, CassetteMissError, TransportResponse, HTTPTransport,
+)
+from core.models.config import ModelType
+from utils.mock.server import MockProviderServer, MockConfig
+
+pytestmark = pytest.mark.asyncio
+
+MESSAGES = [{"role": "user", "content": "hello"}]
+
+def mock_transport(**config):
+    return InProcessTransport(MockProviderServer(MockConfig(**config)).handle)
+
+async def test_default_transport_is_http():
+    async with LLMClient() as client:
+        assert isinstance(client.transport, HTTPTransport)
+        assert client._session is client.transport.session
+
+async def test_requires_context_manager():
+    client = LLMClient(transport=mock_transport())
+    with pytest.raises(RuntimeError):
+        await client.generate(ModelType.GPT4O, MESSAGES)
+
+async def test_in_process_handler_receives_request():
+    seen = []
+
+    async def handler(request):
+        seen.append(request)
+        return {"content": [{"text": "hi"}], "usage": {"input_tokens": 1, "output_tokens": 1}}
+
+    async with LLMClient(transport=InProcessTransport(handler)) as client:
+        response = await client.generate(ModelType.CLAUDE, MESSAGES, max_tokens=5)
+
+    assert client.extract_response(ModelType.CLAUDE, response) == "hi"
+    assert seen[0].url == client.anthropic_base_url
+    assert seen[0].payload["max_tokens"] == 5
+    assert "x-api-key" in seen[0].headers
+
+@pytest.mark.parametrize("status,body,expected", [
+    (429, {"error": {"message": "slow down"}}, RateLimitError),
+    (400, {"error": {"message": "token limit exceeded"}}, TokenLimitError),
+])
+async def test_in_process_errors_mapped(status, body, expected):
+    async def handler(request):
+        return TransportResponse(status, body=body)
+
+    async with LLMClient(transport=InProcessTransport(handler)) as client:
+        with pytest.raises(expected):
+            await client.generate(ModelType.GPT4O, MESSAGES)
+
+@pytest.mark.parametrize("model_type", [ModelType.CLAUDE, ModelType.GPT4O])
+async def test_in_process_streaming(model_type):
+    async with LLMClient(transport=mock_transport(output_tokens=3)) as client:
+        response = await client.generate(model_type, MESSAGES, stream=True)
+        chunks = [chunk async for chunk in client.stream_response(response)]
+    assert chunks == ["tok "] * 3
+
+async def test_cassette_record_then_replay(tmp_path):
+    path = tmp_path / "cassette.json"
+    recorder = CassetteTransport(path, mode="record", inner=mock_transport(output_tokens=2))
+    async with LLMClient(transport=recorder) as client:
+        recorded = await client.generate(ModelType.GPT4O, MESSAGES)
+        stream = await client.generate(ModelType.CLAUDE, MESSAGES, stream=True)
+        recorded_chunks = [chunk async for chunk in client.stream_response(stream)]
+
+    text = path.read_text()
+    assert "Bearer" not in text and "x-api-key" not in text
+
+    async with LLMClient(transport=CassetteTransport(path)) as client:
+        replayed = await client.generate(ModelType.GPT4O, MESSAGES)
+        replayed["choices"][0]["message"]["content"] = "mutated"
+        again = await client.generate(ModelType.GPT4O, MESSAGES)
+        stream = await client.generate(ModelType.CLAUDE, MESSAGES, stream=True)
+        replayed_chunks = [chunk async for chunk in client.stream_response(stream)]
+
+    assert again == recorded
+    assert replayed_chunks == recorded_chunks == ["tok ", "tok "]
+
+async def test_cassette_replay_miss(tmp_path):
+    async with LLMClient(transport=CassetteTransport(tmp_path / "empty.json")) as client:
+        with pytest.raises(CassetteMissError):
+            await client.generate(ModelType.GPT4O, MESSAGES)
+
+async def test_cassette_repeated_requests_replay_in_order(tmp_path):
+    path = tmp_path / "cassette.json"
+    counter = iter(range(10))
+
+    async def handler(request):
+        return {"choices": [{"message": {"content": str(next(counter))}}]}
+
+    async with LLMClient(transport=CassetteTransport(path, "record", InProcessTransport(handler))) as client:
+        for _ in range(2):
+            await client.generate(ModelType.GPT4O, MESSAGES)
+
+    assert len(json.loads(path.read_text())["interactions"]) == 2
+    async with LLMClient(transport=CassetteTransport(path)) as client:
+        texts = [
+            client.extract_response(ModelType.GPT4O, await client.generate(ModelType.GPT4O, MESSAGES))
+            for _ in range(3)
+        ]
+    assert texts == ["0", "1", "1"]
+
+async def test_cassette_auto_records_only_misses(tmp_path):
+    path = tmp_path / "cassette.json"
+    calls = []
+
+    async def handler(request):
+        calls.append(request.payload["messages"][0]["content"])
+        return {"choices": [{"message": {"content": "ok"}}]}
+
+    for _ in range(2):
+        async with LLMClient(transport=CassetteTransport(path, "auto", InProcessTransport(handler))) as client:
+            await client.generate(ModelType.GPT4O, MESSAGES)
+    assert calls == ["hello"]
+
+async def test_unknown_cassette_mode(tmp_path):
+    with pytest.raises(ValueError):
+        CassetteTransport(tmp_path / "c.json", mode="rewind")
+
+async def test_response_size_cap():
+    async with MockProviderServer(MockConfig(output_tokens=2000)) as server:
+        client = LLMClient(openai_base_url=server.openai_url, max_response_bytes=1024)
+        async with client:
+            with pytest.raises(ResponseTooLargeError):
+                await client.generate(ModelType.GPT4O, MESSAGES)
+            client.max_response_bytes = None
+            response = await client.generate(ModelType.GPT4O, MESSAGES)
+        assert len(response.raw) > 1024
+        assert client.buffers.current == 0
+        assert client.buffers.largest_request >= len(response.raw)
+        (state,) = client.limiter.snapshot().values()
+        assert state["in_flight"] == 0
+
+async def test_gzip_request_bodies():
+    seen = []
+
+    async def handle(request):
+        seen.append((request.path, request.headers.get("content-encoding")))
+        if request.path == "/plain" and request.headers.get("content-encoding"):
+            return web.Response(status=415)
+        body = await request.json()
+        return web.json_response({"choices": [{"message": {"content": body["messages"][0]["content"][:5]}}]})
+
+    app = web.Application()
+    app.router.add_post("/{name}", handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    base = f"http://127.0.0.1:{runner.addresses[0][1]}"
+    long_messages = [{"role": "user", "content": "hello " * 1000}]
+    try:
+        for path in ("/gzip", "/plain"):
+            async with LLMClient(openai_base_url=base + path, compress_min_bytes=1024) as client:
+                for _ in range(2):
+                    response = await client.generate(ModelType.GPT4O, long_messages)
+                    assert response.text == "hello"
+                await client.generate(ModelType.GPT4O, MESSAGES)
+    finally:
+        await runner.cleanup()
+    assert seen == [
+        ("/gzip", "gzip"), ("/gzip", "gzip"), ("/gzip", None),
+        # Refused once, then sent plain
+        ("/plain", "gzip"), ("/plain", None), ("/plain", None), ("/plain", None),
+    ]
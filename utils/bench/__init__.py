@@ -0,0 +1 @@
+# utils/bench/__init__.py
@@ -0,0 +1,108 @@
+# utils/bench/hdr.py
+"""
+HDR-style latency histogram.
+
+Values are recorded in microseconds into log-linear buckets: each power of
+two is split into ``2 ** sub_bucket_bits`` linear sub-buckets, which keeps
+the relative error of every reported percentile below
+``10 ** -significant_digits`` across the whole range with a few KB of
+counts, however many values are recorded. Histograms with the same
+precision merge by adding counts, so per-worker or per-run histograms can be
+combined without keeping samples.
+"""
+import math
+from typing import Dict, Any, Iterable, Optional
+
+class HdrHistogram:
+    """Latency histogram with bounded relative error; record seconds, read seconds."""
+
+    UNIT = 1e-6  # recorded resolution, seconds
+
+    def __init__(self, significant_digits: int = 3):
+        if not 1 <= significant_digits <= 5:
+            raise ValueError("significant_digits must be between 1 and 5")
+        self.significant_digits = significant_digits
+        # Enough sub-buckets that one covers at most 10^-digits of its value
+        self._sub_bits = math.ceil(math.log2(2 * 10 ** significant_digits))
+        self._half_bits = self._sub_bits - 1
+        self._half = 1 << self._half_bits
+        self._counts: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def _index(self, value: int) -> int:
+        bucket = max(0, value.bit_length() - self._sub_bits)
+        sub = value >> bucket
+        return ((bucket + 1) << self._half_bits) + sub - self._half
+
+    def _highest_equivalent(self, index: int) -> int:
+        if index < 2 * self._half:
+            return index
+        bucket = (index >> self._half_bits) - 1
+        sub = (index & (self._half - 1)) + self._half
+        return ((sub + 1) << bucket) - 1
+
+    def record(self, seconds: float, count: int = 1):
+        """Record a latency in seconds; negative values count as zero."""
+        value = max(0, int(round(seconds / self.UNIT)))
+        index = self._index(value)
+        self._counts[index] = self._counts.get(index, 0) + count
+        self.count += count
+        self.total += seconds * count
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    def merge(self, other: "HdrHistogram"):
+        if other.significant_digits != self.significant_digits:
+            raise ValueError("Cannot merge histograms of different precision")
+        for index, count in other._counts.items():
+            self._counts[index] = self._counts.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        for value in (other.min, other.max):
+            if value is not None:
+                self.min = value if self.min is None else min(self.min, value)
+                self.max = value if self.max is None else max(self.max, value)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, q: float) -> float:
+        """Value in seconds at or below which ``q`` percent of recorded values fall."""
+        if not self.count:
+            return 0.0
+        # The epsilon keeps float error such as 99.9 / 100 * 20000 from skipping a rank
+        target = max(1, math.ceil(q / 100 * self.count - 1e-9))
+        seen = 0
+        for index in sorted(self._counts):
+            seen += self._counts[index]
+            if seen >= target:
+                return min(self._highest_equivalent(index) * self.UNIT, self.max)
+        return self.max
+
+    def percentiles(self, qs: Iterable[float] = (50, 90, 99, 99.9)) -> Dict[str, float]:
+        return {f"p{q:g}": self.percentile(q) for q in qs}
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Summary plus the raw bucket counts, which ``from_dict`` restores."""
+        return {
+            "count": self.count,
+            "min": self.min,
+            "max": self.max,
+            "mean": self.mean,
+            **self.percentiles(),
+            "significant_digits": self.significant_digits,
+            "counts": {str(index): count for index, count in sorted(self._counts.items())},
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "HdrHistogram":
+        histogram = cls(data["significant_digits"])
+        histogram._counts = {int(index): count for index, count in data["counts"].items()}
+        histogram.count = data["count"]
+        histogram.total = data["mean"] * data["count"]
+        histogram.min, histogram.max = data["min"], data["max"]
+        return histogram
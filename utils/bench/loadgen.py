@@ -0,0 +1,262 @@
+# utils/bench/loadgen.py
+"""
+Load generator for LLMClient.
+
+Closed-loop runs keep ``concurrency`` requests in flight and send the next
+as soon as one finishes, measuring the throughput a node can sustain.
+Open-loop runs send at a fixed ``rate`` with Poisson arrivals regardless of
+how fast responses come back, up to ``concurrency`` in flight; latency is
+measured from each request's scheduled start, so a stalled client shows up
+as latency instead of silently sending less (coordinated omission), and
+arrivals that find every slot busy are counted as ``dropped``.
+
+Requests are drawn from a weighted mix of models, prompt sizes and stream
+or non-stream calls. Results hold throughput, HDR latency and
+time-to-first-token histograms, errors by type and client CPU time.
+"""
+import asyncio
+import platform
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, List
+
+from core.api.client import LLMClient, APIError
+from core.models.config import ModelType
+from .hdr import HdrHistogram
+
+CLOSED = "closed"
+OPEN = "open"
+
+@dataclass
+class MixEntry:
+    """One kind of request in the mix, drawn with probability proportional to ``weight``."""
+    model_type: ModelType
+    weight: float = 1.0
+    prompt_tokens: int = 64
+    max_tokens: int = 256
+    stream: bool = False
+
+    @property
+    def label(self) -> str:
+        return f"{self.model_type.value}/{self.prompt_tokens}{'/stream' if self.stream else ''}"
+
+@dataclass
+class LoadConfig:
+    mix: List[MixEntry]
+    mode: str = CLOSED
+    concurrency: int = 8          # workers (closed) or the in-flight cap (open)
+    rate: float = 0.0             # requests per second, open loop only
+    requests: Optional[int] = 1000
+    duration: Optional[float] = None  # seconds; stops at whichever limit comes first
+    warmup: int = 0
+    seed: int = 0
+
+    def __post_init__(self):
+        if self.mode not in (CLOSED, OPEN):
+            raise ValueError(f"Unknown load mode: {self.mode}")
+        if self.mode == OPEN and self.rate <= 0:
+            raise ValueError("Open-loop load needs a rate above 0")
+        if self.requests is None and self.duration is None:
+            raise ValueError("Set requests, duration or both")
+        if not self.mix:
+            raise ValueError("The request mix is empty")
+
+def parse_mix(spec: str, prompt_tokens: List[int], max_tokens: int = 256, stream_fraction: float = 0.0) -> List[MixEntry]:
+    """
+    Build a mix from ``model[:weight],...``, crossed with prompt sizes and,
+    when ``stream_fraction`` is between 0 and 1, with stream and non-stream calls.
+    """
+    entries = []
+    for part in spec.split(","):
+        name, _, weight = part.strip().partition(":")
+        model_type = ModelType(name)
+        for tokens in prompt_tokens:
+            share = float(weight or 1) / len(prompt_tokens)
+            for stream, fraction in ((False, 1 - stream_fraction), (True, stream_fraction)):
+                if fraction > 0:
+                    entries.append(MixEntry(model_type, share * fraction, tokens, max_tokens, stream))
+    return entries
+
+def prompt_of(tokens: int, rng: random.Random) -> str:
+    """A prompt of roughly ``tokens`` tokens; the random lead word keeps prompts distinct."""
+    return f"{rng.randrange(10 ** 9)} " + "lorem " * max(0, tokens - 1)
+
+@dataclass
+class LoadResult:
+    config: Dict[str, Any]
+    sent: int = 0
+    completed: int = 0
+    dropped: int = 0
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    latency: HdrHistogram = field(default_factory=HdrHistogram)
+    ttft: HdrHistogram = field(default_factory=HdrHistogram)
+    errors: Counter = field(default_factory=Counter)
+    by_entry: Counter = field(default_factory=Counter)
+
+    @property
+    def throughput(self) -> float:
+        """Completed requests per second."""
+        return self.completed / self.wall_seconds if self.wall_seconds else 0.0
+
+    @property
+    def cpu_ms_per_request(self) -> float:
+        return self.cpu_seconds / self.sent * 1000 if self.sent else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": self.config,
+            "sent": self.sent,
+            "completed": self.completed,
+            "dropped": self.dropped,
+            "errors": dict(self.errors),
+            "by_entry": dict(self.by_entry),
+            "wall_seconds": self.wall_seconds,
+            "throughput": self.throughput,
+            "cpu_seconds": self.cpu_seconds,
+            "cpu_ms_per_request": self.cpu_ms_per_request,
+            "latency": self.latency.to_dict(),
+            "ttft": self.ttft.to_dict(),
+        }
+
+class LoadGenerator:
+    """Drive a LoadConfig through an open LLMClient."""
+
+    def __init__(self, client: LLMClient, config: LoadConfig):
+        self.client = client
+        self.config = config
+        self._rng = random.Random(config.seed)
+        self._weights = [entry.weight for entry in config.mix]
+
+    def _pick(self) -> MixEntry:
+        return self._rng.choices(self.config.mix, self._weights)[0]
+
+    async def _call(self, entry: MixEntry, scheduled: float, result: Optional[LoadResult]):
+        messages = [{"role": "user", "content": prompt_of(entry.prompt_tokens, self._rng)}]
+        try:
+            response = await self.client.generate(
+                entry.model_type, messages, max_tokens=entry.max_tokens, stream=entry.stream
+            )
+            if entry.stream:
+                first = None
+                async for _ in self.client.stream_response(response):
+                    if first is None:
+                        first = time.perf_counter()
+                if result is not None and first is not None:
+                    result.ttft.record(first - scheduled)
+        except (APIError, asyncio.TimeoutError) as e:
+            if result is not None:
+                result.errors[type(e).__name__] += 1
+            return
+        if result is not None:
+            result.completed += 1
+            result.latency.record(time.perf_counter() - scheduled)
+
+    async def run(self) -> LoadResult:
+        """Send the warmup requests unmeasured, then the measured load."""
+        config = self.config
+        if config.warmup:
+            warmup = asyncio.Semaphore(config.concurrency)
+
+            async def warm():
+                async with warmup:
+                    await self._call(self._pick(), time.perf_counter(), None)
+
+            await asyncio.gather(*(warm() for _ in range(config.warmup)))
+
+        result = LoadResult(config=describe(config))
+        cpu_started, started = time.process_time(), time.perf_counter()
+        deadline = started + config.duration if config.duration else None
+        if config.mode == CLOSED:
+            await self._closed(result, deadline)
+        else:
+            await self._open(result, started, deadline)
+        result.wall_seconds = time.perf_counter() - started
+        result.cpu_seconds = time.process_time() - cpu_started
+        return result
+
+    def _more(self, result: LoadResult, deadline: Optional[float]) -> bool:
+        if self.config.requests is not None and result.sent + result.dropped >= self.config.requests:
+            return False
+        return deadline is None or time.perf_counter() < deadline
+
+    def _next(self, result: LoadResult) -> MixEntry:
+        entry = self._pick()
+        result.sent += 1
+        result.by_entry[entry.label] += 1
+        return entry
+
+    async def _closed(self, result: LoadResult, deadline: Optional[float]):
+        async def worker():
+            while self._more(result, deadline):
+                await self._call(self._next(result), time.perf_counter(), result)
+
+        await asyncio.gather(*(worker() for _ in range(self.config.concurrency)))
+
+    async def _open(self, result: LoadResult, started: float, deadline: Optional[float]):
+        in_flight = set()
+        scheduled = started
+        while self._more(result, deadline):
+            scheduled += self._rng.expovariate(self.config.rate)
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if len(in_flight) >= self.config.concurrency:
+                result.dropped += 1
+                continue
+            task = asyncio.create_task(self._call(self._next(result), scheduled, result))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+        if in_flight:
+            await asyncio.gather(*in_flight)
+
+def describe(config: LoadConfig) -> Dict[str, Any]:
+    return {
+        "mode": config.mode,
+        "concurrency": config.concurrency,
+        "rate": config.rate,
+        "requests": config.requests,
+        "duration": config.duration,
+        "warmup": config.warmup,
+        "seed": config.seed,
+        "mix": [
+            {"model": e.model_type.value, "weight": e.weight, "prompt_tokens": e.prompt_tokens,
+             "max_tokens": e.max_tokens, "stream": e.stream}
+            for e in config.mix
+        ],
+    }
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def start_mock_server(*args: str, timeout: float = 10.0):
+    """
+    Start ``utils.mock.server`` in a subprocess on a free port, so its CPU is
+    not charged to the client. Returns (process, base URL).
+    """
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    process = subprocess.Popen([sys.executable, "-m", "utils.mock.server", "--port", str(port), *args])
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+            return process, f"http://127.0.0.1:{port}"
+        except OSError:
+            time.sleep(0.05)
+    process.kill()
+    raise RuntimeError("Mock server did not start")
@@ -0,0 +1,161 @@
+# utils/cache/backend.py
+"""
+Storage behind CacheManager.
+
+A CacheBackend stores opaque byte values under string keys. CacheManager
+derives the keys, encodes entries and decides when they are stale, so the
+same manager can sit in front of the per-file store, a shared network cache,
+or anything else implementing the protocol. Every operation is async and
+works on batches, so network backends can answer many keys in one round
+trip. Stores on local disk (files, SQLite) derive from LocalBackend, whose
+blocking methods also serve CacheManager's synchronous API.
+"""
+import asyncio
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional, List, Mapping, Sequence, AsyncIterator, Iterator
+
+@dataclass
+class CacheRecord:
+    """A stored value with its size and, where the backend tracks it, expiry."""
+    value: bytes
+    size: int
+    expires_at: Optional[float] = None  # Unix time; None keeps it until deleted
+
+class CacheBackend(ABC):
+    """Base class for the key-value stores a CacheManager can use."""
+
+    @abstractmethod
+    async def get_many(self, keys: Sequence[str]) -> List[Optional[CacheRecord]]:
+        """The records for ``keys`` in order, None where missing or expired."""
+
+    @abstractmethod
+    async def set_many(self, items: Mapping[str, bytes], ttl: Optional[float] = None):
+        """Store values, to expire after ``ttl`` seconds where the backend supports it."""
+
+    @abstractmethod
+    async def delete_many(self, keys: Sequence[str]) -> int:
+        """Delete keys; returns how many existed."""
+
+    @abstractmethod
+    def scan(self) -> AsyncIterator[str]:
+        """Every stored key, in no particular order."""
+
+    async def get(self, key: str) -> Optional[CacheRecord]:
+        return (await self.get_many([key]))[0]
+
+    async def set(self, key: str, value: bytes, ttl: Optional[float] = None):
+        await self.set_many({key: value}, ttl)
+
+    async def delete(self, key: str) -> bool:
+        return await self.delete_many([key]) > 0
+
+    async def clear(self, batch_size: int = 500):
+        """Delete every key."""
+        batch: List[str] = []
+        async for key in self.scan():
+            batch.append(key)
+            if len(batch) >= batch_size:
+                await self.delete_many(batch)
+                batch = []
+        if batch:
+            await self.delete_many(batch)
+
+    async def close(self):
+        pass
+
+class LocalBackend(CacheBackend):
+    """
+    A store on this host's disk. Subclasses implement the blocking
+    ``read_many``, ``write_many``, ``remove_many`` and ``iter_keys``, which
+    back CacheManager's synchronous methods; the async methods run them in a
+    worker thread so disk I/O never holds up the event loop.
+    """
+
+    @abstractmethod
+    def read_many(self, keys: Sequence[str]) -> List[Optional[CacheRecord]]:
+        """Blocking ``get_many``."""
+
+    @abstractmethod
+    def write_many(self, items: Mapping[str, bytes], ttl: Optional[float] = None):
+        """Blocking ``set_many``."""
+
+    @abstractmethod
+    def remove_many(self, keys: Sequence[str]) -> int:
+        """Blocking ``delete_many``."""
+
+    @abstractmethod
+    def iter_keys(self) -> Iterator[str]:
+        """Blocking ``scan``."""
+
+    async def get_many(self, keys: Sequence[str]) -> List[Optional[CacheRecord]]:
+        return await asyncio.to_thread(self.read_many, list(keys))
+
+    async def set_many(self, items: Mapping[str, bytes], ttl: Optional[float] = None):
+        await asyncio.to_thread(self.write_many, dict(items), ttl)
+
+    async def delete_many(self, keys: Sequence[str]) -> int:
+        return await asyncio.to_thread(self.remove_many, list(keys))
+
+    async def scan(self) -> AsyncIterator[str]:
+        for key in await asyncio.to_thread(lambda: list(self.iter_keys())):
+            yield key
+
+class FileBackend(LocalBackend):
+    """
+    One ``{key}.json`` file per entry in a directory, the store CacheManager
+    has always used. Files carry no expiry of their own; CacheManager drops
+    stale entries by their age when it reads them.
+    """
+    def __init__(self, cache_dir: Path):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def read_many(self, keys: Sequence[str]) -> List[Optional[CacheRecord]]:
+        records: List[Optional[CacheRecord]] = []
+        for key in keys:
+            try:
+                value = self.path(key).read_bytes()
+            except FileNotFoundError:
+                records.append(None)
+                continue
+            records.append(CacheRecord(value, len(value)))
+        return records
+
+    def write_many(self, items: Mapping[str, bytes], ttl: Optional[float] = None):
+        for key, value in items.items():
+            self._atomic_write(self.path(key), value)
+
+    def remove_many(self, keys: Sequence[str]) -> int:
+        removed = 0
+        for key in keys:
+            try:
+                self.path(key).unlink()
+                removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+    def iter_keys(self) -> Iterator[str]:
+        for cache_file in self.cache_dir.glob("*.json"):
+            yield cache_file.stem
+
+    def _atomic_write(self, path: Path, value: bytes):
+        """Write via a temp file and rename so concurrent readers never see a partial entry."""
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.stem}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(value)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
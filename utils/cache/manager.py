@@ -1,85 +1,240 @@
 # utils/cache/manager.py
 import json
 import hashlib
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional, Any, Dict
+from typing import Optional, Any, Dict, Iterable, Iterator, Collection, List, Sequence, Tuple
 from datetime import datetime, timedelta, timezone
 
+from .backend import CacheBackend, CacheRecord, FileBackend, LocalBackend
+
+@dataclass
+class CacheEntry:
+    """One stored response, as moved between caches by snapshots."""
+    key: str
+    model: str
+    cached_at: float  # Unix time
+    response: Dict[str, Any]
+    messages: Optional[list] = None
+
+# (model, messages) or (model, messages, params)
+CacheRequest = Tuple[Any, ...]
+
 class CacheManager:
-    """Manage caching of API responses."""
-    
-    def __init__(self, cache_dir: Optional[Path] = None, settings=None):
+    """
+    Manage caching of API responses.
+
+    The manager derives keys from requests, encodes entries and expires them
+    after CACHE_TTL; a CacheBackend stores them. The default FileBackend keeps
+    one JSON file per entry in ``cache_dir``. Local backends also serve the
+    synchronous ``get``/``set``; network backends are used through
+    ``aget``/``aset`` and the batched ``get_many``/``set_many``.
+    """
+
+    def __init__(self, cache_dir: Optional[Path] = None, settings=None, backend: Optional[CacheBackend] = None):
         from config.settings import settings as default_settings
         self.settings = settings or default_settings
         self.cache_dir = cache_dir or self.settings.cache_dir
-        self.cache_dir.mkdir(parents=True, exist_ok=True)
-    
-    def _get_cache_key(self, model: str, messages: list) -> str:
+        self.backend: CacheBackend = backend or FileBackend(self.cache_dir)
+
+    def _get_cache_key(self, model: str, messages: list, params: Optional[Dict[str, Any]] = None) -> str:
         """Generate a unique cache key for the request."""
         data = {
             "model": model,
             "messages": messages
         }
+        if params:
+            data["params"] = params
         serialized = json.dumps(data, sort_keys=True)
         return hashlib.sha256(serialized.encode()).hexdigest()
-    
+
     def _get_cache_path(self, key: str) -> Path:
         """Get cache file path for a key."""
-        return self.cache_dir / f"{key}.json"
-    
-    def get(self, model: str, messages: list) -> Optional[Dict[str, Any]]:
-        """Get cached response if available and not expired."""
-        if not getattr(self.settings, "CACHE_ENABLED", True):
-            return None
-            
-        key = self._get_cache_key(model, messages)
-        cache_path = self._get_cache_path(key)
-        
-        if not cache_path.exists():
-            return None
-            
-        try:
-            data = json.loads(cache_path.read_text())
-            cached_time = datetime.fromisoformat(data["cached_at"])
-            
-            # Compare with current UTC time
-            if cached_time + timedelta(seconds=self.settings.CACHE_TTL) < datetime.now(timezone.utc):
-                cache_path.unlink()  # Remove expired cache
-                return None
-                
-            return data["response"]
-        except (json.JSONDecodeError, KeyError, TypeError):
-            return None
-    
-    def set(self, model: str, messages: list, response: Dict[str, Any]):
-        """Cache a response."""
-        if not getattr(self.settings, "CACHE_ENABLED", True):
-            return
-            
-        key = self._get_cache_key(model, messages)
-        cache_path = self._get_cache_path(key)
-        
+        if not isinstance(self.backend, FileBackend):
+            raise TypeError(f"{type(self.backend).__name__} does not store entries as files")
+        return self.backend.path(key)
+
+    def _local(self) -> LocalBackend:
+        if not isinstance(self.backend, LocalBackend):
+            raise TypeError(
+                f"{type(self.backend).__name__} is async; use aget/aset or get_many/set_many"
+            )
+        return self.backend
+
+    def _enabled(self) -> bool:
+        return getattr(self.settings, "CACHE_ENABLED", True)
+
+    def _encode(self, model: str, messages: list, response: Dict[str, Any], cached_at: Optional[datetime] = None) -> bytes:
+        # An LLMResponse is a read-only Mapping over the provider's JSON
+        if not isinstance(response, dict) and hasattr(response, "to_dict"):
+            response = response.to_dict()
         data = {
-            "cached_at": datetime.now(timezone.utc).isoformat(),
+            "cached_at": (cached_at or datetime.now(timezone.utc)).isoformat(),
             "model": model,
             "messages": messages,
             "response": response
         }
-        
-        cache_path.write_text(json.dumps(data, indent=2))
-    
+        return json.dumps(data, indent=2).encode()
+
+    def _decode(self, record: Optional[CacheRecord]) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """(entry, expired) for a stored record; unreadable entries are neither."""
+        if record is None:
+            return None, False
+        try:
+            data = json.loads(record.value)
+            cached_time = datetime.fromisoformat(data["cached_at"])
+            data["response"]
+        except (json.JSONDecodeError, UnicodeDecodeError, KeyError, TypeError, ValueError):
+            return None, False
+        # Compare with current UTC time
+        if cached_time + timedelta(seconds=self.settings.CACHE_TTL) < datetime.now(timezone.utc):
+            return None, True
+        return data, False
+
+    def get(self, model: str, messages: list, params: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Get cached response if available and not expired."""
+        if not self._enabled():
+            return None
+
+        key = self._get_cache_key(model, messages, params)
+        files = self._local()
+        data, expired = self._decode(files.read_many([key])[0])
+        if expired:
+            files.remove_many([key])  # Remove expired cache
+        return data["response"] if data is not None else None
+
+    def set(self, model: str, messages: list, response: Dict[str, Any], params: Optional[Dict[str, Any]] = None):
+        """Cache a response."""
+        if not self._enabled():
+            return
+
+        key = self._get_cache_key(model, messages, params)
+        self._local().write_many({key: self._encode(model, messages, response)})
+
+    async def get_many(self, requests: Sequence[CacheRequest]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Cached responses for several ``(model, messages[, params])`` requests
+        in one backend call; None where missing or expired.
+        """
+        if not self._enabled():
+            return [None] * len(requests)
+        keys = [self._get_cache_key(*request) for request in requests]
+        records = await self.backend.get_many(keys)
+        responses: List[Optional[Dict[str, Any]]] = []
+        expired_keys = []
+        for key, record in zip(keys, records):
+            data, expired = self._decode(record)
+            if expired:
+                expired_keys.append(key)
+            responses.append(data["response"] if data is not None else None)
+        if expired_keys:
+            await self.backend.delete_many(expired_keys)
+        return responses
+
+    async def set_many(self, entries: Sequence[Tuple[Any, ...]]):
+        """Cache several ``(model, messages, response[, params])`` entries in one backend call."""
+        if not self._enabled() or not entries:
+            return
+        items = {}
+        for model, messages, response, *params in entries:
+            key = self._get_cache_key(model, messages, params[0] if params else None)
+            items[key] = self._encode(model, messages, response)
+        await self.backend.set_many(items, ttl=self.settings.CACHE_TTL)
+
+    async def aget(self, model: str, messages: list, params: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Async ``get`` through the backend."""
+        return (await self.get_many([(model, messages, params)]))[0]
+
+    async def aset(self, model: str, messages: list, response: Dict[str, Any], params: Optional[Dict[str, Any]] = None):
+        """Async ``set`` through the backend."""
+        await self.set_many([(model, messages, response, params)])
+
+    async def close(self):
+        """Close the backend's connections."""
+        await self.backend.close()
+
+    def claim(self, model: str, messages: list, params: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Claim the right to compute a missing entry.
+
+        The file cache is private to one process, so the claim always succeeds;
+        shared backends use it to keep several workers from sending the same
+        request at once.
+        """
+        return True
+
+    def release(self, model: str, messages: list, params: Optional[Dict[str, Any]] = None):
+        """Release a claim taken with claim()."""
+        pass
+
+    async def wait(
+        self,
+        model: str,
+        messages: list,
+        params: Optional[Dict[str, Any]] = None,
+        timeout: float = 0.0
+    ) -> Optional[Dict[str, Any]]:
+        """Wait for another worker's claimed entry to appear; None if it does not."""
+        return await self.aget(model, messages, params)
+
     def clear(self, age_hours: Optional[int] = None):
         """Clear cache, optionally only entries older than age_hours."""
+        files = self._local()
         if age_hours is not None:
             cutoff = datetime.now(timezone.utc) - timedelta(hours=age_hours)
-            for cache_file in self.cache_dir.glob("*.json"):
+            for key in list(files.iter_keys()):
+                record = files.read_many([key])[0]
                 try:
-                    data = json.loads(cache_file.read_text())
+                    data = json.loads(record.value)
                     cached_time = datetime.fromisoformat(data["cached_at"])
                     if cached_time < cutoff:
-                        cache_file.unlink()
-                except (json.JSONDecodeError, KeyError, TypeError):
-                    cache_file.unlink()
+                        files.remove_many([key])
+                except (AttributeError, json.JSONDecodeError, KeyError, TypeError):
+                    files.remove_many([key])
         else:
-            for cache_file in self.cache_dir.glob("*.json"):
-                cache_file.unlink()
\ No newline at end of file
+            files.remove_many(list(files.iter_keys()))
+
+    def iter_entries(
+        self,
+        models: Optional[Collection[str]] = None,
+        newer_than: Optional[float] = None
+    ) -> Iterator[CacheEntry]:
+        """Yield stored entries, optionally only for some models or cached after a Unix time."""
+        files = self._local()
+        for key in files.iter_keys():
+            try:
+                data = json.loads(files.read_many([key])[0].value)
+                entry = CacheEntry(
+                    key=key,
+                    model=data["model"],
+                    cached_at=datetime.fromisoformat(data["cached_at"]).timestamp(),
+                    response=data["response"],
+                    messages=data.get("messages"),
+                )
+            except (AttributeError, OSError, json.JSONDecodeError, KeyError, TypeError, ValueError):
+                continue
+            if models is not None and entry.model not in models:
+                continue
+            if newer_than is not None and entry.cached_at < newer_than:
+                continue
+            yield entry
+
+    def put_entries(self, entries: Iterable[CacheEntry]) -> int:
+        """
+        Store entries under their own keys and times, keeping an existing
+        entry that is as new or newer. Returns how many were written.
+        """
+        files = self._local()
+        written = 0
+        for entry in entries:
+            existing = files.read_many([entry.key])[0]
+            if existing is not None:
+                try:
+                    if datetime.fromisoformat(json.loads(existing.value)["cached_at"]).timestamp() >= entry.cached_at:
+                        continue
+                except (json.JSONDecodeError, KeyError, TypeError, ValueError):
+                    pass
+            cached_at = datetime.fromtimestamp(entry.cached_at, timezone.utc)
+            files.write_many({entry.key: self._encode(entry.model, entry.messages or [], entry.response, cached_at)})
+            written += 1
+        return written
@@ -0,0 +1,294 @@
+# utils/cache/resp.py
+"""
+Networked cache backend speaking the Redis wire protocol (RESP2).
+
+Works with Redis, Valkey, KeyDB, Dragonfly and other compatible servers
+without a client library. Batched calls are pipelined: ``get_many`` sends
+one MGET and a PTTL per key, ``set_many`` one SET per key, and all replies
+are read after a single write, so a batch costs one round trip. Connections
+are pooled and reused across calls; one that fails, times out, is cancelled
+mid-command or sends bytes that are not a reply is closed rather than
+returned, since its replies can no longer be matched to requests.
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Optional, Any, List, Mapping, Sequence, AsyncIterator, Tuple, Union
+from urllib.parse import urlparse, unquote
+
+from .backend import CacheBackend, CacheRecord
+
+class RespError(Exception):
+    """Raised for an error reply from the server"""
+    pass
+
+class RespProtocolError(Exception):
+    """Raised for bytes that are not a valid reply; the connection is out of step and must be closed"""
+    pass
+
+# parse_reply's result while a reply is still arriving
+INCOMPLETE = object()
+
+def encode_command(*args: Union[str, bytes, int, float]) -> bytes:
+    """A command as a RESP array of bulk strings."""
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if not isinstance(arg, bytes):
+            arg = str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(parts)
+
+def parse_reply(buf: Union[bytes, bytearray], pos: int = 0) -> Tuple[Any, int]:
+    """
+    Parse one reply starting at ``pos``; returns (value, end) or
+    (INCOMPLETE, pos) when ``buf`` does not hold all of it yet. Error
+    replies are returned as RespError instances, not raised; bytes that are
+    not a reply raise RespProtocolError.
+    """
+    end = buf.find(b"\r\n", pos)
+    if end < 0:
+        return INCOMPLETE, pos
+    kind = buf[pos:pos + 1]
+    line = bytes(buf[pos + 1:end])
+    after = end + 2
+    if kind == b"+":
+        return line.decode(), after
+    if kind == b"-":
+        return RespError(line.decode()), after
+    if kind == b":":
+        return _integer(line), after
+    if kind == b"$":
+        length = _integer(line)
+        if length < 0:
+            return None, after
+        if len(buf) < after + length + 2:
+            return INCOMPLETE, pos
+        return bytes(buf[after:after + length]), after + length + 2
+    if kind == b"*":
+        count = _integer(line)
+        if count < 0:
+            return None, after
+        items = []
+        for _ in range(count):
+            item, after = parse_reply(buf, after)
+            if item is INCOMPLETE:
+                return INCOMPLETE, pos
+            items.append(item)
+        return items, after
+    raise RespProtocolError(f"Unexpected reply type: {kind!r}")
+
+def _integer(line: bytes) -> int:
+    try:
+        return int(line)
+    except ValueError:
+        raise RespProtocolError(f"Invalid integer in reply: {line[:32]!r}") from None
+
+class RespConnection:
+    """One connection; ``execute`` pipelines commands and returns their replies in order."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self._buffer = bytearray()
+
+    @classmethod
+    async def connect(
+        cls,
+        host: str,
+        port: int,
+        db: int = 0,
+        password: Optional[str] = None,
+        username: Optional[str] = None,
+    ) -> "RespConnection":
+        reader, writer = await asyncio.open_connection(host, port)
+        conn = cls(reader, writer)
+        try:
+            setup = []
+            if password:
+                setup.append(("AUTH", username, password) if username else ("AUTH", password))
+            if db:
+                setup.append(("SELECT", db))
+            if setup:
+                await conn.execute(*setup)
+        except BaseException:
+            conn.close()
+            raise
+        return conn
+
+    @property
+    def closed(self) -> bool:
+        return self.writer.is_closing()
+
+    async def execute(self, *commands: Sequence[Any]) -> List[Any]:
+        """Send every command, then read one reply each; raises the first error reply."""
+        self.writer.write(b"".join(encode_command(*command) for command in commands))
+        await self.writer.drain()
+        replies = []
+        pos = 0
+        while len(replies) < len(commands):
+            value, end = parse_reply(self._buffer, pos)
+            if value is INCOMPLETE:
+                del self._buffer[:pos]
+                pos = 0
+                data = await self.reader.read(65536)
+                if not data:
+                    raise ConnectionError("Cache server closed the connection")
+                self._buffer += data
+                continue
+            replies.append(value)
+            pos = end
+        del self._buffer[:pos]
+        for reply in replies:
+            if isinstance(reply, RespError):
+                raise reply
+        return replies
+
+    def close(self):
+        self.writer.close()
+
+class RespPool:
+    """Up to ``max_connections`` connections, opened on demand and reused."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 6379,
+        db: int = 0,
+        password: Optional[str] = None,
+        username: Optional[str] = None,
+        max_connections: int = 16,
+        connect_timeout: float = 5.0,
+        command_timeout: float = 5.0,
+    ):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.username = username
+        self.max_connections = max_connections
+        self.connect_timeout = connect_timeout
+        self.command_timeout = command_timeout
+        self._idle: List[RespConnection] = []
+        self._slots = asyncio.Semaphore(max_connections)
+        self.opened = 0
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[RespConnection]:
+        async with self._slots:
+            conn = None
+            while self._idle and conn is None:
+                conn = self._idle.pop()
+                if conn.closed:
+                    conn = None
+            if conn is None:
+                conn = await asyncio.wait_for(
+                    RespConnection.connect(self.host, self.port, self.db, self.password, self.username),
+                    self.connect_timeout,
+                )
+                self.opened += 1
+            try:
+                yield conn
+            except RespError:
+                # The error reply was read in full; the connection is in step.
+                # RespProtocolError, a timeout or a cancellation mean it is
+                # not, and close it below
+                self._idle.append(conn)
+                raise
+            except BaseException:
+                conn.close()
+                raise
+            else:
+                self._idle.append(conn)
+
+    async def execute(self, *commands: Sequence[Any]) -> List[Any]:
+        """Run commands on a pooled connection, giving up after ``command_timeout`` seconds."""
+        try:
+            async with self.connection() as conn:
+                return await asyncio.wait_for(conn.execute(*commands), self.command_timeout)
+        except ConnectionError:
+            # Idle connections go stale when the server restarts or drops
+            # them; retry once on a new one
+            await self.close()
+            async with self.connection() as conn:
+                return await asyncio.wait_for(conn.execute(*commands), self.command_timeout)
+
+    async def close(self):
+        """Close the idle connections; ones in use close when returned with an error."""
+        idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+            try:
+                await conn.writer.wait_closed()
+            except (ConnectionError, OSError):
+                pass
+
+class RedisBackend(CacheBackend):
+    """
+    Cache entries in a Redis-compatible server, shared by every process and
+    host that points at it. Keys are stored under ``prefix``; the server
+    expires entries itself after the ``ttl`` given to ``set_many``.
+    """
+
+    def __init__(self, pool: Optional[RespPool] = None, prefix: str = "llm-cache:", **pool_kwargs):
+        self.pool = pool or RespPool(**pool_kwargs)
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str, prefix: str = "llm-cache:", **pool_kwargs) -> "RedisBackend":
+        """From ``redis://[[user]:password@]host[:port][/db]``."""
+        parsed = urlparse(url)
+        if parsed.scheme != "redis":
+            raise ValueError(f"Unsupported cache URL scheme: {parsed.scheme!r}")
+        db = parsed.path.strip("/")
+        return cls(
+            prefix=prefix,
+            host=parsed.hostname or "127.0.0.1",
+            port=parsed.port or 6379,
+            db=int(db) if db else 0,
+            password=unquote(parsed.password) if parsed.password else None,
+            username=unquote(parsed.username) if parsed.username else None,
+            **pool_kwargs,
+        )
+
+    def _key(self, key: str) -> str:
+        return self.prefix + key
+
+    async def get_many(self, keys: Sequence[str]) -> List[Optional[CacheRecord]]:
+        if not keys:
+            return []
+        names = [self._key(key) for key in keys]
+        replies = await self.pool.execute(("MGET", *names), *(("PTTL", name) for name in names))
+        now = time.time()
+        records: List[Optional[CacheRecord]] = []
+        for value, ttl_ms in zip(replies[0], replies[1:]):
+            if value is None:
+                records.append(None)
+                continue
+            # PTTL is -1 for a key without expiry
+            expires_at = now + ttl_ms / 1000 if ttl_ms >= 0 else None
+            records.append(CacheRecord(value, len(value), expires_at))
+        return records
+
+    async def set_many(self, items: Mapping[str, bytes], ttl: Optional[float] = None):
+        if not items:
+            return
+        expiry = ("PX", max(1, int(ttl * 1000))) if ttl else ()
+        await self.pool.execute(*(("SET", self._key(key), value, *expiry) for key, value in items.items()))
+
+    async def delete_many(self, keys: Sequence[str]) -> int:
+        if not keys:
+            return 0
+        (deleted,) = await self.pool.execute(("DEL", *(self._key(key) for key in keys)))
+        return deleted
+
+    async def scan(self, count: int = 500) -> AsyncIterator[str]:
+        cursor = b"0"
+        while True:
+            ((cursor, names),) = await self.pool.execute(("SCAN", cursor, "MATCH", self.prefix + "*", "COUNT", count))
+            for name in names:
+                yield name.decode()[len(self.prefix):]
+            if cursor == b"0":
+                return
+
+    async def close(self):
+        await self.pool.close()
@@ -0,0 +1,222 @@
+# utils/cache/shared.py
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Any, Dict, Iterator, List, Mapping, Sequence
+
+from .backend import CacheRecord, LocalBackend
+from .manager import CacheManager
+
+# Keys per statement, below SQLite's bound-parameter limit
+CHUNK = 500
+
+class SqliteBackend(LocalBackend):
+    """
+    Entries in one SQLite database in WAL mode, so any number of worker
+    processes on a host can read concurrently while writes are serialized by
+    SQLite's own locking. An ``inflight`` table holds the short leases
+    SharedCacheManager uses to let exactly one worker compute a missing entry.
+    Each thread gets its own connection, reopened after a fork.
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._threads = threading.local()
+        self._lock = threading.Lock()
+        self._connections: List[sqlite3.Connection] = []
+        self._pid = os.getpid()
+        self._init_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Get this thread's connection, reopening after a fork."""
+        conn = getattr(self._threads, "conn", None)
+        if conn is None or self._threads.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            with self._lock:
+                if self._pid != os.getpid():
+                    # The parent's connections are not ours to close
+                    self._connections, self._pid = [], os.getpid()
+                self._connections.append(conn)
+            self._threads.conn = conn
+            self._threads.pid = os.getpid()
+        return conn
+
+    def _init_schema(self):
+        conn = self._connect()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            " key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS inflight ("
+            " key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+
+    def read_many(self, keys: Sequence[str]) -> List[Optional[CacheRecord]]:
+        conn = self._connect()
+        now = time.time()
+        found: Dict[str, CacheRecord] = {}
+        for i in range(0, len(keys), CHUNK):
+            chunk = keys[i:i + CHUNK]
+            rows = conn.execute(
+                f"SELECT key, value, expires_at FROM entries WHERE key IN ({', '.join('?' * len(chunk))})", chunk
+            )
+            for key, value, expires_at in rows:
+                if expires_at is None or expires_at >= now:
+                    found[key] = CacheRecord(bytes(value), len(value), expires_at)
+        return [found.get(key) for key in keys]
+
+    def write_many(self, items: Mapping[str, bytes], ttl: Optional[float] = None):
+        expires_at = time.time() + ttl if ttl is not None else None
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT OR REPLACE INTO entries (key, value, expires_at) VALUES (?, ?, ?)",
+                ((key, value, expires_at) for key, value in items.items()),
+            )
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def remove_many(self, keys: Sequence[str]) -> int:
+        conn = self._connect()
+        before = conn.total_changes
+        conn.executemany("DELETE FROM entries WHERE key = ?", ((key,) for key in keys))
+        return conn.total_changes - before
+
+    def iter_keys(self) -> Iterator[str]:
+        # Fetched up front, so the caller can write while it iterates
+        keys = self._connect().execute("SELECT key FROM entries").fetchall()
+        for (key,) in keys:
+            yield key
+
+    def truncate(self):
+        """Delete every entry and lease."""
+        conn = self._connect()
+        conn.execute("DELETE FROM entries")
+        conn.execute("DELETE FROM inflight")
+
+    async def clear(self, batch_size: int = 500):
+        await asyncio.to_thread(self.truncate)
+
+    def claim(self, key: str, owner: str, lease_seconds: float) -> bool:
+        """Take a lease on ``key``; False if another owner's lease is still live."""
+        now = time.time()
+        cursor = self._connect().execute(
+            "INSERT INTO inflight (key, owner, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+            "WHERE inflight.expires_at < ? OR inflight.owner = excluded.owner",
+            (key, owner, now + lease_seconds, now),
+        )
+        return cursor.rowcount == 1
+
+    def release(self, key: str, owner: str):
+        """Drop ``owner``'s lease on ``key``."""
+        self._connect().execute("DELETE FROM inflight WHERE key = ? AND owner = ?", (key, owner))
+
+    def lease_expires(self, key: str) -> Optional[float]:
+        """When the lease on ``key`` runs out (Unix time), or None if there is none."""
+        row = self._connect().execute("SELECT expires_at FROM inflight WHERE key = ?", (key,)).fetchone()
+        return row[0] if row is not None else None
+
+    def stats(self) -> Dict[str, int]:
+        conn = self._connect()
+        return {
+            "entries": conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0],
+            "inflight": conn.execute("SELECT COUNT(*) FROM inflight").fetchone()[0],
+        }
+
+    def _close(self):
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._threads = threading.local()
+
+    async def close(self):
+        await asyncio.to_thread(self._close)
+
+class SharedCacheManager(CacheManager):
+    """
+    Response cache shared by every process on a host.
+
+    Entries live in a SqliteBackend, and ``claim``/``release``/``wait`` use
+    its leases so that one worker computes a missing entry while the others
+    wait for it.
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[Path] = None,
+        settings=None,
+        lease_seconds: float = 60.0,
+    ):
+        if db_path is None:
+            from config.settings import settings as default_settings
+            db_path = (settings or default_settings).cache_dir / "responses.sqlite3"
+        self.db_path = Path(db_path)
+        self.backend: SqliteBackend = SqliteBackend(self.db_path)
+        super().__init__(cache_dir=self.db_path.parent, settings=settings, backend=self.backend)
+        self.lease_seconds = lease_seconds
+
+    @property
+    def owner(self) -> str:
+        """Lease owner id; includes the pid so forked workers never share it."""
+        return f"{os.getpid()}-{id(self)}"
+
+    def claim(self, model: str, messages: list, params: Optional[Dict[str, Any]] = None) -> bool:
+        """Take a lease on a missing entry; False if another live worker holds it."""
+        return self.backend.claim(self._get_cache_key(model, messages, params), self.owner, self.lease_seconds)
+
+    def release(self, model: str, messages: list, params: Optional[Dict[str, Any]] = None):
+        """Release a lease taken with claim()."""
+        self.backend.release(self._get_cache_key(model, messages, params), self.owner)
+
+    async def wait(
+        self,
+        model: str,
+        messages: list,
+        params: Optional[Dict[str, Any]] = None,
+        timeout: float = 0.0
+    ) -> Optional[Dict[str, Any]]:
+        """Poll for an entry another worker is computing until it lands, its lease ends, or timeout."""
+        key = self._get_cache_key(model, messages, params)
+        deadline = time.monotonic() + timeout
+        delay = 0.005
+        while True:
+            cached = await self.aget(model, messages, params)
+            if cached is not None:
+                return cached
+            expires_at = await asyncio.to_thread(self.backend.lease_expires, key)
+            if expires_at is None or expires_at < time.time() or time.monotonic() >= deadline:
+                return None
+            await asyncio.sleep(min(delay, max(0.0, deadline - time.monotonic())))
+            delay = min(delay * 2, 0.1)
+
+    def clear(self, age_hours: Optional[int] = None):
+        """Clear cache, optionally only entries older than age_hours."""
+        if age_hours is None:
+            self.backend.truncate()
+        else:
+            super().clear(age_hours)
+
+    def get_stats(self) -> Dict[str, int]:
+        """Get entry and lease counts."""
+        return self.backend.stats()
+
+def cache_from_settings(settings) -> CacheManager:
+    """The response cache CACHE_BACKEND selects: "sqlite", "redis" or the default per-file cache."""
+    if settings.cache_backend == "sqlite":
+        return SharedCacheManager(settings=settings)
+    if settings.cache_backend == "redis":
+        from .resp import RedisBackend
+        return CacheManager(settings=settings, backend=RedisBackend.from_url(settings.cache_url))
+    return CacheManager(settings=settings)
@@ -0,0 +1,231 @@
+# utils/cache/snapshot.py
+"""
+Response cache snapshots for warm starts.
+
+A snapshot is one file holding a cache's entries in zlib-compressed blocks
+of JSON lines, followed by an index of every entry (key, model, cached_at,
+block) and a fixed footer pointing at the index::
+
+    MAGIC | block 0 | block 1 | ... | index | index offset, index length, MAGIC
+
+Import reads the index first, so entries that are expired or filtered out by
+model are skipped without decompressing their blocks, and the kept blocks
+are streamed one at a time into the target cache. Entries the target already
+has at the same age or newer are left alone.
+"""
+import json
+import os
+import struct
+import tempfile
+import time
+import zlib
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional, Dict, List, Collection, Iterable, Iterator
+
+from .manager import CacheManager, CacheEntry
+
+MAGIC = b"LLMCSNP1"
+VERSION = 1
+FOOTER = struct.Struct(">QQ8s")
+
+# Uncompressed bytes per block; bounds the memory an import needs
+BLOCK_BYTES = 1024 * 1024
+
+class SnapshotError(ValueError):
+    """Raised when a file is not a readable cache snapshot"""
+    pass
+
+@dataclass
+class SnapshotIndex:
+    created_at: float
+    blocks: List[Dict[str, int]]
+    # [key, model, cached_at, block number]
+    entries: List[list]
+
+@dataclass
+class SnapshotStats:
+    entries: int = 0
+    imported: int = 0
+    expired: int = 0
+    filtered: int = 0
+    duplicates: int = 0
+    # Blocks written by an export, read by an import
+    blocks: int = 0
+    bytes: int = 0
+    elapsed: float = 0.0
+    models: Dict[str, int] = field(default_factory=dict)
+
+def _encode(entry: CacheEntry) -> bytes:
+    record = {"key": entry.key, "model": entry.model, "cached_at": entry.cached_at, "response": entry.response}
+    if entry.messages:
+        record["messages"] = entry.messages
+    return json.dumps(record, separators=(",", ":")).encode() + b"\n"
+
+def write_snapshot(path: Path, entries: Iterable[CacheEntry], block_bytes: int = BLOCK_BYTES, level: int = 6) -> SnapshotStats:
+    """
+    Write entries to a snapshot file, replacing it atomically when complete.
+
+    Entries are compressed a block at a time, so only one block and the index
+    are held in memory.
+    """
+    started = time.perf_counter()
+    path = Path(path)
+    stats = SnapshotStats()
+    blocks: List[Dict[str, int]] = []
+    index: List[list] = []
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(MAGIC)
+            pending: List[bytes] = []
+            pending_bytes = 0
+
+            def flush():
+                nonlocal pending_bytes
+                data = zlib.compress(b"".join(pending), level)
+                blocks.append({"offset": f.tell(), "length": len(data), "entries": len(pending)})
+                f.write(data)
+                pending.clear()
+                pending_bytes = 0
+
+            for entry in entries:
+                line = _encode(entry)
+                index.append([entry.key, entry.model, entry.cached_at, len(blocks)])
+                pending.append(line)
+                pending_bytes += len(line)
+                stats.models[entry.model] = stats.models.get(entry.model, 0) + 1
+                if pending_bytes >= block_bytes:
+                    flush()
+            if pending:
+                flush()
+
+            index_offset = f.tell()
+            data = zlib.compress(json.dumps({
+                "version": VERSION,
+                "created_at": time.time(),
+                "blocks": blocks,
+                "entries": index,
+            }, separators=(",", ":")).encode(), level)
+            f.write(data)
+            f.write(FOOTER.pack(index_offset, len(data), MAGIC))
+            stats.bytes = f.tell()
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    stats.entries = len(index)
+    stats.blocks = len(blocks)
+    stats.elapsed = time.perf_counter() - started
+    return stats
+
+def read_index(path: Path) -> SnapshotIndex:
+    """Read a snapshot's index without touching its blocks."""
+    with open(path, "rb") as f:
+        return _read_index(f)
+
+def _read_index(f) -> SnapshotIndex:
+    if f.read(len(MAGIC)) != MAGIC:
+        raise SnapshotError("Not a cache snapshot")
+    f.seek(-FOOTER.size, os.SEEK_END)
+    index_offset, index_length, magic = FOOTER.unpack(f.read(FOOTER.size))
+    if magic != MAGIC:
+        raise SnapshotError("Cache snapshot is truncated")
+    f.seek(index_offset)
+    try:
+        data = json.loads(zlib.decompress(f.read(index_length)))
+    except (zlib.error, json.JSONDecodeError) as e:
+        raise SnapshotError(f"Cache snapshot index is corrupt: {e}") from e
+    if data.get("version") != VERSION:
+        raise SnapshotError(f"Unsupported cache snapshot version: {data.get('version')}")
+    return SnapshotIndex(data["created_at"], data["blocks"], data["entries"])
+
+def read_snapshot(
+    path: Path,
+    keys: Optional[Collection[str]] = None,
+    stats: Optional[SnapshotStats] = None
+) -> Iterator[List[CacheEntry]]:
+    """
+    Yield a snapshot's entries a block at a time, only the given keys if
+    any; blocks holding none of them are not read.
+    """
+    with open(path, "rb") as f:
+        index = _read_index(f)
+        if keys is None:
+            wanted = range(len(index.blocks))
+        else:
+            wanted = sorted({block for key, _, _, block in index.entries if key in keys})
+        for number in wanted:
+            block = index.blocks[number]
+            f.seek(block["offset"])
+            try:
+                lines = zlib.decompress(f.read(block["length"])).splitlines()
+            except zlib.error as e:
+                raise SnapshotError(f"Cache snapshot block {number} is corrupt: {e}") from e
+            if stats is not None:
+                stats.blocks += 1
+            entries = []
+            for line in lines:
+                record = json.loads(line)
+                if keys is not None and record["key"] not in keys:
+                    continue
+                entries.append(CacheEntry(
+                    record["key"], record["model"], record["cached_at"], record["response"], record.get("messages")
+                ))
+            yield entries
+
+def export_snapshot(
+    cache: CacheManager,
+    path: Path,
+    models: Optional[Collection[str]] = None,
+    max_age: Optional[float] = None,
+    block_bytes: int = BLOCK_BYTES,
+) -> SnapshotStats:
+    """
+    Export a cache's entries to a snapshot file.
+
+    Args:
+        cache: The cache to read
+        path: Snapshot file to write
+        models: Only entries for these models
+        max_age: Only entries cached at most this many seconds ago
+        block_bytes: Uncompressed bytes per compressed block
+    """
+    newer_than = time.time() - max_age if max_age is not None else None
+    return write_snapshot(path, cache.iter_entries(models=models, newer_than=newer_than), block_bytes=block_bytes)
+
+def import_snapshot(
+    cache: CacheManager,
+    path: Path,
+    models: Optional[Collection[str]] = None,
+    ttl: Optional[float] = None,
+) -> SnapshotStats:
+    """
+    Load a snapshot into a cache, skipping entries that are expired under
+    ``ttl`` (the cache's CACHE_TTL by default), not for ``models``, or
+    already in the cache at the same age or newer.
+    """
+    started = time.perf_counter()
+    if ttl is None:
+        ttl = cache.settings.CACHE_TTL
+    index = read_index(path)
+    stats = SnapshotStats(entries=len(index.entries), bytes=Path(path).stat().st_size)
+    cutoff = time.time() - ttl
+    keep = set()
+    for key, model, cached_at, _ in index.entries:
+        if models is not None and model not in models:
+            stats.filtered += 1
+        elif cached_at < cutoff:
+            stats.expired += 1
+        else:
+            keep.add(key)
+            stats.models[model] = stats.models.get(model, 0) + 1
+    if keep:
+        for entries in read_snapshot(path, keys=keep, stats=stats):
+            stats.imported += cache.put_entries(entries)
+    stats.duplicates = stats.entries - stats.filtered - stats.expired - stats.imported
+    stats.elapsed = time.perf_counter() - started
+    return stats
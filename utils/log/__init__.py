@@ -0,0 +1 @@
+# utils/log/__init__.py
@@ -0,0 +1,126 @@
+# utils/log/setup.py
+"""
+Non-blocking logging.
+
+``configure_logging`` puts a single ``QueueHandler`` on the root logger and
+moves the real handler (a stream or file handler using LOG_FORMAT) to a
+``QueueListener`` thread. A log call on the event loop then costs a record
+and a queue put; formatting, the write and the flush happen on the writer
+thread. DEBUG records can be sampled, keeping 1 in N per call site, so that
+per-request debug logging stays affordable at high request rates.
+"""
+import atexit
+import logging
+import logging.handlers
+import queue
+import sys
+from typing import Optional, TextIO, Dict, Tuple
+
+_PLAIN = (str, int, float, bool, type(None))
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that leaves message formatting to the listener thread.
+
+    The stock handler formats every record on the calling thread. Here a
+    record is queued as-is when its arguments are immutable scalars. Records
+    with other arguments are merged first, because a dict or object could
+    change before the writer thread gets to it.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        args = record.args
+        if args and not (isinstance(args, tuple) and all(isinstance(a, _PLAIN) for a in args)):
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+class DebugSampler(logging.Filter):
+    """
+    Pass every record at INFO and above, and one in ``every`` DEBUG records
+    per call site (logger, file and line), starting with the first.
+    """
+
+    def __init__(self, every: int = 1):
+        super().__init__()
+        self.every = max(1, every)
+        self.dropped = 0
+        self._seen: Dict[Tuple[str, str, int], int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.every == 1 or record.levelno > logging.DEBUG:
+            return True
+        site = (record.name, record.pathname, record.lineno)
+        count = self._seen.get(site, 0)
+        self._seen[site] = count + 1
+        if count % self.every:
+            self.dropped += 1
+            return False
+        return True
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+def configure_logging(
+    level: Optional[str] = None,
+    fmt: Optional[str] = None,
+    debug_sample_every: Optional[int] = None,
+    stream: Optional[TextIO] = None,
+    handler: Optional[logging.Handler] = None,
+    settings=None,
+) -> logging.handlers.QueueListener:
+    """
+    Route all logging through a queue to a background writer thread.
+
+    Args:
+        level: Root level; LOG_LEVEL by default
+        fmt: Format string; LOG_FORMAT by default
+        debug_sample_every: Keep 1 in N DEBUG records per call site;
+            LOG_DEBUG_SAMPLE_EVERY by default
+        stream: Stream the default handler writes to; stderr by default
+        handler: Handler to write with instead of a stream handler
+        settings: Settings instance; defaults to the global settings
+
+    Returns:
+        The running listener. Calling again replaces it, and it is stopped
+        (flushing queued records) at exit.
+    """
+    global _listener
+    if level is None or fmt is None or debug_sample_every is None:
+        if settings is None:
+            from config.settings import get_settings
+            settings = get_settings()
+        level = level or settings.log_level
+        fmt = fmt or settings.log_format
+        debug_sample_every = debug_sample_every or settings.log_debug_sample_every
+
+    if handler is None:
+        handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(logging.Formatter(fmt))
+
+    # Unbounded: a burst is absorbed rather than blocking the event loop
+    records: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    queue_handler = DeferredQueueHandler(records)
+    queue_handler.addFilter(DebugSampler(debug_sample_every))
+
+    root = logging.getLogger()
+    if _listener is not None:
+        _listener.stop()
+    for old in list(root.handlers):
+        root.removeHandler(old)
+        if isinstance(old, logging.handlers.QueueHandler):
+            old.close()
+    root.addHandler(queue_handler)
+    root.setLevel(level.upper())
+
+    _listener = logging.handlers.QueueListener(records, handler, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+def stop_logging():
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+atexit.register(stop_logging)
@@ -0,0 +1,216 @@
+# utils/mock/resp_server.py
+"""
+Local stand-in for a Redis-compatible cache server.
+
+Keeps keys in memory and answers the commands RedisBackend sends (PING,
+AUTH, SELECT, GET, MGET, SET with EX/PX, DEL, EXISTS, PTTL, TTL, STRLEN,
+SCAN, DBSIZE, FLUSHDB) over RESP2. Each chunk of bytes received is answered
+in one write after ``delay`` seconds, so a pipelined batch costs one
+simulated round trip while unpipelined commands pay one each.
+
+    python -m utils.mock.resp_server --port 6380 --delay 0.001
+"""
+import argparse
+import asyncio
+import fnmatch
+import time
+from collections import Counter
+from typing import Optional, Dict, Tuple, List, Any
+
+from utils.cache.resp import parse_reply, RespError, INCOMPLETE
+
+def _encode(value: Any) -> bytes:
+    if value is None:
+        return b"$-1\r\n"
+    if isinstance(value, RespError):
+        return b"-%s\r\n" % str(value).encode()
+    if isinstance(value, str):
+        return b"+%s\r\n" % value.encode()
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, bytes):
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+    return b"*%d\r\n" % len(value) + b"".join(_encode(item) for item in value)
+
+class _Session(asyncio.Protocol):
+    def __init__(self, server: "FakeRespServer"):
+        self.server = server
+        self.buffer = bytearray()
+        self.authenticated = server.password is None
+        self.db = 0
+        self.transport: Optional[asyncio.Transport] = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.server.stats["connections"] += 1
+        self.server._sessions.add(self)
+
+    def connection_lost(self, exc):
+        self.server._sessions.discard(self)
+
+    def data_received(self, data: bytes):
+        self.server.stats["reads"] += 1
+        self.buffer += data
+        replies = []
+        pos = 0
+        while True:
+            command, end = parse_reply(self.buffer, pos)
+            if command is INCOMPLETE:
+                break
+            pos = end
+            replies.append(_encode(self.server.execute(self, command)))
+        del self.buffer[:pos]
+        if not replies:
+            return
+        out = b"".join(replies)
+        if self.server.delay:
+            asyncio.get_running_loop().call_later(self.server.delay, self._write, out)
+        else:
+            self._write(out)
+
+    def _write(self, data: bytes):
+        if self.transport is not None and not self.transport.is_closing():
+            self.transport.write(data)
+
+class FakeRespServer:
+    """
+    In-process server for testing RedisBackend; use as an async context
+    manager and pass ``url`` to ``RedisBackend.from_url``. ``data`` maps
+    (db, key) to (value, expires_at); ``stats`` counts connections, reads
+    and commands by name.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, password: Optional[str] = None, delay: float = 0.0):
+        self.host = host
+        self.port = port
+        self.password = password
+        self.delay = delay
+        self.data: Dict[Tuple[int, bytes], Tuple[bytes, Optional[float]]] = {}
+        self.stats: Counter = Counter()
+        self._sessions: set = set()
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def url(self) -> str:
+        auth = f":{self.password}@" if self.password else ""
+        return f"redis://{auth}{self.host}:{self.port}/0"
+
+    async def start(self) -> "FakeRespServer":
+        loop = asyncio.get_running_loop()
+        self._server = await loop.create_server(lambda: _Session(self), self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            self.drop_connections()
+            await self._server.wait_closed()
+            self._server = None
+
+    def drop_connections(self):
+        """Close every client connection, as a server restart would."""
+        for session in list(self._sessions):
+            session.transport.close()
+
+    async def __aenter__(self) -> "FakeRespServer":
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.stop()
+
+    def _live(self, db: int, key: bytes) -> Optional[Tuple[bytes, Optional[float]]]:
+        entry = self.data.get((db, key))
+        if entry is not None and entry[1] is not None and entry[1] <= time.time():
+            del self.data[(db, key)]
+            return None
+        return entry
+
+    def execute(self, session: _Session, command: List[bytes]) -> Any:
+        if not isinstance(command, list) or not command:
+            return RespError("ERR Protocol error")
+        name = command[0].decode().upper()
+        args = command[1:]
+        self.stats[name] += 1
+        if name == "AUTH":
+            if args[-1].decode() != self.password:
+                return RespError("WRONGPASS invalid username-password pair")
+            session.authenticated = True
+            return "OK"
+        if not session.authenticated:
+            return RespError("NOAUTH Authentication required.")
+        db = session.db
+        if name == "PING":
+            return "PONG"
+        if name == "SELECT":
+            session.db = int(args[0])
+            return "OK"
+        if name == "GET":
+            entry = self._live(db, args[0])
+            return entry[0] if entry else None
+        if name == "MGET":
+            return [entry[0] if entry else None for entry in (self._live(db, key) for key in args)]
+        if name == "SET":
+            expires_at = None
+            options = [arg.decode().upper() for arg in args[2:]]
+            if "EX" in options:
+                expires_at = time.time() + int(options[options.index("EX") + 1])
+            elif "PX" in options:
+                expires_at = time.time() + int(options[options.index("PX") + 1]) / 1000
+            self.data[(db, args[0])] = (args[1], expires_at)
+            return "OK"
+        if name == "DEL":
+            deleted = 0
+            for key in args:
+                if self._live(db, key) is not None:
+                    del self.data[(db, key)]
+                    deleted += 1
+            return deleted
+        if name == "EXISTS":
+            return sum(self._live(db, key) is not None for key in args)
+        if name in ("PTTL", "TTL"):
+            entry = self._live(db, args[0])
+            if entry is None:
+                return -2
+            if entry[1] is None:
+                return -1
+            left = entry[1] - time.time()
+            return int(left * 1000) if name == "PTTL" else int(left)
+        if name == "STRLEN":
+            entry = self._live(db, args[0])
+            return len(entry[0]) if entry else 0
+        if name == "SCAN":
+            cursor = int(args[0])
+            options = [arg.decode() for arg in args[1:]]
+            upper = [option.upper() for option in options]
+            pattern = options[upper.index("MATCH") + 1] if "MATCH" in upper else "*"
+            count = int(options[upper.index("COUNT") + 1]) if "COUNT" in upper else 10
+            keys = sorted(key for (key_db, key) in list(self.data) if key_db == db and self._live(db, key))
+            page = keys[cursor:cursor + count]
+            following = cursor + count if cursor + count < len(keys) else 0
+            return [str(following).encode(), [key for key in page if fnmatch.fnmatchcase(key.decode(), pattern)]]
+        if name == "DBSIZE":
+            return sum(1 for (key_db, key) in list(self.data) if key_db == db and self._live(db, key))
+        if name == "FLUSHDB":
+            for key in [k for k in self.data if k[0] == db]:
+                del self.data[key]
+            return "OK"
+        return RespError(f"ERR unknown command '{name.lower()}'")
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Redis-compatible cache server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6380)
+    parser.add_argument("--password", default=None)
+    parser.add_argument("--delay", type=float, default=0.0, help="Seconds before answering each read")
+    args = parser.parse_args()
+
+    async def serve():
+        async with FakeRespServer(args.host, args.port, args.password, args.delay) as server:
+            print(f"Serving on {server.url}")
+            await asyncio.Event().wait()
+
+    asyncio.run(serve())
+
+if __name__ == "__main__":
+    main()
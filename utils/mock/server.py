@@ -0,0 +1,416 @@
+# utils/mock/server.py
+"""
+Local stand-in for the Anthropic and OpenAI HTTP APIs.
+
+Serves ``/v1/messages`` and ``/v1/chat/completions`` (streaming and not) with
+configurable latency distributions, SSE token pacing, 429/5xx injection,
+per-key request quotas with rate-limit headers, padded payloads, and
+Anthropic-style prompt caching with simulated prefill time. Randomness is
+seeded so runs are repeatable.
+
+    python -m utils.mock.server --port 8080 --latency lognormal:0.2,0.5 --rate-429 0.01
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Optional, Dict, Any, AsyncIterator
+
+from aiohttp import web
+
+from core.api.transport import TransportRequest, TransportResponse
+
+LatencySampler = Callable[[random.Random], float]
+
+PACKED_INPUT = re.compile(r'<input id="(\d+)">')
+
+def parse_latency(spec: str) -> LatencySampler:
+    """
+    Parse a latency distribution spec into a sampler returning seconds.
+
+    Supported: ``fixed:S``, ``uniform:LO,HI``, ``normal:MEAN,STDDEV``,
+    ``lognormal:MEDIAN,SIGMA`` and ``exponential:MEAN``.
+    """
+    name, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v] if args else []
+    if name == "fixed":
+        delay = values[0] if values else 0.0
+        return lambda rng: delay
+    if name == "uniform":
+        lo, hi = values
+        return lambda rng: rng.uniform(lo, hi)
+    if name == "normal":
+        mean, stddev = values
+        return lambda rng: max(0.0, rng.gauss(mean, stddev))
+    if name == "lognormal":
+        median, sigma = values
+        mu = math.log(median)
+        return lambda rng: rng.lognormvariate(mu, sigma)
+    if name == "exponential":
+        mean = values[0]
+        return lambda rng: rng.expovariate(1.0 / mean) if mean > 0 else 0.0
+    raise ValueError(f"Unknown latency distribution: {spec}")
+
+@dataclass
+class MockConfig:
+    latency: str = "fixed:0"          # time before the first byte
+    tokens_per_second: float = 0.0    # SSE pacing; 0 sends all tokens at once
+    output_tokens: int = 16
+    payload_bytes: int = 0            # pad the completion text to at least this size
+    rate_429: float = 0.0
+    rate_5xx: float = 0.0
+    retry_after: float = 1.0
+    key_limit: int = 0                # requests per API key per window; 0 is unlimited
+    key_window: float = 60.0
+    prefill_tokens_per_second: float = 0.0  # delay for uncached prompt tokens; 0 is none
+    pack_drop_rate: float = 0.0       # share of packed-prompt inputs left out of the reply
+    seed: Optional[int] = 0
+
+class MockProviderServer:
+    """
+    In-process aiohttp server emulating both providers.
+
+    Use as an async context manager; ``anthropic_url`` and ``openai_url`` can
+    be passed straight to ``LLMClient``. Without starting it, ``handle`` serves
+    the same responses through an ``InProcessTransport``.
+    """
+
+    def __init__(self, config: Optional[MockConfig] = None, host: str = "127.0.0.1", port: int = 0):
+        self.config = config or MockConfig()
+        self.host = host
+        self.port = port
+        self.stats: Counter = Counter()
+        self._rng = random.Random(self.config.seed)
+        self._latency = parse_latency(self.config.latency)
+        self._windows: Dict[str, list] = {}
+        self._prompt_cache: set = set()
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    @property
+    def anthropic_url(self) -> str:
+        return f"{self.base_url}/v1/messages"
+
+    @property
+    def openai_url(self) -> str:
+        return f"{self.base_url}/v1/chat/completions"
+
+    def app(self) -> web.Application:
+        app = web.Application(client_max_size=1024 ** 3)
+        app.router.add_post("/v1/messages", self._claude)
+        app.router.add_post("/v1/chat/completions", self._openai)
+        app.router.add_get("/stats", self._stats)
+        return app
+
+    async def start(self) -> "MockProviderServer":
+        self._runner = web.AppRunner(self.app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+        return self
+
+    async def stop(self):
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self) -> "MockProviderServer":
+        return await self.start()
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.stop()
+
+    def _tokens(self, max_tokens: Optional[int]) -> list:
+        count = self.config.output_tokens if not max_tokens else min(self.config.output_tokens, max_tokens)
+        tokens = ["tok "] * max(1, count)
+        padding = self.config.payload_bytes - 4 * len(tokens)
+        if padding > 0:
+            tokens[-1] += "x" * padding
+        return tokens
+
+    async def _preamble(self, provider: str):
+        """Apply latency and maybe return an injected (status, headers, body) error."""
+        self.stats[f"{provider}_requests"] += 1
+        await asyncio.sleep(self._latency(self._rng))
+
+        roll = self._rng.random()
+        if roll < self.config.rate_429:
+            self.stats[f"{provider}_429"] += 1
+            return 429, {"retry-after": str(self.config.retry_after)}, {
+                "error": {"type": "rate_limit_error", "message": "Rate limit exceeded"}
+            }
+        if roll < self.config.rate_429 + self.config.rate_5xx:
+            status = self._rng.choice((500, 502, 503))
+            self.stats[f"{provider}_{status}"] += 1
+            return status, {}, {"error": {"type": "api_error", "message": "Injected server error"}}
+        return None
+
+    def _packed_reply(self, body: Dict[str, Any]) -> Optional[tuple]:
+        """
+        (text, output tokens) answering a packed prompt the way a model would:
+        a JSON object with one answer per ``<input id="N">``.
+        """
+        messages = body.get("messages") or [{}]
+        content = messages[-1].get("content")
+        ids = PACKED_INPUT.findall(content) if isinstance(content, str) else []
+        if not ids:
+            return None
+        answers = {
+            i: "tok " * self.config.output_tokens
+            for i in ids
+            if self._rng.random() >= self.config.pack_drop_rate
+        }
+        self.stats["packed_requests"] += 1
+        return json.dumps(answers), max(1, self.config.output_tokens * len(ids))
+
+    def _cache_usage(self, body: Dict[str, Any]) -> tuple:
+        """
+        (cache read, cache write) prompt tokens of a Claude request: the
+        prefix up to its last cache_control block is written on first sight
+        and read afterwards.
+        """
+        segments = ([body["system"]] if body.get("system") else []) + list(body.get("messages", []))
+        digest = hashlib.blake2b(digest_size=16)
+        size, cached = 0, None
+        for segment in segments:
+            content = segment.get("content") if isinstance(segment, dict) else segment
+            blocks = content if isinstance(content, list) else [content]
+            marked = any(isinstance(b, dict) and "cache_control" in b for b in blocks)
+            # The breakpoint marker itself is not part of the cached content
+            stripped = [
+                {k: v for k, v in b.items() if k != "cache_control"} if isinstance(b, dict) else b
+                for b in blocks
+            ]
+            encoded = json.dumps(stripped).encode()
+            digest.update(encoded)
+            size += len(encoded)
+            if marked:
+                cached = (digest.copy().digest(), size // 4)
+        if cached is None:
+            return 0, 0
+        key, tokens = cached
+        if key in self._prompt_cache:
+            self.stats["anthropic_cache_reads"] += 1
+            return tokens, 0
+        self._prompt_cache.add(key)
+        self.stats["anthropic_cache_writes"] += 1
+        return 0, tokens
+
+    async def _pace(self, index: int):
+        if self.config.tokens_per_second > 0 and index:
+            await asyncio.sleep(1.0 / self.config.tokens_per_second)
+
+    def _quota(self, provider: str, headers) -> tuple:
+        """Count a request against its key; returns (allowed, rate-limit headers)."""
+        if not self.config.key_limit:
+            return True, {}
+        lowered = {k.lower(): v for k, v in headers.items()}
+        key = lowered.get("x-api-key") or lowered.get("authorization", "").removeprefix("Bearer ")
+        now = time.monotonic()
+        window = self._windows.get(key)
+        if window is None or now - window[0] >= self.config.key_window:
+            window = self._windows[key] = [now, 0]
+        window[1] += 1
+        remaining = max(0, self.config.key_limit - window[1])
+        reset = window[0] + self.config.key_window - now
+        if provider == "anthropic":
+            reset_at = datetime.fromtimestamp(time.time() + reset, timezone.utc).isoformat().replace("+00:00", "Z")
+            limit_headers = {
+                "anthropic-ratelimit-requests-remaining": str(remaining),
+                "anthropic-ratelimit-requests-reset": reset_at,
+            }
+        else:
+            limit_headers = {
+                "x-ratelimit-remaining-requests": str(remaining),
+                "x-ratelimit-reset-requests": f"{reset:.3f}s",
+            }
+        if window[1] > self.config.key_limit:
+            self.stats[f"{provider}_key_limited"] += 1
+            return False, {**limit_headers, "retry-after": f"{reset:.3f}"}
+        return True, limit_headers
+
+    async def _respond(self, provider: str, body: Dict[str, Any], headers=None):
+        """
+        Build a response as (status, headers, payload) where payload is a
+        JSON-ready dict, or an async iterator of SSE lines when streaming.
+        """
+        allowed, limit_headers = self._quota(provider, headers or {})
+        if not allowed:
+            return 429, limit_headers, {"error": {"type": "rate_limit_error", "message": "Key rate limit exceeded"}}
+        status, response_headers, payload = await self._respond_unlimited(provider, body)
+        return status, {**limit_headers, **response_headers}, payload
+
+    async def _respond_unlimited(self, provider: str, body: Dict[str, Any]):
+        error = await self._preamble(provider)
+        if error is not None:
+            return error
+        tokens = self._tokens(body.get("max_tokens"))
+        text, output_tokens = "".join(tokens), len(tokens)
+        packed = None if body.get("stream") else self._packed_reply(body)
+        if packed is not None:
+            text, output_tokens = packed
+        input_tokens = len(json.dumps(body.get("messages", []))) // 4
+        if body.get("system"):
+            input_tokens += len(json.dumps(body["system"])) // 4
+        cache_read = cache_write = 0
+        if provider == "anthropic":
+            cache_read, cache_write = self._cache_usage(body)
+            cache_read, cache_write = min(cache_read, input_tokens), min(cache_write, input_tokens)
+        if self.config.prefill_tokens_per_second > 0:
+            await asyncio.sleep((input_tokens - cache_read) / self.config.prefill_tokens_per_second)
+        if provider == "anthropic":
+            usage = {"input_tokens": input_tokens - cache_read - cache_write}
+            if cache_read or cache_write:
+                usage.update(cache_read_input_tokens=cache_read, cache_creation_input_tokens=cache_write)
+            if body.get("stream"):
+                return 200, {"content-type": "text/event-stream"}, self._claude_events(body, tokens, usage)
+            return 200, {}, {
+                "id": f"msg_{uuid.uuid4().hex[:24]}",
+                "type": "message",
+                "role": "assistant",
+                "model": body.get("model"),
+                "content": [{"type": "text", "text": text}],
+                "stop_reason": "end_turn",
+                "usage": {**usage, "output_tokens": output_tokens},
+            }
+        if body.get("stream"):
+            return 200, {"content-type": "text/event-stream"}, self._openai_chunks(body, tokens)
+        return 200, {}, {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": text},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": input_tokens,
+                "completion_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens,
+            },
+        }
+
+    async def _claude_events(self, body: Dict[str, Any], tokens: list, usage: Dict[str, int]) -> AsyncIterator[bytes]:
+        def event(name: str, data: Dict[str, Any]) -> bytes:
+            return f"event: {name}\ndata: {json.dumps(data)}\n\n".encode()
+
+        yield event("message_start", {"type": "message_start", "message": {
+            "id": f"msg_{uuid.uuid4().hex[:24]}", "model": body.get("model"),
+            "usage": {**usage, "output_tokens": 0},
+        }})
+        yield event("content_block_start", {"type": "content_block_start", "index": 0,
+                                            "content_block": {"type": "text", "text": ""}})
+        for i, token in enumerate(tokens):
+            await self._pace(i)
+            yield event("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                                "delta": {"type": "text_delta", "text": token}})
+        yield event("content_block_stop", {"type": "content_block_stop", "index": 0})
+        yield event("message_delta", {"type": "message_delta", "delta": {"stop_reason": "end_turn"},
+                                      "usage": {"output_tokens": len(tokens)}})
+        yield event("message_stop", {"type": "message_stop"})
+
+    async def _openai_chunks(self, body: Dict[str, Any], tokens: list) -> AsyncIterator[bytes]:
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        for i, token in enumerate(tokens):
+            await self._pace(i)
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": body.get("model"),
+                "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}],
+            }
+            yield b"data: " + json.dumps(chunk).encode() + b"\n\n"
+        yield b"data: [DONE]\n\n"
+
+    async def handle(self, request: TransportRequest) -> TransportResponse:
+        """Serve a request in-process; pass as the handler of an InProcessTransport."""
+        provider = "anthropic" if request.url.endswith("/messages") else "openai"
+        status, headers, payload = await self._respond(provider, request.payload, request.headers)
+        if isinstance(payload, dict):
+            return TransportResponse(status, body=payload, headers=headers)
+        return TransportResponse(status, lines=self._split_lines(payload), headers=headers)
+
+    @staticmethod
+    async def _split_lines(events: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        # Events are multi-line; StreamReader hands the client one line at a time
+        async for event in events:
+            for line in event.splitlines(keepends=True):
+                yield line
+
+    async def _serve(self, request: web.Request, provider: str) -> web.StreamResponse:
+        status, headers, payload = await self._respond(provider, await request.json(), request.headers)
+        if isinstance(payload, dict):
+            return web.json_response(payload, status=status, headers=headers)
+
+        response = web.StreamResponse(status=status, headers=headers)
+        await response.prepare(request)
+        try:
+            async for chunk in payload:
+                await response.write(chunk)
+            await response.write_eof()
+        except ConnectionResetError:
+            # Client stopped reading after the final event or gave up mid-stream
+            self.stats[f"{provider}_disconnects"] += 1
+        return response
+
+    async def _claude(self, request: web.Request) -> web.StreamResponse:
+        return await self._serve(request, "anthropic")
+
+    async def _openai(self, request: web.Request) -> web.StreamResponse:
+        return await self._serve(request, "openai")
+
+    async def _stats(self, request: web.Request) -> web.Response:
+        return web.json_response(dict(self.stats))
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock Anthropic/OpenAI API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", default="fixed:0", help="e.g. fixed:0.05, lognormal:0.2,0.5")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0)
+    parser.add_argument("--output-tokens", type=int, default=16)
+    parser.add_argument("--payload-bytes", type=int, default=0)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--rate-5xx", type=float, default=0.0)
+    parser.add_argument("--key-limit", type=int, default=0, help="Requests per key per --key-window")
+    parser.add_argument("--key-window", type=float, default=60.0)
+    parser.add_argument("--prefill-tokens-per-second", type=float, default=0.0,
+                        help="Simulated prompt processing speed; cached tokens skip it")
+    parser.add_argument("--pack-drop-rate", type=float, default=0.0, help="Share of packed inputs left unanswered")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    config = MockConfig(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        output_tokens=args.output_tokens,
+        payload_bytes=args.payload_bytes,
+        rate_429=args.rate_429,
+        rate_5xx=args.rate_5xx,
+        key_limit=args.key_limit,
+        key_window=args.key_window,
+        prefill_tokens_per_second=args.prefill_tokens_per_second,
+        pack_drop_rate=args.pack_drop_rate,
+        seed=args.seed,
+    )
+    server = MockProviderServer(config, host=args.host, port=args.port)
+    web.run_app(server.app(), host=args.host, port=args.port, access_log=None, print=None)
+
+if __name__ == "__main__":
+    main()